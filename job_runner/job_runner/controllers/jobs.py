@@ -25,6 +25,7 @@ from pylons.decorators import jsonify
 from job_runner.lib.base import BaseController
 from job_runner.utils.constants import *
 from job_runner.services.job_service import JobService
+from job_runner.services.job_status_cache import job_status_cache
 from job_runner.model.job_status import JobStatus
 from job_runner.services.service_exception import ServiceException
 
@@ -68,11 +69,13 @@ class JobsController(BaseController):
     Controller for jobs
     """
 
-    def __init__(self, job_service=JobService()):
+    def __init__(self, job_service=JobService(), status_cache=job_status_cache):
         """
         :param job_service: the job service
+        :param status_cache: cache of the statuses of finished jobs
         """
         self._job_service = job_service
+        self._job_status_cache = status_cache
 
     @jsonify
     def new(self):
@@ -103,6 +106,7 @@ class JobsController(BaseController):
         for namelist_file in json[JSON_MODEL_NAMELIST_FILES]:
             namelist.append(_validate_namelist_file(namelist_file))
 
+        self._job_status_cache.invalidate(int(json[JSON_MODEL_RUN_ID]))
         try:
             return self._job_service.submit(json)
         except ServiceException, ex:
@@ -111,23 +115,33 @@ class JobsController(BaseController):
     @jsonify
     def status(self):
         """
-        Return the statuses of the jobs requested
+        Return the statuses of the jobs requested, keyed by model run id
         """
 
         json = self._get_json_abort_on_error()
 
         log.debug("Status with parameters %s" % json)
 
-        queued_jobs_status = self._job_service.queued_jobs_status()
-        job_statuses = []
+        model_run_ids = []
         for job_id in json:
             try:
-                job_status = JobStatus(int(job_id))
-                job_status.check(self._job_service, queued_jobs_status)
-                job_statuses.append(job_status)
+                model_run_ids.append(int(job_id))
             except ValueError:
                 abort(400, "Job ids must all be integers")
 
+        queued_jobs_status = None
+        queued_jobs_status_time = None
+        job_statuses = {}
+        for model_run_id in model_run_ids:
+            job_status = self._job_status_cache.get(model_run_id)
+            if job_status is None:
+                if queued_jobs_status is None:
+                    queued_jobs_status, queued_jobs_status_time = self._job_service.queued_jobs_status_with_time()
+                job_status = JobStatus(model_run_id)
+                job_status.check(self._job_service, queued_jobs_status, queued_jobs_status_time)
+                self._job_status_cache.add(job_status)
+            job_statuses[model_run_id] = job_status
+
         return job_statuses
 
     @jsonify
@@ -144,6 +158,7 @@ class JobsController(BaseController):
             abort(400, "Model run id must be included")
         try:
             model_run_id = int(json[JSON_MODEL_RUN_ID])
+            self._job_status_cache.invalidate(model_run_id)
             self._job_service.delete(model_run_id)
         except ValueError:
             abort(400, "Model run id must be an integer")
@@ -39,6 +39,7 @@ class JobStatus(object):
         self.model_run_id = model_run_id
         self.status = ''
         self.error_message = ''
+        self.status_from_log = False  # true if the status was read from the job's output log
 
     def __json__(self):
         """
@@ -53,11 +54,12 @@ class JobStatus(object):
             'end_time': convert_time_to_standard_string(self.end_time),
             'storage_in_mb': self.storage_in_mb}
 
-    def check(self, job_service, bjobs_list):
+    def check(self, job_service, bjobs_list, bjobs_list_time=None):
         """
         Check the job status by usin gthe bjob output and log file
         :param job_service: the job service to use
         :param bjobs_list: the list of jobs on the system and their statuses
+        :param bjobs_list_time: the time the list of jobs was taken, None if not known
         :return:nothing
         """
         if not job_service.exists_run_dir(self.model_run_id):
@@ -76,12 +78,24 @@ class JobStatus(object):
             self.status = bjobs_list[bsub_id]
             return
 
+        if bjobs_list_time is not None:
+            bsub_id_written_time = job_service.get_bsub_id_written_time(run_dir)
+            if bsub_id_written_time is not None and bsub_id_written_time >= bjobs_list_time:
+                # submitted after the list of jobs was taken (maybe by another process) so the list can not say
+                # whether it has finished; the log may only be partly written
+                if job_service.exists_output_log(run_dir):
+                    self.status = constants.MODEL_RUN_STATUS_RUNNING
+                else:
+                    self.status = constants.MODEL_RUN_STATUS_PENDING
+                return
+
         try:
             log_file_parser = job_service.get_output_log_result(run_dir)
             self.status = log_file_parser.status
             self.start_time = log_file_parser.start_time
             self.end_time = log_file_parser.end_time
             self.storage_in_mb = log_file_parser.storage_in_mb
+            self.status_from_log = True
             if self.status == constants.MODEL_RUN_STATUS_FAILED:
                 self.error_message = log_file_parser.error_message
         except ServiceException, ex:
@@ -29,10 +29,11 @@ class LogFileParser(object):
     Class to parse a Jules log file
     """
 
-    def __init__(self, lines):
+    def __init__(self, lines, state=None):
         """
         Initiate
         :param lines: the log file lines to parse
+        :param state: state from a previous parse of the start of the log file to continue from (see get_state)
         :return:nothing
         """
         self._lines = lines
@@ -42,55 +43,126 @@ class LogFileParser(object):
         self.end_time = None
         self.storage_in_mb = 0
 
+        self._found_a_line = False
+        self._completed = False
+        self._errors = []
+        self._post_process_errors = []
+        if state is not None:
+            self._set_state(state)
+
     def parse(self):
         """
         Parse the log file this will set the status and error message
         :return: nothing
         """
+        for line in self._lines:
+            self._parse_line(line)
+        self._set_status()
 
-        found_a_line = False
-        errors = []
-        post_process_errors = []
+    def parse_from_offset(self, offset=0):
+        """
+        Parse the log file starting at a byte offset, this will set the status and error message. The lines must be
+        an open file. A final line without a line ending may still be being written so is parsed but is not included
+        in the returned offset and state
+        :param offset: the byte offset to start at, the end of the lines parsed to create the state
+        :return: tuple of the offset after the last complete line and the state of the parse at that offset
+        """
+        self._lines.seek(offset)
+        partial_line = None
         for line in self._lines:
-            found_a_line = True
-            error_line = line.split(constants.JULES_FATAL_ERROR_PREFIX)
-            post_process_error_line = line.split(constants.JULES_POST_PROCESS_ERROR_PREFIX)
-            if constants.JULES_RUN_COMPLETED_MESSAGE in line:
-                self.status = constants.MODEL_RUN_STATUS_COMPLETED
-            elif len(error_line) > 1:
-                errors.append(error_line[1].strip())
-            elif len(post_process_error_line) > 1:
-                post_process_errors.append(post_process_error_line[1].strip())
-            elif line.startswith(constants.JULES_START_TIME_PREFIX):
-                time = line[len(constants.JULES_START_TIME_PREFIX):].strip()
-                try:
-                    self.start_time = parse(time)
-                except (ValueError, TypeError):
-                    log.exception('Start time can not be converted from jules run script. Line is "%s"' % line)
-            elif line.startswith(constants.JULES_END_TIME_PREFIX):
-                time = line[len(constants.JULES_END_TIME_PREFIX):].strip()
-                try:
-                    self.end_time = parse(time)
-                except (ValueError, TypeError):
-                    log.exception('End time can not be converted from jules run script. Line is "%s"' % line)
-            elif line.startswith(constants.JULES_STORAGE_PREFIX):
-                storage = re.match("\s*(\d+).*", line[len(constants.JULES_STORAGE_PREFIX):])
-                if storage is not None:
-                    self.storage_in_mb = int(storage.group(1))
-                else:
-                    log.exception('Storage can not be converted from jules run script. Line is "%s"' % line)
+            if not line.endswith('\n'):
+                partial_line = line
+                break
+            offset += len(line)
+            self._parse_line(line)
+
+        state = self.get_state()
+        if partial_line is not None:
+            self._parse_line(partial_line)
+        self._set_status()
+        return offset, state
+
+    def get_state(self):
+        """
+        Get the state of the parse so far so that parsing can continue later without rereading the lines
+        :return: dictionary which can be converted to json
+        """
+        return {
+            'found_a_line': self._found_a_line,
+            'completed': self._completed,
+            'errors': list(self._errors),
+            'post_process_errors': list(self._post_process_errors),
+            'start_time': self.start_time.isoformat() if self.start_time is not None else None,
+            'end_time': self.end_time.isoformat() if self.end_time is not None else None,
+            'storage_in_mb': self.storage_in_mb}
+
+    def _set_state(self, state):
+        """
+        Set the state of the parse from a previous parse
+        :param state: the state returned from get_state
+        :return: nothing
+        """
+        self._found_a_line = state['found_a_line']
+        self._completed = state['completed']
+        self._errors = list(state['errors'])
+        self._post_process_errors = list(state['post_process_errors'])
+        self.start_time = parse(state['start_time']) if state['start_time'] is not None else None
+        self.end_time = parse(state['end_time']) if state['end_time'] is not None else None
+        self.storage_in_mb = state['storage_in_mb']
+
+    def _parse_line(self, line):
+        """
+        Parse a single line of the log file
+        :param line: the line
+        :return: nothing
+        """
+        self._found_a_line = True
+        if constants.JULES_RUN_COMPLETED_MESSAGE in line:
+            self._completed = True
+        elif constants.JULES_FATAL_ERROR_PREFIX in line:
+            self._errors.append(line.split(constants.JULES_FATAL_ERROR_PREFIX)[1].strip())
+        elif constants.JULES_POST_PROCESS_ERROR_PREFIX in line:
+            self._post_process_errors.append(line.split(constants.JULES_POST_PROCESS_ERROR_PREFIX)[1].strip())
+        elif line.startswith(constants.JULES_START_TIME_PREFIX):
+            time = line[len(constants.JULES_START_TIME_PREFIX):].strip()
+            try:
+                self.start_time = parse(time)
+            except (ValueError, TypeError):
+                log.exception('Start time can not be converted from jules run script. Line is "%s"' % line)
+        elif line.startswith(constants.JULES_END_TIME_PREFIX):
+            time = line[len(constants.JULES_END_TIME_PREFIX):].strip()
+            try:
+                self.end_time = parse(time)
+            except (ValueError, TypeError):
+                log.exception('End time can not be converted from jules run script. Line is "%s"' % line)
+        elif line.startswith(constants.JULES_STORAGE_PREFIX):
+            storage = re.match("\s*(\d+).*", line[len(constants.JULES_STORAGE_PREFIX):])
+            if storage is not None:
+                self.storage_in_mb = int(storage.group(1))
+            else:
+                log.exception('Storage can not be converted from jules run script. Line is "%s"' % line)
+
+    def _set_status(self):
+        """
+        Set the status and error message from what has been found in the lines
+        :return: nothing
+        """
+        self.status = None
+        self.error_message = None
+        if self._completed:
+            self.status = constants.MODEL_RUN_STATUS_COMPLETED
 
-        if not found_a_line:
+        if not self._found_a_line:
             self.status = constants.MODEL_RUN_STATUS_FAILED
             self.error_message = constants.ERROR_MESSAGE_OUTPUT_IS_EMPTY
             return
 
-        if len(post_process_errors) != 0:
+        if len(self._post_process_errors) != 0:
             self.status = constants.MODEL_RUN_STATUS_FAILED
-            self.error_message = "Post processing error:" + ", ".join(post_process_errors)
+            self.error_message = "Post processing error:" + ", ".join(self._post_process_errors)
         elif self.status != constants.MODEL_RUN_STATUS_COMPLETED:
             self.status = constants.MODEL_RUN_STATUS_FAILED
-            if len(errors) == 0:
+            if len(self._errors) == 0:
                 self.error_message = constants.ERROR_MESSAGE_UNKNOWN_JULES_ERROR
             else:
-                self.error_message = "Jules error:" + ", ".join(errors)
+                self.error_message = "Jules error:" + ", ".join(self._errors)
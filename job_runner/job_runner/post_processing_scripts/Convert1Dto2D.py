@@ -16,11 +16,14 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
-from sys import argv
-
+import argparse
+import errno
 import os
-from postProcessingRes0p5 import convert1Din2D
+from postProcessingRes0p5 import convert1Din2D, create_point_grid
 from postProcessBNG import ProcessingError, PostProcessBNG
+from aggregation import write_data_ranges_file, write_ncml_file
+from batch_processing import get_files_to_process, get_aggregation_pattern, process_files
+from chunking import CHUNKING_POLICIES, DEFAULT_CHUNKING_POLICY
 
 #  prefix in the post processing namelist file indicating the id
 PP_ID_LINE_START = 'id ='
@@ -29,86 +32,225 @@ PP_ID_LINE_START = 'id ='
 #  directory where processed files should be written to
 PROCESSED_PATH = 'processed'
 
-NCML_FILE = \
-"""<?xml version="1.0" encoding="UTF-8"?>
+#  directory shared between runs where the locations of points in the CHESS grid are cached
+BNG_POINT_LOCATIONS_CACHE_PATH = os.path.join('..', 'post_processing_cache')
 
-<netcdf xmlns="http://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2">
-    <aggregation dimName="Time" type="joinExisting" >
-        <scan location="." subdirs="false" regExp="^{netcdf_file_name_patern}.*\.nc$"/>
-    </aggregation>
-</netcdf>
-"""
+#  post processing script ids
+NO_CONVERSION = 0
+WATCH_CONVERSION = 1
+CHESS_CONVERSION = 2
+SINGLE_CELL_CONVERSION = 3
+
+#  script ids whose conversion grids 1D points at half degree resolution
+POINT_GRID_CONVERSIONS = [WATCH_CONVERSION, SINGLE_CELL_CONVERSION]
+
+#  state set up once in each batch process: the post processing script id, the shared point grid and chunking policy
+_batch_post_processing_script_id = None
+_batch_point_grid = None
+_batch_chunking_policy = DEFAULT_CHUNKING_POLICY
+
+
+def read_post_processing_script_id():
+    """
+    Read the post processing script id from the namelist in the run directory
+    :return: the id
+    """
+    post_processing_script_id = None
+    try:
+        f = open('post_processing.nml', 'r')
+        for line in f:
+            if line.strip().startswith(PP_ID_LINE_START):
+                post_processing_script = line.strip()[len(PP_ID_LINE_START):]
+                if post_processing_script.strip().isdigit():
+                    post_processing_script_id = int(post_processing_script.strip())
+        f.close()
+    except Exception:
+        raise ProcessingError("Exception when getting script id")
+    if post_processing_script_id is None:
+        raise ProcessingError("Post processing script id not found")
+    return post_processing_script_id
 
-print "-----------------------------------"
-print "Post processing File"
-
-file_to_process = str(argv[1])
-print
-print file_to_process
-
-# check to see which script to use
-post_processing_script_id = None
-try:
-    f = open('post_processing.nml', 'r')
-    for line in f:
-        if line.strip().startswith(PP_ID_LINE_START):
-            post_processing_script = line.strip()[len(PP_ID_LINE_START):]
-            if post_processing_script.strip().isdigit():
-                post_processing_script_id = int(post_processing_script.strip())
-    f.close()
-except Exception:
-    print "[POST PROCESS ERROR] Exception when getting script id"
-    exit()
-if post_processing_script_id is None:
-    print "[POST PROCESS ERROR] Post processing script id not found"
-    exit()
-
-# can not just check that the dir exists because in parallel this introduces a race condition so catch the error instead
-import errno
-try:
-    os.makedirs(PROCESSED_PATH)
-except OSError as e:
-    if e.errno != errno.EEXIST:
-        raise  # raises the error again
 
+def make_processed_dir():
+    """
+    Make the directory for the processed files
+    :return: nothing
+    """
+    # can not just check that the dir exists because in parallel this introduces a race condition so catch the error
+    try:
+        os.makedirs(PROCESSED_PATH)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise  # raises the error again
 
-basename = os.path.basename(file_to_process)
-input_dir_name = os.path.dirname(file_to_process)
-try:
-    if post_processing_script_id == 0:
+
+def convert_file(file_to_process, post_processing_script_id, point_grid=None, chunking_policy=DEFAULT_CHUNKING_POLICY):
+    """
+    Convert a JULES output file for visualisation, write its data ranges and remove the original
+    :param file_to_process: path of the file
+    :param post_processing_script_id: id of the conversion to use
+    :param point_grid: the grid for the points of 1D files, None to create it from the file
+    :param chunking_policy: how to chunk the gridded variables, one of chunking.CHUNKING_POLICIES
+    :return: nothing
+    """
+    basename = os.path.basename(file_to_process)
+    input_dir_name = os.path.dirname(file_to_process)
+    if post_processing_script_id == NO_CONVERSION:
         print "No conversion"
-    elif post_processing_script_id == 1:
+    elif post_processing_script_id == WATCH_CONVERSION:
         print "Watch conversion"
-        convert1Din2D(input_dir_name, PROCESSED_PATH, basename, verbose=True)
+        convert1Din2D(input_dir_name, PROCESSED_PATH, basename, verbose=True, point_grid=point_grid,
+                      chunking_policy=chunking_policy)
         os.remove(file_to_process)
-    elif post_processing_script_id == 2:
+    elif post_processing_script_id == CHESS_CONVERSION:
         print "Chess conversion"
-        p = PostProcessBNG()
-        p.open(input_dir_name, PROCESSED_PATH, basename)
-        p.convert_jules_1d_to_thredds_2d_for_chess(verbose=True)
-        p.close()
+        p = PostProcessBNG(index_cache_dir=BNG_POINT_LOCATIONS_CACHE_PATH, chunking_policy=chunking_policy)
+        try:
+            p.open(input_dir_name, PROCESSED_PATH, basename)
+            p.convert_jules_1d_to_thredds_2d_for_chess(verbose=True)
+        finally:
+            p.close()
         os.remove(file_to_process)
-    elif post_processing_script_id == 3:
+    elif post_processing_script_id == SINGLE_CELL_CONVERSION:
         print "Single cell conversion"
-        convert1Din2D(input_dir_name, PROCESSED_PATH, basename, verbose=True)
+        convert1Din2D(input_dir_name, PROCESSED_PATH, basename, verbose=True, point_grid=point_grid,
+                      chunking_policy=chunking_policy)
         os.remove(file_to_process)
     else:
-        print "[POST PROCESS ERROR] Post processing script id not recognised"
+        raise ProcessingError("Post processing script id not recognised")
+    if post_processing_script_id != NO_CONVERSION:
+        write_data_ranges_file(os.path.join(PROCESSED_PATH, basename))
+
+
+def write_ncml_file_for(file_processed):
+    """
+    Create or update the ncml file with the data ranges over all the files processed so far in the file's aggregation
+    :param file_processed: path of a file in the aggregation
+    :return: nothing
+    """
+    netcdf_file_name_pattern = get_aggregation_pattern(file_processed)
+    ncml_filename = os.path.join(os.path.dirname(file_processed), netcdf_file_name_pattern + '.ncml')
+
+    print "Writing ncml file " + ncml_filename
+    write_ncml_file(ncml_filename, netcdf_file_name_pattern, PROCESSED_PATH)
+
+
+def convert_single_file(file_to_process, chunking_policy=DEFAULT_CHUNKING_POLICY):
+    """
+    Convert a single file and update the ncml file for its aggregation
+    :param file_to_process: path of the file
+    :param chunking_policy: how to chunk the gridded variables, one of chunking.CHUNKING_POLICIES
+    :return: nothing
+    """
+    print "-----------------------------------"
+    print "Post processing File"
+    print
+    print file_to_process
+
+    try:
+        post_processing_script_id = read_post_processing_script_id()
+        make_processed_dir()
+        convert_file(file_to_process, post_processing_script_id, chunking_policy=chunking_policy)
+    except ProcessingError as ex:
+        print("[POST PROCESS ERROR] {}".format(ex.message))
         exit()
-except ProcessingError as ex:
-    print("[POST PROCESS ERROR] {}".format(ex.message))
-    exit()
 
-# create ncml file if needed
-parts = basename.split('.')
-netcdf_file_name_pattern = ".".join(parts[:2])
-ncml_filename = os.path.join(input_dir_name, netcdf_file_name_pattern + '.ncml')
+    write_ncml_file_for(file_to_process)
 
-if not os.path.exists(ncml_filename):
-    print "Creating ncml file " + ncml_filename
+    print "Post processing finished"
 
-    f = open(ncml_filename, 'w')
-    f.writelines(NCML_FILE.format(netcdf_file_name_patern=netcdf_file_name_pattern))
-    f.close()
 
-print "Post processing finished"
+def _init_batch_process(post_processing_script_id, point_grid, chunking_policy):
+    """
+    Set up the state shared by all the files a batch process converts
+    :param post_processing_script_id: id of the conversion to use
+    :param point_grid: the grid for the points of 1D files, or None
+    :param chunking_policy: how to chunk the gridded variables
+    :return: nothing
+    """
+    global _batch_post_processing_script_id, _batch_point_grid, _batch_chunking_policy
+    _batch_post_processing_script_id = post_processing_script_id
+    _batch_point_grid = point_grid
+    _batch_chunking_policy = chunking_policy
+
+
+def _convert_batch_file(file_to_process):
+    """
+    Convert a file in a batch process
+    :param file_to_process: path of the file
+    :return: nothing
+    """
+    convert_file(file_to_process, _batch_post_processing_script_id, _batch_point_grid, _batch_chunking_policy)
+
+
+def convert_batch(input_folder, task_id=1, task_count=1, process_count=None, chunking_policy=DEFAULT_CHUNKING_POLICY):
+    """
+    Convert this task's share of the JULES output files in a folder using a pool of processes. The post processing
+    namelist is read once, the grid for 1D points is created once from the first file and the ncml file for each
+    aggregation is written once all the files are converted.
+    :param input_folder: folder containing the JULES output
+    :param task_id: the id of this task, from 1 to task_count
+    :param task_count: the number of tasks the files are shared between
+    :param process_count: number of processes to use, None for the number of cpus on the node
+    :param chunking_policy: how to chunk the gridded variables, one of chunking.CHUNKING_POLICIES
+    :return: nothing
+    """
+    print "-----------------------------------"
+    print "Post processing folder {} as task {} of {}".format(input_folder, task_id, task_count)
+
+    try:
+        post_processing_script_id = read_post_processing_script_id()
+        make_processed_dir()
+    except ProcessingError as ex:
+        print("[POST PROCESS ERROR] {}".format(ex.message))
+        exit()
+
+    files_to_process = get_files_to_process(input_folder, task_id, task_count)
+    point_grid = None
+    if post_processing_script_id in POINT_GRID_CONVERSIONS and len(files_to_process) > 0:
+        point_grid = create_point_grid(files_to_process[0])
+
+    timings = process_files(
+        _convert_batch_file,
+        files_to_process,
+        process_count,
+        log_folder='.',
+        initializer=_init_batch_process,
+        initargs=(post_processing_script_id, point_grid, chunking_policy))
+
+    total_seconds = 0
+    for timing in timings:
+        total_seconds += timing.seconds
+        print "Converted {} in {:.1f}s".format(timing.file_path, timing.seconds)
+        if timing.error_message is not None:
+            print "[POST PROCESS ERROR] Post processing of {} failed: {}".format(
+                timing.file_path, timing.error_message)
+    print "Converted {} files in {:.1f}s of processing".format(len(timings), total_seconds)
+
+    patterns_written = set()
+    for file_processed in files_to_process:
+        pattern = get_aggregation_pattern(file_processed)
+        if pattern not in patterns_written:
+            patterns_written.add(pattern)
+            write_ncml_file_for(file_processed)
+
+    print "Post processing finished"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert JULES output files for visualisation")
+    parser.add_argument('file', nargs='?', help="a single file to convert")
+    parser.add_argument('--batch', metavar='FOLDER', help="convert all the output files in the folder")
+    parser.add_argument('--task', type=int, default=1, help="id of this task when sharing a batch between tasks")
+    parser.add_argument('--tasks', type=int, default=1, help="number of tasks sharing a batch")
+    parser.add_argument('--processes', type=int, default=None, help="number of processes to convert a batch with")
+    parser.add_argument('--chunking', choices=CHUNKING_POLICIES, default=DEFAULT_CHUNKING_POLICY,
+                        help="how to chunk the gridded variables in the converted files")
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        convert_batch(args.batch, args.task, args.tasks, args.processes, args.chunking)
+    elif args.file is not None:
+        convert_single_file(str(args.file), args.chunking)
+    else:
+        parser.error("give a file to convert or a folder with --batch")
@@ -0,0 +1,124 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import fcntl
+import json
+import math
+import os
+import re
+import netCDF4
+
+#  extension of the file written next to each post processed file recording the data range of its variables
+DATA_RANGES_FILE_EXTENSION = '.ranges.json'
+
+NCML_FILE = \
+"""<?xml version="1.0" encoding="UTF-8"?>
+
+<netcdf xmlns="http://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2">
+{variables}    <aggregation dimName="Time" type="joinExisting" >
+        <scan location="." subdirs="false" regExp="^{netcdf_file_name_patern}.*\.nc$"/>
+    </aggregation>
+</netcdf>
+"""
+
+NCML_VARIABLE_DATA_RANGE = \
+"""    <variable name="{name}">
+        <attribute name="actual_range" type="double" value="{min!r} {max!r}"/>
+    </variable>
+"""
+
+
+def write_data_ranges_file(netcdf_file_path):
+    """
+    Write the actual ranges of the variables in a post processed file to a file next to it, so that the range
+    over all files in an aggregation can be found without reading the data again
+    :param netcdf_file_path: path of the post processed netcdf file
+    :return: dictionary of variable name to [min, max]
+    """
+    data_ranges = {}
+    netcdf_file = netCDF4.Dataset(netcdf_file_path, 'r')
+    try:
+        for variable_name, variable in netcdf_file.variables.items():
+            if 'actual_range' in variable.ncattrs():
+                actual_range = variable.getncattr('actual_range')
+                data_range = [float(actual_range[0]), float(actual_range[1])]
+                if not math.isnan(data_range[0]) and not math.isnan(data_range[1]):
+                    data_ranges[variable_name] = data_range
+    finally:
+        netcdf_file.close()
+
+    with open(netcdf_file_path + DATA_RANGES_FILE_EXTENSION, 'w') as data_ranges_file:
+        json.dump(data_ranges, data_ranges_file)
+    return data_ranges
+
+
+def read_data_ranges(folder, netcdf_file_name_pattern):
+    """
+    Read and combine the data ranges of all the files in a folder which belong to an aggregation
+    :param folder: folder containing the data ranges files
+    :param netcdf_file_name_pattern: the start of the filename for all files in the aggregation
+    :return: dictionary of variable name to [min, max] over all the files
+    """
+    file_name_regex = re.compile('^' + re.escape(netcdf_file_name_pattern) + '.*\.nc' +
+                                 re.escape(DATA_RANGES_FILE_EXTENSION) + '$')
+    data_ranges = {}
+    for filename in sorted(os.listdir(folder)):
+        if not file_name_regex.match(filename):
+            continue
+        with open(os.path.join(folder, filename), 'r') as data_ranges_file:
+            file_data_ranges = json.load(data_ranges_file)
+        for variable_name, (range_min, range_max) in file_data_ranges.items():
+            if variable_name in data_ranges:
+                range_min = min(range_min, data_ranges[variable_name][0])
+                range_max = max(range_max, data_ranges[variable_name][1])
+            data_ranges[variable_name] = [range_min, range_max]
+    return data_ranges
+
+
+def create_ncml_file_contents(netcdf_file_name_pattern, data_ranges):
+    """
+    Create the contents of an ncml file which aggregates the files along the time dimension and sets the actual range
+    of each variable to the range over all the files
+    :param netcdf_file_name_pattern: the start of the filename for all files in the aggregation
+    :param data_ranges: dictionary of variable name to [min, max]
+    :return: the ncml
+    """
+    variables = ''.join([NCML_VARIABLE_DATA_RANGE.format(name=variable_name, min=data_range[0], max=data_range[1])
+                         for variable_name, data_range in sorted(data_ranges.items())])
+    return NCML_FILE.format(netcdf_file_name_patern=netcdf_file_name_pattern, variables=variables)
+
+
+def write_ncml_file(ncml_filename, netcdf_file_name_pattern, data_ranges_folder):
+    """
+    Write (or rewrite) the ncml file for an aggregation with the data ranges from all the files processed so far.
+    The file is locked whilst it is written because the files in an aggregation may be processed in parallel.
+    :param ncml_filename: the filename of the ncml file
+    :param netcdf_file_name_pattern: the start of the filename for all files in the aggregation
+    :param data_ranges_folder: folder containing the data ranges files
+    :return: nothing
+    """
+    with open(ncml_filename, 'a') as ncml_file:
+        fcntl.flock(ncml_file, fcntl.LOCK_EX)
+        try:
+            data_ranges = read_data_ranges(data_ranges_folder, netcdf_file_name_pattern)
+            ncml_file.seek(0)
+            ncml_file.truncate()
+            ncml_file.write(create_ncml_file_contents(netcdf_file_name_pattern, data_ranges))
+            ncml_file.flush()
+        finally:
+            fcntl.flock(ncml_file, fcntl.LOCK_UN)
@@ -0,0 +1,136 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+#  part of the filename of restart dumps, which are not post processed
+DUMP_FILE_NAME_PART = 'dump'
+
+#  prefix of the log file for each file converted in a batch
+BATCH_LOG_FILE_PREFIX = 'out_'
+
+
+class FileTiming(object):
+    """
+    The outcome of processing one file in a batch
+    """
+
+    def __init__(self, file_path, seconds, error_message=None):
+        """
+        :param file_path: path of the file processed
+        :param seconds: wall clock time taken to process the file
+        :param error_message: message if the processing failed, None if it succeeded
+        """
+        self.file_path = file_path
+        self.seconds = seconds
+        self.error_message = error_message
+
+
+def get_files_to_process(input_folder, task_id=1, task_count=1):
+    """
+    Get the JULES output files a task should process. The files are ordered largest first (as ls -S does) and dealt
+    out to the tasks in turn, restart dumps are not included
+    :param input_folder: the folder containing the JULES output
+    :param task_id: the id of this task, from 1 to task_count
+    :param task_count: the number of tasks the files are shared between
+    :return: list of file paths
+    """
+    file_paths = [os.path.join(input_folder, filename)
+                  for filename in os.listdir(input_folder)
+                  if filename.endswith('.nc') and DUMP_FILE_NAME_PART not in filename]
+    file_paths.sort(key=lambda file_path: (-os.path.getsize(file_path), file_path))
+    return [file_path for index, file_path in enumerate(file_paths) if index % task_count + 1 == task_id]
+
+
+def get_aggregation_pattern(filename):
+    """
+    Get the start of the filename shared by all the files in the same aggregation, e.g. majic.gpp_monthly
+    :param filename: the filename of a JULES output file
+    :return: the pattern
+    """
+    return ".".join(os.path.basename(filename).split('.')[:2])
+
+
+def get_default_process_count():
+    """
+    Get the number of processes to convert files with on this node
+    :return: the number of processes
+    """
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def process_files(process_file, file_paths, process_count=None, log_folder=None, initializer=None, initargs=()):
+    """
+    Process files in a pool of processes. Each file's output is written to its own log file.
+    :param process_file: function taking the file path to process; must be defined at module level
+    :param file_paths: paths of the files to process
+    :param process_count: number of processes, None for the number of cpus on the node
+    :param log_folder: folder in which to write the log for each file, None to not redirect the output
+    :param initializer: function to call once in each process before it processes any files
+    :param initargs: arguments to the initializer
+    :return: list of FileTimings in the order of file paths
+    """
+    if process_count is None:
+        process_count = get_default_process_count()
+    process_count = max(1, min(process_count, len(file_paths)))
+    tasks = [(process_file, file_path, log_folder) for file_path in file_paths]
+
+    if process_count == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [_process_file_with_timing(task) for task in tasks]
+
+    pool = multiprocessing.Pool(process_count, initializer, initargs)
+    try:
+        return pool.map(_process_file_with_timing, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _process_file_with_timing(task):
+    """
+    Process a file, catching any error and timing how long it takes
+    :param task: tuple of the process function, the file path and the log folder
+    :return: FileTiming
+    """
+    process_file, file_path, log_folder = task
+    original_stdout = sys.stdout
+    log_file = None
+    if log_folder is not None:
+        log_file = open(os.path.join(log_folder, BATCH_LOG_FILE_PREFIX + os.path.basename(file_path) + '.log'), 'a')
+        sys.stdout = log_file
+    start_time = time.time()
+    error_message = None
+    try:
+        process_file(file_path)
+    except Exception as ex:
+        traceback.print_exc(file=sys.stdout)
+        error_message = getattr(ex, 'message', None) or repr(ex)
+    finally:
+        sys.stdout = original_stdout
+        if log_file is not None:
+            log_file.close()
+    return FileTiming(file_path, time.time() - start_time, error_message)
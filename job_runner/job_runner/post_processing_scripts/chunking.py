@@ -0,0 +1,76 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import math
+
+#  leave the chunking to the netCDF library
+CHUNKING_DEFAULT = 'default'
+#  one map per chunk: fastest to read a map at one time, slowest to read the time series at a point
+CHUNKING_MAP = 'map'
+#  all times for a small tile of the map per chunk: fastest to read a time series, slowest to read a map
+CHUNKING_TIME_SERIES = 'time_series'
+#  the same fraction of time and of each map axis per chunk, a compromise between reading maps and time series
+CHUNKING_BALANCED = 'balanced'
+
+CHUNKING_POLICIES = [CHUNKING_DEFAULT, CHUNKING_MAP, CHUNKING_TIME_SERIES, CHUNKING_BALANCED]
+
+DEFAULT_CHUNKING_POLICY = CHUNKING_BALANCED
+
+#  approximate uncompressed size of a chunk
+DEFAULT_CHUNK_SIZE_IN_BYTES = 256 * 1024
+
+
+def get_chunk_sizes(dimensions, shape, itemsize, policy=DEFAULT_CHUNKING_POLICY,
+                    chunk_size_in_bytes=DEFAULT_CHUNK_SIZE_IN_BYTES, time_dimension='Time'):
+    """
+    Get the chunk sizes for a gridded variable in a post processed file. The variable's last two dimensions must be
+    the map's y and x. Any other dimensions apart from time (e.g. tiles or soil levels) are chunked one at a time so
+    that a single level can be read on its own.
+    :param dimensions: names of the variable's dimensions
+    :param shape: the shape of the variable
+    :param itemsize: size in bytes of each value
+    :param policy: the chunking policy, one of CHUNKING_POLICIES
+    :param chunk_size_in_bytes: approximate uncompressed size of a chunk
+    :param time_dimension: name of the time dimension
+    :return: list of chunk sizes, or None for the netCDF library's default chunking
+    """
+    if policy not in CHUNKING_POLICIES:
+        raise ValueError("Unknown chunking policy '{}'".format(policy))
+    if policy == CHUNKING_DEFAULT or len(shape) < 2 or min(shape) == 0:
+        return None
+
+    y_count, x_count = shape[-2:]
+    chunk_sizes = [1] * (len(shape) - 2) + [y_count, x_count]
+    if time_dimension not in dimensions[:-2] or policy == CHUNKING_MAP:
+        return chunk_sizes
+
+    time_index = list(dimensions).index(time_dimension)
+    time_count = shape[time_index]
+    values_per_chunk = max(1, chunk_size_in_bytes // itemsize)
+
+    if policy == CHUNKING_TIME_SERIES:
+        edge = int(math.sqrt(max(1, values_per_chunk // time_count)))
+        chunk_sizes[time_index] = time_count
+        chunk_sizes[-2:] = [max(1, min(y_count, edge)), max(1, min(x_count, edge))]
+        return chunk_sizes
+
+    # balanced: take the same fraction of time, y and x
+    fraction = min(1.0, (float(values_per_chunk) / (time_count * y_count * x_count)) ** (1.0 / 3.0))
+    chunk_sizes[time_index] = max(1, int(time_count * fraction))
+    chunk_sizes[-2:] = [max(1, int(y_count * fraction)), max(1, int(x_count * fraction))]
+    return chunk_sizes
@@ -0,0 +1,118 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import netCDF4
+import numpy as np
+from chunking import get_chunk_sizes, CHUNKING_POLICIES, DEFAULT_CHUNK_SIZE_IN_BYTES
+
+#  Benchmark the chunking policies for post processed files: for a synthetic gridded variable written with each policy
+#  report the write time, file size and the mean time to read the time series at a point and the map at a time, e.g.
+#
+#      python chunking_benchmark.py --times 365 --rows 1057 --cols 656
+
+
+def _create_data(y_count, x_count, time_index):
+    """
+    Create a smooth map with some noise so it compresses like model output
+    """
+    y, x = np.mgrid[0:y_count, 0:x_count]
+    data = np.sin(y / 50.0 + time_index / 10.0) * np.cos(x / 40.0) * 10.0
+    return (data + np.random.random((y_count, x_count))).astype(np.float32)
+
+
+def write_file(file_path, policy, time_count, y_count, x_count, chunk_size_in_bytes):
+    """
+    Write a file with the synthetic variable chunked using the policy
+    :return: the time taken in seconds
+    """
+    start_time = time.time()
+    netcdf_file = netCDF4.Dataset(file_path, 'w')
+    netcdf_file.createDimension('Time', time_count)
+    netcdf_file.createDimension('y', y_count)
+    netcdf_file.createDimension('x', x_count)
+    chunk_sizes = get_chunk_sizes(
+        ('Time', 'y', 'x'), (time_count, y_count, x_count), 4, policy, chunk_size_in_bytes)
+    variable = netcdf_file.createVariable(
+        'values', 'f4', ('Time', 'y', 'x'), zlib=True, fill_value=-99999.0, chunksizes=chunk_sizes)
+    block = variable.chunking()[0] if variable.chunking() != 'contiguous' else 1
+    for start in range(0, time_count, block):
+        stop = min(start + block, time_count)
+        variable[start:stop] = np.array([_create_data(y_count, x_count, index)
+                                         for index in range(start, stop)])
+    netcdf_file.close()
+    return time.time() - start_time
+
+
+def time_reads(file_path, read, count):
+    """
+    Time reads from a freshly opened file
+    :return: mean time per read in seconds
+    """
+    total = 0
+    for index in range(count):
+        netcdf_file = netCDF4.Dataset(file_path, 'r')
+        start_time = time.time()
+        read(netcdf_file.variables['values'], index)
+        total += time.time() - start_time
+        netcdf_file.close()
+    return total / count
+
+
+def run_benchmark(time_count, y_count, x_count, reads, chunk_size_in_bytes):
+    """
+    Run the benchmark and print the results
+    """
+    random = np.random.RandomState(1)
+    points = zip(random.randint(0, y_count, reads), random.randint(0, x_count, reads))
+    times = random.randint(0, time_count, reads)
+    folder = tempfile.mkdtemp()
+    try:
+        print "{} times x {} rows x {} cols, {} reads each".format(time_count, y_count, x_count, reads)
+        print "{:<12} {:>20} {:>10} {:>10} {:>16} {:>14}".format(
+            "policy", "chunks", "write s", "size MB", "point series ms", "map slice ms")
+        for policy in CHUNKING_POLICIES:
+            file_path = os.path.join(folder, policy + '.nc')
+            write_seconds = write_file(file_path, policy, time_count, y_count, x_count, chunk_size_in_bytes)
+            with_chunks = netCDF4.Dataset(file_path, 'r')
+            chunks = with_chunks.variables['values'].chunking()
+            with_chunks.close()
+            point_seconds = time_reads(file_path, lambda variable, index: variable[:, points[index][0],
+                                                                                  points[index][1]], reads)
+            map_seconds = time_reads(file_path, lambda variable, index: variable[times[index]], reads)
+            print "{:<12} {:>20} {:>10.2f} {:>10.1f} {:>16.1f} {:>14.1f}".format(
+                policy, chunks, write_seconds, os.path.getsize(file_path) / 1024.0 / 1024.0,
+                point_seconds * 1000, map_seconds * 1000)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the chunking policies for post processed files")
+    parser.add_argument('--times', type=int, default=365, help="number of times in the file")
+    parser.add_argument('--rows', type=int, default=360, help="number of rows in the map")
+    parser.add_argument('--cols', type=int, default=720, help="number of columns in the map")
+    parser.add_argument('--reads', type=int, default=20, help="number of reads to time for each layout")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE_IN_BYTES,
+                        help="approximate chunk size in bytes")
+    args = parser.parse_args()
+    run_benchmark(args.times, args.rows, args.cols, args.reads, args.chunk_size)
@@ -0,0 +1,165 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import numpy as np
+
+# default approximate memory to use for the data when scattering a variable onto the grid
+DEFAULT_MEMORY_BUDGET_IN_BYTES = 256 * 1024 * 1024
+
+
+class PointGrid(object):
+    """
+    A regular lat/lon grid covering the points of a 1D JULES output file, with the row and column of each point in the
+    grid. The pixel indexes are computed once and used to scatter every variable (and every file on the same points)
+    onto the grid.
+    """
+
+    def __init__(self, longitudes, latitudes, resolution, memory_budget_in_bytes=DEFAULT_MEMORY_BUDGET_IN_BYTES):
+        """
+        Create the grid for a set of points
+        :param longitudes: longitudes of the points
+        :param latitudes: latitudes of the points
+        :param resolution: the grid spacing in degrees
+        :param memory_budget_in_bytes: approximate memory to use for the data when scattering a variable
+        :return: nothing
+        """
+        self.longitudes = np.asarray(longitudes, dtype=np.float64).flatten()
+        self.latitudes = np.asarray(latitudes, dtype=np.float64).flatten()
+        self.resolution = resolution
+        self.memory_budget_in_bytes = memory_budget_in_bytes
+
+        self.lon_min = self.longitudes.min()
+        self.lon_max = self.longitudes.max()
+        self.lat_min = self.latitudes.min()
+        self.lat_max = self.latitudes.max()
+
+        self.rows = int(((self.lat_max - self.lat_min) / resolution) + 1)
+        self.cols = int(((self.lon_max - self.lon_min) / resolution) + 1)
+        self.yi = np.linspace(self.lat_min, self.lat_max, num=self.rows, endpoint=True)
+        self.xi = np.linspace(self.lon_min, self.lon_max, num=self.cols, endpoint=True)
+
+        # truncate towards zero as mapToPixel does
+        self.x_pixels = ((self.longitudes - self.lon_min) / resolution).astype(np.int64)
+        self.y_pixels = ((self.latitudes - self.lat_min) / resolution).astype(np.int64)
+        self.flat_index = self.y_pixels * self.cols + self.x_pixels
+
+    def get_envelope(self):
+        """
+        Get the envelope of the points in the same order as an OGR geometry envelope
+        :return: tuple of min longitude, max longitude, min latitude, max latitude
+        """
+        return self.lon_min, self.lon_max, self.lat_min, self.lat_max
+
+    def is_for_points(self, longitudes, latitudes):
+        """
+        Are these the points the grid was created for?
+        :param longitudes: longitudes of the points
+        :param latitudes: latitudes of the points
+        :return: True if they are the same points in the same order, False otherwise
+        """
+        return np.array_equal(np.asarray(longitudes, dtype=np.float64).flatten(), self.longitudes) and \
+            np.array_equal(np.asarray(latitudes, dtype=np.float64).flatten(), self.latitudes)
+
+    def scatter_variable(self, variable_in, variable_out, fill_value):
+        """
+        Scatter a variable from the points onto the grid
+        :param variable_in: variable with the points as its last two dimensions (1, number of points)
+        :param variable_out: variable with latitude and longitude as its last two dimensions
+        :param fill_value: the fill value for cells in the grid with no data
+        :return: tuple of the minimum and maximum value written or None if all values are fill values
+        """
+        data_range = scatter_points_onto_grid(
+            variable_in, variable_out, self.flat_index, fill_value, self.memory_budget_in_bytes)
+        if data_range is None:
+            return None
+        return float(data_range[0]), float(data_range[1])
+
+
+def scatter_points_onto_grid(variable_in, variable_out, flat_index, fill_value, memory_budget_in_bytes):
+    """
+    Scatter a variable from a list of points onto a grid. The data is read and written in hyperslabs along the first
+    dimension which fit in the memory budget and are aligned with the output chunks, all the leading dimensions of a
+    block are scattered onto the grid at once using a flat index
+    :param variable_in: variable with the points as its last two dimensions
+    :param variable_out: variable with the grid rows and columns as its last two dimensions
+    :param flat_index: index of each point in the flattened grid (row * number of columns + column)
+    :param fill_value: the fill value for cells in the grid with no data
+    :param memory_budget_in_bytes: approximate memory to use for the data
+    :return: tuple of the minimum and maximum value written (of the output type) or None if all values are fill values
+    """
+    rows, cols = variable_out.shape[-2:]
+    points_in = variable_in.shape[-2] * variable_in.shape[-1]
+    points_out = rows * cols
+
+    if len(variable_in.shape) == 2:
+        blocks = [None]
+    else:
+        blocks = get_scatter_blocks(variable_in, variable_out, points_in + points_out, memory_budget_in_bytes)
+
+    data_min = None
+    data_max = None
+    for block in blocks:
+        if block is None:
+            data_in = variable_in[:]
+        else:
+            data_in = variable_in[block]
+        data_in = np.ma.filled(data_in.astype(variable_out.dtype), fill_value)
+        leading_shape = data_in.shape[:-2]
+        data_in = data_in.reshape(-1, points_in)
+
+        data_out = np.empty((data_in.shape[0], points_out), dtype=variable_out.dtype)
+        data_out.fill(fill_value)
+        data_out[:, flat_index] = data_in
+        data_out = data_out.reshape(leading_shape + (rows, cols))
+
+        if block is None:
+            variable_out[:] = data_out
+        else:
+            variable_out[block] = data_out
+
+        values = data_in[data_in != fill_value]
+        if values.size > 0:
+            block_min = values.min()
+            block_max = values.max()
+            data_min = block_min if data_min is None else min(data_min, block_min)
+            data_max = block_max if data_max is None else max(data_max, block_max)
+
+    if data_min is None:
+        return None
+    return data_min, data_max
+
+
+def get_scatter_blocks(variable_in, variable_out, points_per_value, memory_budget_in_bytes):
+    """
+    Split the first dimension of the variable into blocks which fit in the memory budget
+    :param variable_in: variable to scatter
+    :param variable_out: variable to output
+    :param points_per_value: number of points in the input and output grid for each value of the leading dimensions
+    :param memory_budget_in_bytes: approximate memory to use for the data in a block
+    :return: list of slices along the first dimension
+    """
+    values_per_entry = int(np.prod(variable_in.shape[1:-2])) * points_per_value
+    bytes_per_entry = max(1, values_per_entry * variable_out.dtype.itemsize)
+    entries_per_block = max(1, memory_budget_in_bytes // bytes_per_entry)
+
+    chunking = variable_out.chunking()
+    if chunking != 'contiguous' and entries_per_block > chunking[0]:
+        entries_per_block -= entries_per_block % chunking[0]
+
+    count = variable_in.shape[0]
+    return [slice(start, min(start + entries_per_block, count)) for start in range(0, count, entries_per_block)]
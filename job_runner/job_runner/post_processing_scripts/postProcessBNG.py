@@ -17,9 +17,17 @@
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 import datetime
+import errno
+import hashlib
+import tempfile
 import netCDF4
 import numpy as np
 import os
+from chunking import get_chunk_sizes, DEFAULT_CHUNKING_POLICY
+from point_grid import scatter_points_onto_grid, DEFAULT_MEMORY_BUDGET_IN_BYTES
+
+# threshold for lats and lons of points to match those in the reference file
+LAT_LON_MATCH_THRESHOLD = 5e-5
 
 
 class ProcessingError(Exception):
@@ -105,83 +113,156 @@ class PostProcessBNG(object):
             raise ProcessingError("Can not process the file it does not appear to be a BNG file. "
                                   "It doesn't have both an x and y variables of size >0.")
 
-        lats_in = file_in.variables['latitude'][:].flatten()
-        lons_in = file_in.variables['longitude'][:].flatten()
-
         if 'latitude' not in file_in.variables or 'longitude' not in file_in.variables:
             raise ProcessingError("Can not process the file it does not appear to be a BNG file. "
                                   "It doesn't have both an latitude and longitude variables.")
 
-        lats_ref = self.reference_file_handle.variables['lat'][:]
-        lons_ref = self.reference_file_handle.variables['lon'][:]
-
-        # threshold for lats and lons to match
-        thresh = 5e-5
-
-        total_points = count_x_in * count_y_in
-        x_ref_index = np.zeros(total_points, dtype='int')
-        y_ref_index = np.zeros(total_points, dtype='int')
-
-        for index in range(total_points):
-            if verbose and index % 10000 == 0:
-                print "{} points of {}".format(index, total_points)
-            ref_indexes_found = np.where(
-                np.logical_and(
-                    np.abs(lats_ref-lats_in[index]) < thresh,
-                    np.abs(lons_ref-lons_in[index]) < thresh))
-            if len(ref_indexes_found[0]) == 1:
-                # axises are in order y x in file
-                x_ref_index[index] = ref_indexes_found[1]
-                y_ref_index[index] = ref_indexes_found[0]
+        lats_in = np.asarray(file_in.variables['latitude'][:]).flatten()
+        lons_in = np.asarray(file_in.variables['longitude'][:]).flatten()
+
+        index_cache_path = self._get_index_cache_path(lats_in, lons_in)
+        if index_cache_path is not None and os.path.exists(index_cache_path):
+            try:
+                with np.load(index_cache_path) as index_cache:
+                    self.x_ref_index = index_cache['x_ref_index']
+                    self.y_ref_index = index_cache['y_ref_index']
+                if verbose:
+                    print("Read point locations from {}".format(index_cache_path))
+                return
+            except (IOError, ValueError, KeyError):
+                print("Can not read point locations from {}, locating them again".format(index_cache_path))
+
+        lats_ref = np.asarray(self.reference_file_handle.variables['lat'][:])
+        lons_ref = np.asarray(self.reference_file_handle.variables['lon'][:])
+
+        ref_flat_index = self._find_points_in_reference_grid(lats_in, lons_in, lats_ref, lons_ref)
+
+        # axises are in order y x in file
+        self.y_ref_index, self.x_ref_index = [index.astype('int') for index in
+                                              np.unravel_index(ref_flat_index, lats_ref.shape)]
+        if verbose:
+            print("Located {} points".format(len(ref_flat_index)))
+
+        if index_cache_path is not None:
+            self._write_index_cache(index_cache_path)
+
+    def _find_points_in_reference_grid(self, lats_in, lons_in, lats_ref, lons_ref):
+        """
+        Find the index of each point in the reference grid which is within the threshold of it. The reference points
+        are hashed by their coordinates rounded to the threshold so each point only needs to be compared with the
+        reference points which have the same or neighbouring rounded coordinates
+        :param lats_in: latitudes of the points to find
+        :param lons_in: longitudes of the points to find
+        :param lats_ref: 2D array of reference grid latitudes
+        :param lons_ref: 2D array of reference grid longitudes
+        :return: array of indexes into the flattened reference grid
+        """
+        lats_ref_flat = lats_ref.flatten()
+        lons_ref_flat = lons_ref.flatten()
+        ref_keys = self._get_coordinate_hash(
+            self._round_to_threshold(lats_ref_flat), self._round_to_threshold(lons_ref_flat))
+        ref_order = np.argsort(ref_keys, kind='mergesort')
+        sorted_ref_keys = ref_keys[ref_order]
+
+        lat_keys_in = self._round_to_threshold(lats_in)
+        lon_keys_in = self._round_to_threshold(lons_in)
+        match_counts = np.zeros(len(lats_in), dtype='int')
+        ref_flat_index = np.zeros(len(lats_in), dtype='int')
+        for lat_offset in (-1, 0, 1):
+            for lon_offset in (-1, 0, 1):
+                keys = self._get_coordinate_hash(lat_keys_in + lat_offset, lon_keys_in + lon_offset)
+                candidates = np.searchsorted(sorted_ref_keys, keys, side='left')
+                ends = np.searchsorted(sorted_ref_keys, keys, side='right')
+                points = np.nonzero(candidates < ends)[0]
+                while len(points) > 0:
+                    ref_indexes = ref_order[candidates[points]]
+                    is_match = np.logical_and(
+                        np.abs(lats_ref_flat[ref_indexes] - lats_in[points]) < LAT_LON_MATCH_THRESHOLD,
+                        np.abs(lons_ref_flat[ref_indexes] - lons_in[points]) < LAT_LON_MATCH_THRESHOLD)
+                    match_counts[points[is_match]] += 1
+                    ref_flat_index[points[is_match]] = ref_indexes[is_match]
+                    candidates[points] += 1
+                    points = points[candidates[points] < ends[points]]
+
+        not_matched_once = np.nonzero(match_counts != 1)[0]
+        if len(not_matched_once) > 0:
+            index = not_matched_once[0]
+            if match_counts[index] == 0:
+                raise ProcessingError("point %d (%s %s) not found" % (index, lats_in[index], lons_in[index]))
             else:
-                if len(ref_indexes_found[0]) == 0:
-                    raise ProcessingError("point %d (%s %s) not found" % (index, lats_in[index], lons_in[index]))
-                elif len(ref_indexes_found[0]) > 1:
-                    raise ProcessingError("point %d (%s %s) been found %d times"
-                                          % (index, lats_in[index], lons_in[index], len(ref_indexes_found[0])))
+                raise ProcessingError("point %d (%s %s) been found %d times"
+                                      % (index, lats_in[index], lons_in[index], match_counts[index]))
+        return ref_flat_index
 
-        self.x_ref_index = x_ref_index
-        self.y_ref_index = y_ref_index
+    def _round_to_threshold(self, values):
+        """
+        Round coordinates to the nearest multiple of the match threshold, two coordinates which match differ by at
+        most one after rounding
+        :param values: the coordinates
+        :return: integer array of rounded coordinates in units of the threshold
+        """
+        return np.rint(np.asarray(values, dtype=np.float64) / LAT_LON_MATCH_THRESHOLD).astype(np.int64)
+
+    def _get_coordinate_hash(self, lat_keys, lon_keys):
+        """
+        Combine rounded latitudes and longitudes into a single integer
+        :param lat_keys: rounded latitudes
+        :param lon_keys: rounded longitudes (in the range +-2**22 which is over +-180 degrees)
+        :return: integer array
+        """
+        return lat_keys * 2 ** 23 + lon_keys + 2 ** 22
 
-    def _remap_variable_data(self, variable_in, variable_out):
+    def _get_index_cache_path(self, lats_in, lons_in):
+        """
+        Get the path of the file caching the located points for this reference file and set of points
+        :param lats_in: latitudes of the points to find
+        :param lons_in: longitudes of the points to find
+        :return: the path or None if the locations should not be cached
+        """
+        if self.index_cache_dir is None or self.reference_file_path is None:
+            return None
+        reference_file_stat = os.stat(self.reference_file_path)
+        key = hashlib.sha1()
+        key.update(os.path.abspath(self.reference_file_path))
+        key.update(str(reference_file_stat.st_size))
+        key.update(str(reference_file_stat.st_mtime))
+        key.update(np.ascontiguousarray(lats_in).tostring())
+        key.update(np.ascontiguousarray(lons_in).tostring())
+        return os.path.join(self.index_cache_dir, "bng_point_locations_{}.npz".format(key.hexdigest()))
+
+    def _write_index_cache(self, index_cache_path):
+        """
+        Write the located points to the cache file. The file is written under a temporary name and renamed so that
+        other processes never see a partly written file
+        :param index_cache_path: path of the cache file
+        :return: nothing
+        """
+        try:
+            try:
+                os.makedirs(self.index_cache_dir)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            handle, temporary_path = tempfile.mkstemp(dir=self.index_cache_dir, suffix='.tmp')
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, x_ref_index=self.x_ref_index, y_ref_index=self.y_ref_index)
+            os.rename(temporary_path, index_cache_path)
+        except (IOError, OSError) as ex:
+            print("Can not write point locations to {}: {}".format(index_cache_path, ex))
+
+    def _remap_variable_data(self, variable_in, variable_out, fill_value):
         """
         Remap the data variable from 1D to 2D using the indexes
         :param variable_in: variable to remap
         :param variable_out: variable to output
-        :return: nothing
+        :param fill_value: the fill value for cells in the grid with no data
+        :return: tuple of the minimum and maximum value written or None if all values are fill values
         """
-        if len(variable_in.shape) == 2:
-            variable_out[self.y_ref_index, self.x_ref_index] = variable_in[:].flatten()
-        elif len(variable_in.shape) == 3:
-            for t in range(variable_in.shape[0]):
-                variable_out[t, self.y_ref_index, self.x_ref_index] = variable_in[t, :, :].flatten()
-        elif len(variable_in.shape) == 4:
-            for t in range(variable_in.shape[0]):
-                for z in range(variable_in.shape[1]):
-                    variable_out[t, z, self.y_ref_index, self.x_ref_index] = variable_in[t, z, :, :].flatten()
-        elif len(variable_in.shape) == 5:
-            for i1 in range(variable_in.shape[0]):
-                for i2 in range(variable_in.shape[1]):
-                    for i3 in range(variable_in.shape[2]):
-                        variable_out[i1, i2, i3, self.y_ref_index, self.x_ref_index] =\
-                            variable_in[i1, i2, i3, :, :].flatten()
-        elif len(variable_in.shape) == 6:
-            for i1 in range(variable_in.shape[0]):
-                for i2 in range(variable_in.shape[1]):
-                    for i3 in range(variable_in.shape[2]):
-                        for i4 in range(variable_in.shape[3]):
-                            variable_out[i1, i2, i3, i4, self.y_ref_index, self.x_ref_index] =\
-                                variable_in[i1, i2, i3, i4, :, :].flatten()
-        elif len(variable_in.shape) == 7:
-            for i1 in range(variable_in.shape[0]):
-                for i2 in range(variable_in.shape[1]):
-                    for i3 in range(variable_in.shape[2]):
-                        for i4 in range(variable_in.shape[3]):
-                            for i5 in range(variable_in.shape[3]):
-                                variable_out[i1, i2, i3, i4, i5, self.y_ref_index, self.x_ref_index] =\
-                                    variable_in[i1, i2, i3, i4, i5, :, :].flatten()
-        else:
-            raise ProcessingError("too many dimensions to remap")
+        if len(variable_in.shape) < 2:
+            raise ProcessingError("too few dimensions to remap")
+        flat_index = self.y_ref_index * variable_out.shape[-1] + self.x_ref_index
+        return scatter_points_onto_grid(
+            variable_in, variable_out, flat_index, fill_value, self.memory_budget_in_bytes)
 
     def _convert_variables_and_dimensions(self, verbose):
         """
@@ -234,6 +315,12 @@ class PostProcessBNG(object):
 
                 dimensions_out = ['Time' if x == 'time' else x for x in dimensions_in]
 
+                chunk_sizes = None
+                if "x" in dimensions_in and "y" in dimensions_in:
+                    shape_out = [len(self.output_file_handle.dimensions[dim]) for dim in dimensions_out]
+                    chunk_sizes = get_chunk_sizes(
+                        dimensions_out, shape_out, variable_in.dtype.itemsize, self.chunking_policy)
+
                 if variable_name == "time":
                     variable_name_out = "Time"
                 else:
@@ -244,27 +331,26 @@ class PostProcessBNG(object):
                         variable_name_out,
                         variable_in.dtype,
                         dimensions=dimensions_out,
-                        zlib=compress_netcdf_file)
+                        zlib=compress_netcdf_file,
+                        chunksizes=chunk_sizes)
                 else:
                     variable_out = self.output_file_handle.createVariable(
                         variable_name_out,
                         variable_in.dtype,
                         dimensions=dimensions_out,
                         fill_value=fill_value_in,
-                        zlib=compress_netcdf_file)
+                        zlib=compress_netcdf_file,
+                        chunksizes=chunk_sizes)
 
                 for attr in var_attributes_in:
                     if attr not in ('_FillValue', 'fill_value', 'missing_value'):
                         variable_out.setncattr(attr, variable_in.getncattr(attr))
 
                 if "x" in dimensions_in and "y" in dimensions_in:
-                    remapped_array = np.ma.masked_equal(
-                        np.ones(self.output_file_handle.variables[variable_name].shape) * fill_value_in, fill_value_in)
-                    self._remap_variable_data(variable_in, remapped_array)
-                    variable_out[:] = remapped_array[:]
+                    data_range = self._remap_variable_data(variable_in, variable_out, fill_value_in)
                     # as long one element is not masked then set the actual range
-                    if not np.all(np.ma.getmaskarray(remapped_array)):
-                        variable_out.actual_range = remapped_array.min(), remapped_array.max()
+                    if data_range is not None:
+                        variable_out.actual_range = data_range
                 else:
                     variable_out[:] = variable_in[:]
 
@@ -332,15 +418,24 @@ class PostProcessBNG(object):
         coord.scale_factor_at_projection_origin = np.float_(0.9996012717)
         coord.EPSG_code = "EPSG:27700"
 
-    def __init__(self):
+    def __init__(self, memory_budget_in_bytes=DEFAULT_MEMORY_BUDGET_IN_BYTES, index_cache_dir=None,
+                 chunking_policy=DEFAULT_CHUNKING_POLICY):
         """
         Construct an object to perform a conversion.
+        :param memory_budget_in_bytes: approximate memory to use for the data when remapping a variable
+        :param index_cache_dir: directory in which to cache the locations of points in the reference file, None for
+        no caching
+        :param chunking_policy: how to chunk the gridded variables, one of chunking.CHUNKING_POLICIES
         :return: nothing
         """
+        self.memory_budget_in_bytes = memory_budget_in_bytes
+        self.index_cache_dir = index_cache_dir
+        self.chunking_policy = chunking_policy
         self.output_file_handle = None
         self.input_file_handle = None
         self.output_file_path = None
         self.reference_file_handle = None
+        self.reference_file_path = None
 
     def open(self, input_folder, output_folder, input_filename, ref_filepath='data/CHESS_v1.0/ancils/chess_lat_lon.nc'):
         """
@@ -356,6 +451,7 @@ class PostProcessBNG(object):
         output_file_path = os.path.join(output_folder, input_filename)
         self.output_file_handle = netCDF4.Dataset(output_file_path, 'w')
         self.reference_file_handle = netCDF4.Dataset(ref_filepath, 'r')
+        self.reference_file_path = ref_filepath
 
     def close(self):
         """
@@ -26,6 +26,8 @@ import netCDF4
 from osgeo import ogr
 import mpl_toolkits.basemap.pyproj as pyproj
 from dateutil.rrule import rrule, MONTHLY, DAILY, HOURLY
+from point_grid import PointGrid
+from chunking import get_chunk_sizes, DEFAULT_CHUNKING_POLICY
 
 
 # ======================================================================================================================
@@ -120,13 +122,35 @@ def netcdf2datetime(t,netcdfUnits):
 # ======================================================================================================================
 
 
-def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
+#  Spatial resolution of the grid in degrees
+GRID_RESOLUTION = 0.5
+
+
+def create_point_grid(netcdf_file_path):
+    """
+    Create the grid for the points in a 1D JULES output file, so that it can be shared by all files on those points
+    :param netcdf_file_path: path of the JULES output file
+    :return: the PointGrid, or None if the file is not 1D
+    """
+    fh = netCDF4.Dataset(netcdf_file_path, mode='r')
+    try:
+        if len(fh.dimensions[u'y']) != 1:
+            return None
+        return PointGrid(fh.variables['longitude'][:], fh.variables['latitude'][:], GRID_RESOLUTION)
+    finally:
+        fh.close()
+
+
+def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False, point_grid=None,
+                  chunking_policy=DEFAULT_CHUNKING_POLICY):
     """
     Convert 1D data into a 2D grid
     :param inputFolder: folder in which orginal file is stored
     :param outputFolder:  folder to output new file to
     :param inputFileName: filename of the file
     :param verbose: True to print more information on convert
+    :param point_grid: grid already created for the points (used if the file is for the same points), None to create it
+    :param chunking_policy: how to chunk the gridded variables, one of chunking.CHUNKING_POLICIES
     :return: nothing
     """
 
@@ -147,7 +171,7 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
     wgs84proj = pyproj.Proj('+init=EPSG:4326')
 
     #  Set spatial resolution
-    resolution = 0.5
+    resolution = GRID_RESOLUTION
 
     #  Define coordinate netcCDF file
     coordinatenetCDFFile = os.path.join(ROOTFOLDER, inputFileName)
@@ -167,10 +191,7 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
 
     if len(yDim) == 1:
 
-        #  Create multipoint geometry object
-        multipoint = ogr.Geometry(ogr.wkbMultiPoint)
-
-        #  Define arrays to hold point longitude, latitude and Z values
+        #  Define arrays to hold point longitude and latitude values
 
         longitude = fh.variables['longitude'][:]
         latitude = fh.variables['latitude'][:]
@@ -188,51 +209,37 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
         #  Close coordinates netCDF file
         fh.close()
 
-        #  Add netCDF coordinate file points to multipoint geometry object
-        for i in range(0, longitude.size):
-            point = ogr.Geometry(ogr.wkbPoint)
-            point.AddPoint(float(longitude[0][i]), float(latitude[0][i]))
-            multipoint.AddGeometry(point)
-            del point
-        del i
+        #  Locate the points in the grid once, the pixel indices are reused for every variable
+        if point_grid is not None and point_grid.is_for_points(longitude, latitude):
+            pointgrid = point_grid
+        else:
+            pointgrid = PointGrid(longitude, latitude, resolution)
 
-        #  Delete point longitude, latitude and Z arrays
+        #  Delete point longitude and latitude arrays
         del longitude, latitude
 
-        #  Examine multipoint geomtery object
+        envelope = pointgrid.get_envelope()
         if verbose==True:
-            print '\n\nmultipoint.GetGeometryCount():\t{0}'.format(multipoint.GetGeometryCount())
-            print '\n\nmultipoint.GetEnvelope():\t\t{0}'.format(multipoint.GetEnvelope())
+            print '\n\npoint count:\t\t\t\t\t{0}'.format(pointgrid.flat_index.size)
+            print '\n\nenvelope:\t\t\t\t\t\t{0}'.format(envelope)
 
-
-        # Get bottom left corner and upper right corner in EPSG:4326 ((WGS1984) from multipoint envelope
-        llcornerll = (multipoint.GetEnvelope()[0], multipoint.GetEnvelope()[2])
-        urcornerll = (multipoint.GetEnvelope()[1], multipoint.GetEnvelope()[3])
+        # Get bottom left corner and upper right corner in EPSG:4326 ((WGS1984) from the envelope
+        llcornerll = (envelope[0], envelope[2])
+        urcornerll = (envelope[1], envelope[3])
         if verbose==True:
             print '\n\nnllcornerll:\t\t\t\t\t{0}'.format(llcornerll)
             print 'urcornerll:\t\t\t\t\t\t{0}'.format(urcornerll)
 
-
-        ylength = multipoint.GetEnvelope()[3] - multipoint.GetEnvelope()[2]
-        rows = (ylength / resolution) + 1
-
-        xlength = multipoint.GetEnvelope()[1] - multipoint.GetEnvelope()[0]
-        cols = (xlength / resolution) + 1
+        rows = pointgrid.rows
+        cols = pointgrid.cols
 
         if verbose==True:
             print '\n\nrows:\t\t\t\t\t\t\t{0}'.format(rows)
             print 'cols:\t\t\t\t\t\t\t{0}'.format(cols)
 
-
         #  Define arrays for coordinate x and y values
-        yi = np.linspace(multipoint.GetEnvelope()[2], multipoint.GetEnvelope()[3], num=rows, endpoint=True)
-        xi = np.linspace(multipoint.GetEnvelope()[0], multipoint.GetEnvelope()[1], num=cols, endpoint=True)
-
-        # Set geotransformation tuple for converting coordinates to array indices.
-        # For the WATCH Forcing Data (WFD) no transformation is required as not
-        # converting between different projections just creating gridded netCDF
-        # files from 1-dimensional netCDF files.
-        gt = (multipoint.GetEnvelope()[0], resolution, 0.0, multipoint.GetEnvelope()[2], 0.0, resolution)
+        yi = pointgrid.yi
+        xi = pointgrid.xi
 
 
         #  Set NetCDF format
@@ -290,10 +297,10 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
         setattr(outnc, 'creator_name', 'MAJIC')
         setattr(outnc, 'creator_url', 'https://majic.ceh.ac.uk/')
         setattr(outnc, 'creator_email', 'majic@ceh.ac.uk')
-        setattr(outnc, 'geospatial_lon_min', multipoint.GetEnvelope()[0] - (resolution * 0.5))
-        setattr(outnc, 'geospatial_lat_min', multipoint.GetEnvelope()[2] - (resolution * 0.5))
-        setattr(outnc, 'geospatial_lon_max', multipoint.GetEnvelope()[1] + (resolution * 0.5))
-        setattr(outnc, 'geospatial_lat_max', multipoint.GetEnvelope()[3] + (resolution * 0.5))
+        setattr(outnc, 'geospatial_lon_min', envelope[0] - (resolution * 0.5))
+        setattr(outnc, 'geospatial_lat_min', envelope[2] - (resolution * 0.5))
+        setattr(outnc, 'geospatial_lon_max', envelope[1] + (resolution * 0.5))
+        setattr(outnc, 'geospatial_lat_max', envelope[3] + (resolution * 0.5))
 
         setattr(outnc, 'licence', 'https://majic.ceh.ac.uk/docs/majic_terms_and_conditions.pdf')
         setattr(outnc, 'publisher_name', 'Centre for Ecology & Hydrology')
@@ -395,17 +402,6 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
             if var not in NoList:
                 if verbose==True:
                     print '\nVariable: ' + var
-                #
-                # Define new variable shape
-                varShape = np.shape(fh.variables[var])
-
-                outVarShape = []
-                for i in range(len(varShape)-2):
-                    outVarShape.append(varShape[i])
-                outVarShape.append(rows)
-                outVarShape.append(cols)
-
-
                 #
                 # Define new variable dimensions
 
@@ -423,177 +419,19 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
                 if verbose==True:
                     print '  Dimensions: ' + str(newDim)
 
-                #
-                #  Define the empty month array
-                #array = np.empty((intervals, rows, cols), dtype=np.float)
-                array = np.empty(outVarShape, dtype=np.float)
-
-                array.fill(MISSINGVALUE)
-                if verbose==True:
-                    print '\t\t#\n\t\tarray.shape:\t\t\t{0}'.format(array.shape)
-                    print '\t\tarray.size:\t\t\t\t{0}'.format(array.size)
-
-                values = None
-                #
-                # If variable is 3 dimensional
-                if len(newDim)==3:
-                    # Loop through timesteps
-                    for i in range(intervals):
-                        values = fh.variables[var][i]
-                        #  Update minimum and maximum parameter values
-                        parameterminvalue = min(parameterminvalue, float(np.amin(values)))
-                        parametermaxvalue = max(parametermaxvalue, float(np.amax(values)))
-
-                        #
-                        #  Print interval
-                        if outputinterval:
-                            if verbose == True:
-                                print '\t\t\t{0:>3}:\t\t\t\t{1}'.format(i, dh)
-
-                        #  Loop for all points in multipoint geomtery object
-                        for j in range(0, multipoint.GetGeometryCount()):
-                            point = multipoint.GetGeometryRef(j)
-
-                            xpixel, ypixel = mapToPixel(point.GetX(), point.GetY(), gt)
-
-                            array[i][ypixel][xpixel] = values[0][j]
-
-                #
-                # If variable is 4 dimensional
-                if len(newDim)==4:
-                    secondDim=outVarShape[1]
-
-                    # Loop through timesteps
-                    for tile in range(int(secondDim)):
-                        for i in range(intervals):
-                            values = fh.variables[var][i][tile]
-                            #  Update minimum and maximum parameter values
-                            parameterminvalue = min(parameterminvalue, float(np.amin(values)))
-                            parametermaxvalue = max(parametermaxvalue, float(np.amax(values)))
-
-                            #
-                            #  Print interval
-                            if outputinterval:
-                                if verbose == True:
-                                    print '\t\t\t{0:>3}:\t\t\t\t{1}'.format(i, dh)
-
-                            #  Loop for all points in multipoint geomtery object
-                            for j in range(0, multipoint.GetGeometryCount()):
-                                point = multipoint.GetGeometryRef(j)
-
-                                xpixel, ypixel = mapToPixel(point.GetX(), point.GetY(), gt)
-
-                                array[i][tile][ypixel][xpixel] = values[0][j]
-
-                #
-                # If variable is 5 dimensional
-                if len(newDim)==5:
-                    secondDim = outVarShape[1]
-                    thirdDim = outVarShape[2]
-
-                    # Loop through timesteps
-                    for tile2 in range(int(thirdDim)):
-                        for tile in range(int(secondDim)):
-                            for i in range(intervals):
-                                values = fh.variables[var][i][tile][tile2]
-                                #  Update minimum and maximum parameter values
-                                parameterminvalue = min(parameterminvalue, float(np.amin(values)))
-                                parametermaxvalue = max(parametermaxvalue, float(np.amax(values)))
-
-                                #
-                                #  Print interval
-                                if outputinterval:
-                                    if verbose == True:
-                                        print '\t\t\t{0:>3}:\t\t\t\t{1}'.format(i, dh)
-
-                                #  Loop for all points in multipoint geomtery object
-                                for j in range(0, multipoint.GetGeometryCount()):
-                                    point = multipoint.GetGeometryRef(j)
-
-                                    xpixel, ypixel = mapToPixel(point.GetX(), point.GetY(), gt)
-
-                                    array[i][tile][tile2][ypixel][xpixel] = values[0][j]
-                #
-                # If variable is 6 dimensional
-                if len(newDim)==6:
-                    secondDim = outVarShape[1]
-                    thirdDim = outVarShape[2]
-                    fourthDim = outVarShape[3]
-
-                    # Loop through timesteps
-                    for tile3 in range(int(fourthDim)):
-                        for tile2 in range(int(thirdDim)):
-                            for tile in range(int(secondDim)):
-
-                                for i in range(intervals):
-                                    values = fh.variables[var][i][tile][tile2][tile3]
-                                    #  Update minimum and maximum parameter values
-                                    parameterminvalue = min(parameterminvalue, float(np.amin(values)))
-                                    parametermaxvalue = max(parametermaxvalue, float(np.amax(values)))
-
-                                    #
-                                    #  Print interval
-                                    if outputinterval:
-                                        if verbose == True:
-                                            print '\t\t\t{0:>3}:\t\t\t\t{1}'.format(i, dh)
-
-                                    #  Loop for all points in multipoint geomtery object
-                                    for j in range(0, multipoint.GetGeometryCount()):
-                                        point = multipoint.GetGeometryRef(j)
-
-                                        xpixel, ypixel = mapToPixel(point.GetX(), point.GetY(), gt)
-
-                                        array[i][tile][tile2][tile3][ypixel][xpixel] = values[0][j]
-
-                #
-                # If variable is 7 dimensional
-                if len(newDim)==7:
-                    secondDim = outVarShape[1]
-                    thirdDim = outVarShape[2]
-                    fourthDim = outVarShape[3]
-                    fifthDim = outVarShape[4]
-
-                    # Loop through timesteps
-                    for tile4 in range(int(fifthDim)):
-                        for tile3 in range(int(fourthDim)):
-                            for tile2 in range(int(thirdDim)):
-                                for tile in range(int(secondDim)):
-
-                                    for i in range(intervals):
-                                        values = fh.variables[var][i][tile][tile2][tile3][tile4]
-                                        #  Update minimum and maximum parameter values
-                                        parameterminvalue = min(parameterminvalue, float(np.amin(values)))
-                                        parametermaxvalue = max(parametermaxvalue, float(np.amax(values)))
-
-                                        #
-                                        #  Print interval
-                                        if outputinterval:
-                                            if verbose == True:
-                                                print '\t\t\t{0:>3}:\t\t\t\t{1}'.format(i, dh)
-
-                                        #  Loop for all points in multipoint geomtery object
-                                        for j in range(0, multipoint.GetGeometryCount()):
-                                            point = multipoint.GetGeometryRef(j)
-
-                                            xpixel, ypixel = mapToPixel(point.GetX(), point.GetY(), gt)
-
-                                            array[i][tile][tile2][tile3][tile4][ypixel][xpixel] = values[0][j]
-
-                # If variable has more than 7 dimensions: unsupported
-                if len(newDim) > 7:
-                    print 'Variables with 8 dimensions or greater are unsupported. \n\
-                            The array will be left empty'
-
-                #  Delete values numpy array
-                if values is not None:
-                    del values
-
                 #  Create out netCDF parameter variable
-                #outncvar = outnc.createVariable(var, 'f8', ('Time', 'Latitude', 'Longitude'), zlib=zlib, fill_value=MISSINGVALUE)
-                outncvar = outnc.createVariable(var, 'f8', newDim, zlib=zlib, fill_value=MISSINGVALUE)
-
-                if len(newDim) <= 7:
-                    outncvar[:] = array
+                #  Chunk the variable so that both maps and time series at a point can be read efficiently
+                outVarShape = [len(outnc.dimensions[dim]) for dim in newDim]
+                chunksizes = get_chunk_sizes(newDim, outVarShape, 8, chunking_policy, time_dimension=DIM_TIME_FINAL)
+                outncvar = outnc.createVariable(
+                    var, 'f8', newDim, zlib=zlib, fill_value=MISSINGVALUE, chunksizes=chunksizes)
+
+                #  Scatter all the points onto the grid for blocks of time steps (and all their tiles) at once,
+                #  writing each block as a hyperslab
+                datarange = pointgrid.scatter_variable(fh.variables[var], outncvar, MISSINGVALUE)
+                if datarange is not None:
+                    parameterminvalue = min(parameterminvalue, datarange[0])
+                    parametermaxvalue = max(parametermaxvalue, datarange[1])
 
                 for att in fh.variables[var].ncattrs():
                     if att != '_FillValue':
@@ -624,9 +462,6 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
         outnc.close()
         del outnc
         #
-        #  Delete the empty month array
-        del array
-        #
         #  Delete the time list
         del timelist
         #
@@ -636,8 +471,8 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
         #  Delete arrays for evenly-space coordinate x and y values
         del yi, xi
 
-        #  Delete multipoint object
-        del multipoint
+        #  Delete the point grid
+        del pointgrid
 
 #######################################################################
 ####################### IF JULES OUTPUT IS 2D #########################
@@ -855,7 +690,11 @@ def convert1Din2D(inputFolder, outputFolder, inputFileName, verbose=False):
                 if verbose==True:
                     print '  Dimensions: ' + str(newDim)
 
-                outncvar = outnc.createVariable(var, 'f8', newDim, zlib=zlib, fill_value=MISSINGVALUE)
+                #  Chunk the variable so that both maps and time series at a point can be read efficiently
+                outVarShape = [len(outnc.dimensions[dim]) for dim in newDim]
+                chunksizes = get_chunk_sizes(newDim, outVarShape, 8, chunking_policy, time_dimension=DIM_TIME_FINAL)
+                outncvar = outnc.createVariable(
+                    var, 'f8', newDim, zlib=zlib, fill_value=MISSINGVALUE, chunksizes=chunksizes)
                 outncvar[:] = fh.variables[var]
                 for att in fh.variables[var].ncattrs():
                     if att != '_FillValue':
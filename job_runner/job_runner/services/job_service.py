@@ -22,6 +22,7 @@ import subprocess
 import shutil
 
 import os
+import json
 from pylons import config
 import re
 
@@ -30,6 +31,7 @@ from job_runner.model.log_file_parser import LogFileParser
 from job_runner.model.bjobs_parser import BjobsParser
 from job_runner.utils.land_cover_editor import LandCoverEditor
 from job_runner.services.service_exception import ServiceException
+from job_runner.services.queued_jobs_status_cache import queued_jobs_status_cache
 
 
 log = logging.getLogger(__name__)
@@ -42,17 +44,21 @@ class JobService(object):
 
     def __init__(self, valid_code_versions=VALID_CODE_VERSIONS,
                  valid_single_processor_code_version=VALID_SINGLE_PROCESSOR_CODE_VERSIONS,
-                 land_cover_editor=LandCoverEditor()):
+                 land_cover_editor=LandCoverEditor(),
+                 queued_jobs_status_cache=queued_jobs_status_cache):
         """
         Constructor setups up valid code versions
 
         :param valid_single_processor_code_version: a dictionary of valid code versions and
         script files for single processor runs, defaults to constants
         :param valid_code_versions: a dictionary of valid code versions and script files, defaults to constants
+        :param land_cover_editor: the land cover editor
+        :param queued_jobs_status_cache: cache of the statuses of the jobs in the job queue
         """
         self._valid_code_version = valid_code_versions
         self._valid_single_processor_code_version = valid_single_processor_code_version
         self.land_cover_editor = land_cover_editor
+        self._queued_jobs_status_cache = queued_jobs_status_cache
 
     def exists_run_dir(self, model_run_id):
         """
@@ -91,6 +97,25 @@ class JobService(object):
         else:
             return None
 
+    def get_bsub_id_written_time(self, model_run_dir):
+        """
+        Get the time the bsub id file in the model run directory was written
+        :param model_run_dir: the model run directory
+        :return: the time in seconds since the epoch or None if there is no file
+        """
+        try:
+            return os.path.getmtime(os.path.join(model_run_dir, FILENAME_BSUB_ID))
+        except OSError:
+            return None
+
+    def exists_output_log(self, model_run_dir):
+        """
+        Check whether the job has started writing its output log
+        :param model_run_dir: the model run directory
+        :return: true if the output log exists
+        """
+        return os.path.exists(os.path.join(model_run_dir, FILENAME_OUTPUT_LOG))
+
     def write_bsub_id(self, model_run_dir, bsub_id):
         """
         Write the bsub id to the bsub id file in the model run directory
@@ -129,18 +154,63 @@ class JobService(object):
 
     def get_output_log_result(self, run_dir):
         """
-        Get the result of the Jules by looking at the log
+        Get the result of the Jules by looking at the log. Parsing continues from the checkpoint saved by the last
+        call so only lines added to the log since then are read
         :param run_dir: the run directory to get the file from
         :return: log file parser
         """
         file_path = os.path.join(run_dir, FILENAME_OUTPUT_LOG)
         if not os.path.exists(file_path):
             raise ServiceException(ERROR_MESSAGE_NO_LOG_FILE)
-        f = open(file_path, 'r')
-        log_file_parser = LogFileParser(f)
-        log_file_parser.parse()
+        checkpoint_path = os.path.join(run_dir, FILENAME_OUTPUT_LOG_CHECKPOINT)
+        file_stat = os.stat(file_path)
+        checkpoint = self._read_output_log_checkpoint(checkpoint_path)
+        if checkpoint is None \
+                or checkpoint['inode'] != file_stat.st_ino \
+                or checkpoint['offset'] > file_stat.st_size:
+            checkpoint = {'inode': file_stat.st_ino, 'offset': 0, 'state': None}
+
+        with open(file_path, 'r') as f:
+            log_file_parser = LogFileParser(f, checkpoint['state'])
+            offset, state = log_file_parser.parse_from_offset(checkpoint['offset'])
+
+        if offset != checkpoint['offset']:
+            self._write_output_log_checkpoint(
+                checkpoint_path,
+                {'inode': file_stat.st_ino, 'offset': offset, 'state': state})
         return log_file_parser
 
+    def _read_output_log_checkpoint(self, checkpoint_path):
+        """
+        Read the checkpoint of the parse of the output log
+        :param checkpoint_path: path of the checkpoint file
+        :return: the checkpoint or None if there isn't a valid one
+        """
+        if not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            log.exception("Can not read output log checkpoint %s, rereading the log" % checkpoint_path)
+            return None
+
+    def _write_output_log_checkpoint(self, checkpoint_path, checkpoint):
+        """
+        Write the checkpoint of the parse of the output log, this is written to a temporary file and renamed so
+        that a half written checkpoint is never read
+        :param checkpoint_path: path of the checkpoint file
+        :param checkpoint: the checkpoint
+        :return: nothing
+        """
+        temporary_path = checkpoint_path + '.tmp'
+        try:
+            with open(temporary_path, 'w') as f:
+                json.dump(checkpoint, f)
+            os.rename(temporary_path, checkpoint_path)
+        except (IOError, OSError):
+            log.exception("Can not write output log checkpoint %s" % checkpoint_path)
+
     def _create_run_dir(self, run_directory):
         """
         Create model run directory
@@ -185,6 +255,8 @@ class JobService(object):
 
         self._write_job_log(bsub_id, model_run_json)
         self.write_bsub_id(run_directory, bsub_id)
+        # the job will not be in the last snapshot of the job queue
+        self._queued_jobs_status_cache.clear()
 
         return bsub_id
 
@@ -252,9 +324,17 @@ class JobService(object):
 
         f.write('\n/\n')
 
-    def queued_jobs_status(self):
+    def queued_jobs_status_with_time(self):
         """
-        Get the status of jobs in the job queue
+        Get the status of jobs in the job queue and the time it was taken, this is a recent snapshot shared between
+        requests
+        :return: tuple of the status and the time in seconds since the epoch
+        """
+        return self._queued_jobs_status_cache.get_with_time(self._run_bjobs)
+
+    def _run_bjobs(self):
+        """
+        Run bjobs to get the status of jobs in the job queue
         :return: the status
         """
         try:
@@ -382,31 +462,35 @@ class JobService(object):
         base_file_name = land_cover_json_dict[JSON_LAND_COVER_BASE_FILE]
         base_file_frac_key = land_cover_json_dict[JSON_LAND_COVER_BASE_KEY]
 
-        # Make a copy of the base file in the run directory
-        base_file_path = self.land_cover_editor.copy_land_cover_base_map(base_file_name, run_directory)
-
         land_cover_actions = land_cover_json_dict[JSON_LAND_COVER_ACTIONS]
         land_cover_point_edit = land_cover_json_dict[JSON_LAND_COVER_POINT_EDIT]
 
         if len(land_cover_actions) > 0:
             # We need to edit the file using land cover regions
-            # Sort by order
+            # Sort by order and apply them all in one pass while writing the edited copy of the base file
             sorted_actions = sorted(land_cover_actions, key=lambda action: action[JSON_LAND_COVER_ORDER])
-            for land_cover_action in sorted_actions:
-                mask_file = land_cover_action[JSON_LAND_COVER_MASK_FILE]
-                value = land_cover_action[JSON_LAND_COVER_VALUE]
-                ice_index = land_cover_json_dict[JSON_LAND_COVER_ICE_INDEX]
-                mask_file_path = os.path.join(run_directory, mask_file)
-                self.land_cover_editor.apply_land_cover_action(base_file_path, mask_file_path,
-                                                               value, ice_index, key=base_file_frac_key)
-        elif land_cover_point_edit:
-            lat = land_cover_point_edit[JSON_LAND_COVER_LAT]
-            lon = land_cover_point_edit[JSON_LAND_COVER_LON]
-            values = land_cover_point_edit[JSON_LAND_COVER_FRACTIONAL_VALS]
-
-            # We just set a single value
-            self.land_cover_editor.apply_single_point_fractional_cover(base_file_path, values,
-                                                                       lat, lon, base_file_frac_key)
+            actions = [(os.path.join(run_directory, land_cover_action[JSON_LAND_COVER_MASK_FILE]),
+                        land_cover_action[JSON_LAND_COVER_VALUE])
+                       for land_cover_action in sorted_actions]
+            ice_index = land_cover_json_dict[JSON_LAND_COVER_ICE_INDEX]
+            self.land_cover_editor.apply_land_cover_actions(
+                os.path.join(run_directory, base_file_name),
+                os.path.join(run_directory, USER_EDITED_FRACTIONAL_FILENAME),
+                actions,
+                ice_index,
+                key=base_file_frac_key)
+        else:
+            # Make a copy of the base file in the run directory
+            base_file_path = self.land_cover_editor.copy_land_cover_base_map(base_file_name, run_directory)
+
+            if land_cover_point_edit:
+                lat = land_cover_point_edit[JSON_LAND_COVER_LAT]
+                lon = land_cover_point_edit[JSON_LAND_COVER_LON]
+                values = land_cover_point_edit[JSON_LAND_COVER_FRACTIONAL_VALS]
+
+                # We just set a single value
+                self.land_cover_editor.apply_single_point_fractional_cover(base_file_path, values,
+                                                                           lat, lon, base_file_frac_key)
 
     def duplicate_file(self, model_run_id_to_duplicate, filename, model_run_id):
         """
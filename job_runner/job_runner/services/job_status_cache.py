@@ -0,0 +1,93 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import threading
+import time
+from pylons import config
+from job_runner.utils import constants
+
+
+class JobStatusCache(object):
+    """
+    A short lived cache of the statuses of jobs which have finished (completed or failed), these will not change
+    so do not need to be found from the run directory on every status request
+    """
+
+    def __init__(self, time_to_live_in_s=None, clock=time.time):
+        """
+        Initiate the cache
+        :param time_to_live_in_s: how long to keep a status for, defaults to the config or constants value
+        :param clock: function returning the current time in seconds
+        :return: nothing
+        """
+        self._time_to_live_in_s = time_to_live_in_s
+        self._clock = clock
+        self._job_statuses = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_run_id):
+        """
+        Get the cached status of a job
+        :param model_run_id: the model run id
+        :return: the job status or None if it is not cached or has expired
+        """
+        with self._lock:
+            if model_run_id not in self._job_statuses:
+                return None
+            job_status, expires = self._job_statuses[model_run_id]
+            if expires <= self._clock():
+                del self._job_statuses[model_run_id]
+                return None
+            return job_status
+
+    def add(self, job_status):
+        """
+        Add a job status to the cache if the job has finished. Only statuses read from the job's output log are
+        cached; a failure because, e.g., the log could not be read may not be final
+        :param job_status: the job status
+        :return: nothing
+        """
+        if job_status.status not in constants.JOB_STATUS_CACHE_STATUSES or not job_status.status_from_log:
+            return
+        with self._lock:
+            now = self._clock()
+            for model_run_id, (cached_job_status, expires) in self._job_statuses.items():
+                if expires <= now:
+                    del self._job_statuses[model_run_id]
+            self._job_statuses[job_status.model_run_id] = (job_status, now + self._get_time_to_live_in_s())
+
+    def invalidate(self, model_run_id):
+        """
+        Remove a job status from the cache, e.g. because the run directory has changed
+        :param model_run_id: the model run id
+        :return: nothing
+        """
+        with self._lock:
+            self._job_statuses.pop(model_run_id, None)
+
+    def _get_time_to_live_in_s(self):
+        """
+        Get the time to keep a status in the cache for
+        :return: time in seconds
+        """
+        if self._time_to_live_in_s is not None:
+            return self._time_to_live_in_s
+        return float(config.get('job_status_cache_expire_in_s', constants.JOB_STATUS_CACHE_EXPIRE_IN_S))
+
+
+job_status_cache = JobStatusCache()
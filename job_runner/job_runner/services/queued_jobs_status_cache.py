@@ -0,0 +1,135 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import threading
+import time
+from pylons import config
+from job_runner.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class QueuedJobsStatusCache(object):
+    """
+    A snapshot of the statuses of the jobs in the job queue shared between requests. When the snapshot is too old
+    the first request to need it refreshes it and other requests wait for that refresh rather than running bjobs
+    themselves
+    """
+
+    def __init__(self, max_age_in_s=None, clock=time.time):
+        """
+        Initiate the cache
+        :param max_age_in_s: how old a snapshot can be before it is refreshed, defaults to the config or constants
+        value
+        :param clock: function returning the current time in seconds
+        :return: nothing
+        """
+        self._max_age_in_s = max_age_in_s
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._snapshot = None
+        self._snapshot_time = None
+        self._snapshot_taken_time = None
+        self._refreshing = False
+        self._hits = 0
+        self._refreshes = 0
+        self._refresh_time_in_s = 0.0
+        self._last_refresh_time_in_s = None
+
+    def get(self, get_queued_jobs_status):
+        """
+        Get the statuses of the jobs in the queue
+        :param get_queued_jobs_status: function to get the statuses if the snapshot needs refreshing
+        :return: dictionary of job ids and status
+        """
+        snapshot, taken_time = self.get_with_time(get_queued_jobs_status)
+        return snapshot
+
+    def get_with_time(self, get_queued_jobs_status):
+        """
+        Get the statuses of the jobs in the queue and when they were taken; jobs submitted after this time may not
+        be in the statuses
+        :param get_queued_jobs_status: function to get the statuses if the snapshot needs refreshing
+        :return: tuple of dictionary of job ids and status, and the time the statuses started to be taken
+        """
+        with self._condition:
+            while True:
+                if self._snapshot is not None and self._clock() - self._snapshot_time < self._get_max_age_in_s():
+                    self._hits += 1
+                    return self._snapshot, self._snapshot_taken_time
+                if not self._refreshing:
+                    self._refreshing = True
+                    break
+                self._condition.wait()
+
+        start_time = self._clock()
+        try:
+            snapshot = get_queued_jobs_status()
+        except:
+            with self._condition:
+                self._refreshing = False
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            now = self._clock()
+            self._snapshot = snapshot
+            self._snapshot_time = now
+            self._snapshot_taken_time = start_time
+            self._refreshing = False
+            self._refreshes += 1
+            self._last_refresh_time_in_s = now - start_time
+            self._refresh_time_in_s += self._last_refresh_time_in_s
+            self._condition.notify_all()
+        log.debug("Refreshed queued jobs status in %.2fs" % self._last_refresh_time_in_s)
+        return snapshot, start_time
+
+    def clear(self):
+        """
+        Remove the snapshot so that the next get refreshes it
+        :return: nothing
+        """
+        with self._condition:
+            self._snapshot = None
+            self._snapshot_time = None
+            self._snapshot_taken_time = None
+
+    def get_statistics(self):
+        """
+        Get statistics on the use of the cache
+        :return: dictionary of hits, refreshes, total refresh time and last refresh time in seconds
+        """
+        with self._condition:
+            return {
+                'hits': self._hits,
+                'refreshes': self._refreshes,
+                'refresh_time_in_s': self._refresh_time_in_s,
+                'last_refresh_time_in_s': self._last_refresh_time_in_s}
+
+    def _get_max_age_in_s(self):
+        """
+        Get the maximum age of a snapshot
+        :return: time in seconds
+        """
+        if self._max_age_in_s is not None:
+            return self._max_age_in_s
+        return float(config.get('queued_jobs_status_cache_max_age_in_s', constants.QUEUED_JOBS_STATUS_MAX_AGE_IN_S))
+
+
+queued_jobs_status_cache = QueuedJobsStatusCache()
@@ -0,0 +1,113 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pylons import config
+from job_runner.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class RegionIndexCache(object):
+    """
+    Indexes of the points inside land cover regions shared between model run submissions. The same few region masks
+    (countries, river basins) are used by most runs on a driving dataset, so each mask file is read once and kept as
+    the flat indexes of its points; the least recently used indexes are dropped when there are too many
+    """
+
+    def __init__(self, max_regions=None, get_modified_time=os.path.getmtime):
+        """
+        Initiate the cache
+        :param max_regions: how many region indexes to keep, defaults to the config or constants value
+        :param get_modified_time: function returning the modified time of a mask file
+        :return: nothing
+        """
+        self._max_regions = max_regions
+        self._get_modified_time = get_modified_time
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        self._hits = 0
+        self._loads = 0
+
+    def get(self, mask_file_path, grid_shape, key, load_region_index):
+        """
+        Get the index of the points inside a region
+        :param mask_file_path: Path of the mask file for the region
+        :param grid_shape: Shape of the land cover map grid the index is for
+        :param key: The name of the mask variable in the mask file
+        :param load_region_index: function to read the index from the mask file if it is not cached
+        :return: array of the flat indexes of the points in the grid inside the region
+        """
+        cache_key = (os.path.realpath(mask_file_path), key, tuple(grid_shape))
+        try:
+            modified_time = self._get_modified_time(mask_file_path)
+        except OSError:
+            # let reading the mask file report the problem
+            return load_region_index()
+        with self._lock:
+            entry = self._indexes.pop(cache_key, None)
+            if entry is not None and entry[0] == modified_time:
+                self._indexes[cache_key] = entry
+                self._hits += 1
+                return entry[1]
+
+        region_index = load_region_index()
+        region_index.flags.writeable = False
+
+        with self._lock:
+            self._indexes[cache_key] = (modified_time, region_index)
+            self._loads += 1
+            while len(self._indexes) > self._get_max_regions():
+                self._indexes.popitem(last=False)
+        log.debug("Indexed land cover region '%s' (%s points)" % (mask_file_path, len(region_index)))
+        return region_index
+
+    def clear(self):
+        """
+        Remove all the region indexes
+        :return: nothing
+        """
+        with self._lock:
+            self._indexes.clear()
+
+    def get_statistics(self):
+        """
+        Get statistics on the use of the cache
+        :return: dictionary of hits, loads and number of regions and points held
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'loads': self._loads,
+                'regions': len(self._indexes),
+                'points': sum(len(region_index) for _, region_index in self._indexes.values())}
+
+    def _get_max_regions(self):
+        """
+        Get the maximum number of region indexes to keep
+        :return: number of regions
+        """
+        if self._max_regions is not None:
+            return self._max_regions
+        return int(config.get('region_index_cache_max_regions', constants.REGION_INDEX_CACHE_MAX_REGIONS))
+
+
+region_index_cache = RegionIndexCache()
@@ -20,14 +20,14 @@ class TestJobsControllerStatus(TestController):
 
         assert_that(response.status_code, is_(400), "invalid request")
 
-    def test_GIVEN_empty_jobs_list_WHEN_get_job_status_THEN_empty_list_retutned(self):
+    def test_GIVEN_empty_jobs_list_WHEN_get_job_status_THEN_empty_dictionary_retutned(self):
         response = self.app.post_json(
             url(controller='jobs', action='status'),
             params=[]
         )
 
         assert_that(response.status_code, is_(200), "valid request")
-        assert_that(response.json_body, is_([]), "containing empty list")
+        assert_that(response.json_body, is_({}), "containing empty dictionary")
 
     def test_GIVEN_non_integer_job_id_WHEN_get_job_status_THEN_error(self):
         response = self.app.post_json(
@@ -47,7 +47,8 @@ class TestJobsControllerStatus(TestController):
 
         job_statuses = response.json_body
         assert_that(len(job_statuses), is_(1), "Number of job statuses")
-        assert_that(job_statuses[0]['id'], is_(model_run_id), "containing empty list")
-        assert_that(job_statuses[0]['status'], is_(constants.MODEL_RUN_STATUS_SUBMIT_FAILED), "containing empty list")
-        assert_that(job_statuses[0]['error_message'], is_(constants.ERROR_MESSAGE_NO_FOLDER), "containing empty list")
+        job_status = job_statuses[str(model_run_id)]
+        assert_that(job_status['id'], is_(model_run_id), "id")
+        assert_that(job_status['status'], is_(constants.MODEL_RUN_STATUS_SUBMIT_FAILED), "status")
+        assert_that(job_status['error_message'], is_(constants.ERROR_MESSAGE_NO_FOLDER), "error message")
 
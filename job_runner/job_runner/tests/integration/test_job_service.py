@@ -27,6 +27,8 @@ from job_runner.services.job_service import JobService
 from job_runner.utils.constants import *
 from job_runner.services.service_exception import ServiceException
 from job_runner.utils.land_cover_editor import LandCoverEditor
+from job_runner.services.queued_jobs_status_cache import QueuedJobsStatusCache
+from job_runner.model.job_status import JobStatus
 
 
 class TestJobService(TestController):
@@ -125,6 +127,20 @@ class TestJobService(TestController):
             return
         self.fail("Should have thrown an exception")
 
+    def test_GIVEN_job_queue_snapshot_recent_WHEN_submit_job_and_get_status_THEN_job_queue_reread(self):
+        queued_jobs = {}
+        job_service = JobService(queued_jobs_status_cache=QueuedJobsStatusCache(max_age_in_s=10))
+        job_service._run_bjobs = Mock(side_effect=lambda: dict(queued_jobs))
+        job_service.queued_jobs_status_with_time()
+
+        bsub_id = job_service.submit(self.model_run)
+        queued_jobs[int(bsub_id)] = MODEL_RUN_STATUS_PENDING
+        job_status = JobStatus(self.model_run_id)
+        job_status.check(job_service, *job_service.queued_jobs_status_with_time())
+
+        assert_that(job_service._run_bjobs.call_count, is_(2), "bjobs runs")
+        assert_that(job_status.status, is_(MODEL_RUN_STATUS_PENDING), "status")
+
     def test_GIVEN_land_cover_actions_WHEN_submit_job_THEN_land_cover_editor_called_correctly(self):
         land_cover_dict = {JSON_LAND_COVER_BASE_FILE: 'data/ancils/frac.nc',
                            JSON_LAND_COVER_BASE_KEY: 'frac',
@@ -139,31 +155,26 @@ class TestJobService(TestController):
         model_run_json = self.model_run
         model_run_json[JSON_LAND_COVER] = land_cover_dict
 
-        expected_copied_base_path = self.run_dir + '/user_edited_land_cover_fractional_file.nc'
+        expected_edited_path = self.run_dir + '/user_edited_land_cover_fractional_file.nc'
 
         land_cover_editor = LandCoverEditor()
-        land_cover_editor.copy_land_cover_base_map = Mock(return_value=expected_copied_base_path)
-        land_cover_editor.apply_land_cover_action = Mock()
+        land_cover_editor.copy_land_cover_base_map = Mock()
+        land_cover_editor.apply_land_cover_actions = Mock()
 
         job_service = JobService(land_cover_editor=land_cover_editor)
         job_service.submit(model_run_json)
 
-        # Check that the file was called to copy correctly
-        called_base_file, called_run_directory = land_cover_editor.copy_land_cover_base_map.call_args_list[0][0]
-        assert_that(called_base_file, is_('data/ancils/frac.nc'))
-        assert_that(called_run_directory, is_(self.run_dir))
-
-        # Check that the apply action was called correctly the first time
-        called_base, called_mask, called_value, ice = land_cover_editor.apply_land_cover_action.call_args_list[0][0]
-        assert_that(called_base, is_(expected_copied_base_path))
-        assert_that(called_mask, is_(self.run_dir + '/data/masks/mask2.nc'))
-        assert_that(called_value, is_('5'))
+        # Check that the base file is not copied before editing
+        assert_that(land_cover_editor.copy_land_cover_base_map.called, is_(False))
 
-        # Check that the apply actions was called correctly the second time
-        called_base, called_mask, called_value, ice = land_cover_editor.apply_land_cover_action.call_args_list[1][0]
-        assert_that(called_base, is_(expected_copied_base_path))
-        assert_that(called_mask, is_(self.run_dir + '/data/masks/mask1.nc'))
-        assert_that(called_value, is_('9'))
+        # Check that all the actions were applied in one call, in order
+        assert_that(land_cover_editor.apply_land_cover_actions.call_count, is_(1))
+        called_base, called_edited, called_actions, ice = land_cover_editor.apply_land_cover_actions.call_args[0]
+        assert_that(called_base, is_(self.run_dir + '/data/ancils/frac.nc'))
+        assert_that(called_edited, is_(expected_edited_path))
+        assert_that(called_actions, is_([(self.run_dir + '/data/masks/mask2.nc', '5'),
+                                         (self.run_dir + '/data/masks/mask1.nc', '9')]))
+        assert_that(ice, is_(9))
 
     def test_GIVEN_single_point_land_cover_edit_WHEN_submit_job_THEN_land_cover_editor_called_correctly(self):
         land_cover_dict = {JSON_LAND_COVER_BASE_FILE: 'data/ancils/frac.nc',
@@ -190,3 +201,23 @@ class TestJobService(TestController):
         assert_that(c_lat, is_(51.75))
         assert_that(c_lon, is_(-0.25))
         assert_that(c_vals, is_(8 * [0.0] + [1.0]))
+
+    def test_GIVEN_output_log_read_and_lines_appended_WHEN_get_output_log_result_THEN_result_includes_new_lines(self):
+        # not the model run directory because jobs submitted by other tests may still be writing to its log
+        run_dir = os.path.join(config['run_dir'], 'output_log_test')
+        if os.path.exists(run_dir):
+            shutil.rmtree(run_dir)
+        os.makedirs(run_dir)
+        log_path = os.path.join(run_dir, FILENAME_OUTPUT_LOG)
+        with open(log_path, 'w') as f:
+            f.write('Storage MB: 256\n')
+        first_result = self.job_service.get_output_log_result(run_dir)
+        with open(log_path, 'a') as f:
+            f.write(JULES_RUN_COMPLETED_MESSAGE + '\n')
+
+        result = self.job_service.get_output_log_result(run_dir)
+
+        assert_that(first_result.status, is_(MODEL_RUN_STATUS_FAILED), "status before completion")
+        assert_that(os.path.exists(os.path.join(run_dir, FILENAME_OUTPUT_LOG_CHECKPOINT)), is_(True), "checkpoint")
+        assert_that(result.status, is_(MODEL_RUN_STATUS_COMPLETED), "status")
+        assert_that(result.storage_in_mb, is_(256), "storage from checkpoint")
@@ -18,11 +18,14 @@
 """
 from netCDF4 import Dataset
 from hamcrest import assert_that, is_
+import numpy as np
 import os
 from pylons import config
 import shutil
+import tempfile
 from job_runner.tests import TestController
 from job_runner.utils.land_cover_editor import LandCoverEditor
+from job_runner.services.region_index_cache import RegionIndexCache
 from job_runner.services.service_exception import ServiceException
 
 
@@ -191,3 +194,133 @@ class TestLandCoverEditorApplySinglePoint(TestLandCoverEditor):
 
         frac = self._get_frac_values_at_point(frac_path, lat, lon)
         assert_that(frac, is_(cover))
+
+
+class TestLandCoverEditorApplyActionsInOnePass(TestController):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.base_path = os.path.join(self.test_dir, 'base.nc')
+        self.edited_path = os.path.join(self.test_dir, 'edited.nc')
+        self.ice_index = 3
+        # 3 types on a 3 x 4 grid: the first point is sea and the last point is ice
+        frac = np.ma.zeros((3, 3, 4))
+        frac[0, :, :] = 0.25
+        frac[1, :, :] = 0.75
+        frac[:, 2, 3] = [0.0, 0.0, 1.0]
+        frac[:, 0, 0] = np.ma.masked
+        self._create_file(self.base_path, frac, 'frac', 'Latitude', 'Longitude')
+        self.region_index_cache = RegionIndexCache(max_regions=10)
+        self.land_cover_editor = LandCoverEditor(region_index_cache=self.region_index_cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _create_file(self, path, values, key, lat_key='lat', lon_key='lon'):
+        ds = Dataset(path, 'w')
+        ds.title = 'test file'
+        ds.createDimension(lat_key, 3)
+        ds.createDimension(lon_key, 4)
+        ds.createVariable(lat_key, 'f4', (lat_key,))[:] = [50, 51, 52]
+        longitude = ds.createVariable(lon_key, 'f4', (lon_key,))
+        longitude.units = 'degrees_east'
+        longitude[:] = [0, 1, 2, 3]
+        dimensions = (lat_key, lon_key)
+        if values.ndim == 3:
+            ds.createDimension('pseudo', values.shape[0])
+            dimensions = ('pseudo',) + dimensions
+        ds.createVariable(key, values.dtype, dimensions, fill_value=-9999)[:] = values
+        ds.close()
+
+    def _create_mask(self, name, region):
+        """
+        Create a region mask file, the region is a list of (lat index, lon index) tuples
+        """
+        path = os.path.join(self.test_dir, name)
+        mask = np.ones((3, 4), dtype='i8')
+        for lat_index, lon_index in region:
+            mask[lat_index, lon_index] = 0
+        self._create_file(path, mask, 'frac')
+        return path
+
+    def _read_frac(self, path):
+        ds = Dataset(path, 'r')
+        frac = ds.variables['frac'][:]
+        ds.close()
+        return frac
+
+    def test_GIVEN_two_masks_overlapping_WHEN_apply_land_cover_actions_THEN_later_action_applied_in_overlap(self):
+        mask1 = self._create_mask('mask1.nc', [(1, 0), (1, 1)])
+        mask2 = self._create_mask('mask2.nc', [(1, 1), (1, 2)])
+
+        self.land_cover_editor.apply_land_cover_actions(
+            self.base_path, self.edited_path, [(mask1, 1), (mask2, 2)], self.ice_index)
+
+        frac = self._read_frac(self.edited_path)
+        assert_that(frac[:, 1, 0].tolist(), is_([1.0, 0.0, 0.0]))
+        assert_that(frac[:, 1, 1].tolist(), is_([0.0, 1.0, 0.0]))
+        assert_that(frac[:, 1, 2].tolist(), is_([0.0, 1.0, 0.0]))
+        assert_that(frac[:, 0, 1].tolist(), is_([0.25, 0.75, 0.0]))
+
+    def test_GIVEN_mask_including_sea_and_ice_WHEN_apply_land_cover_actions_THEN_sea_and_ice_unchanged(self):
+        mask = self._create_mask('mask.nc', [(0, 0), (2, 3)])
+
+        self.land_cover_editor.apply_land_cover_actions(self.base_path, self.edited_path, [(mask, 1)], self.ice_index)
+
+        frac = self._read_frac(self.edited_path)
+        assert_that(frac.mask[:, 0, 0].tolist(), is_([True, True, True]))
+        assert_that(frac[:, 2, 3].tolist(), is_([0.0, 0.0, 1.0]))
+
+    def test_GIVEN_actions_WHEN_apply_land_cover_actions_THEN_same_as_applying_actions_one_at_a_time(self):
+        mask1 = self._create_mask('mask1.nc', [(0, 1), (1, 1), (2, 1)])
+        mask2 = self._create_mask('mask2.nc', [(1, 0), (1, 1), (1, 2), (1, 3)])
+        actions = [(mask1, 3), (mask2, 2), (mask1, 1)]
+        shutil.copyfile(self.base_path, self.edited_path)
+        for mask, value in actions:
+            self.land_cover_editor.apply_land_cover_action(self.edited_path, mask, value, self.ice_index)
+        expected_frac = self._read_frac(self.edited_path)
+        os.remove(self.edited_path)
+
+        self.land_cover_editor.apply_land_cover_actions(self.base_path, self.edited_path, actions, self.ice_index)
+
+        frac = self._read_frac(self.edited_path)
+        assert_that(frac.tolist(), is_(expected_frac.tolist()))
+
+    def test_GIVEN_actions_WHEN_apply_land_cover_actions_THEN_base_file_unchanged_and_rest_of_file_copied(self):
+        mask = self._create_mask('mask.nc', [(1, 1)])
+        base_frac = self._read_frac(self.base_path)
+
+        self.land_cover_editor.apply_land_cover_actions(self.base_path, self.edited_path, [(mask, 1)], self.ice_index)
+
+        assert_that(self._read_frac(self.base_path).tolist(), is_(base_frac.tolist()))
+        ds = Dataset(self.edited_path, 'r')
+        assert_that(ds.title, is_('test file'))
+        assert_that(ds.variables['Latitude'][:].tolist(), is_([50, 51, 52]))
+        assert_that(ds.variables['Longitude'].units, is_('degrees_east'))
+        assert_that(ds.variables['frac']._FillValue, is_(-9999))
+        ds.close()
+
+    def test_GIVEN_mask_used_by_earlier_run_WHEN_apply_land_cover_actions_THEN_mask_file_not_read_again(self):
+        mask = self._create_mask('mask.nc', [(1, 1)])
+        self.land_cover_editor.apply_land_cover_actions(self.base_path, self.edited_path, [(mask, 1)], self.ice_index)
+        os.remove(self.edited_path)
+
+        self.land_cover_editor.apply_land_cover_actions(
+            self.base_path, self.edited_path, [(mask, 2), (mask, 1)], self.ice_index)
+
+        statistics = self.region_index_cache.get_statistics()
+        assert_that(statistics['loads'], is_(1), "loads")
+        assert_that(statistics['hits'], is_(2), "hits")
+        assert_that(self._read_frac(self.edited_path)[:, 1, 1].tolist(), is_([1.0, 0.0, 0.0]))
+
+    def test_GIVEN_mask_wrong_shape_for_grid_WHEN_apply_land_cover_actions_THEN_exception_and_no_file_written(self):
+        mask = os.path.join(self.test_dir, 'wrong-shape.nc')
+        ds = Dataset(mask, 'w')
+        ds.createDimension('lat', 2)
+        ds.createVariable('frac', 'i8', ('lat',))[:] = [0, 1]
+        ds.close()
+
+        with self.assertRaises(ServiceException):
+            self.land_cover_editor.apply_land_cover_actions(
+                self.base_path, self.edited_path, [(mask, 1)], self.ice_index)
+        assert_that(os.path.exists(self.edited_path), is_(False))
@@ -0,0 +1,78 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+import os
+import shutil
+import tempfile
+
+from hamcrest import *
+import netCDF4
+import numpy as np
+from job_runner.tests import TestController
+from job_runner.post_processing_scripts.aggregation import write_data_ranges_file, read_data_ranges, \
+    write_ncml_file, DATA_RANGES_FILE_EXTENSION
+
+
+class TestAggregation(TestController):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def create_processed_file(self, filename, values):
+        file_path = os.path.join(self.folder, filename)
+        netcdf_file = netCDF4.Dataset(file_path, mode="w")
+        netcdf_file.createDimension('Time', len(values))
+        variable = netcdf_file.createVariable('gpp', 'f4', ('Time',))
+        variable[:] = values
+        variable.actual_range = np.min(values), np.max(values)
+        netcdf_file.createVariable('Time', 'f4', ('Time',))
+        netcdf_file.close()
+        return file_path
+
+    def test_GIVEN_processed_file_WHEN_write_data_ranges_file_THEN_ranges_of_variables_with_actual_range_written(self):
+        file_path = self.create_processed_file("majic.gpp_monthly.1961.nc", [1.0, 5.0, 3.0])
+
+        write_data_ranges_file(file_path)
+
+        assert_that(os.path.exists(file_path + DATA_RANGES_FILE_EXTENSION), is_(True))
+        assert_that(read_data_ranges(self.folder, "majic.gpp_monthly"), is_({'gpp': [1.0, 5.0]}))
+
+    def test_GIVEN_several_files_in_aggregation_WHEN_read_data_ranges_THEN_range_over_all_files_returned(self):
+        write_data_ranges_file(self.create_processed_file("majic.gpp_monthly.1961.nc", [1.0, 5.0]))
+        write_data_ranges_file(self.create_processed_file("majic.gpp_monthly.1962.nc", [-2.0, 4.0]))
+        write_data_ranges_file(self.create_processed_file("majic.gpp_daily.1961.nc", [-20.0, 40.0]))
+
+        data_ranges = read_data_ranges(self.folder, "majic.gpp_monthly")
+
+        assert_that(data_ranges, is_({'gpp': [-2.0, 5.0]}))
+
+    def test_GIVEN_several_files_in_aggregation_WHEN_write_ncml_file_THEN_ncml_has_aggregation_and_actual_range(self):
+        write_data_ranges_file(self.create_processed_file("majic.gpp_monthly.1961.nc", [1.0, 5.0]))
+        write_data_ranges_file(self.create_processed_file("majic.gpp_monthly.1962.nc", [-2.0, 4.0]))
+        ncml_filename = os.path.join(self.folder, "majic.gpp_monthly.ncml")
+
+        write_ncml_file(ncml_filename, "majic.gpp_monthly", self.folder)
+        write_ncml_file(ncml_filename, "majic.gpp_monthly", self.folder)
+
+        with open(ncml_filename) as ncml_file:
+            ncml = ncml_file.read()
+        assert_that(ncml.count("<netcdf "), is_(1))
+        assert_that(ncml, contains_string('regExp="^majic.gpp_monthly.*\.nc$"'))
+        assert_that(ncml, contains_string('<variable name="gpp">'))
+        assert_that(ncml, contains_string('<attribute name="actual_range" type="double" value="-2.0 5.0"/>'))
@@ -0,0 +1,100 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+import os
+import shutil
+import tempfile
+
+from hamcrest import *
+from job_runner.tests import TestController
+from job_runner.post_processing_scripts.batch_processing import get_files_to_process, get_aggregation_pattern, \
+    process_files, BATCH_LOG_FILE_PREFIX
+
+_initialised_with = None
+
+
+def _initialise(value):
+    global _initialised_with
+    _initialised_with = value
+
+
+def _process_file(file_path):
+    print "processing " + file_path
+    if file_path.endswith('bad.nc'):
+        raise Exception("bad file")
+    with open(file_path + '.done', 'w') as done_file:
+        done_file.write(str(_initialised_with))
+
+
+class TestBatchProcessing(TestController):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def create_file(self, filename, size=1):
+        file_path = os.path.join(self.folder, filename)
+        with open(file_path, 'w') as output_file:
+            output_file.write('x' * size)
+        return file_path
+
+    def test_GIVEN_output_files_WHEN_get_files_to_process_THEN_netcdf_files_without_dumps_largest_first(self):
+        small = self.create_file("majic.gpp.1961.nc", 1)
+        large = self.create_file("majic.gpp.1962.nc", 10)
+        self.create_file("majic.dump.19610101.0.nc", 100)
+        self.create_file("majic.gpp.ncml", 100)
+
+        files = get_files_to_process(self.folder)
+
+        assert_that(files, contains(large, small))
+
+    def test_GIVEN_two_tasks_WHEN_get_files_to_process_THEN_files_dealt_out_to_tasks_in_turn(self):
+        files = [self.create_file("majic.gpp.{}.nc".format(year), 10 - index)
+                 for index, year in enumerate(range(1961, 1966))]
+
+        assert_that(get_files_to_process(self.folder, 1, 2), contains(files[0], files[2], files[4]))
+        assert_that(get_files_to_process(self.folder, 2, 2), contains(files[1], files[3]))
+
+    def test_GIVEN_filename_WHEN_get_aggregation_pattern_THEN_first_two_parts_of_filename(self):
+        assert_that(get_aggregation_pattern("/output/majic.gpp_monthly.1961.nc"), is_("majic.gpp_monthly"))
+
+    def test_GIVEN_files_WHEN_process_files_in_pool_THEN_all_processed_after_initialising_with_timings_and_logs(self):
+        files = [self.create_file("majic.gpp.{}.nc".format(year)) for year in range(1961, 1965)]
+
+        timings = process_files(_process_file, files, 2, self.folder, _initialise, ("initialised",))
+
+        assert_that([timing.file_path for timing in timings], is_(files))
+        for timing in timings:
+            assert_that(timing.error_message, is_(None))
+            assert_that(timing.seconds, greater_than_or_equal_to(0))
+        for file_path in files:
+            with open(file_path + '.done') as done_file:
+                assert_that(done_file.read(), is_("initialised"))
+            log_path = os.path.join(self.folder, BATCH_LOG_FILE_PREFIX + os.path.basename(file_path) + '.log')
+            with open(log_path) as log_file:
+                assert_that(log_file.read(), contains_string("processing " + file_path))
+
+    def test_GIVEN_file_which_fails_WHEN_process_files_THEN_error_reported_and_other_files_processed(self):
+        good = self.create_file("majic.gpp.good.nc")
+        bad = self.create_file("majic.gpp.bad.nc")
+
+        timings = process_files(_process_file, [bad, good], 1, self.folder, _initialise, ("initialised",))
+
+        assert_that(timings[0].error_message, is_("bad file"))
+        assert_that(timings[1].error_message, is_(None))
+        assert_that(os.path.exists(good + '.done'), is_(True))
@@ -89,6 +89,7 @@ class TestJobRunnerClient(TestController):
         self.job_status.check(self.job_service, bjobs_list)
 
         assert_that(self.job_status.status, is_(constants.MODEL_RUN_STATUS_COMPLETED), "Job status")
+        assert_that(self.job_status.status_from_log, is_(True), "Status from log")
 
     def test_GIVEN_job_is_not_in_list_and_log_has_failed_in_WHEN_get_job_status_THEN_job_status_faield(self):
 
@@ -121,6 +122,53 @@ class TestJobRunnerClient(TestController):
         assert_that(self.job_status.status, is_(constants.MODEL_RUN_STATUS_FAILED), "Job status")
         assert_that(self.job_status.error_message, is_(expected_error_msg), "Error message")
 
+    def test_GIVEN_job_submitted_after_list_taken_and_no_log_WHEN_get_job_status_THEN_job_status_pending(self):
+
+        bsub_id = 10
+        bjobs_list = {}
+        self.job_service.exists_run_dir = Mock(return_value=True)
+        self.job_service.get_bsub_id = Mock(return_value=bsub_id)
+        self.job_service.exists_output_log = Mock(return_value=False)
+        self.job_service.get_bsub_id_written_time = Mock(return_value=1005.0)
+        self.job_service.get_output_log_result = Mock(side_effect=ServiceException(constants.ERROR_MESSAGE_NO_LOG_FILE))
+
+        self.job_status.check(self.job_service, bjobs_list, 1000.0)
+
+        assert_that(self.job_status.status, is_(constants.MODEL_RUN_STATUS_PENDING), "Job status")
+
+    def test_GIVEN_job_submitted_after_list_taken_and_partial_log_WHEN_get_job_status_THEN_job_status_running(self):
+
+        bsub_id = 10
+        bjobs_list = {}
+        self.job_service.exists_run_dir = Mock(return_value=True)
+        self.job_service.get_bsub_id = Mock(return_value=bsub_id)
+        self.job_service.exists_output_log = Mock(return_value=True)
+        self.job_service.get_bsub_id_written_time = Mock(return_value=1005.0)
+        log_file_parser = LogFileParser(None)
+        log_file_parser.status = constants.MODEL_RUN_STATUS_FAILED
+        self.job_service.get_output_log_result = Mock(return_value=log_file_parser)
+
+        self.job_status.check(self.job_service, bjobs_list, 1000.0)
+
+        assert_that(self.job_status.status, is_(constants.MODEL_RUN_STATUS_RUNNING), "Job status")
+        assert_that(self.job_status.status_from_log, is_(False), "Status from log")
+
+    def test_GIVEN_job_submitted_before_list_taken_and_no_log_WHEN_get_job_status_THEN_job_status_failed(self):
+
+        bsub_id = 10
+        bjobs_list = {}
+        self.job_service.exists_run_dir = Mock(return_value=True)
+        self.job_service.get_bsub_id = Mock(return_value=bsub_id)
+        self.job_service.exists_output_log = Mock(return_value=False)
+        self.job_service.get_bsub_id_written_time = Mock(return_value=995.0)
+        self.job_service.get_output_log_result = Mock(side_effect=ServiceException(constants.ERROR_MESSAGE_NO_LOG_FILE))
+
+        self.job_status.check(self.job_service, bjobs_list, 1000.0)
+
+        assert_that(self.job_status.status, is_(constants.MODEL_RUN_STATUS_FAILED), "Job status")
+        assert_that(self.job_status.error_message, is_(constants.ERROR_MESSAGE_NO_LOG_FILE), "Error message")
+        assert_that(self.job_status.status_from_log, is_(False), "Status from log")
+
     def test_GIVEN_job_is_not_in_list_and_log_has_success_and_time_and_storage_in_WHEN_get_job_status_THEN_json_contains_storage_and_start_end_times(self):
 
         bsub_id = 10
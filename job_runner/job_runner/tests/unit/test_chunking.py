@@ -0,0 +1,61 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+from hamcrest import *
+from job_runner.tests import TestController
+from job_runner.post_processing_scripts.chunking import get_chunk_sizes, CHUNKING_DEFAULT, CHUNKING_MAP, \
+    CHUNKING_TIME_SERIES, CHUNKING_BALANCED
+
+
+class TestChunking(TestController):
+
+    def test_GIVEN_default_policy_WHEN_get_chunk_sizes_THEN_none(self):
+        chunk_sizes = get_chunk_sizes(('Time', 'y', 'x'), (365, 100, 200), 4, CHUNKING_DEFAULT)
+
+        assert_that(chunk_sizes, is_(None))
+
+    def test_GIVEN_map_policy_WHEN_get_chunk_sizes_THEN_one_map_per_chunk(self):
+        chunk_sizes = get_chunk_sizes(('Time', 'pseudo', 'y', 'x'), (365, 9, 100, 200), 4, CHUNKING_MAP)
+
+        assert_that(chunk_sizes, is_([1, 1, 100, 200]))
+
+    def test_GIVEN_time_series_policy_WHEN_get_chunk_sizes_THEN_all_times_for_a_tile_per_chunk(self):
+        chunk_sizes = get_chunk_sizes(('Time', 'y', 'x'), (100, 1000, 1000), 4, CHUNKING_TIME_SERIES, 40000)
+
+        assert_that(chunk_sizes, is_([100, 10, 10]))
+
+    def test_GIVEN_balanced_policy_WHEN_get_chunk_sizes_THEN_same_fraction_of_each_dimension(self):
+        chunk_sizes = get_chunk_sizes(('Time', 'y', 'x'), (100, 200, 400), 8, CHUNKING_BALANCED, 8 * 8000)
+
+        assert_that(chunk_sizes, is_([10, 20, 40]))
+
+    def test_GIVEN_balanced_policy_and_time_not_first_WHEN_get_chunk_sizes_THEN_other_dimensions_chunked_singly(self):
+        chunk_sizes = get_chunk_sizes(('pseudo', 'Time', 'y', 'x'), (4, 100, 200, 400), 8, CHUNKING_BALANCED, 8 * 8000)
+
+        assert_that(chunk_sizes, is_([1, 10, 20, 40]))
+
+    def test_GIVEN_variable_smaller_than_chunk_WHEN_get_chunk_sizes_THEN_whole_variable_in_one_chunk(self):
+        chunk_sizes = get_chunk_sizes(('Time', 'y', 'x'), (3, 2, 2), 4, CHUNKING_BALANCED)
+
+        assert_that(chunk_sizes, is_([3, 2, 2]))
+
+    def test_GIVEN_variable_without_time_WHEN_get_chunk_sizes_THEN_one_map_per_chunk(self):
+        chunk_sizes = get_chunk_sizes(('y', 'x'), (100, 200), 4, CHUNKING_BALANCED)
+
+        assert_that(chunk_sizes, is_([100, 200]))
+
+    def test_GIVEN_unknown_policy_WHEN_get_chunk_sizes_THEN_value_error(self):
+        self.assertRaises(ValueError, get_chunk_sizes, ('Time', 'y', 'x'), (3, 2, 2), 4, 'unknown')
@@ -0,0 +1,55 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+import os
+import shutil
+import tempfile
+
+from hamcrest import *
+from job_runner.tests import TestController
+from job_runner.post_processing_scripts.Convert1Dto2D import convert_batch
+
+
+class TestConvert1Dto2D(TestController):
+
+    def setUp(self):
+        self.original_dir = os.getcwd()
+        self.run_dir = tempfile.mkdtemp()
+        os.chdir(self.run_dir)
+        os.mkdir('output')
+
+    def tearDown(self):
+        os.chdir(self.original_dir)
+        shutil.rmtree(self.run_dir)
+
+    def _create_run(self, post_processing_script_id, filenames):
+        with open('post_processing.nml', 'w') as namelist_file:
+            namelist_file.write("&post_processing\n  id = {}\n/\n".format(post_processing_script_id))
+        for filename in filenames:
+            open(os.path.join('output', filename), 'w').close()
+
+    def test_GIVEN_no_conversion_WHEN_convert_batch_THEN_files_left_and_ncml_written_for_each_aggregation(self):
+        self._create_run(0, ['majic.gpp_monthly.1901.nc', 'majic.gpp_monthly.1902.nc', 'majic.npp_yearly.1901.nc'])
+
+        convert_batch('output', process_count=1)
+
+        assert_that(sorted(os.listdir('output')), is_(['majic.gpp_monthly.1901.nc',
+                                                        'majic.gpp_monthly.1902.nc',
+                                                        'majic.gpp_monthly.ncml',
+                                                        'majic.npp_yearly.1901.nc',
+                                                        'majic.npp_yearly.ncml']))
+        with open(os.path.join('output', 'majic.gpp_monthly.ncml')) as ncml_file:
+            assert_that(ncml_file.read(), contains_string('regExp="^majic.gpp_monthly.*\.nc$"'))
@@ -0,0 +1,77 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from hamcrest import *
+from job_runner.model.job_status import JobStatus
+from job_runner.services.job_status_cache import JobStatusCache
+from job_runner.tests import TestController
+from job_runner.utils import constants
+
+
+class TestJobStatusCache(TestController):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = JobStatusCache(time_to_live_in_s=60, clock=lambda: self.now)
+
+    def _create_job_status(self, model_run_id, status, status_from_log=True):
+        job_status = JobStatus(model_run_id)
+        job_status.status = status
+        job_status.status_from_log = status_from_log
+        return job_status
+
+    def test_GIVEN_failed_job_status_not_from_log_added_WHEN_get_THEN_nothing_returned(self):
+        job_status = self._create_job_status(1, constants.MODEL_RUN_STATUS_FAILED, status_from_log=False)
+        job_status.error_message = constants.ERROR_MESSAGE_NO_LOG_FILE
+        self.cache.add(job_status)
+
+        result = self.cache.get(1)
+
+        assert_that(result, is_(None), "failures without a log are not cached")
+
+    def test_GIVEN_completed_job_status_added_WHEN_get_THEN_job_status_returned(self):
+        job_status = self._create_job_status(1, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.cache.add(job_status)
+
+        result = self.cache.get(1)
+
+        assert_that(result, is_(same_instance(job_status)), "cached job status")
+
+    def test_GIVEN_running_job_status_added_WHEN_get_THEN_nothing_returned(self):
+        self.cache.add(self._create_job_status(1, constants.MODEL_RUN_STATUS_RUNNING))
+
+        result = self.cache.get(1)
+
+        assert_that(result, is_(None), "running jobs are not cached")
+
+    def test_GIVEN_failed_job_status_added_and_time_to_live_passed_WHEN_get_THEN_nothing_returned(self):
+        self.cache.add(self._create_job_status(1, constants.MODEL_RUN_STATUS_FAILED))
+        self.now += 61
+
+        result = self.cache.get(1)
+
+        assert_that(result, is_(None), "expired job status")
+
+    def test_GIVEN_completed_job_status_added_and_invalidated_WHEN_get_THEN_nothing_returned(self):
+        self.cache.add(self._create_job_status(1, constants.MODEL_RUN_STATUS_COMPLETED))
+        self.cache.invalidate(1)
+
+        result = self.cache.get(1)
+
+        assert_that(result, is_(None), "invalidated job status")
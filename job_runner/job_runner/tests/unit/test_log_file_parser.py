@@ -15,6 +15,7 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 from datetime import datetime
+from StringIO import StringIO
 import pytz
 
 from hamcrest import *
@@ -133,3 +134,28 @@ class TestJulesLogFileParser(TestController):
 
         assert_that(self.parser.status, is_(constants.MODEL_RUN_STATUS_FAILED), "Job status")
         assert_that(self.parser.error_message, contains_string(expected_error), "error line")
+
+    def test_GIVEN_start_of_file_parsed_WHEN_parse_rest_of_file_from_offset_with_state_THEN_result_is_as_whole_file(self):
+        start = 'Start Time: 2014-07-02 12:13:00 +0100\n{MPI Task 1}[FATAL ERROR] error1\n'
+        rest = 'Storage MB: 256\n{MPI Task 0}[FATAL ERROR] error2\n'
+        first_parser = LogFileParser(StringIO(start))
+        offset, state = first_parser.parse_from_offset()
+
+        parser = LogFileParser(StringIO(start + rest), state)
+        offset, state = parser.parse_from_offset(offset)
+
+        assert_that(offset, is_(len(start + rest)), "offset")
+        assert_that(parser.status, is_(constants.MODEL_RUN_STATUS_FAILED), "Job status")
+        assert_that(parser.error_message, is_("Jules error:error1, error2"), "error message")
+        assert_that(parser.start_time, is_(datetime(2014, 7, 2, 12, 13, 0, tzinfo=pytz.FixedOffset(60))), "start time")
+        assert_that(parser.storage_in_mb, is_(256), "storage")
+
+    def test_GIVEN_file_ends_with_partial_line_WHEN_parse_from_offset_THEN_partial_line_parsed_but_not_in_offset(self):
+        complete_lines = 'blah\n'
+        parser = LogFileParser(StringIO(complete_lines + constants.JULES_RUN_COMPLETED_MESSAGE))
+
+        offset, state = parser.parse_from_offset()
+
+        assert_that(parser.status, is_(constants.MODEL_RUN_STATUS_COMPLETED), "Job status")
+        assert_that(offset, is_(len(complete_lines)), "offset")
+        assert_that(state['completed'], is_(False), "state completed")
@@ -0,0 +1,113 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+import netCDF4
+import numpy as np
+from hamcrest import *
+from job_runner.tests import TestController
+from job_runner.post_processing_scripts.point_grid import PointGrid, get_scatter_blocks
+
+FILL_VALUE = -9999.99
+
+
+class TestPointGrid(TestController):
+
+    def create_variables(self, in_values, dimensions, grid):
+        self.file_in = netCDF4.Dataset("input", mode="w", diskless=True)
+        self.file_out = netCDF4.Dataset("output", mode="w", diskless=True)
+        in_values = np.array(in_values)
+        for size, name in zip(in_values.shape[:-2], dimensions):
+            self.file_in.createDimension(name, size)
+            self.file_out.createDimension(name, size)
+        self.file_in.createDimension('y', 1)
+        self.file_in.createDimension('x', in_values.shape[-1])
+        self.file_out.createDimension('Latitude', grid.rows)
+        self.file_out.createDimension('Longitude', grid.cols)
+        variable_in = self.file_in.createVariable('values', 'f4', tuple(dimensions) + ('y', 'x'))
+        variable_in[:] = in_values
+        variable_out = self.file_out.createVariable(
+            'values', 'f8', tuple(dimensions) + ('Latitude', 'Longitude'), fill_value=FILL_VALUE)
+        return variable_in, variable_out
+
+    def setUp(self):
+        self.file_in = None
+        self.file_out = None
+
+    def tearDown(self):
+        for netcdf_file in [self.file_in, self.file_out]:
+            if netcdf_file is not None:
+                netcdf_file.close()
+
+    def test_GIVEN_points_WHEN_create_grid_THEN_grid_covers_points_with_a_pixel_for_each_point(self):
+        grid = PointGrid([[0.25, 1.25, 0.75]], [[-10.25, -9.25, -9.75]], 0.5)
+
+        assert_that(grid.rows, is_(3))
+        assert_that(grid.cols, is_(3))
+        assert_that(grid.get_envelope(), is_((0.25, 1.25, -10.25, -9.25)))
+        assert_that(list(grid.yi), is_([-10.25, -9.75, -9.25]))
+        assert_that(list(grid.xi), is_([0.25, 0.75, 1.25]))
+        assert_that(list(grid.x_pixels), is_([0, 2, 1]))
+        assert_that(list(grid.y_pixels), is_([0, 2, 1]))
+
+    def test_GIVEN_time_and_tile_variable_WHEN_scatter_THEN_all_values_on_grid_and_others_missing(self):
+        grid = PointGrid([[0.25, 1.25, 0.75]], [[-10.25, -9.25, -9.75]], 0.5)
+        in_values = np.arange(2 * 4 * 3, dtype=np.float32).reshape((2, 4, 1, 3))
+        variable_in, variable_out = self.create_variables(in_values, ['time', 'tile'], grid)
+
+        data_range = grid.scatter_variable(variable_in, variable_out, FILL_VALUE)
+
+        result = variable_out[:]
+        assert_that(result.shape, is_((2, 4, 3, 3)))
+        for time in range(2):
+            for tile in range(4):
+                expected = np.ma.masked_all((3, 3))
+                expected[0, 0] = in_values[time, tile, 0, 0]
+                expected[2, 2] = in_values[time, tile, 0, 1]
+                expected[1, 1] = in_values[time, tile, 0, 2]
+                assert_that(np.ma.allequal(result[time, tile], expected), is_(True))
+                assert_that(result[time, tile].count(), is_(3))
+        assert_that(data_range, is_((0.0, 23.0)))
+
+    def test_GIVEN_memory_budget_smaller_than_variable_WHEN_scatter_THEN_same_result_as_one_block(self):
+        in_values = np.arange(5 * 3, dtype=np.float32).reshape((5, 1, 3))
+        small_grid = PointGrid([[0.25, 1.25, 0.75]], [[-10.25, -9.25, -9.75]], 0.5, memory_budget_in_bytes=1)
+        variable_in, variable_out = self.create_variables(in_values, ['time'], small_grid)
+
+        data_range = small_grid.scatter_variable(variable_in, variable_out, FILL_VALUE)
+
+        assert_that(len(get_scatter_blocks(variable_in, variable_out, 12, 1)), is_(5))
+        for time in range(5):
+            assert_that(variable_out[time, 0, 0], is_(in_values[time, 0, 0]))
+            assert_that(variable_out[time, 2, 2], is_(in_values[time, 0, 1]))
+            assert_that(variable_out[time, 1, 1], is_(in_values[time, 0, 2]))
+        assert_that(data_range, is_((0.0, 14.0)))
+
+    def test_GIVEN_all_values_missing_WHEN_scatter_THEN_no_range(self):
+        grid = PointGrid([[0.25, 0.75]], [[-10.25, -10.25]], 0.5)
+        in_values = np.ma.masked_all((2, 1, 2))
+        variable_in, variable_out = self.create_variables(in_values, ['time'], grid)
+        variable_in[:] = in_values
+
+        data_range = grid.scatter_variable(variable_in, variable_out, FILL_VALUE)
+
+        assert_that(data_range, is_(None))
+        assert_that(variable_out[:].count(), is_(0))
+
+    def test_GIVEN_grid_WHEN_is_for_points_THEN_true_only_for_same_points(self):
+        grid = PointGrid([[0.25, 1.25]], [[-10.25, -9.25]], 0.5)
+
+        assert_that(grid.is_for_points([[0.25, 1.25]], [[-10.25, -9.25]]), is_(True))
+        assert_that(grid.is_for_points([[1.25, 0.25]], [[-9.25, -10.25]]), is_(False))
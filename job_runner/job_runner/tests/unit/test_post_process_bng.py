@@ -17,10 +17,15 @@
 from formencode import Invalid
 
 
+import os
+import shutil
+import tempfile
 from hamcrest import *
+from mock import Mock
 import netCDF4
 from job_runner.tests import TestController
 from job_runner.post_processing_scripts.postProcessBNG import PostProcessBNG, ProcessingError
+from job_runner.post_processing_scripts.chunking import CHUNKING_MAP
 import numpy as np
 
 
@@ -42,9 +47,12 @@ class TestPostProcessBNG(TestController):
         assert_that(actual_variable.standard_name, is_(standard_name), "standard name of {}".format(message))
         assert_that(actual_variable.units, is_(units), "units of {}".format(message))
 
-    def create_reference_file(self, expected_lats, expected_lons, expected_x, expected_y):
+    def create_reference_file(self, expected_lats, expected_lons, expected_x, expected_y, file_path=None):
 
-        reference_file = netCDF4.Dataset("ref", mode="w", diskless=True)
+        if file_path is None:
+            reference_file = netCDF4.Dataset("ref", mode="w", diskless=True)
+        else:
+            reference_file = netCDF4.Dataset(file_path, mode="w")
         reference_file.createDimension('x', len(expected_x))
         reference_file.createDimension('y', len(expected_y))
         reference_file.createVariable('lat', 'f4', ('y', 'x'))
@@ -293,6 +301,23 @@ class TestPostProcessBNG(TestController):
         self.assert_that_variables_are_as_expected(expected_lats, expected_lons, expected_values, expected_x,
                                                    expected_y, expected_time, expected_pusedo)
 
+    def test_GIVEN_map_chunking_policy_WHEN_convert_THEN_values_chunked_one_map_at_a_time(self):
+        ref_x = np.array([1000, 2000])
+        ref_y = np.array([1001])
+        ref_lats = np.array([[49.22, 49.32]])
+        ref_lons = np.array([[7.22, 7.32]])
+        in_values = np.arange(24).reshape((4, 3, 1, 2)).flatten()
+
+        self.process = PostProcessBNG(chunking_policy=CHUNKING_MAP)
+        self.process.input_file_handle = self.create_input_file(
+            ref_lats, ref_lons, in_values, np.array([4.0, 5.0, 6.0]), np.array([10.0, 11.0, 12.0, 13.0]))
+        self.process.reference_file_handle = self.create_reference_file(ref_lats, ref_lons, ref_x, ref_y)
+        self.process.output_file_handle = netCDF4.Dataset("output", mode="w", diskless=True)
+
+        self.process.convert_jules_1d_to_thredds_2d_for_chess()
+
+        assert_that(self.process.output_file_handle.variables['values'].chunking(), is_([1, 1, 1, 2]))
+
     def test_GIVEN_file_with_no_points_WHEN_convert_THEN_return_file_with_no_points_populated(self):
         ref_x = np.array([0, 1000, 2000])
         ref_y = np.array([1, 1001, 2001])
@@ -457,3 +482,92 @@ class TestPostProcessBNG(TestController):
 
         self.process.convert_jules_1d_to_thredds_2d_for_chess()
         assert_that(self.process.output_file_handle.variables["values"].ncattrs(), is_not(has_item('actual_range')), "actual range should not be in file because there is not data")
+
+    def test_GIVEN_memory_budget_smaller_than_a_time_step_WHEN_convert_THEN_all_points_populated_and_range_correct(self):
+        self.process = PostProcessBNG(memory_budget_in_bytes=1)
+        ref_x = np.array([1000, 2000])
+        ref_y = np.array([1001])
+        ref_lats = np.array([[49.22, 49.32]])
+        ref_lons = np.array([[7.22, 7.32]])
+
+        expected_x = np.array([1000, 2000])
+        expected_y = np.array([1001])
+        expected_pusedo = np.array([10.0, 11.0, 12.0, 13.0])
+        expected_time = np.array([4.0, 5.0, 6.0])
+        expected_lats = np.array([[49.22, 49.32]])
+        expected_lons = np.array([[7.22, 7.32]])
+        expected_values = np.arange(24).reshape((4, 3, 1, 2))
+
+        self.process.input_file_handle = self.create_input_file(
+            expected_lats, expected_lons, expected_values.flatten(), expected_time, expected_pusedo)
+        self.process.reference_file_handle = self.create_reference_file(ref_lats, ref_lons, ref_x, ref_y)
+        self.process.output_file_handle = netCDF4.Dataset("output", mode="w", diskless=True)
+
+        self.process.convert_jules_1d_to_thredds_2d_for_chess()
+
+        self.assert_that_variables_are_as_expected(expected_lats, expected_lons, expected_values, expected_x,
+                                                   expected_y, expected_time, expected_pusedo)
+        actual_range = self.process.output_file_handle.variables["values"].actual_range
+        assert_that(list(actual_range), is_([0, 23]), "actual range")
+
+    def assert_that_convert_raises_processing_error(self, message_pattern):
+        try:
+            self.process.convert_jules_1d_to_thredds_2d_for_chess()
+        except ProcessingError as ex:
+            assert_that(ex.message, matches_regexp(message_pattern), "error message")
+            return
+        raise AssertionError("ProcessingError not raised")
+
+    def _setup_two_point_files(self, in_lats, in_lons, ref_lats=None):
+        if ref_lats is None:
+            ref_lats = np.array([[49.22, 49.32]])
+        ref_lons = np.array([[7.22, 7.32]])
+        self.process.input_file_handle = self.create_input_file(
+            in_lats, in_lons, np.array([1.0, 2.0]), np.array([4.0]))
+        self.process.reference_file_handle = self.create_reference_file(
+            ref_lats, ref_lons, np.array([1000, 2000]), np.array([1001]))
+        self.process.output_file_handle = netCDF4.Dataset("output", mode="w", diskless=True)
+
+    def test_GIVEN_point_not_in_reference_file_WHEN_convert_THEN_processing_error_point_not_found(self):
+        self._setup_two_point_files(np.array([[49.22, 49.42]]), np.array([[7.22, 7.32]]))
+
+        self.assert_that_convert_raises_processing_error("point 1 .* not found")
+
+    def test_GIVEN_point_in_reference_file_twice_WHEN_convert_THEN_processing_error_point_found_twice(self):
+        self._setup_two_point_files(
+            np.array([[49.22, 49.22]]), np.array([[7.22, 7.22]]), ref_lats=np.array([[49.22, 49.22002]]))
+        self.process.reference_file_handle.variables['lon'][:] = np.array([[7.22, 7.22002]])
+
+        self.assert_that_convert_raises_processing_error("point 0 .* been found 2 times")
+
+    def test_GIVEN_points_within_threshold_but_in_neighbouring_rounded_cells_WHEN_convert_THEN_points_located(self):
+        self._setup_two_point_files(np.array([[49.219974, 49.320026]]), np.array([[7.220026, 7.319974]]))
+
+        self.process.convert_jules_1d_to_thredds_2d_for_chess()
+
+        assert_that(list(self.process.x_ref_index), is_([0, 1]), "x indexes")
+        assert_that(list(self.process.y_ref_index), is_([0, 0]), "y indexes")
+
+    def test_GIVEN_index_cache_dir_WHEN_convert_twice_with_same_reference_file_THEN_point_locations_read_from_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            reference_file_path = os.path.join(cache_dir, 'ref.nc')
+            self.create_reference_file(np.array([[49.22, 49.32]]), np.array([[7.22, 7.32]]),
+                                       np.array([1000, 2000]), np.array([1001]), reference_file_path).close()
+            for process_number in range(2):
+                self.process.close()
+                self.process = PostProcessBNG(index_cache_dir=os.path.join(cache_dir, 'cache'))
+                if process_number == 1:
+                    self.process._find_points_in_reference_grid = Mock(side_effect=AssertionError("not cached"))
+                self.process.input_file_handle = self.create_input_file(
+                    np.array([[49.22, 49.32]]), np.array([[7.22, 7.32]]), np.array([1.0, 2.0]), np.array([4.0]))
+                self.process.reference_file_handle = netCDF4.Dataset(reference_file_path, mode='r')
+                self.process.reference_file_path = reference_file_path
+                self.process.output_file_handle = netCDF4.Dataset("output", mode="w", diskless=True)
+
+                self.process.convert_jules_1d_to_thredds_2d_for_chess()
+
+                assert_that(list(self.process.x_ref_index), is_([0, 1]), "x indexes")
+            assert_that(len(os.listdir(os.path.join(cache_dir, 'cache'))), is_(1), "cache files")
+        finally:
+            shutil.rmtree(cache_dir)
@@ -0,0 +1,105 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import threading
+from hamcrest import *
+from mock import Mock
+from job_runner.services.queued_jobs_status_cache import QueuedJobsStatusCache
+from job_runner.tests import TestController
+
+
+class TestQueuedJobsStatusCache(TestController):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = QueuedJobsStatusCache(max_age_in_s=10, clock=lambda: self.now)
+
+    def test_GIVEN_snapshot_is_recent_WHEN_get_THEN_bjobs_not_rerun(self):
+        get_queued_jobs_status = Mock(return_value={10: 'Running'})
+        self.cache.get(get_queued_jobs_status)
+        self.now += 5
+
+        result = self.cache.get(get_queued_jobs_status)
+
+        assert_that(result, is_({10: 'Running'}), "statuses")
+        assert_that(get_queued_jobs_status.call_count, is_(1), "bjobs runs")
+        assert_that(self.cache.get_statistics()['hits'], is_(1), "hits")
+
+    def test_GIVEN_snapshot_is_old_WHEN_get_THEN_snapshot_refreshed(self):
+        get_queued_jobs_status = Mock(side_effect=[{10: 'Running'}, {10: 'Pending'}])
+        self.cache.get(get_queued_jobs_status)
+        self.now += 10
+
+        result = self.cache.get(get_queued_jobs_status)
+
+        assert_that(result, is_({10: 'Pending'}), "statuses")
+        assert_that(self.cache.get_statistics()['refreshes'], is_(2), "refreshes")
+
+    def test_GIVEN_refresh_in_progress_WHEN_get_THEN_waits_for_refresh_rather_than_running_bjobs(self):
+        refresh_started = threading.Event()
+        finish_refresh = threading.Event()
+        calls = []
+
+        def get_queued_jobs_status():
+            calls.append(1)
+            refresh_started.set()
+            finish_refresh.wait(5)
+            return {10: 'Running'}
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(self.cache.get(get_queued_jobs_status)))
+        first.start()
+        refresh_started.wait(5)
+        second = threading.Thread(target=lambda: results.append(self.cache.get(get_queued_jobs_status)))
+        second.start()
+        finish_refresh.set()
+        first.join(5)
+        second.join(5)
+
+        assert_that(len(calls), is_(1), "bjobs runs")
+        assert_that(results, is_([{10: 'Running'}, {10: 'Running'}]), "statuses")
+
+    def test_GIVEN_refresh_fails_WHEN_get_THEN_exception_raised_and_next_get_refreshes(self):
+        get_queued_jobs_status = Mock(side_effect=[Exception("bjobs failed"), {10: 'Running'}])
+
+        assert_that(calling(self.cache.get).with_args(get_queued_jobs_status), raises(Exception))
+        result = self.cache.get(get_queued_jobs_status)
+
+        assert_that(result, is_({10: 'Running'}), "statuses")
+
+    def test_GIVEN_snapshot_taken_WHEN_get_with_time_THEN_time_refresh_started_returned(self):
+        def get_queued_jobs_status():
+            self.now += 2
+            return {10: 'Running'}
+        self.cache.get(get_queued_jobs_status)
+        self.now += 5
+
+        result, taken_time = self.cache.get_with_time(get_queued_jobs_status)
+
+        assert_that(result, is_({10: 'Running'}), "statuses")
+        assert_that(taken_time, is_(1000.0), "time taken")
+
+    def test_GIVEN_snapshot_cleared_WHEN_get_THEN_snapshot_refreshed(self):
+        get_queued_jobs_status = Mock(side_effect=[{}, {10: 'Pending'}])
+        self.cache.get(get_queued_jobs_status)
+        self.cache.clear()
+
+        result = self.cache.get(get_queued_jobs_status)
+
+        assert_that(result, is_({10: 'Pending'}), "statuses")
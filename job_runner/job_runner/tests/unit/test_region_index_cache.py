@@ -0,0 +1,88 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import numpy as np
+from hamcrest import *
+from mock import Mock
+from job_runner.services.region_index_cache import RegionIndexCache
+from job_runner.tests import TestController
+
+
+class TestRegionIndexCache(TestController):
+
+    def setUp(self):
+        self.modified_times = {}
+        self.cache = RegionIndexCache(max_regions=2, get_modified_time=lambda path: self.modified_times[path])
+
+    def _get(self, path, load_region_index, grid_shape=(3, 4)):
+        self.modified_times.setdefault(path, 100.0)
+        return self.cache.get(path, grid_shape, 'frac', load_region_index)
+
+    def test_GIVEN_region_indexed_WHEN_get_THEN_mask_not_reread(self):
+        load_region_index = Mock(return_value=np.array([1, 5]))
+        self._get('/masks/uk.nc', load_region_index)
+
+        result = self._get('/masks/uk.nc', load_region_index)
+
+        assert_that(result.tolist(), is_([1, 5]), "index")
+        assert_that(load_region_index.call_count, is_(1), "mask reads")
+        assert_that(self.cache.get_statistics()['hits'], is_(1), "hits")
+
+    def test_GIVEN_mask_file_changed_WHEN_get_THEN_mask_reread(self):
+        load_region_index = Mock(side_effect=[np.array([1, 5]), np.array([2])])
+        self._get('/masks/uk.nc', load_region_index)
+        self.modified_times['/masks/uk.nc'] = 200.0
+
+        result = self._get('/masks/uk.nc', load_region_index)
+
+        assert_that(result.tolist(), is_([2]), "index")
+        assert_that(self.cache.get_statistics()['loads'], is_(2), "loads")
+
+    def test_GIVEN_different_grid_WHEN_get_THEN_mask_read_for_that_grid(self):
+        load_region_index = Mock(side_effect=[np.array([1, 5]), np.array([2])])
+        self._get('/masks/uk.nc', load_region_index)
+
+        result = self._get('/masks/uk.nc', load_region_index, grid_shape=(6, 8))
+
+        assert_that(result.tolist(), is_([2]), "index")
+
+    def test_GIVEN_more_regions_than_maximum_WHEN_get_THEN_least_recently_used_dropped(self):
+        self._get('/masks/uk.nc', Mock(return_value=np.array([1])))
+        self._get('/masks/wales.nc', Mock(return_value=np.array([2])))
+        self._get('/masks/uk.nc', Mock())
+        self._get('/masks/thames.nc', Mock(return_value=np.array([3])))
+        load_wales = Mock(return_value=np.array([2]))
+        load_uk = Mock()
+
+        self._get('/masks/uk.nc', load_uk)
+        self._get('/masks/wales.nc', load_wales)
+
+        assert_that(load_uk.called, is_(False), "uk reread")
+        assert_that(load_wales.called, is_(True), "wales reread")
+        assert_that(self.cache.get_statistics()['regions'], is_(2), "regions")
+
+    def test_GIVEN_region_indexed_WHEN_get_THEN_index_is_read_only(self):
+        result = self._get('/masks/uk.nc', Mock(return_value=np.array([1, 5])))
+
+        assert_that(result.flags.writeable, is_(False))
+
+    def test_GIVEN_read_fails_WHEN_get_THEN_nothing_cached(self):
+        self.assertRaises(IOError, self._get, '/masks/uk.nc', Mock(side_effect=IOError()))
+
+        assert_that(self.cache.get_statistics()['regions'], is_(0))
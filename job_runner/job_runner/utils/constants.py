@@ -81,6 +81,16 @@ MODEL_RUN_STATUS_FAILED = 'Failed'
 MODEL_RUN_STATUS_SUBMIT_FAILED = 'Submission Failed'  # user submitted a model but it can not be submitted
 MODEL_RUN_STATUS_UNKNOWN = 'Unknown'  # Job is in the bjobs list but the status is not understood
 
+# Statuses of jobs which will not change so can be cached and how long (in seconds) to cache them for
+JOB_STATUS_CACHE_STATUSES = [MODEL_RUN_STATUS_COMPLETED, MODEL_RUN_STATUS_FAILED]
+JOB_STATUS_CACHE_EXPIRE_IN_S = 300
+
+# How old (in seconds) the snapshot of the statuses of the jobs in the job queue can be before bjobs is rerun
+QUEUED_JOBS_STATUS_MAX_AGE_IN_S = 10
+
+# Maximum number of land cover region indexes kept in memory between model run submissions
+REGION_INDEX_CACHE_MAX_REGIONS = 200
+
 # Error messages to pass back for statuses (can be displayed in UI)
 ERROR_MESSAGE_NO_FOLDER = 'Model run folder can not be found'
 ERROR_MESSAGE_NO_JOB_ID = 'Model run folder contains no job id, model run was not submitted'
@@ -91,6 +101,7 @@ ERROR_MESSAGE_UNKNOWN_JULES_ERROR = 'Jules did not complete successfully'
 # filename for the file containing the bsub id
 FILENAME_BSUB_ID = 'bsub_id'
 FILENAME_OUTPUT_LOG = 'out.log'
+FILENAME_OUTPUT_LOG_CHECKPOINT = 'out.log.checkpoint'
 FILENAME_JOBS_RUN_LOG = 'jobs_run.log'
 
 DATA_FORMAT_WITH_TZ = '%Y-%m-%d %H:%M:%S %z'
@@ -23,6 +23,7 @@ import os
 import shutil
 from job_runner.utils import constants
 from job_runner.services.service_exception import ServiceException
+from job_runner.services.region_index_cache import region_index_cache
 from job_runner.utils.netcdf_utils import NetCdfHelper
 
 log = logging.getLogger(__name__)
@@ -33,8 +34,35 @@ class LandCoverEditor(object):
     Edits land cover files
     """
 
-    def __init__(self, nc_helper=NetCdfHelper()):
+    def __init__(self, nc_helper=NetCdfHelper(), region_index_cache=region_index_cache):
         self._nc_helper = nc_helper
+        self._region_index_cache = region_index_cache
+
+    def apply_land_cover_actions(self, base_file_path, edited_file_path, actions, ice_index, key='frac'):
+        """
+        Apply a list of land cover actions to a base land cover file, writing the result to a new file. The base
+        file is read once, the actions are applied in order in memory and the edited file written once.
+        :param base_file_path: Path of the base land cover file (which is not changed)
+        :param edited_file_path: Path of the edited land cover file to write
+        :param actions: List of (mask file path, land cover value) tuples in the order to apply them
+        :param ice_index: Index of the ice
+        :param key: The name of the fractional cover variable in the land cover file
+        :return: nothing
+        """
+        base = Dataset(base_file_path, 'r')
+        try:
+            base_frac = base.variables[key]
+            base_frac_array = base_frac[:, :, :]
+
+            for mask_file_path, value in actions:
+                log.info("Editing land cover map using mask '%s'- setting land cover value to %s"
+                         % (mask_file_path, value))
+                region_index = self._get_region_index(mask_file_path, base_frac.shape[1:], key)
+                self._apply_action(base_frac_array, region_index, value, ice_index)
+
+            self._nc_helper.copy_dataset(base, edited_file_path, {key: base_frac_array})
+        finally:
+            base.close()
 
     def apply_land_cover_action(self, base_file_path, mask_file_path, value, ice_index, key='frac'):
         """
@@ -48,36 +76,15 @@ class LandCoverEditor(object):
         """
         log.info("Editing land cover map using mask '%s'- setting land cover value to %s" % (mask_file_path, value))
         base = Dataset(base_file_path, 'r+')
-        base_frac = base.variables[key]
-        base_frac_array = base_frac[:, :, :]
-        base_mask = base_frac[:, :, :].mask
+        try:
+            base_frac = base.variables[key]
+            base_frac_array = base_frac[:, :, :]
 
-        region = Dataset(mask_file_path, 'r')
-        region_frac = region.variables[key]
-        region_mask = region_frac[:, :]
-
-        if not base_frac.shape[1:] == region_frac.shape:
-            log.exception("Could not apply land cover edit: the mask file '%s' "
-                          "was the wrong shape for the land cover map." % mask_file_path)
-            raise ServiceException("Could not apply land cover edit: the mask file was the wrong "
-                                   "shape for the land cover map.")
-        ice_mask = self._create_ice_mask(base_frac_array, ice_index)
-        combined_mask = base_mask | region_mask | ice_mask
-        base_frac_array.mask = combined_mask
-        base_frac_array.harden_mask()
-
-        n_pseudo = base_frac.shape[0]
-        for pseudo in np.arange(n_pseudo):
-            if pseudo == value - 1:
-                base_frac_array[pseudo, :, :] = 1.0
-            else:
-                base_frac_array[pseudo, :, :] = 0.0
-        base_frac_array.soften_mask()
-        base_frac_array.mask = base_mask
-        base_frac[:, :, :] = base_frac_array
-
-        region.close()
-        base.close()
+            region_index = self._get_region_index(mask_file_path, base_frac.shape[1:], key)
+            self._apply_action(base_frac_array, region_index, value, ice_index)
+            base_frac[:, :, :] = base_frac_array
+        finally:
+            base.close()
 
     def apply_single_point_fractional_cover(self, base_file_path, fractional_cover, lat, lon, key='frac'):
         """
@@ -125,6 +132,55 @@ class LandCoverEditor(object):
         shutil.copyfile(base_file_path, dest_file_path)
         return dest_file_path
 
+    def _get_region_index(self, mask_file_path, grid_shape, key):
+        """
+        Get the index of the points inside a region from the cache, reading the mask file if it is not there
+        :param mask_file_path: Path of the mask file for the region
+        :param grid_shape: Shape of the land cover map grid
+        :param key: The name of the mask variable in the mask file
+        :return: array of the flat indexes of the points in the grid inside the region
+        """
+        return self._region_index_cache.get(
+            mask_file_path, grid_shape, key, lambda: self._read_region_index(mask_file_path, grid_shape, key))
+
+    def _read_region_index(self, mask_file_path, grid_shape, key):
+        """
+        Read the mask of a region, checking that it matches the land cover grid
+        :param mask_file_path: Path of the mask file for the region (points inside the region are zero)
+        :param grid_shape: Shape of the land cover map grid
+        :param key: The name of the mask variable in the mask file
+        :return: array of the flat indexes of the points in the grid inside the region
+        """
+        region = Dataset(mask_file_path, 'r')
+        try:
+            region_frac = region.variables[key]
+            if not grid_shape == region_frac.shape:
+                log.exception("Could not apply land cover edit: the mask file '%s' "
+                              "was the wrong shape for the land cover map." % mask_file_path)
+                raise ServiceException("Could not apply land cover edit: the mask file was the wrong "
+                                       "shape for the land cover map.")
+            return np.flatnonzero(np.ma.getdata(region_frac[:, :]) == 0)
+        finally:
+            region.close()
+
+    def _apply_action(self, frac_array, region_index, value, ice_index):
+        """
+        Set the land cover in a region to a single type, leaving points which are ice or not on the map unchanged.
+        Only the points in the region are read and written.
+        :param frac_array: Fractional cover array to edit in place
+        :param region_index: Flat indexes of the points in the grid inside the region
+        :param value: Land cover value to set the region to
+        :param ice_index: Index of the ice
+        :return: nothing
+        """
+        rows, cols = np.unravel_index(region_index, frac_array.shape[1:])
+        region_frac = frac_array[:, rows, cols]
+        unchanged = np.ma.getmaskarray(region_frac) | self._create_ice_mask(region_frac, ice_index)
+
+        n_pseudo = frac_array.shape[0]
+        new_frac = (np.arange(n_pseudo) == value - 1)[:, np.newaxis]
+        frac_array.data[:, rows, cols] = np.where(unchanged, np.ma.getdata(region_frac), new_frac)
+
     def _create_ice_mask(self, frac_array, ice_index):
         ice_array = frac_array[ice_index - 1]
         masked_ice_array = np.ma.masked_greater(ice_array, 0)
@@ -17,6 +17,7 @@
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
+from netCDF4 import Dataset
 import numpy as np
 
 
@@ -70,4 +71,44 @@ class NetCdfHelper(object):
             lat_index = np.unravel_index(indexes, variables[lat_key].shape)[0]
             lon_index = np.unravel_index(indexes, variables[lat_key].shape)[1]
 
-        return lat_index, lon_index
\ No newline at end of file
+        return lat_index, lon_index
+
+    def copy_dataset(self, source, destination_path, replacement_values=None):
+        """
+        Write a copy of an open dataset to a new file, one record of each variable at a time, replacing the values of
+        some of the variables on the way
+        :param source: The open dataset to copy
+        :param destination_path: Path of the file to write
+        :param replacement_values: Dictionary of variable name to the values to write instead of the source values
+        :return: nothing
+        """
+        if replacement_values is None:
+            replacement_values = {}
+        destination = Dataset(destination_path, 'w', format=source.data_model)
+        try:
+            destination.setncatts(source.__dict__)
+            for name, dimension in source.dimensions.items():
+                destination.createDimension(name, None if dimension.isunlimited() else len(dimension))
+            for name, variable in source.variables.items():
+                filters = variable.filters() or {}
+                chunking = variable.chunking()
+                copy = destination.createVariable(
+                    name,
+                    variable.datatype,
+                    variable.dimensions,
+                    zlib=filters.get('zlib', False),
+                    complevel=filters.get('complevel', 4),
+                    shuffle=filters.get('shuffle', True),
+                    chunksizes=None if chunking in (None, 'contiguous') else chunking,
+                    fill_value=getattr(variable, '_FillValue', None))
+                copy.setncatts(dict((key, value) for key, value in variable.__dict__.items() if key != '_FillValue'))
+                values = replacement_values.get(name, variable)
+                if variable.ndim == 0:
+                    copy.assignValue(values[...])
+                elif variable.ndim == 1:
+                    copy[:] = values[:]
+                else:
+                    for record in range(variable.shape[0]):
+                        copy[record] = values[record]
+        finally:
+            destination.close()
@@ -30,6 +30,7 @@ from joj.services.dataset import DatasetService
 from joj.services.netcdf import NetCdfService
 from joj.services.user import UserService
 from joj.lib import wmc_util
+from joj.lib.wms_tile_cache import wms_tile_cache
 from joj.services.model_run_service import ModelRunService
 from joj.utils import constants
 from joj.utils.download.ascii_dataset_download_helper import AsciiDatasetDownloadHelper
@@ -51,11 +52,13 @@ class DatasetController(BaseController):
                  dataset_service=DatasetService(),
                  netcdf_service=NetCdfService(),
                  user_service=UserService(),
-                 model_run_service=ModelRunService()):
+                 model_run_service=ModelRunService(),
+                 tile_cache=wms_tile_cache):
         """ Constructs a new dataset controller
         @param dataset_service: The dataset service to use with this controller
         @param netcdf_service: The NetCDF service to use with this controller
         @param user_service: The user service we're going to use
+        @param tile_cache: The cache of WMS tiles
         """
 
         super(DatasetController, self).__init__()
@@ -64,6 +67,7 @@ class DatasetController(BaseController):
         self._dataset_service = dataset_service
         self._netcdf_service = netcdf_service
         self._model_run_service = model_run_service
+        self._tile_cache = tile_cache
 
     @jsonify
     def columns(self, id):
@@ -97,16 +101,48 @@ class DatasetController(BaseController):
         user = self._user_service.get_user_by_username(request.environ['REMOTE_USER'])
         ds = self._dataset_service.get_dataset_by_id(id, user_id=user.id)
 
-        redirect_url = "%s?%s" % (ds.wms_url.split('?')[0], request.query_string)
+        params = request.params
+        if not self._tile_cache.is_cacheable(params):
+            redirect_url = "%s?%s" % (ds.wms_url.split('?')[0], request.query_string)
+            log.debug("Redirecting to %s" % redirect_url)
+            try:
+                return wmc_util.create_request_and_open_url(redirect_url, external=False).read()
+            except urllib2.HTTPError, e:
+                log.exception("exception occurred while access {}".format(redirect_url))
+                log.exception("Page read {}".format(e.fp.read()))
+                raise e
+
+        # Tiles are only visible to users who can see the dataset so must not be held in shared caches
+        response.headers['Cache-Control'] = 'private, max-age=0'
+        key = self._tile_cache.get_key(ds.id, params)
+        tile = self._tile_cache.get(key)
+        if tile is not None:
+            response.etag = tile.etag
+            if tile.etag in request.if_none_match:
+                self._tile_cache.record_not_modified()
+                response.status_int = 304
+                return ''
+            response.content_type = str(tile.content_type)
+            return tile.read_blocks()
 
+        redirect_url = "%s?%s" % (ds.wms_url.split('?')[0], request.query_string)
         log.debug("Redirecting to %s" % redirect_url)
         try:
-            return wmc_util.create_request_and_open_url(redirect_url, external=False).read()
+            wms_response = wmc_util.create_request_and_open_url(redirect_url, external=False)
         except urllib2.HTTPError, e:
             log.exception("exception occurred while access {}".format(redirect_url))
             log.exception("Page read {}".format(e.fp.read()))
             raise e
 
+        content_type = wms_response.info().gettype()
+        response.content_type = content_type
+        if not content_type.startswith('image/'):
+            # THREDDS reports errors as XML service exceptions; these are not cached
+            return wms_response.read()
+        etag = self._tile_cache.create_etag(key)
+        response.etag = etag
+        return self._tile_cache.stream_and_store(key, wms_response, content_type, etag)
+
     def base(self):
         """
         Indirection layer to enable a base map wms service to be wrapped up in our domain
@@ -21,7 +21,9 @@ import logging
 import datetime
 
 from pylons import request, config
+from pylons.controllers.util import abort
 from pylons.decorators import jsonify
+from sqlalchemy.orm.exc import NoResultFound
 
 from joj.lib.base import BaseController, render, c
 from joj.services.user import UserService
@@ -115,19 +117,76 @@ class MapController(BaseController):
     @jsonify
     def graph(self, id):
         """
-        Get time-series graphing data for a specified dataset and position
+        Get time-series graphing data for a specified dataset and position. Optional parameters are start and end to
+        graph all the times between them (downsampled to npoints), npoints and format=compact for separate lists of
+        times and values
         :param id: The dataset ID to request
         :return: JSON graphing data
         """
         lat = float(request.params['lat'])
         lon = float(request.params['lon'])
-        str_time = request.params['time']
-        if len(str_time.strip()) > 0:
-            time = datetime.datetime.strptime(str_time, constants.GRAPH_TIME_FORMAT)
-        else:
-            time = None
+        time = self._get_time_param('time')
+        start_time = self._get_time_param('start')
+        end_time = self._get_time_param('end')
+        npoints = int(request.params.get('npoints', constants.GRAPH_NPOINTS))
+        npoints = max(1, min(npoints, constants.GRAPH_MAX_NPOINTS))
+        compact = request.params.get('format', '') == 'compact'
         dataset = self._dataset_service.get_dataset_by_id(id, self.current_user.id)
         model_run = self._model_run_service.get_model_by_id(self.current_user, dataset.model_run_id)
         url = dataset.netcdf_url
         dap_client = self._dap_factory.get_graphing_dap_client(url)
-        return dap_client.get_graph_data(lat, lon, time, run_name=model_run.name)
\ No newline at end of file
+        return dap_client.get_graph_data(lat, lon, time, npoints=npoints, run_name=model_run.name,
+                                         start_time=start_time, end_time=end_time, compact=compact)
+
+    @jsonify
+    def graphs(self):
+        """
+        Get time-series graphing data at a position for several datasets in one request, e.g. to compare model runs.
+        Parameters are id for each dataset and time, either once for all of them or once for each dataset, plus
+        the optional parameters of graph
+        :return: JSON graphing data, a dictionary with graphs as a list of the data for each dataset in order
+        """
+        try:
+            dataset_ids = request.params.getall('id')
+            lat = float(request.params['lat'])
+            lon = float(request.params['lon'])
+            times = [self._parse_time(str_time) for str_time in request.params.getall('time')]
+            if len(times) <= 1:
+                times = (times or [None]) * len(dataset_ids)
+            elif len(times) != len(dataset_ids):
+                raise ValueError("There must be one time or one time for each dataset")
+            start_time = self._get_time_param('start')
+            end_time = self._get_time_param('end')
+            npoints = int(request.params.get('npoints', constants.GRAPH_NPOINTS))
+            npoints = max(1, min(npoints, constants.GRAPH_MAX_NPOINTS))
+        except (KeyError, ValueError):
+            abort(status_code=400, detail="Invalid request parameters")
+        compact = request.params.get('format', '') == 'compact'
+
+        try:
+            datasets = self._dataset_service.get_model_run_datasets_by_ids(dataset_ids, self.current_user)
+        except (NoResultFound, ValueError):
+            abort(status_code=400, detail="Dataset ID could not be found.")
+        graphs = self._dap_factory.get_graphs_data(
+            [dataset.netcdf_url for dataset in datasets], lat, lon, times,
+            [dataset.model_run.name for dataset in datasets], npoints=npoints, start_time=start_time,
+            end_time=end_time, compact=compact)
+        return {'graphs': graphs}
+
+    def _get_time_param(self, name):
+        """
+        Get a time from the request parameters
+        :param name: name of the parameter
+        :return: the time as a datetime or None if it is not set
+        """
+        return self._parse_time(request.params.get(name, ''))
+
+    def _parse_time(self, str_time):
+        """
+        Parse a time in the format used by the graphs
+        :param str_time: the time as a string
+        :return: the time as a datetime or None if the string is empty
+        """
+        if len(str_time.strip()) > 0:
+            return datetime.datetime.strptime(str_time, constants.GRAPH_TIME_FORMAT)
+        return None
\ No newline at end of file
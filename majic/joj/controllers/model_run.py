@@ -78,18 +78,12 @@ class ModelRunController(BaseController):
         Default controller providing access to the catalogue of user model runs
         :return: Rendered catalogue page
         """
-        # all non-created runs for the user
+        # a page of the non-created runs for the user
         c.user = self.current_user
-        c.model_runs = [model
-                        for model in self._model_run_service.get_models_for_user(self.current_user)
-                        if model.status.name != constants.MODEL_RUN_STATUS_CREATED]
+        c.before_id = self._get_before_id()
+        c.model_runs = self._model_run_service.get_model_run_listing(self.current_user, before_id=c.before_id)
 
-        total_user_storage = 0
-        for model in c.model_runs:
-            if model.status.name != constants.MODEL_RUN_STATUS_PUBLISHED and \
-               model.status.name != constants.MODEL_RUN_STATUS_PUBLIC:
-                if model.storage_in_mb is not None:
-                    total_user_storage += model.storage_in_mb
+        total_user_storage = self._model_run_service.get_storage_used_by_user_in_mb(self.current_user)
 
         c.storage_total_used_in_gb = utils.convert_mb_to_gb_and_round(total_user_storage)
         c.storage_percent_used = round(c.storage_total_used_in_gb / c.user.storage_quota_in_gb * 100.0, 0)
@@ -107,10 +101,21 @@ class ModelRunController(BaseController):
         :return: Rendered catalogue page
         """
         c.user = self.current_user
-        c.model_runs = self._model_run_service.get_published_models()
+        c.before_id = self._get_before_id()
+        c.model_runs = self._model_run_service.get_model_run_listing(before_id=c.before_id)
         c.showing = "published"
         return render("model_run/catalogue.html")
 
+    def _get_before_id(self):
+        """
+        Get the id of the model run the catalogue page should start after
+        :return: the id, or None for the first page (including if the parameter is not a valid id)
+        """
+        try:
+            return int(request.params['before'])
+        except (KeyError, ValueError):
+            return None
+
     def publish(self, id):
         """
         Controller allowing existing model runs to be published
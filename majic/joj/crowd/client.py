@@ -2,9 +2,10 @@
 #header
 """
 import base64
-import datetime
 import logging
+import time
 from joj.crowd.models import UserRequest
+from joj.crowd.token_cache import crowd_token_cache
 import urllib2
 import simplejson
 from simplejson import JSONDecodeError
@@ -63,23 +64,23 @@ class CrowdClient(object):
         'USER_NOT_FOUND': UserException
     }
 
-    _token_cache = {}
-
     crowd_user = None
     crowd_password = None
 
-    def __init__(self, api_url=None, app_name=None, app_pwd=None):
+    def __init__(self, api_url=None, app_name=None, app_pwd=None, token_cache=crowd_token_cache):
         """Constructor function
         Params:
             api_url: The URL to the Crowd API
             app_name: Application login name for Crowd server
             app_pwd: Application password for Crowd server
+            token_cache: Cache of recently verified session tokens
         """
 
         self.crowd_user = app_name
         self.crowd_password = app_pwd
         self.crowd_api = api_url
         self.use_crowd = None
+        self._token_cache = token_cache
         self.external_opener = urllib2.build_opener(urllib2.HTTPHandler(), urllib2.ProxyHandler({}))
 
     def config(self, config):
@@ -92,6 +93,7 @@ class CrowdClient(object):
         self.crowd_password = config['crowd_app_password']
         self.crowd_api = config['crowd_api_url']
         self.use_crowd = config['crowd_use_crowd'].lower() != 'false'
+        self._token_cache.configure(config)
         try:
             self.external_opener = urllib2.build_opener(
                 urllib2.ProxyHandler({'http': config['external_http_proxy'],
@@ -140,33 +142,22 @@ class CrowdClient(object):
                 raises exception if not
         """
 
-        # Look for a user, and last access entry in the
-        # cache...
-        try:
-            user, last_access_time = self._token_cache[token]
-
-            time_since_last_access = datetime.datetime.now() - last_access_time
-
-            if time_since_last_access.seconds > 20:
-
-                del[self._token_cache[token]]
-
-            else:
-
-                log.debug("Found user in cache - no need to call Crowd")
-
-                return {
-                    'user': user,
-                    'token': token
-                }
-
-        except KeyError:
+        # Look for a user in the cache of recently verified tokens...
+        user = self._token_cache.get(token)
+        if user is not None:
+            log.debug("Found user in cache - no need to call Crowd")
+            return {
+                'user': user,
+                'token': token
+            }
 
+        start_time = time.time()
+        try:
             server_credentials = self._make_request('session/' + token)
-            self._token_cache[token] = (server_credentials['user'], datetime.datetime.now())
-            return server_credentials
-
-        return self._make_request('session/' + token)
+        finally:
+            self._token_cache.record_verification(time.time() - start_time)
+        self._token_cache.put(token, server_credentials['user'])
+        return server_credentials
 
     def delete_session(self, token):
         """
@@ -175,8 +166,7 @@ class CrowdClient(object):
         :param token: Session identifier to invalidate
         :return:Nothing
         """
-        if token in self._token_cache:
-            del[self._token_cache[token]]
+        self._token_cache.invalidate(token)
         self._make_request('session/' + token, method='DELETE')
 
     def get_user_info(self, username):
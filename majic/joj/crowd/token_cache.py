@@ -0,0 +1,196 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from beaker.cache import CacheManager
+from beaker.util import parse_cache_config_options
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class CrowdTokenCache(object):
+    """
+    A thread safe cache of Crowd session tokens which have been verified recently, so that a request does not need a
+    round trip to Crowd to check its token. Tokens are held for a short time in a least recently used in-process cache
+    or, if configured, a Beaker cache shared between processes (e.g. file or memcached) so that logging out in one
+    process is seen in all of them straight away.
+    """
+
+    def __init__(self, max_size=None, time_to_live_in_s=None, clock=time.time):
+        """
+        Create the cache; size and time to live are read when the cache is configured if they are not given
+        :param max_size: maximum number of tokens to hold in process, 0 to disable the cache
+        :param time_to_live_in_s: number of seconds a verified token is trusted for
+        :param clock: function returning the current time in seconds
+        """
+        self.max_size = max_size if max_size is not None else constants.CROWD_TOKEN_CACHE_SIZE
+        self.time_to_live_in_s = time_to_live_in_s if time_to_live_in_s is not None \
+            else constants.CROWD_TOKEN_CACHE_EXPIRE_IN_S
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._shared_cache = None
+        self._shared_cache_options = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verifications = 0
+        self.total_verification_time_in_s = 0.0
+        self.max_verification_time_in_s = 0.0
+
+    def configure(self, config):
+        """
+        Configure the cache from the application configuration
+        :param config: the configuration
+        :return: nothing
+        """
+        self.max_size = int(config.get('crowd_token_cache.size', constants.CROWD_TOKEN_CACHE_SIZE))
+        self.time_to_live_in_s = float(config.get('crowd_token_cache.expire_in_s',
+                                                  constants.CROWD_TOKEN_CACHE_EXPIRE_IN_S))
+        shared_cache_type = config.get('crowd_token_cache.type', None)
+        if shared_cache_type is None:
+            options = None
+        else:
+            options = {
+                'cache.type': shared_cache_type,
+                'cache.data_dir': config.get('crowd_token_cache.data_dir', None),
+                'cache.lock_dir': config.get('crowd_token_cache.lock_dir', None),
+                'cache.url': config.get('crowd_token_cache.url', None)}
+        with self._lock:
+            if options == self._shared_cache_options:
+                return
+            self._shared_cache_options = options
+            self._entries.clear()
+            if options is None:
+                self._shared_cache = None
+            else:
+                cache_manager = CacheManager(**parse_cache_config_options(options))
+                self._shared_cache = cache_manager.get_cache('crowdTokens', expire=int(self.time_to_live_in_s))
+        log.info("Crowd token cache %s" % ("shared (%s)" % shared_cache_type if options else "in process"))
+
+    def get(self, token):
+        """
+        Get the user for a token if it has been verified within the time to live
+        :param token: the Crowd session token
+        :return: the user the token belongs to, None if it has not been verified recently
+        """
+        now = self._clock()
+        with self._lock:
+            shared_cache = self._shared_cache
+            if shared_cache is None:
+                entry = self._entries.pop(token, None)
+                if entry is not None:
+                    verified_time, user = entry
+                    if now - verified_time <= self.time_to_live_in_s:
+                        self._entries[token] = entry
+                        self.hits += 1
+                        return user
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+        try:
+            verified_time, user = shared_cache.get(key=self._get_shared_key(token))
+        except KeyError:
+            verified_time, user = None, None
+        with self._lock:
+            if user is not None and now - verified_time <= self.time_to_live_in_s:
+                self.hits += 1
+                return user
+            self.misses += 1
+            return None
+
+    def put(self, token, user):
+        """
+        Record that a token has just been verified
+        :param token: the Crowd session token
+        :param user: the user the token belongs to
+        :return: nothing
+        """
+        now = self._clock()
+        with self._lock:
+            shared_cache = self._shared_cache
+            if shared_cache is None:
+                if self.max_size <= 0:
+                    return
+                self._entries.pop(token, None)
+                self._entries[token] = (now, user)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                return
+        shared_cache.put(self._get_shared_key(token), (now, user))
+
+    def invalidate(self, token):
+        """
+        Forget a token, e.g. because the user has logged out
+        :param token: the Crowd session token
+        :return: nothing
+        """
+        with self._lock:
+            self._entries.pop(token, None)
+            shared_cache = self._shared_cache
+        if shared_cache is not None:
+            shared_cache.remove_value(key=self._get_shared_key(token))
+
+    def record_verification(self, verification_time_in_s):
+        """
+        Record how long it took to verify a token with Crowd
+        :param verification_time_in_s: the time taken in seconds
+        :return: nothing
+        """
+        with self._lock:
+            self.verifications += 1
+            self.total_verification_time_in_s += verification_time_in_s
+            self.max_verification_time_in_s = max(self.max_verification_time_in_s, verification_time_in_s)
+        log.debug("Crowd token verified in %.3fs" % verification_time_in_s)
+
+    def get_statistics(self):
+        """
+        Get the usage statistics for the cache and the times taken to verify tokens with Crowd
+        :return: dictionary of statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups > 0 else None,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'verifications': self.verifications,
+                'mean_verification_time_in_s':
+                    self.total_verification_time_in_s / self.verifications if self.verifications > 0 else None,
+                'max_verification_time_in_s': self.max_verification_time_in_s}
+
+    def _get_shared_key(self, token):
+        """
+        Get the key for a token in the shared cache, a hash so that tokens are not stored in the clear
+        :param token: the Crowd session token
+        :return: the key
+        """
+        return hashlib.sha256(token).hexdigest()
+
+
+# The single cache shared by all the Crowd clients created in this process
+crowd_token_cache = CrowdTokenCache()
@@ -20,6 +20,7 @@ from joj.crowd.repoze_plugin import is_public_page, is_responsible_for_own_user_
 
 from joj.services.user import UserService
 from joj.lib import helpers
+from joj.lib.request_cache import start_request_cache, end_request_cache
 
 app_globals = config['pylons.app_globals']
 
@@ -52,21 +53,26 @@ class BaseController(WSGIController):
         # Redirect to a canonical form of the URL if necessary.
         self._redirect_noncanonical_url(environ)
 
-        if not is_public_page(environ):
-            self.current_user = self._user_service.get_user_by_username(environ.get('REMOTE_USER'))
-
-            if self.current_user:
-                c.admin_user = self.current_user.is_admin()
-            else:
-                # It's OK to allow access to the home URL with no user logged in because the home controller
-                # will sort out what page to show
-                if not is_responsible_for_own_user_authentication(environ):
-                    raise httpexceptions.HTTPUnauthorized()
-
-        # WSGIController.__call__ dispatches to the Controller method
-        # the request is routed to. This routing information is
-        # available in environ['pylons.routes_dict']
-        return WSGIController.__call__(self, environ, start_response)
+        # Entities read from the database are cached until the request has been handled
+        start_request_cache(environ)
+        try:
+            if not is_public_page(environ):
+                self.current_user = self._user_service.get_user_by_username(environ.get('REMOTE_USER'))
+
+                if self.current_user:
+                    c.admin_user = self.current_user.is_admin()
+                else:
+                    # It's OK to allow access to the home URL with no user logged in because the home controller
+                    # will sort out what page to show
+                    if not is_responsible_for_own_user_authentication(environ):
+                        raise httpexceptions.HTTPUnauthorized()
+
+            # WSGIController.__call__ dispatches to the Controller method
+            # the request is routed to. This routing information is
+            # available in environ['pylons.routes_dict']
+            return WSGIController.__call__(self, environ, start_response)
+        finally:
+            end_request_cache(environ)
 
     def _redirect_noncanonical_url(self, environ):
         """Convert the URL to the form /{controller}/ if the request URL is of
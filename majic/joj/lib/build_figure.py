@@ -2,7 +2,9 @@
 import math
 import urllib, urllib2, time
 from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 import logging
+from pylons import config
 
 try:
     from PIL import Image
@@ -16,6 +18,7 @@ from joj.lib.figure_builder import FigureBuilder
 import joj.lib.figure_parameters as figure_parameters
 from joj.lib.figure_parameters import LayerInfoBuilder
 import joj.lib.wmc_util as wmc_util
+from joj.utils import constants
 
 log = logging.getLogger(__name__)
 
@@ -67,23 +70,22 @@ def buildImage(layerInfoList, imageCache):
     @param imageCache: cache of images that have been generated for layers (used for animations
            where dimensions only vary in the layer over which animation occurs)
     """
-    images = []
     st = time.time()
     
     log.debug("Starting buildImage")
-    
-    size = None
-    layerIndex = 0
-    for layerInfo in layerInfoList:
-        if imageCache == None or imageCache[layerIndex] == None:
-            requestURL = wmc_util.parseEndpointString(layerInfo.endpoint, layerInfo.params)
 
-            req = urllib2.Request(requestURL)
-            req.add_header('Cookie', request.headers.get('Cookie', ''))
+    # Fetch the layers which are not cached concurrently; the cookie is read here as the request is not
+    # available to the fetching threads.
+    cookie = request.headers.get('Cookie', '')
+    layersToFetch = [(layerIndex, layerInfo) for layerIndex, layerInfo in enumerate(layerInfoList)
+                     if imageCache == None or imageCache[layerIndex] == None]
+    fetchedImages = dict(_fetchLayerImages(layersToFetch, cookie))
 
-            filehandle = wmc_util.openURL(req)           
-            imageString = StringIO(filehandle.read())
-            img = Image.open(imageString)
+    images = []
+    size = None
+    for layerIndex, layerInfo in enumerate(layerInfoList):
+        if layerIndex in fetchedImages:
+            img = fetchedImages[layerIndex]
             layerInfo.cachedImage = img
             if imageCache != None:
                 imageCache[layerIndex] = img
@@ -93,7 +95,6 @@ def buildImage(layerInfoList, imageCache):
         images.append(img)
         size = img.size
         log.debug("img.size = %s, img.mode = %s" % (img.size, img.mode,))
-        layerIndex = layerIndex + 1
     
     background = Image.new('RGBA', size, (255,255,255,255))
 
@@ -107,6 +108,44 @@ def buildImage(layerInfoList, imageCache):
     
     return finalImg
 
+def _fetchLayerImages(layersToFetch, cookie):
+    """Fetches the images for layers, using a bounded pool of threads if there is more than one.
+    @param layersToFetch: list of tuples of layer index and LayerInfo for the layers to fetch
+    @param cookie: cookie to send with the WMS requests
+    @return list of tuples of layer index and image
+    """
+    def fetch(layerToFetch):
+        layerIndex, layerInfo = layerToFetch
+        return layerIndex, _fetchLayerImage(layerInfo, cookie)
+
+    maxWorkers = int(config.get('figure.layer_fetch_workers', constants.FIGURE_LAYER_FETCH_WORKERS))
+    if len(layersToFetch) <= 1 or maxWorkers <= 1:
+        return map(fetch, layersToFetch)
+
+    pool = ThreadPool(min(maxWorkers, len(layersToFetch)))
+    try:
+        return pool.map(fetch, layersToFetch)
+    finally:
+        pool.close()
+        pool.join()
+
+def _fetchLayerImage(layerInfo, cookie):
+    """Fetches and decodes the WMS GetMap image for a layer.
+    @param layerInfo: LayerInfo defining the layer
+    @param cookie: cookie to send with the WMS request
+    @return image
+    """
+    requestURL = wmc_util.parseEndpointString(layerInfo.endpoint, layerInfo.params)
+
+    req = urllib2.Request(requestURL)
+    req.add_header('Cookie', cookie)
+
+    filehandle = wmc_util.openURL(req)
+    imageString = StringIO(filehandle.read())
+    img = Image.open(imageString)
+    img.load()
+    return img
+
     
 def addAxisToImage(figureOptions, commonLayerParams, layerInfoList, imageCache):
     """Generates the main figure image with axes.
@@ -397,10 +397,11 @@ class Datasets:
 
         endpoint = {
             'wmsurl': indirect_url,
-            'wcsurl': wcs_url
+            'wcsurl': wcs_url,
+            'dataset_id': dataset.id
         }
 
-        layer_info = self.wmsCapabilityReader.getLayers(endpoint, dataset.name, None, None, True)
+        layer_info = self.wmsCapabilityReader.getLayers(endpoint, dataset.name, None, None, False)
 
         # The returned structure will have numerous child layers, however we're only interested in the
         # very last one, as that contains the map data
@@ -0,0 +1,140 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pylons import config
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+# Model runs in these states are not changed, except by publishing, making public or deleting them
+FINISHED_MODEL_RUN_STATUSES = [constants.MODEL_RUN_STATUS_COMPLETED,
+                               constants.MODEL_RUN_STATUS_PUBLISHED,
+                               constants.MODEL_RUN_STATUS_PUBLIC]
+
+
+class FinishedModelRunCache(object):
+    """
+    A process wide, thread safe, least recently used cache of finished model runs, with their parameter values, keyed
+    by id. The runs are held for a short time only because they can be published or deleted by another process; runs
+    which have not finished are never cached. The cached runs are shared between requests so must not be changed.
+    """
+
+    def __init__(self, max_size=None, time_to_live_in_s=None, config=config, clock=time.time):
+        """
+        Create the cache; size and time to live are read from the config if they are not given
+        :param max_size: maximum number of model runs to hold, 0 to disable the cache
+        :param time_to_live_in_s: number of seconds a model run may be held for
+        :param config: the configuration to read defaults from
+        :param clock: function returning the current time in seconds
+        """
+        self._max_size = max_size
+        self._time_to_live_in_s = time_to_live_in_s
+        self._config = config
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        """
+        Maximum number of model runs held in the cache
+        """
+        if self._max_size is None:
+            return int(self._config.get('model_run_cache.size', constants.FINISHED_MODEL_RUN_CACHE_SIZE))
+        return self._max_size
+
+    @property
+    def time_to_live_in_s(self):
+        """
+        Number of seconds for which a model run is held in the cache
+        """
+        if self._time_to_live_in_s is None:
+            return float(self._config.get('model_run_cache.expire_in_s',
+                                          constants.FINISHED_MODEL_RUN_CACHE_EXPIRE_IN_S))
+        return self._time_to_live_in_s
+
+    def get(self, model_run_id):
+        """
+        Get a model run from the cache
+        :param model_run_id: the id of the model run
+        :return: the model run or None if it is not in the cache or has expired
+        """
+        key = str(model_run_id)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                created_time, model_run = entry
+                if now - created_time <= self.time_to_live_in_s:
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return model_run
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, model_run):
+        """
+        Add a model run to the cache if it has finished
+        :param model_run: the model run, with its status loaded
+        :return: nothing
+        """
+        if model_run.status.name not in FINISHED_MODEL_RUN_STATUSES:
+            return
+        max_size = self.max_size
+        if max_size <= 0:
+            return
+        key = str(model_run.id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock(), model_run)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_run_id):
+        """
+        Remove a model run from the cache, e.g. because it has been published or deleted
+        :param model_run_id: the id of the model run
+        :return: nothing
+        """
+        with self._lock:
+            self._entries.pop(str(model_run_id), None)
+
+    def get_statistics(self):
+        """
+        Get the usage statistics for the cache
+        :return: dictionary of hits, misses, evictions and current size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)}
+
+
+# The single cache shared by all the model run services created in this process
+finished_model_run_cache = FinishedModelRunCache()
@@ -0,0 +1,189 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pylons import config
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class ParsedWmsCapabilitiesEntry(object):
+    """
+    Parsed WMS capabilities held in the cache
+    """
+
+    def __init__(self, capabilities, created_time, dataset_id):
+        """
+        Create an entry
+        :param capabilities: the parsed capabilities
+        :param created_time: time (in seconds since the epoch) at which the capabilities were fetched
+        :param dataset_id: id of the dataset the capabilities are for, None if they are not for a dataset
+        """
+        self.capabilities = capabilities
+        self.created_time = created_time
+        self.dataset_id = dataset_id
+
+
+class ParsedWmsCapabilityCache(object):
+    """
+    A process wide, thread safe, least recently used cache of parsed WMS capabilities keyed by WMS URL, with
+    counters of the time spent fetching and parsing capabilities documents.
+    Entries are evicted when the cache is full or when they are older than the time to live; expired or
+    invalidated entries are fetched again from the WMS server rather than from the document cache.
+    """
+
+    def __init__(self, max_size=None, time_to_live_in_s=None, config=config, clock=time.time):
+        """
+        Create the cache; size and time to live are read from the config if they are not given
+        :param max_size: maximum number of capabilities to hold, 0 to disable the cache
+        :param time_to_live_in_s: number of seconds capabilities may be held for
+        :param config: the configuration to read defaults from
+        :param clock: function returning the current time in seconds
+        """
+        self._max_size = max_size
+        self._time_to_live_in_s = time_to_live_in_s
+        self._config = config
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._stale_urls = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fetch_time_in_s = 0.0
+        self.parse_time_in_s = 0.0
+
+    @property
+    def max_size(self):
+        """
+        Maximum number of parsed capabilities held in the cache
+        """
+        if self._max_size is None:
+            return int(self._config.get('wmscapabilitycache.parsed_cache_size',
+                                        constants.PARSED_WMS_CAPABILITIES_CACHE_SIZE))
+        return self._max_size
+
+    @property
+    def time_to_live_in_s(self):
+        """
+        Number of seconds for which parsed capabilities are held in the cache
+        """
+        if self._time_to_live_in_s is None:
+            return float(self._config.get('wmscapabilitycache.parsed_expire_in_s',
+                                          constants.PARSED_WMS_CAPABILITIES_CACHE_EXPIRE_IN_S))
+        return self._time_to_live_in_s
+
+    def get(self, url, fetch, parse, force_refresh=False, dataset_id=None):
+        """
+        Get the parsed capabilities for a URL from the cache, fetching and parsing the document if they are not in
+        the cache. Exceptions from fetching or parsing are passed on and nothing is cached.
+        :param url: the WMS URL
+        :param fetch: function taking the url and whether to bypass any document cache, returning the document
+        :param parse: function taking the document and returning the parsed capabilities
+        :param force_refresh: True to ignore any cached capabilities
+        :param dataset_id: id of the dataset the URL is for so that it can be invalidated, None if not for a dataset
+        :return: the parsed capabilities
+        """
+        max_size = self.max_size
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None and now - entry.created_time > self.time_to_live_in_s:
+                entry = None
+                self.evictions += 1
+                self._stale_urls.add(url)
+            if entry is not None and not force_refresh:
+                self._entries[url] = entry
+                self.hits += 1
+                log.debug("Parsed WMS capabilities cache hit for %s" % url)
+                return entry.capabilities
+            self.misses += 1
+            force_refresh = force_refresh or url in self._stale_urls
+
+        log.debug("Parsed WMS capabilities cache miss for %s" % url)
+        start_time = time.time()
+        document = fetch(url, force_refresh)
+        fetched_time = time.time()
+        capabilities = parse(document)
+        parsed_time = time.time()
+
+        with self._lock:
+            self.fetch_time_in_s += fetched_time - start_time
+            self.parse_time_in_s += parsed_time - fetched_time
+            self._stale_urls.discard(url)
+            if max_size > 0:
+                self._entries[url] = ParsedWmsCapabilitiesEntry(capabilities, now, dataset_id)
+                while len(self._entries) > max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        log.debug("WMS capabilities for %s fetched in %.3fs and parsed in %.3fs"
+                  % (url, fetched_time - start_time, parsed_time - fetched_time))
+        return capabilities
+
+    def invalidate(self, url):
+        """
+        Remove the capabilities for a URL from the cache
+        :param url: the WMS URL
+        :return: nothing
+        """
+        with self._lock:
+            self._entries.pop(url, None)
+            self._stale_urls.add(url)
+
+    def invalidate_dataset(self, dataset_id):
+        """
+        Remove the capabilities for a dataset from the cache, e.g. because it has been deleted or replaced
+        :param dataset_id: id of the dataset
+        :return: nothing
+        """
+        with self._lock:
+            for url, entry in self._entries.items():
+                if entry.dataset_id == dataset_id:
+                    del self._entries[url]
+                    self._stale_urls.add(url)
+
+    def clear(self):
+        """
+        Remove all capabilities from the cache
+        :return: nothing
+        """
+        with self._lock:
+            self._stale_urls.update(self._entries.keys())
+            self._entries.clear()
+
+    def get_statistics(self):
+        """
+        Get the usage statistics for the cache
+        :return: dictionary of hits, misses, evictions, current size and total time spent fetching and parsing
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'fetch_time_in_s': self.fetch_time_in_s,
+                'parse_time_in_s': self.parse_time_in_s}
+
+
+# The single cache shared by all the WMS capability readers created in this process
+parsed_wms_capability_cache = ParsedWmsCapabilityCache()
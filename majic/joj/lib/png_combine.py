@@ -1,4 +1,3 @@
-
 try:
     from PIL import Image
 except:
@@ -9,48 +8,56 @@ import numpy as N
 
 log = logging.getLogger(__name__)
 
+R, G, B, A = 0, 1, 2, 3
+
 def merge(*args):
-    finalImg = args[0]
-    
-    for i in args[1:]:
-        finalImg = myCombine(finalImg, i)
-    
-    return finalImg
+    """Combines images, each one drawn over those before it, in a single pass.
+    @param args: images, the first being the bottom one
+    @return RGBA image of the combined images
+    """
+    return compositeImages(args)
+
+
+def compositeImages(images):
+    """Alpha blends a list of images of the same size into a single image.
+    The images are stacked into one uint8 buffer and composited in one pass over the layers, with the colours
+    accumulated premultiplied by alpha in float32 so that only the accumulator and one layer are held as floats:
+        alpha_out = alpha_top + alpha_base * (1 - alpha_top)
+        colour_out * alpha_out = colour_top * alpha_top + colour_base * alpha_base * (1 - alpha_top)
+    @param images: images, the first being the bottom one
+    @return RGBA image of the combined images
+    """
+    # Ensure that the images are in RGBA format.
+    layers = N.empty((len(images),) + N.asarray(_toRgba(images[0])).shape, dtype=N.uint8)
+    for index, image in enumerate(images):
+        layers[index] = N.asarray(_toRgba(image))
+
+    premultiplied = N.zeros(layers.shape[1:3] + (3,), dtype=N.float32)
+    alpha = N.zeros(layers.shape[1:3] + (1,), dtype=N.float32)
+    scale = N.float32(1.0 / 255)
+    for layer in layers:
+        topAlpha = layer[:, :, A:A+1] * scale
+        transmitted = 1 - topAlpha
+        premultiplied *= transmitted
+        premultiplied += layer[:, :, R:A] * (topAlpha * scale)
+        alpha *= transmitted
+        alpha += topAlpha
+
+    result = N.empty(layers.shape[1:], dtype=N.uint8)
+    # Premultiplied colours are zero wherever alpha is zero so they are left as they are there.
+    N.divide(premultiplied, alpha, out=premultiplied, where=(alpha > 0))
+    result[:, :, R:A] = N.clip(N.rint(premultiplied * 255), 0, 255)
+    result[:, :, A] = N.rint(alpha[:, :, 0] * 255)
+    return Image.fromarray(result, 'RGBA')
 
 
 def myCombine(baseIm, topIm):
+    """Combines two images, drawing topIm over baseIm.
+    """
+    return compositeImages([baseIm, topIm])
 
-    # Ensure that the images are in RGBA format.
-    if baseIm.mode != 'RGBA':
-        baseImRgba = baseIm.convert('RGBA')
-    else:
-        baseImRgba = baseIm
-
-    if topIm.mode != 'RGBA':
-        topImRgba = topIm.convert('RGBA')
-    else:
-        topImRgba = topIm
-
-    # combining the two images using the formula:
-    # alpha_out = alpha_top + alpha_base * (1 - alpha_top)
-    # colour_out = (colour_top * alpha_top + 
-    #              colour_base * alpha_base * (1 - alpha_top) ) / alpha_out
-    
-    baseArr = N.asarray(baseImRgba, dtype=float)/255
-    topArr = N.asarray(topImRgba, dtype=float)/255
-    R,G,B,A = 0,1,2,3
-    res = N.zeros(baseArr.shape)
-
-    res[:,:,A] = topArr[:,:,A] + baseArr[:,:,A] * (1-topArr[:,:,A])
-
-    for i in [R,G,B]:
-
-        pt1 = topArr[:,:,i] * topArr[:,:,A]
-        pt2 = baseArr[:,:,i] * baseArr[:,:,A] * (1-topArr[:,:,A])
-        res[:,:,i] = (pt1 + pt2) / res[:,:,A]
-
-    res = res * 255
-    res.round()
-    res = N.array(res, dtype=N.uint8)
-
-    return Image.fromarray(res, 'RGBA')
+
+def _toRgba(image):
+    if image.mode != 'RGBA':
+        return image.convert('RGBA')
+    return image
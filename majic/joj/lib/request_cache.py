@@ -0,0 +1,121 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+from pylons import request
+
+log = logging.getLogger(__name__)
+
+REQUEST_CACHE_ENVIRON_KEY = 'joj.request_cache'
+
+
+class RequestCache(object):
+    """
+    An identity map of the entities read from the database while handling one request, so that looking the same
+    entity up again (e.g. the current user, or a dataset and its model run) does not need another database round trip
+    """
+
+    def __init__(self):
+        """
+        Create an empty cache
+        """
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, createfunc):
+        """
+        Get an entity from the cache, reading it if it has not been read during this request. Exceptions from reading
+        the entity are passed on and nothing is cached.
+        :param key: tuple identifying the entity, e.g. ('user', username)
+        :param createfunc: function with no arguments which reads the entity
+        :return: the entity
+        """
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        value = createfunc()
+        self._entries[key] = value
+        return value
+
+    def clear(self):
+        """
+        Forget all the entities, e.g. because the database has been changed
+        :return: nothing
+        """
+        self._entries.clear()
+
+
+def start_request_cache(environ):
+    """
+    Start caching entities for a request
+    :param environ: the WSGI environment of the request
+    :return: the cache for the request
+    """
+    cache = RequestCache()
+    environ[REQUEST_CACHE_ENVIRON_KEY] = cache
+    return cache
+
+
+def end_request_cache(environ):
+    """
+    Stop caching entities for a request
+    :param environ: the WSGI environment of the request
+    :return: nothing
+    """
+    cache = environ.pop(REQUEST_CACHE_ENVIRON_KEY, None)
+    if cache is not None:
+        log.debug("Request cache hits %s, misses %s" % (cache.hits, cache.misses))
+
+
+def get_request_cache():
+    """
+    Get the cache for the request being handled by this thread
+    :return: the cache or None if no request is being handled (e.g. in a script or background thread)
+    """
+    try:
+        environ = request.environ
+    except TypeError:
+        # no request registered for this thread
+        return None
+    return environ.get(REQUEST_CACHE_ENVIRON_KEY)
+
+
+def cached_for_request(key, createfunc):
+    """
+    Get an entity from the cache for the current request, reading it if it has not been read during the request or
+    there is no request
+    :param key: tuple identifying the entity
+    :param createfunc: function with no arguments which reads the entity
+    :return: the entity
+    """
+    cache = get_request_cache()
+    if cache is None:
+        return createfunc()
+    return cache.get(key, createfunc)
+
+
+def clear_request_cache():
+    """
+    Forget the entities cached for the current request, if there is one
+    :return: nothing
+    """
+    cache = get_request_cache()
+    if cache is not None:
+        cache.clear()
@@ -5,17 +5,31 @@ Video export.
 """
 import logging
 import copy
-import os, shutil, tempfile
-from pylons import config
+import os, shlex, subprocess, tempfile
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from pylons import config, request
+
+try:
+    from PIL import Image
+except:
+    import Image
+
 import joj.lib.build_figure as build_figure
 from joj.lib.export_parameters import ExportResult
 import joj.lib.wmc_util as wmc_util
+from joj.utils import constants
 
 log = logging.getLogger(__name__)
 
-def makeVideo(exportParams):
+def makeVideo(exportParams, progressCallback=None):
     """Generates a video export.
-    Creates an image for each frame then combines this into a video according to the format specified.
+    Frames are rendered by a pool of threads and piped, in order, as raw RGBA to a single converter process, so no
+    intermediate image files are written. Images of the layers that are not animated are fetched for the first
+    frame and reused for the others.
+    @param exportParams: ExportParameters defining the video
+    @param progressCallback: optional function called with the number of frames written and the total number of
+           frames after each frame is written
     """
     # Check that the number of steps is within range.
     maxNumberSteps = int(exportParams.configuration['maxnumbersteps'])
@@ -24,70 +38,137 @@ def makeVideo(exportParams):
         return ExportResult(False,
                             errorMessage = ('The number of steps for a video cannot exceed %d' % maxNumberSteps))
 
-    layerInfo = exportParams.layerInfoList[exportParams.animationLayerNumber - 1]
-
-    animationLayerParams = layerInfo.params
-    if (exportParams.animationDimension != None) and (exportParams.animationDimension in animationLayerParams):
-        del animationLayerParams[exportParams.animationDimension]
-
-    imageDir = tempfile.mkdtemp(prefix="viewdataVideoExport", suffix="", dir=exportParams.exportDir)
-
-    # Create an image for each dimension value.
-    imageIndex = 0
-    if exportParams.animationDimension == None:
-        createImage(exportParams.params, exportParams.figureOptions, exportParams.commonLayerParams,
-                    exportParams.layerInfoList, imageDir, imageIndex, None)
-    else:
-        # Initialise a list of cached images to be used for layers that don't change between steps.
-        imageCache = [None] * len(exportParams.layerInfoList)
-        for val in exportParams.dimensionValues:
-            # Clear the cached image for the layer that is being animated.
-            imageCache[exportParams.animationLayerNumber - 1] = None
-            # Set the current value of the animated dimension.
-            animationLayerParams[exportParams.animationDimension] = val
-            # Update the legend URL with the animated dimension value.
-            animationLayerLegendUrl = layerInfo.legendURL
-            layerInfo.legendURL = wmc_util.parseEndpointString(animationLayerLegendUrl, {exportParams.animationDimension: val})
-
-            # Create the image file for this value.
-            createImage(exportParams.params, exportParams.figureOptions, exportParams.commonLayerParams,
-                        exportParams.layerInfoList, imageDir, imageIndex, imageCache)
-            imageIndex = imageIndex + 1
-
-    # Create the video from the individual images.
+    frames = makeFrames(exportParams)
     try:
-        outFilePath = createVideo(exportParams.formatName, exportParams.frameRate, imageDir, exportParams.exportDir,
-                                  exportParams.fileNamePrefix)
+        outFilePath = createVideo(exportParams.formatName, exportParams.frameRate, frames, exportParams.exportDir,
+                                  exportParams.fileNamePrefix, progressCallback)
     except Exception, err:
-        log.error("Exception creating video: %s" % err)
+        log.exception("Exception creating video: %s" % err)
         outFilePath = None
 
-    # Remove the image directory, ignoring errors.
-    shutil.rmtree(imageDir, True)
-
     if outFilePath == None:
         return ExportResult(False, errorMessage = 'Video creation failed')
     else:
         return ExportResult(True, fileName = os.path.basename(outFilePath))
 
-def createImage(requestParams, figureOptions, commonLayerParams, layerInfoList, imageDir, imageIndex, imageCache):
-    """Creates a PNG image forming one frame of the video.
+class VideoFrame():
+    """The parameters needed to render one frame of a video.
+    """
+    def __init__(self, requestParams, figureOptions, commonLayerParams, layerInfoList, animationLayerIndex):
+        self.requestParams = requestParams
+        self.figureOptions = figureOptions
+        self.commonLayerParams = commonLayerParams
+        self.layerInfoList = layerInfoList
+        self.animationLayerIndex = animationLayerIndex
+
+def makeFrames(exportParams):
+    """Makes the list of frames for a video, one for each value of the animated dimension.
     """
-    outFileName = "image_%05d.png" % (imageIndex)
-    outPath = os.path.join(imageDir, outFileName)
-    log.debug("Creating image file: %s", outPath);
+    layerInfo = exportParams.layerInfoList[exportParams.animationLayerNumber - 1]
 
-    img = build_figure.buildFigureForLayers(requestParams, figureOptions, commonLayerParams.copy(),
-                                            copy.deepcopy(layerInfoList), imageCache)
+    animationLayerParams = layerInfo.params
+    if (exportParams.animationDimension != None) and (exportParams.animationDimension in animationLayerParams):
+        del animationLayerParams[exportParams.animationDimension]
 
-    img.save(outPath, 'PNG')
+    if exportParams.animationDimension == None:
+        return [VideoFrame(exportParams.params, exportParams.figureOptions, exportParams.commonLayerParams.copy(),
+                           copy.deepcopy(exportParams.layerInfoList), None)]
+
+    frames = []
+    for val in exportParams.dimensionValues:
+        # Set the current value of the animated dimension.
+        animationLayerParams[exportParams.animationDimension] = val
+        # Update the legend URL with the animated dimension value.
+        animationLayerLegendUrl = layerInfo.legendURL
+        layerInfo.legendURL = wmc_util.parseEndpointString(animationLayerLegendUrl, {exportParams.animationDimension: val})
+
+        frames.append(VideoFrame(exportParams.params, exportParams.figureOptions,
+                                 exportParams.commonLayerParams.copy(), copy.deepcopy(exportParams.layerInfoList),
+                                 exportParams.animationLayerNumber - 1))
+    return frames
+
+def renderFrames(frames, imageCache):
+    """Generator of the images of the frames of a video, in order.
+    The first frame is rendered on its own to fill the cache of images for the layers which do not change; the
+    rest are rendered by a pool of threads with a bounded number of frames in progress.
+    @param frames: list of VideoFrame
+    @param imageCache: list of cached images for each layer (None where the image is not cached)
+    """
+    img, frameImageCache = renderFrame(frames[0], imageCache)
+    imageCache[:] = frameImageCache
+    if frames[0].animationLayerIndex != None:
+        imageCache[frames[0].animationLayerIndex] = None
+    yield img
+
+    maxWorkers = int(config.get('video.frame_render_workers', constants.VIDEO_FRAME_RENDER_WORKERS))
+    if len(frames) == 1:
+        return
+    if maxWorkers <= 1:
+        for frame in frames[1:]:
+            yield renderFrame(frame, imageCache)[0]
+        return
+
+    # The frames are rendered in other threads so the request (used for its cookie) and the application's
+    # configuration are registered in each of them.
+    try:
+        requestObject = request._current_obj()
+    except TypeError:
+        requestObject = None
+    configObject = config._current_obj()
 
-def createVideo(formatName, frameRate, imageDir, exportDir, fileNamePrefix):
-    """Combine the image into a video.
+    pool = ThreadPool(min(maxWorkers, len(frames) - 1))
+    try:
+        pending = deque()
+        for frame in frames[1:]:
+            pending.append(pool.apply_async(_renderFrameInThread, (frame, imageCache, requestObject, configObject)))
+            if len(pending) >= 2 * maxWorkers:
+                yield pending.popleft().get()[0]
+        while len(pending) > 0:
+            yield pending.popleft().get()[0]
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _renderFrameInThread(frame, imageCache, requestObject, configObject):
+    config.push_thread_config(configObject)
+    try:
+        if requestObject is None:
+            return renderFrame(frame, imageCache)
+        request._push_object(requestObject)
+        try:
+            return renderFrame(frame, imageCache)
+        finally:
+            request._pop_object(requestObject)
+    finally:
+        config.pop_thread_config(configObject)
+
+def renderFrame(frame, imageCache):
+    """Renders one frame of a video.
+    @param frame: VideoFrame to render
+    @param imageCache: list of cached images of the layers which are not animated (None where not cached)
+    @return tuple of the RGBA image of the frame and the images of its layers
+    """
+    frameImageCache = list(imageCache)
+    if frame.animationLayerIndex != None:
+        frameImageCache[frame.animationLayerIndex] = None
+    img = build_figure.buildFigureForLayers(frame.requestParams, frame.figureOptions, frame.commonLayerParams,
+                                            frame.layerInfoList, frameImageCache)
+    return img.convert('RGBA'), frameImageCache
+
+def _fitFrame(img, size):
+    """Pads or crops a frame image to the size of the video.
+    """
+    if img.size == size:
+        return img
+    log.warn("Frame size %s differs from video size %s" % (img.size, size))
+    fitted = Image.new('RGBA', size, (255, 255, 255, 255))
+    fitted.paste(img, (0, 0))
+    return fitted
+
+def createVideo(formatName, frameRate, frames, exportDir, fileNamePrefix, progressCallback=None):
+    """Renders the frames and pipes them into the converter to create the video.
     """
     framesPerSecond = (float(frameRate) if frameRate != None else None)
-    fileNameTemplate = "image_%05d.png"
-    filePathTemplate = os.path.join(imageDir, fileNameTemplate)
     reserveFileSuffix = ".rsrv"
 
     # FFmpeg doesn't allow framerates below 20fps for MPEG-2. It will modify other values to one valid for the format.
@@ -95,17 +176,18 @@ def createVideo(formatName, frameRate, imageDir, exportDir, fileNamePrefix):
         framesPerSecond = 20
 
     # Find the command template for converting to the specified format.
+    rawInput = "-f rawvideo -pix_fmt rgba -s %(width)dx%(height)d -r %(framesPerSecond)g -i -"
     formats = {
-        "AVI_MJPEG": {'template': "%(converter)s -r %(framesPerSecond)g -i %(filePathTemplate)s -f avi -vcodec mjpeg -sameq '%(outFilePath)s'",
+        "AVI_MJPEG": {'template': "%(converter)s " + rawInput + " -f avi -vcodec mjpeg -sameq '%(outFilePath)s'",
                       'converter': "ffmpeg",
                       'suffix': '.avi'},
-        "FLV": {'template': "%(converter)s -r %(framesPerSecond)g -i %(filePathTemplate)s -f flv -sameq '%(outFilePath)s'",
+        "FLV": {'template': "%(converter)s " + rawInput + " -f flv -sameq '%(outFilePath)s'",
                 'converter': "ffmpeg",
                 'suffix': '.flv'},
-        "MOV": {'template': "%(converter)s -r %(framesPerSecond)g -i %(filePathTemplate)s -f mov -sameq '%(outFilePath)s'",
+        "MOV": {'template': "%(converter)s " + rawInput + " -f mov -sameq '%(outFilePath)s'",
                 'converter': "ffmpeg",
                 'suffix': '.mov'},
-        "MPEG2": {'template': "%(converter)s -r %(framesPerSecond)g -i %(filePathTemplate)s -f mpeg2video -vcodec mpeg2video -sameq '%(outFilePath)s'",
+        "MPEG2": {'template': "%(converter)s " + rawInput + " -f mpeg2video -vcodec mpeg2video -sameq '%(outFilePath)s'",
                   'converter': "ffmpeg",
                   'suffix': '.mpeg'}
         }
@@ -126,14 +208,42 @@ def createVideo(formatName, frameRate, imageDir, exportDir, fileNamePrefix):
     outFilePath = reserveFile.name[:-len(reserveFileSuffix)] + outFileSuffix
     log.debug("File: %s" % (outFilePath))
 
-    # Run the external executable to create the video file.
-    command = commandTemplate % {'converter': converterExe, 'framesPerSecond': framesPerSecond, 'filePathTemplate': filePathTemplate, 'outFilePath': outFilePath}
+    imageCache = [None] * len(frames[0].layerInfoList)
+    frameImages = renderFrames(frames, imageCache)
+    firstImage = next(frameImages)
+    size = firstImage.size
+
+    # Run the external executable, writing the frames to its input as they are rendered.
+    command = commandTemplate % {'converter': converterExe, 'framesPerSecond': framesPerSecond,
+                                 'width': size[0], 'height': size[1], 'outFilePath': outFilePath}
     log.debug('Running command "%s"', command)
-    rc = os.system(command)
+    process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+    try:
+        framesWritten = 0
+        for img in _prepend(firstImage, frameImages):
+            process.stdin.write(_fitFrame(img, size).tobytes())
+            framesWritten += 1
+            log.debug("Written video frame %d of %d" % (framesWritten, len(frames)))
+            if progressCallback is not None:
+                progressCallback(framesWritten, len(frames))
+        process.stdin.close()
+    except:
+        frameImages.close()
+        process.kill()
+        process.wait()
+        if os.path.exists(outFilePath):
+            os.remove(outFilePath)
+        raise
+    rc = process.wait()
     log.debug("Video creation process return code: %x", rc)
 
     # Check that a file was created.
-    if not os.path.exists(outFilePath):
+    if rc != 0 or not os.path.exists(outFilePath):
         return None
 
     return outFilePath
+
+def _prepend(first, rest):
+    yield first
+    for item in rest:
+        yield item
@@ -4,55 +4,57 @@ Performs WMS capabilities calls and processes the results.
 @author: rwilkinson
 """
 
+import copy
+import io
 import logging
 import re
 import urlparse
-import xml.dom.minidom
+from lxml import etree
 
 from joj.lib.endpoint_hierarchy_builder import EndpointHierarchyBuilder, Node
+from joj.lib.parsed_wms_capability_cache import parsed_wms_capability_cache
 from joj.lib.wmc_util import parseEndpointString
-from joj.lib.wms_layer import WmsLayer
+from joj.lib.wms_layer import WmsLayer, getTag, getChildText, getOnlineResourceHref
 from joj.lib.wms_capability_cache import WmsCapabilityCache
-import joj.lib.xml_util as xml_util
 
 log = logging.getLogger(__name__)
 
-XLINK_URI = 'http://www.w3.org/1999/xlink'
+
+class ParsedLayer():
+    """A layer parsed from a capabilities document together with its sublayers.
+    """
+    def __init__(self, layer, subLayers):
+        self.layer = layer
+        self.subLayers = subLayers
+
+
+class WmsCapabilities():
+    """The parts of a WMS capabilities document used to build the layer tree.
+    """
+    def __init__(self):
+        self.wmsVersion = None
+        self.service = None
+        self.commonData = None
+        self.layers = None
+
 
 class WmsCapabilityReader():
-    def __init__(self, config):
+    def __init__(self, config, parsedCapabilityCache=parsed_wms_capability_cache):
         self.wmsCapabilityCache = WmsCapabilityCache(config)
+        self.parsedCapabilityCache = parsedCapabilityCache
         self.proxyUrl = config.get('proxyUrl')
 
     def getEndpointServiceData(self, endpoint, forceRefresh):
         """Returns service data for an endpoint.
         """
         log.debug("getEndpointData called for %s", endpoint['wmsurl'])
-        wmsUrl = self.makeProxiedUrl(endpoint['wmsurl'])
-        wmcDoc = self.wmsCapabilityCache.getWmsCapabilities(wmsUrl, forceRefresh)
-
-        dom = xml.dom.minidom.parseString(wmcDoc)
-        # Get the namespace URI for the document root element.
-        ns = dom.documentElement.namespaceURI
-
-        # Get the version the WMS server responded with.
-        wmsVersion = dom.documentElement.getAttribute('version')
-
-        service = xml_util.getSingleChildByNameNS(dom.documentElement, ns, 'Service')
-        if service == None:
+        capabilities = self.getCapabilities(endpoint, forceRefresh)
+        if capabilities.service == None:
             return None
 
-        title = xml_util.getSingleChildTextByNameNS(service, ns, 'Title')
-        abstract = xml_util.getSingleChildTextByNameNS(service, ns, 'Abstract')
-
-        # Break internal references to facilitiate garbage collection.
-        dom.unlink()
-
-        return {
-            'version': wmsVersion,
-            'title': title,
-            'abstract': abstract
-            }
+        service = capabilities.service.copy()
+        service['version'] = capabilities.wmsVersion
+        return service
 
     def getLayers(self, endpoint, parentId, idMap, keywordData, forceRefresh):
         """Returns a list of 'endpoint_hierarchy_builder.Node's for the layers of an endpoint in a WMC document.
@@ -60,78 +62,104 @@ class WmsCapabilityReader():
         """
         log.debug("getLayers called for %s", endpoint['wmsurl'])
         log.debug("  keywordData: %s" % keywordData)
-        wmsUrl = self.makeProxiedUrl(endpoint['wmsurl'])
-        wmcDoc = self.wmsCapabilityCache.getWmsCapabilities(wmsUrl, True)
-
-        dom = xml.dom.minidom.parseString(wmcDoc)
-        # Get the namespace URI for the document root element.
-        ns = dom.documentElement.namespaceURI
+        capabilities = self.getCapabilities(endpoint, forceRefresh)
+        if capabilities.layers == None:
+            return None
 
-        # Get the version the WMS server responded with.
-        wmsVersion = dom.documentElement.getAttribute('version')
+        commonData = capabilities.commonData.copy()
+        if 'wcsurl' in endpoint:
+            commonData['getCoverageUrl'] = endpoint['wcsurl']
 
         nodes = []
-        capability = xml_util.getSingleChildByNameNS(dom.documentElement, ns, 'Capability')
-        if capability == None:
-            return None
+        for parsedLayer in capabilities.layers:
+            self.handleLayer(parsedLayer, nodes, endpoint, parentId, commonData, keywordData, idMap)
+        return nodes
+
+    def getCapabilities(self, endpoint, forceRefresh):
+        """Returns the parsed capabilities for an endpoint from the parsed capabilities cache, fetching and parsing
+        the capabilities document if they are not cached or forceRefresh=True.
+        """
+        wmsUrl = self.makeProxiedUrl(endpoint['wmsurl'])
+        return self.parsedCapabilityCache.get(wmsUrl, self.wmsCapabilityCache.getWmsCapabilities,
+                                              self.parseCapabilities, forceRefresh, endpoint.get('dataset_id'))
 
-        getCapabilitiesUrlEl = xml_util.getSingleChildByPathNS(capability,
-                                                               [(ns, 'Request'), (ns, 'GetCapabilities'), (ns, 'DCPType'),
-                                                                (ns, 'HTTP'), (ns, 'Get'), (ns, 'OnlineResource')])
-        getCapabilitiesUrl = getCapabilitiesUrlEl.getAttributeNS(XLINK_URI, 'href')
-        if not getCapabilitiesUrl:
-            getCapabilitiesUrl = xml_util.getAttributeByLocalName(getCapabilitiesUrlEl, 'href')
+    def parseCapabilities(self, wmcDoc):
+        """Parses a WMS capabilities document in a single streaming pass.
+        Layer elements are converted to WmsLayers as soon as they end and are then cleared, so the whole document
+        is never held as a tree.
+        """
+        capabilities = WmsCapabilities()
+        parsedLayers = {}
+        root = None
+        ns = None
+        for event, element in etree.iterparse(io.BytesIO(wmcDoc), events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    # Get the namespace URI and the version the WMS server responded with from the root element.
+                    root = element
+                    ns = etree.QName(element).namespace
+                    capabilities.wmsVersion = element.get('version', '')
+                continue
+
+            if element.tag == getTag(ns, 'Layer'):
+                layer = WmsLayer()
+                layer.populateFromLayerElement(ns, element)
+                subLayers = [parsedLayers.pop(subLayerEl) for subLayerEl in element.iterchildren(getTag(ns, 'Layer'))]
+                parsedLayers[element] = ParsedLayer(layer, subLayers)
+                element.clear()
+            elif element.tag == getTag(ns, 'Service'):
+                capabilities.service = {
+                    'title': getChildText(element, ns, 'Title'),
+                    'abstract': getChildText(element, ns, 'Abstract')
+                    }
+            elif element.tag == getTag(ns, 'Request'):
+                capabilities.commonData = self.getRequestData(ns, element, capabilities.wmsVersion)
+            elif element.tag == getTag(ns, 'Capability'):
+                capabilities.layers = [parsedLayers.pop(layerEl)
+                                       for layerEl in element.iterchildren(getTag(ns, 'Layer'))]
+        return capabilities
+
+    def getRequestData(self, ns, requestEl, wmsVersion):
+        """Gets the URLs of the WMS operations from the capabilities Request element.
+        """
+        def getOperationHref(operation):
+            onlineResourceEl = requestEl.find('/'.join(getTag(ns, name) for name in
+                                                       [operation, 'DCPType', 'HTTP', 'Get', 'OnlineResource']))
+            return getOnlineResourceHref(onlineResourceEl) if onlineResourceEl is not None else None
+
+        getCapabilitiesUrl = getOperationHref('GetCapabilities')
         log.debug("GetCapabilities URL: %s", getCapabilitiesUrl)
         getCapabilitiesUrl = parseEndpointString(getCapabilitiesUrl, {'REQUEST':'GetCapabilities', 'SERVICE':'WMS'})
 
-        getFeatureInfoOnlineResourceEl = xml_util.getSingleChildByPathNS(capability,
-                                                                         [(ns, 'Request'), (ns, 'GetFeatureInfo'),
-                                                                          (ns, 'DCPType'), (ns, 'HTTP'),
-                                                                          (ns, 'Get'), (ns, 'OnlineResource')])
-        if getFeatureInfoOnlineResourceEl:
-            getFeatureInfoUrl = getFeatureInfoOnlineResourceEl.getAttributeNS(XLINK_URI, 'href')
-            if not getFeatureInfoUrl:
-                getFeatureInfoUrl = xml_util.getAttributeByLocalName(getFeatureInfoOnlineResourceEl, 'href')
+        getFeatureInfoUrl = getOperationHref('GetFeatureInfo')
+        if getFeatureInfoUrl:
             log.debug("GetFeatureInfo URL: %s", getFeatureInfoUrl)
             getFeatureInfoUrl = getFeatureInfoUrl.rstrip('?&')
         else:
             getFeatureInfoUrl = None
 
-        getMapOnlineResourceEl = xml_util.getSingleChildByPathNS(capability,
-                                                               [(ns, 'Request'), (ns, 'GetMap'), (ns, 'DCPType'), (ns, 'HTTP'),
-                                                                (ns, 'Get'), (ns, 'OnlineResource')])
-        getMapUrl = getMapOnlineResourceEl.getAttributeNS(XLINK_URI, 'href')
-        if not getMapUrl:
-            getMapUrl = xml_util.getAttributeByLocalName(getMapOnlineResourceEl, 'href')
+        getMapUrl = getOperationHref('GetMap')
         log.debug("GetMap URL: %s", getMapUrl)
         getMapUrl = getMapUrl.rstrip('?&')
         getMapUrl = self.makeProxiedUrl(getMapUrl)
 
-        commonData = {
+        return {
             'getCapabilitiesUrl': getCapabilitiesUrl,
             'getFeatureInfoUrl': getFeatureInfoUrl,
             'getMapUrl': getMapUrl,
             'wmsVersion': wmsVersion
             }
-        if 'wcsurl' in endpoint:
-            commonData['getCoverageUrl'] = endpoint['wcsurl']
-        for layer in xml_util.getChildrenByNameNS(capability, ns, 'Layer'):
-            self.handleLayer(ns, layer, nodes, endpoint, parentId, commonData, keywordData, idMap)
-
-        # Break internal references to facilitate garbage collection.
-        dom.unlink()
-
-        return nodes
 
-    def handleLayer(self, ns, layerEl, nodes, endpoint, parentId, commonData, antecedentKeywordData, idMap):
+    def handleLayer(self, parsedLayer, nodes, endpoint, parentId, commonData, antecedentKeywordData, idMap):
         """Processes a layer.
         Determines whether the layer has sublayers, in which case this method is called recursively,
         or if it is a leaf, in which case a node is added to the node list.
         """
-        subLayers = xml_util.getChildrenByNameNS(layerEl, ns, 'Layer')
+        subLayers = parsedLayer.subLayers
         isLeaf = len(subLayers) == 0
-        layer = WmsLayer()
-        layer.populateFromLayerElement(ns, layerEl, commonData)
+        # The parsed layer is shared through the cache so each tree gets its own copy to modify.
+        layer = copy.deepcopy(parsedLayer.layer)
+        layer.setCommonData(commonData)
         log.debug("Layer %s %s" % (layer.name, layer.title))
 
         self.setLayerId(layer, parentId, isLeaf)
@@ -160,8 +188,8 @@ class WmsCapabilityReader():
         if isLeaf:
             log.debug("Found layer: title '%s' (ID=%s)", layer.title, layer.id)
         else:
-            for lyr in subLayers:
-                self.handleLayer(ns, lyr, children, endpoint, layer.id, commonData, antecedentKeywordData, idMap)
+            for subLayer in subLayers:
+                self.handleLayer(subLayer, children, endpoint, layer.id, commonData, antecedentKeywordData, idMap)
 
     def setLayerId(self, layer, parentId, isLeaf):
         """Constructs an id for the tree node.
@@ -6,13 +6,40 @@ Holds data for a layer from a WMS capabilities document.
 
 import logging
 
+from lxml import etree
+
 import joj.lib.dimension_format as dimension_format
-import joj.lib.xml_util as xml_util
 
 log = logging.getLogger(__name__)
 
 XLINK_URI = 'http://www.w3.org/1999/xlink'
 
+def getTag(ns, name):
+    """Returns the ElementTree tag for an element name in a namespace (which may be None).
+    """
+    if ns:
+        return '{%s}%s' % (ns, name)
+    return name
+
+def getChildText(element, ns, name):
+    """Returns the text of the first child element with a name, or None if there is no such child or it is empty.
+    """
+    text = element.findtext(getTag(ns, name))
+    if text:
+        return text
+    return None
+
+def getOnlineResourceHref(onlineResourceEl):
+    """Returns the link from an OnlineResource element, accepting an href attribute in any namespace if there is
+    no xlink:href.
+    """
+    href = onlineResourceEl.get(getTag(XLINK_URI, 'href'))
+    if not href:
+        for name, value in onlineResourceEl.attrib.iteritems():
+            if etree.QName(name).localname == 'href':
+                return value
+    return href
+
 class WmsLayer:
     """Holds the WMS data needed for layer.
     """
@@ -39,42 +66,34 @@ class WmsLayer:
         self.dimensions = dimensions
         self.styles = style
 
-    def populateFromLayerElement(self, ns, layerEl, commonData):
+    def populateFromLayerElement(self, ns, layerEl):
         """Populates a WmsLayer instance from a WMS capabilities Layer element
         @param ns: namespace in capabilities document
-        @param layerEl: Layer element
-        @param commonData: dict of capabilities data that is not specific to the layer
+        @param layerEl: Layer element (lxml)
         """
-        self.title = xml_util.getSingleChildTextByNameNS(layerEl, ns, 'Title')
-        self.name = xml_util.getSingleChildTextByNameNS(layerEl, ns, 'Name')
-        self.abstract = xml_util.getSingleChildTextByNameNS(layerEl, ns, 'Abstract')
-        self.getMapUrl = commonData['getMapUrl']
-        self.getCapabilitiesUrl = commonData['getCapabilitiesUrl']
-        self.getFeatureInfoUrl = commonData['getFeatureInfoUrl']
-        self.wmsVersion = commonData['wmsVersion']
-        self.getCoverageUrl = commonData['getCoverageUrl']
+        self.title = getChildText(layerEl, ns, 'Title')
+        self.name = getChildText(layerEl, ns, 'Name')
+        self.abstract = getChildText(layerEl, ns, 'Abstract')
 
         # Parse Dimension element into attributes and list of values.
         # First look for pre-WMS 1.3.0 Extent elements.
         extents = {}
-        for extentEl in xml_util.getChildrenByNameNS(layerEl, ns, 'Extent'):
-            name = extentEl.getAttribute('name')
-            extentData = extentEl.firstChild
-            if extentData != None:
-                extentStr = extentEl.firstChild.data.strip()
+        for extentEl in layerEl.iterchildren(getTag(ns, 'Extent')):
+            name = extentEl.get('name', '')
+            if extentEl.text != None:
+                extentStr = extentEl.text.strip()
                 extentValues = extentStr.split(',')
                 extents[name] = extentValues
 
         # Find the Dimension elements.
         self.dimensions = []
-        for dimensionEl in xml_util.getChildrenByNameNS(layerEl, ns, 'Dimension'):
-            name = dimensionEl.getAttribute('name')
-            units = dimensionEl.getAttribute('units')
-            unitSymbol = dimensionEl.getAttribute('unitSymbol')
-            default = dimensionEl.getAttribute('default')
-            dimensionData = dimensionEl.firstChild
-            if dimensionData != None:
-                dimensionStr = dimensionEl.firstChild.data.strip()
+        for dimensionEl in layerEl.iterchildren(getTag(ns, 'Dimension')):
+            name = dimensionEl.get('name', '')
+            units = dimensionEl.get('units', '')
+            unitSymbol = dimensionEl.get('unitSymbol', '')
+            default = dimensionEl.get('default', '')
+            if dimensionEl.text != None:
+                dimensionStr = dimensionEl.text.strip()
                 dimensionValues = dimensionStr.split(',')
             elif name in extents:
                 dimensionValues = extents[name]
@@ -92,19 +111,19 @@ class WmsLayer:
 
         # Parse Style element into list of values.
         self.styles = []
-        for styleEl in xml_util.getChildrenByNameNS(layerEl, ns, 'Style'):
-            name = xml_util.getSingleChildTextByNameNS(styleEl, ns, 'Name')
-            title = xml_util.getSingleChildTextByNameNS(styleEl, ns, 'Title')
+        for styleEl in layerEl.iterchildren(getTag(ns, 'Style')):
+            name = getChildText(styleEl, ns, 'Name')
+            title = getChildText(styleEl, ns, 'Title')
             style = {
                 'name': name,
                 'title': title,
                 }
-            legendUrlEl = xml_util.getSingleChildByNameNS(styleEl, ns, 'LegendURL')
+            legendUrlEl = styleEl.find(getTag(ns, 'LegendURL'))
             if legendUrlEl != None:
-                width = legendUrlEl.getAttribute('width')
-                height = legendUrlEl.getAttribute('height')
-                onlineResourceEl = xml_util.getSingleChildByNameNS(legendUrlEl, ns, 'OnlineResource')
-                legendURL = onlineResourceEl.getAttributeNS(XLINK_URI, 'href')
+                width = legendUrlEl.get('width', '')
+                height = legendUrlEl.get('height', '')
+                onlineResourceEl = legendUrlEl.find(getTag(ns, 'OnlineResource'))
+                legendURL = onlineResourceEl.get(getTag(XLINK_URI, 'href'), '')
 
                 style['legendURL'] = {
                     'width': width,
@@ -114,13 +133,23 @@ class WmsLayer:
             self.styles.append(style)
 
         self.getDisplayOptionsUrl = None
-        for metadataUrlEl in xml_util.getChildrenByNameNS(layerEl, ns, 'MetadataURL'):
-            metadataUrlType = metadataUrlEl.getAttribute('type')
+        for metadataUrlEl in layerEl.iterchildren(getTag(ns, 'MetadataURL')):
+            metadataUrlType = metadataUrlEl.get('type')
             if metadataUrlType and (metadataUrlType == 'display_options') :
-                if xml_util.getSingleChildTextByNameNS(metadataUrlEl, ns, 'Format') == 'application/json':
-                    onlineResourceEl = xml_util.getSingleChildByNameNS(metadataUrlEl, ns, 'OnlineResource')
-                    if onlineResourceEl:
-                        self.getDisplayOptionsUrl = onlineResourceEl.getAttributeNS(XLINK_URI, 'href')
+                if getChildText(metadataUrlEl, ns, 'Format') == 'application/json':
+                    onlineResourceEl = metadataUrlEl.find(getTag(ns, 'OnlineResource'))
+                    if onlineResourceEl != None:
+                        self.getDisplayOptionsUrl = onlineResourceEl.get(getTag(XLINK_URI, 'href'), '')
+
+    def setCommonData(self, commonData):
+        """Sets the layer data that is not specific to the layer
+        @param commonData: dict of capabilities data that is not specific to the layer
+        """
+        self.getMapUrl = commonData['getMapUrl']
+        self.getCapabilitiesUrl = commonData['getCapabilitiesUrl']
+        self.getFeatureInfoUrl = commonData['getFeatureInfoUrl']
+        self.wmsVersion = commonData['wmsVersion']
+        self.getCoverageUrl = commonData['getCoverageUrl']
 
     def generateDimensionDisplayValues(self, dimensionFormat, dimensionReverse):
         """Creates dimension values formatted for display if there is an appropriate format.
@@ -0,0 +1,338 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib
+from collections import OrderedDict
+from pylons import config
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+# WMS requests whose responses are cached
+CACHEABLE_WMS_REQUESTS = ['getmap', 'getlegendgraphic']
+
+# size of the blocks tiles are read and written in
+TILE_BLOCK_SIZE = 64 * 1024
+
+
+class CachedWmsTile(object):
+    """
+    A tile in the cache
+    """
+
+    def __init__(self, path, content_type, etag):
+        """
+        Create the tile
+        :param path: path of the file holding the tile
+        :param content_type: the content type of the tile
+        :param etag: the entity tag of the tile
+        """
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+
+    def read_blocks(self):
+        """
+        Generator of the blocks of the tile image
+        :return: nothing
+        """
+        with open(self.path, 'rb') as tile_file:
+            tile_file.readline()
+            while True:
+                block = tile_file.read(TILE_BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+
+
+class WmsTileCache(object):
+    """
+    A least recently used cache of WMS tiles on local disk, bounded by total size and keyed by dataset id and the
+    normalised WMS query. Each tile file holds a line of json with its content type and entity tag followed by the
+    image, tiles are held in a directory per dataset so they can be removed when the dataset changes.
+    """
+
+    def __init__(self, data_dir=None, max_size_in_mb=None, config=config):
+        """
+        Create the cache; the directory and size are read from the config if they are not given
+        :param data_dir: directory to hold the tiles in
+        :param max_size_in_mb: maximum total size of the tiles, 0 to disable the cache
+        :param config: the configuration to read defaults from
+        """
+        self._data_dir = data_dir
+        self._max_size_in_mb = max_size_in_mb
+        self._config = config
+        self._lock = threading.Lock()
+        self._tile_sizes = None
+        self._total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @property
+    def data_dir(self):
+        """
+        Directory the tiles are held in
+        """
+        if self._data_dir is None:
+            return self._config.get('wms_tile_cache.data_dir', constants.WMS_TILE_CACHE_DATA_DIR)
+        return self._data_dir
+
+    @property
+    def max_size_in_bytes(self):
+        """
+        Maximum total size of the tiles in the cache
+        """
+        if self._max_size_in_mb is None:
+            max_size_in_mb = float(self._config.get('wms_tile_cache.max_size_in_mb',
+                                                    constants.WMS_TILE_CACHE_MAX_SIZE_IN_MB))
+        else:
+            max_size_in_mb = self._max_size_in_mb
+        return int(max_size_in_mb * 1024 * 1024)
+
+    def is_cacheable(self, params):
+        """
+        Whether the response to a WMS request can be cached
+        :param params: dictionary of the WMS request parameters
+        :return: True if it can be cached
+        """
+        if self.max_size_in_bytes <= 0:
+            return False
+        for name, value in params.items():
+            if name.lower() == 'request':
+                return value.lower() in CACHEABLE_WMS_REQUESTS
+        return False
+
+    def get_key(self, dataset_id, params):
+        """
+        Get the key for a WMS request, parameter names are case insensitive in WMS and their order does not matter
+        :param dataset_id: id of the dataset
+        :param params: dictionary of the WMS request parameters
+        :return: the key
+        """
+        query = urllib.urlencode(sorted([(name.lower(), unicode(value).encode('utf-8'))
+                                         for name, value in params.items()]))
+        return "{}/{}".format(int(dataset_id), hashlib.sha1(query).hexdigest())
+
+    def get(self, key):
+        """
+        Get a tile from the cache
+        :param key: key for the tile
+        :return: the tile or None if it is not in the cache
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as tile_file:
+                header = json.loads(tile_file.readline())
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+                self._remove_from_index(path)
+            log.debug("WMS tile cache miss for %s" % key)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            tile_sizes = self._get_tile_sizes()
+            if path in tile_sizes:
+                tile_sizes[path] = tile_sizes.pop(path)
+        log.debug("WMS tile cache hit for %s" % key)
+        return CachedWmsTile(path, header['content_type'], header['etag'])
+
+    def record_not_modified(self):
+        """
+        Record that a client already had the tile it asked for
+        :return: nothing
+        """
+        with self._lock:
+            self.not_modified += 1
+
+    def create_etag(self, key):
+        """
+        Create an entity tag for a new tile, without the surrounding quotes
+        :param key: key for the tile
+        :return: the entity tag
+        """
+        return '{}-{}'.format(key.replace('/', '-'), int(time.time() * 1000))
+
+    def stream_and_store(self, key, response, content_type, etag):
+        """
+        Generator which passes on the blocks of a WMS response while writing them to the cache. The tile is only
+        added to the cache once the whole response has been read
+        :param key: key for the tile
+        :param response: the open response from the WMS server
+        :param content_type: content type of the response
+        :param etag: the entity tag of the tile
+        :return: nothing
+        """
+        path = self._get_path(key)
+        temporary_file, temporary_path = self._open_temporary_file(path, content_type, etag)
+        size = 0
+        try:
+            while True:
+                block = response.read(TILE_BLOCK_SIZE)
+                if not block:
+                    break
+                if temporary_file is not None:
+                    try:
+                        temporary_file.write(block)
+                        size += len(block)
+                    except IOError:
+                        log.exception("Can not write WMS tile to cache")
+                        temporary_file.close()
+                        os.remove(temporary_path)
+                        temporary_file = None
+                yield block
+
+            if temporary_file is not None:
+                temporary_file.close()
+                temporary_file = None
+                os.rename(temporary_path, path)
+                self._add_to_index(path, size)
+        finally:
+            response.close()
+            if temporary_file is not None:
+                temporary_file.close()
+                os.remove(temporary_path)
+
+    def invalidate_dataset(self, dataset_id):
+        """
+        Remove all the tiles for a dataset, e.g. because it has been deleted
+        :param dataset_id: id of the dataset
+        :return: nothing
+        """
+        dataset_dir = os.path.join(self.data_dir, str(int(dataset_id)))
+        with self._lock:
+            if self._tile_sizes is not None:
+                for path in [path for path in self._tile_sizes if os.path.dirname(path) == dataset_dir]:
+                    self._remove_from_index(path)
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+
+    def get_statistics(self):
+        """
+        Get statistics on the use of the cache
+        :return: dictionary of hits, misses, not modified responses, evictions, hit rate, tiles and size in bytes
+        """
+        with self._lock:
+            tile_sizes = self._get_tile_sizes()
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_rate': float(self.hits) / requests if requests > 0 else None,
+                'tiles': len(tile_sizes),
+                'size_in_bytes': self._total_size}
+
+    def _get_path(self, key):
+        """
+        Get the path of the file for a tile
+        :param key: key for the tile
+        :return: the path
+        """
+        return os.path.join(self.data_dir, *key.split('/'))
+
+    def _open_temporary_file(self, path, content_type, etag):
+        """
+        Open a temporary file to write a tile to and write the header to it
+        :param path: path the tile will be stored at
+        :param content_type: content type of the tile
+        :param etag: entity tag of the tile
+        :return: tuple of the open file and its path, or None, None if the file can not be created
+        """
+        try:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+            handle, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            temporary_file = os.fdopen(handle, 'wb')
+            temporary_file.write(json.dumps({'content_type': content_type, 'etag': etag}) + '\n')
+            return temporary_file, temporary_path
+        except (IOError, OSError):
+            log.exception("Can not create file in the WMS tile cache")
+            return None, None
+
+    def _get_tile_sizes(self):
+        """
+        Get the sizes of the tiles in the cache in least recently used order, reading them from the cache directory
+        the first time they are needed. Must be called with the lock held.
+        :return: ordered dictionary of path to size
+        """
+        if self._tile_sizes is None:
+            tiles = []
+            for directory, _, filenames in os.walk(self.data_dir):
+                for filename in filenames:
+                    if filename.endswith('.tmp'):
+                        continue
+                    path = os.path.join(directory, filename)
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError:
+                        continue
+                    tiles.append((file_stat.st_mtime, path, file_stat.st_size))
+            self._tile_sizes = OrderedDict((path, size) for _, path, size in sorted(tiles))
+            self._total_size = sum(self._tile_sizes.values())
+        return self._tile_sizes
+
+    def _add_to_index(self, path, size):
+        """
+        Add a tile to the index and evict the least recently used tiles until the cache is within its size
+        :param path: path of the tile
+        :param size: size of the tile
+        :return: nothing
+        """
+        max_size_in_bytes = self.max_size_in_bytes
+        with self._lock:
+            tile_sizes = self._get_tile_sizes()
+            self._remove_from_index(path)
+            tile_sizes[path] = size
+            self._total_size += size
+            while self._total_size > max_size_in_bytes and len(tile_sizes) > 0:
+                evicted_path, evicted_size = tile_sizes.popitem(last=False)
+                self._total_size -= evicted_size
+                self.evictions += 1
+                try:
+                    os.remove(evicted_path)
+                except OSError:
+                    pass
+
+    def _remove_from_index(self, path):
+        """
+        Remove a tile from the index, must be called with the lock held
+        :param path: path of the tile
+        :return: nothing
+        """
+        if self._tile_sizes is not None and path in self._tile_sizes:
+            self._total_size -= self._tile_sizes.pop(path)
+
+
+wms_tile_cache = WmsTileCache()
@@ -19,10 +19,11 @@
 
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
 from joj.model.meta import Base
-from joj.utils import constants, utils
+from joj.utils import constants
+from joj.model.non_database.parameter_value_index import IndexedParameterValuesMixin
 
 
-class DrivingDataset(Base):
+class DrivingDataset(IndexedParameterValuesMixin, Base):
     """
     A Dataset which can be used as driving data
     """
@@ -49,17 +50,6 @@ class DrivingDataset(Base):
     driving_data_lon = None
     driving_data_rows = None
 
-    def get_python_parameter_value(self, parameter_namelist_name, is_list=None):
-        """
-        Gets the value of the first matching parameter value as a python object
-        :param parameter_namelist_name: list containing [namelist, name, is_list] of parameter to find
-            if is_list is not present defaults to false
-        :param is_list: Indicates whether the value is a list, overrides constant
-        :return parameter value as python or None
-        """
-        return utils.find_first_parameter_value_in_param_vals_list(
-            self.parameter_values, parameter_namelist_name, is_list)
-
     def set_from(self, results):
         """
         Set from a dictionary of results
@@ -22,11 +22,12 @@ import datetime
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy import Column, Integer, String, DateTime, BigInteger, SmallInteger, ForeignKey, Float
 from joj.model.meta import Base
-from joj.utils import constants, utils
+from joj.utils import constants
 from joj.model import ModelRunStatus
+from joj.model.non_database.parameter_value_index import IndexedParameterValuesMixin
 
 
-class ModelRun(Base):
+class ModelRun(IndexedParameterValuesMixin, Base):
     """
     A single run of a model
 
@@ -111,26 +112,11 @@ class ModelRun(Base):
         Gets all matching values of a specified parameter, sorted by group id and then Python value
         :param parameter_namelist_name: list containing [namelist, name] of parameter to find
         """
-        param_vals = []
-        for param_val in self.parameter_values:
-            if param_val.parameter.name == parameter_namelist_name[1]:
-                if param_val.parameter.namelist.name == parameter_namelist_name[0]:
-                    param_vals.append(param_val)
+        param_vals = self._get_parameter_value_index().get_all(parameter_namelist_name)
         param_vals.sort(key=lambda pv: pv.get_value_as_python())
         param_vals.sort(key=lambda pv: pv.group_id)
         return param_vals
 
-    def get_python_parameter_value(self, parameter_namelist_name, is_list=None):
-        """
-        Gets the value of the first matching parameter value as a python object
-        :param parameter_namelist_name: list containing [namelist, name, is_list] of parameter to find
-            if is_list is not present defaults to false
-        :param is_list: Indicates whether the value is a list, overrides constant
-        :return parameter value as python or None
-        """
-        return utils.find_first_parameter_value_in_param_vals_list(
-            self.parameter_values, parameter_namelist_name, is_list)
-
     def is_for_single_cell(self):
         """
         If this model run is for a single cell return true, otherwise false.
@@ -0,0 +1,69 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+
+class ModelRunListingItem(object):
+    """
+    A model run as shown in the model run catalogue. Holds only the columns the catalogue displays so that a page of
+    runs can be read in a single query without loading the full model runs.
+    """
+
+    def __init__(self, id, name, description, date_created, last_status_change, storage_in_mb, user_name, status):
+        """
+        Create a listing item
+        :param id: the model run id
+        :param name: the model run name
+        :param description: the model run description
+        :param date_created: date the model run was created
+        :param last_status_change: date the model run last changed status
+        :param storage_in_mb: storage used by the model run
+        :param user_name: name of the user who owns the model run
+        :param status: the ModelRunStatus of the model run
+        :return: nothing
+        """
+        self.id = id
+        self.name = name
+        self.description = description
+        self.date_created = date_created
+        self.last_status_change = last_status_change
+        self.storage_in_mb = storage_in_mb
+        self.user_name = user_name
+        self.status = status
+
+
+class ModelRunListingPage(object):
+    """
+    A page of model run listing items, newest first, with the key of the next (older) page
+    """
+
+    def __init__(self, items, next_before_id=None):
+        """
+        Create a page of the listing
+        :param items: list of ModelRunListingItems on this page
+        :param next_before_id: id to pass as before_id to get the next page, None if this is the last page
+        :return: nothing
+        """
+        self.items = items
+        self.next_before_id = next_before_id
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,161 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from joj.utils import f90_helper
+
+
+class ParameterValueIndex(object):
+    """
+    An index of a list of parameter values by namelist and parameter name, and by group, so that finding a parameter
+    value does not need a scan of all the values
+    """
+
+    def __init__(self, parameter_values):
+        """
+        Build the index
+        :param parameter_values: the list of parameter values to index
+        """
+        self._parameter_values = parameter_values
+        self._length = len(parameter_values)
+        self._by_name = {}
+        self._by_name_and_group = {}
+        for param_val in parameter_values:
+            key = (param_val.parameter.namelist.name, param_val.parameter.name)
+            self._by_name.setdefault(key, []).append(param_val)
+            # driving dataset parameter values are not grouped
+            group_id = getattr(param_val, 'group_id', None)
+            self._by_name_and_group.setdefault(key + (group_id,), []).append(param_val)
+
+    def is_index_of(self, parameter_values):
+        """
+        Is this an up to date index of a list of parameter values
+        :param parameter_values: the list of parameter values
+        :return: True if the index was built from the list and no values have been added or removed since
+        """
+        return parameter_values is self._parameter_values and len(parameter_values) == self._length
+
+    def get_all(self, parameter_namelist_name):
+        """
+        Get all the values of a parameter, in the order they are in the list
+        :param parameter_namelist_name: list containing [namelist, name] of parameter to find
+        :return: list of parameter values
+        """
+        return list(self._by_name.get((parameter_namelist_name[0], parameter_namelist_name[1]), []))
+
+    def get_first(self, parameter_namelist_name):
+        """
+        Get the first value of a parameter
+        :param parameter_namelist_name: list containing [namelist, name] of parameter to find
+        :return: the parameter value or None
+        """
+        param_vals = self._by_name.get((parameter_namelist_name[0], parameter_namelist_name[1]))
+        if param_vals:
+            return param_vals[0]
+        return None
+
+    def get_all_for_group(self, parameter_namelist_name, group_id):
+        """
+        Get all the values of a parameter in a group, in the order they are in the list
+        :param parameter_namelist_name: list containing [namelist, name] of parameter to find
+        :param group_id: the group id
+        :return: list of parameter values
+        """
+        key = (parameter_namelist_name[0], parameter_namelist_name[1], group_id)
+        return list(self._by_name_and_group.get(key, []))
+
+
+class IndexedParameterValuesMixin(object):
+    """
+    Mixin for a model with a list of parameter_values, which looks parameter values up through an index built the
+    first time it is needed and rebuilt if values are added or removed
+    """
+
+    _parameter_value_index = None
+
+    def _get_parameter_value_index(self):
+        """
+        Get the index of the parameter values
+        :return: ParameterValueIndex
+        """
+        index = self._parameter_value_index
+        if index is None or not index.is_index_of(self.parameter_values):
+            index = ParameterValueIndex(self.parameter_values)
+            self._parameter_value_index = index
+        return index
+
+    def get_python_parameter_value(self, parameter_namelist_name, is_list=None):
+        """
+        Gets the value of the first matching parameter value as a python object
+        :param parameter_namelist_name: list containing [namelist, name, is_list] of parameter to find
+            if is_list is not present defaults to false
+        :param is_list: Indicates whether the value is a list, overrides constant
+        :return parameter value as python or None
+        """
+        if is_list is None:
+            is_list = parameter_namelist_name[2] if len(parameter_namelist_name) >= 3 else False
+        param_val = self._get_parameter_value_index().get_first(parameter_namelist_name)
+        if param_val is None:
+            return None
+        return param_val.get_value_as_python(is_list=is_list)
+
+    def get_parameter_values_for_group(self, parameter_namelist_name, group_id):
+        """
+        Gets all matching values of a specified parameter in a group, sorted by Python value
+        :param parameter_namelist_name: list containing [namelist, name] of parameter to find
+        :param group_id: the group id
+        :return: list of parameter values
+        """
+        param_vals = self._get_parameter_value_index().get_all_for_group(parameter_namelist_name, group_id)
+        param_vals.sort(key=lambda pv: pv.get_value_as_python())
+        return param_vals
+
+
+class PythonValueMixin(object):
+    """
+    Mixin for a model with a Fortran namelist string value, which remembers the value converted to Python so that
+    the string is only parsed once
+    """
+
+    _python_values = None
+
+    def set_value_from_python(self, value):
+        """
+        Set the Parameter value, converting a Python type to a Fortran namelist string
+        :param value: Value to set (Python type)
+        :return:
+        """
+        self.value = f90_helper.python_to_f90_str(value)
+        self._python_values = None
+
+    def get_value_as_python(self, is_list=False):
+        """
+        Get the Parameter value, converting a Fortran namelist string to a Python type
+        :param is_list: Indicates whether this value is a list
+        :return: Python type
+        """
+        # the string is part of the key so values set directly are converted again
+        key = (self.value, is_list)
+        if self._python_values is None:
+            self._python_values = {}
+        if key not in self._python_values:
+            self._python_values[key] = f90_helper.f90_str_to_python(self.value, is_list)
+        python_value = self._python_values[key]
+        if isinstance(python_value, list):
+            # a copy so that the remembered value can not be changed by the caller
+            return list(python_value)
+        return python_value
@@ -182,6 +182,7 @@ function resetGraph()
 function getData(layerIds, position)
 {
     data = [];
+    var params = [{name: "lat", value: position.lat}, {name: "lon", value: position.lon}];
     for (var i = 0; i < layerIds.length; i++ ) {
         var layerId = layerIds[i];
         var dsid = $(".dataset[layer-id='" + layerId + "']").attr("data-dsid");
@@ -191,21 +192,20 @@ function getData(layerIds, position)
         if (time_control.length) {
             time = time_control.val()
         }
-        var url = "/map/graph/" + dsid + "?lat=" + position.lat + "&lon=" + position.lon + "&time=" + time;
-        $.getJSON(url, function (_data) {
-            data[data.length] = _data;
-            // If this is the last one then we can go ahead and plot them all
-            if (data.length == layerIds.length){
-                plotGraph(data);
-                var graph_title_template = "Measurements at Lat: {lat}, Lon: {lon}";
-                var title = graph_title_template.replace(/{lat}/g, data[0].lat).replace(/{lon}/g, data[0].lon);
-                $('#graph-title').text(title);
-            }
-        }).fail(function() {
-            alert("An error occurred loading the dataset, please try again.");
-            hideGraph();
-        });
+        params.push({name: "id", value: dsid});
+        params.push({name: "time", value: time});
     }
+    // Get all the graphs in one request so that the datasets are read together on the server
+    $.getJSON("/map/graphs?" + $.param(params), function (_data) {
+        data = _data.graphs;
+        plotGraph(data);
+        var graph_title_template = "Measurements at Lat: {lat}, Lon: {lon}";
+        var title = graph_title_template.replace(/{lat}/g, data[0].lat).replace(/{lon}/g, data[0].lon);
+        $('#graph-title').text(title);
+    }).fail(function() {
+        alert("An error occurred loading the dataset, please try again.");
+        hideGraph();
+    });
 }
 
 /**
@@ -0,0 +1,118 @@
+"""
+Compares the figure export image pipeline with the previous one: fetching layer images one at a time against
+fetching them through a bounded pool, and compositing them pairwise in float64 against compositing them in a
+single premultiplied float32 pass. Reports the time taken and the increase in peak memory for each.
+
+Usage: benchmark_figure_compositing.py [<width> <height> <number of layers> <fetch latency in s>]
+"""
+import sys
+import time
+import resource
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import numpy as N
+
+try:
+    from PIL import Image
+except:
+    import Image
+
+from joj.lib.png_combine import merge
+from joj.utils import constants
+
+
+def legacyCombine(baseIm, topIm):
+    """The previous pairwise float64 combination of two images, for comparison.
+    """
+    baseArr = N.asarray(baseIm.convert('RGBA'), dtype=float)/255
+    topArr = N.asarray(topIm.convert('RGBA'), dtype=float)/255
+    R,G,B,A = 0,1,2,3
+    res = N.zeros(baseArr.shape)
+
+    res[:,:,A] = topArr[:,:,A] + baseArr[:,:,A] * (1-topArr[:,:,A])
+
+    for i in [R,G,B]:
+        pt1 = topArr[:,:,i] * topArr[:,:,A]
+        pt2 = baseArr[:,:,i] * baseArr[:,:,A] * (1-topArr[:,:,A])
+        res[:,:,i] = (pt1 + pt2) / res[:,:,A]
+
+    res = res * 255
+    res.round()
+    res = N.array(res, dtype=N.uint8)
+    return Image.fromarray(res, 'RGBA')
+
+def legacyMerge(*images):
+    finalImg = images[0]
+    for image in images[1:]:
+        finalImg = legacyCombine(finalImg, image)
+    return finalImg
+
+def makeLayers(width, height, numberLayers):
+    """Makes a white background and random semi transparent layers.
+    """
+    random = N.random.RandomState(0)
+    layers = [Image.new('RGBA', (width, height), (255, 255, 255, 255))]
+    for _ in xrange(numberLayers):
+        layers.append(Image.fromarray(random.randint(0, 256, (height, width, 4), dtype=N.uint8), 'RGBA'))
+    return layers
+
+def _measure(setup, function, results):
+    """Runs a function on the arguments made by setup, putting the elapsed time and increase in peak resident memory
+    (in MB) on the results queue. Run in its own process so that the peak memory is not affected by the other
+    measurements.
+    """
+    args = setup()
+    peakBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    function(*args)
+    elapsed = time.time() - start
+    peakAfter = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, (peakAfter - peakBefore) / 1024.0))
+
+def measure(setup, function):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(setup, function, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def _fetch(latency):
+    time.sleep(latency)
+
+def fetchSequential(numberLayers, latency):
+    map(_fetch, [latency] * numberLayers)
+
+def fetchPooled(numberLayers, latency):
+    pool = ThreadPool(min(constants.FIGURE_LAYER_FETCH_WORKERS, numberLayers))
+    try:
+        pool.map(_fetch, [latency] * numberLayers)
+    finally:
+        pool.close()
+        pool.join()
+
+def main():
+    """Runs the benchmark and prints the results.
+    """
+    if len(sys.argv) not in [1, 5]:
+        print(__doc__)
+        sys.exit(1)
+    if len(sys.argv) == 5:
+        width, height, numberLayers, latency = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4])
+    else:
+        width, height, numberLayers, latency = 1600, 1200, 5, 0.2
+
+    print("%d layers of %d x %d, fetch latency %.3fs" % (numberLayers, width, height, latency))
+    print("%-30s %10s %16s" % ("", "time (s)", "peak memory (MB)"))
+    fetchSetup = lambda: (numberLayers, latency)
+    compositeSetup = lambda: makeLayers(width, height, numberLayers)
+    for name, setup, function in [
+            ("fetch sequential", fetchSetup, fetchSequential),
+            ("fetch pooled", fetchSetup, fetchPooled),
+            ("composite pairwise float64", compositeSetup, legacyMerge),
+            ("composite single pass float32", compositeSetup, merge)]:
+        elapsed, peakMemory = measure(setup, function)
+        print("%-30s %10.3f %16.1f" % (name, elapsed, peakMemory))
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,7 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+import hashlib
 from urllib2 import HTTPError
 import numpy as np
 import logging
@@ -23,6 +24,8 @@ from pydap.client import open_url
 from pylons import config
 from joj.lib.wmc_util import create_request_and_open_url
 from joj.utils import constants
+from joj.services.dap_client.dap_dataset_cache import DapDatasetCacheEntry
+from joj.services.dap_client.coordinate_index import AxisIndex, CurvilinearGridIndex
 
 log = logging.getLogger(__name__)
 
@@ -46,10 +49,47 @@ class BaseDapClient(object):
     A basic DAP Client for accessing datasets on a THREDDS Server
     """
 
-    def __init__(self, url):
+    def __init__(self, url, dataset_cache=None):
+        """
+        Open the dataset
+        :param url: URL of the dataset
+        :param dataset_cache: cache of opened datasets to use (None to always open the dataset)
+        """
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return
 
+        try:
+            if dataset_cache is None:
+                self._dataset_cache_entry = DapDatasetCacheEntry(self._open_dataset(url), None)
+            else:
+                self._dataset_cache_entry = dataset_cache.get(url, self._open_dataset)
+            self._dataset = self._dataset_cache_entry.dataset
+            self.url = url
+        except HTTPError as ex:
+            if ex.code == 500:
+                log.exception("Can not open the dataset URL '%s'." % url)
+                raise DapClientInternalServerErrorException("Can not open the dataset URL.")
+            else:
+                log.exception("Can not open the dataset URL '%s'." % url)
+                raise DapClientException("Can not open the dataset URL.")
+        except Exception:
+            log.exception("Can not open the dataset URL '%s'." % url)
+            raise DapClientException("Can not open the dataset URL.")
+
+        try:
+            self._lat = self._get_coordinate(constants.NETCDF_LATITUDE)
+            self._lon = self._get_coordinate(constants.NETCDF_LONGITUDE)
+        except Exception:
+            log.exception("Can not read dataset '%s'." % url)
+            raise DapClientException("Problems reading the dataset.")
+
+    def _open_dataset(self, url):
+        """
+        Open a dataset on the THREDDS server
+        :param url: URL of the dataset
+        :return: the pydap dataset
+        """
+
         def new_request(url):
             """
             Create a new dap request
@@ -70,27 +110,17 @@ class BaseDapClient(object):
         from pydap import proxy
 
         proxy.request = new_request
-        try:
-            # this is a modified open url. See pydap factory
-            self._dataset = open_url(url)
-            self.url = url
-        except HTTPError as ex:
-            if ex.code == 500:
-                log.exception("Can not open the dataset URL '%s'." % url)
-                raise DapClientInternalServerErrorException("Can not open the dataset URL.")
-            else:
-                log.exception("Can not open the dataset URL '%s'." % url)
-                raise DapClientException("Can not open the dataset URL.")
-        except Exception:
-            log.exception("Can not open the dataset URL '%s'." % url)
-            raise DapClientException("Can not open the dataset URL.")
+        # this is a modified open url. See pydap factory
+        return open_url(url)
 
-        try:
-            self._lat = np.array(self._dataset[self._get_key(constants.NETCDF_LATITUDE)][:])
-            self._lon = np.array(self._dataset[self._get_key(constants.NETCDF_LONGITUDE)][:])
-        except Exception:
-            log.exception("Can not read dataset '%s'." % url)
-            raise DapClientException("Problems reading the dataset.")
+    def _get_coordinate(self, var_names):
+        """
+        Get the values of a coordinate variable as an array, reading it only if it is not already in the cache
+        :param var_names: list of possible variable names for the coordinate
+        :return: numpy array of values
+        """
+        key = self._get_key(var_names)
+        return self._dataset_cache_entry.get_coordinate(key, lambda: np.array(self._dataset[key][:]))
 
     def _get_key(self, var_names):
         """
@@ -104,15 +134,34 @@ class BaseDapClient(object):
                     return key
         return var_names[0]
 
-    def _get_closest_value_index(self, data, value):
+    def _get_axis_index(self, name, values):
+        """
+        Get the index for a one dimensional coordinate axis, building it only if it is not already in the cache
+        :param name: name of the axis
+        :param values: the values on the axis
+        :return: AxisIndex
+        """
+        return self._dataset_cache_entry.get_coordinate(name + ' index', lambda: AxisIndex(values))
+
+    def _get_grid_index(self):
         """
-        Utility method to identify the closest data point in a list for a given value
-        :param data: List of data points
-        :param value: Value to search close to
-        :return: The index of the closest point in the list
+        Get the spatial index for a two dimensional lat / lon grid, building it only if it is not already in the cache
+        :return: CurvilinearGridIndex
         """
-        # Won't always get the one we expect but will always be equally close (e.g. 6.5 might go to 6 not 7)
-        return min(range(len(data)), key=lambda i: abs(data[i] - value))
+        return self._dataset_cache_entry.get_coordinate(
+            'grid index',
+            lambda: CurvilinearGridIndex(self._lat, self._lon))
+
+    def get_grid_key(self):
+        """
+        Get a key identifying the lat / lon grid of the dataset, so that lookups can be shared between datasets on
+        the same grid
+        :return: the key
+        """
+        return self._dataset_cache_entry.get_coordinate(
+            'grid key',
+            lambda: tuple([(array.dtype.str, array.shape, hashlib.sha1(np.ascontiguousarray(array)).hexdigest())
+                           for array in (self._lat, self._lon)]))
 
     def get_lat_lon_index(self, lat_to_find, lon_to_find):
         """
@@ -121,14 +170,23 @@ class BaseDapClient(object):
         :param lon_to_find: longitude to find
         :return: tuple of lat and lon indexes
         """
+        lat_indices, lon_indices = self.get_lat_lon_indices([lat_to_find], [lon_to_find])
+        return int(lat_indices[0]), int(lon_indices[0])
 
-        lat_index, lon_index = self._get_lat_lon_flattened_index(lat_to_find, lon_to_find)
+    def get_lat_lon_indices(self, lats_to_find, lons_to_find):
+        """
+        Get the lat and lon indexes for the points closest to each of the given positions
+        :param lats_to_find: list of latitudes to find
+        :param lons_to_find: list of longitudes to find (same length as the latitudes)
+        :return: tuple of arrays of lat indexes and lon indexes
+        """
+        lat_indices, lon_indices = self._get_lat_lon_flattened_indices(lats_to_find, lons_to_find)
 
         if self._lat.ndim > 1:
-            lat_index = np.unravel_index(lat_index, self._lat.shape)[0]
-            lon_index = np.unravel_index(lon_index, self._lon.shape)[1]
+            lat_indices = np.unravel_index(lat_indices, self._lat.shape)[0]
+            lon_indices = np.unravel_index(lon_indices, self._lon.shape)[1]
 
-        return lat_index, lon_index
+        return lat_indices, lon_indices
 
     def get_closest_lat_lon(self, lat_to_find, lon_to_find):
         """
@@ -140,28 +198,25 @@ class BaseDapClient(object):
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return lat_to_find, lon_to_find
 
-        lat_ind, lon_ind = self._get_lat_lon_flattened_index(lat_to_find, lon_to_find)
-        lat = self._lat.flat[lat_ind]
-        lon = self._lon.flat[lon_ind]
+        lat_indices, lon_indices = self._get_lat_lon_flattened_indices([lat_to_find], [lon_to_find])
+        lat = self._lat.flat[lat_indices[0]]
+        lon = self._lon.flat[lon_indices[0]]
 
         return lat, lon
 
-    def _get_lat_lon_flattened_index(self, lat_to_find, lon_to_find):
+    def _get_lat_lon_flattened_indices(self, lats_to_find, lons_to_find):
         """
-        Get the lat and lon indexes for the point closest to the given values
-        :param lat_to_find: latitude to find
-        :param lon_to_find: longitude to find
-        :return: tuple of lat and lon indexes (if arrays are 2D this is the flatterned index)
+        Get the lat and lon indexes for the points closest to the given values
+        :param lats_to_find: list of latitudes to find
+        :param lons_to_find: list of longitudes to find
+        :return: tuple of arrays of lat and lon indexes (if arrays are 2D these are the flattened indexes)
         """
 
         if self._lat.ndim == 1:
-            lat_index = self._get_closest_value_index(self._lat, lat_to_find)
-            lon_index = self._get_closest_value_index(self._lon, lon_to_find)
+            lat_indices = self._get_axis_index('lat', self._lat).find_closest_indices(lats_to_find)
+            lon_indices = self._get_axis_index('lon', self._lon).find_closest_indices(lons_to_find)
 
         else:
-            lat_diff = self._lat - lat_to_find
-            lon_diff = self._lon - lon_to_find
-
-            lat_index = lon_index = np.argmin(lon_diff * lon_diff + lat_diff * lat_diff)
+            lat_indices = lon_indices = self._get_grid_index().find_closest_indices(lats_to_find, lons_to_find)
 
-        return lat_index, lon_index
\ No newline at end of file
+        return lat_indices, lon_indices
@@ -0,0 +1,203 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import math
+import numpy as np
+
+
+class AxisIndex(object):
+    """
+    Index for finding the closest value on a one dimensional coordinate axis (e.g. latitude, longitude or time).
+    The axis is sorted once so that each lookup is a binary search.
+    """
+
+    def __init__(self, values):
+        """
+        Build the index
+        :param values: the values on the axis (in file order)
+        """
+        self._values = np.asarray(values, dtype=np.float64).ravel()
+        self._order = np.argsort(self._values, kind='mergesort')
+        self._sorted_values = self._values[self._order]
+        self.is_increasing = bool(np.all(np.diff(self._values) >= 0))
+
+    def __len__(self):
+        return len(self._values)
+
+    def find_closest_index(self, value):
+        """
+        Find the index of the value closest to the one given. If two values are equally close the lowest index is used.
+        :param value: the value to look for
+        :return: the index of the closest value
+        """
+        return int(self.find_closest_indices([value])[0])
+
+    def find_closest_indices(self, values):
+        """
+        Find the indices of the values closest to each of the given values
+        :param values: list or array of values to look for
+        :return: array of indices
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        count = len(self._sorted_values)
+        right = np.clip(np.searchsorted(self._sorted_values, values, side='left'), 0, count - 1)
+        left = np.clip(right - 1, 0, count - 1)
+        # move to the first of any run of equal values so that ties go to the lowest index in the file
+        left = np.searchsorted(self._sorted_values, self._sorted_values[left], side='left')
+
+        left_index = self._order[left]
+        right_index = self._order[right]
+        left_distance = np.abs(self._sorted_values[left] - values)
+        right_distance = np.abs(self._sorted_values[right] - values)
+        use_left = (left_distance < right_distance) | \
+            ((left_distance == right_distance) & (left_index < right_index))
+        return np.where(use_left, left_index, right_index)
+
+    def find_first_index_at_or_after(self, value):
+        """
+        Find the index of the first value in the axis which is greater than or equal to the value given
+        :param value: the value
+        :return: the index or None if there is no such value
+        """
+        if self.is_increasing:
+            index = int(np.searchsorted(self._values, value, side='left'))
+            if index < len(self._values):
+                return index
+            return None
+        indices = np.flatnonzero(self._values >= value)
+        if len(indices) > 0:
+            return int(indices[0])
+        return None
+
+    def find_last_index_at_or_before(self, value):
+        """
+        Find the index of the last value in the axis which is less than or equal to the value given
+        :param value: the value
+        :return: the index or None if there is no such value
+        """
+        if self.is_increasing:
+            index = int(np.searchsorted(self._values, value, side='right')) - 1
+            if index >= 0:
+                return index
+            return None
+        indices = np.flatnonzero(self._values <= value)
+        if len(indices) > 0:
+            return int(indices[-1])
+        return None
+
+
+class CurvilinearGridIndex(object):
+    """
+    Spatial index for finding the closest point on a two dimensional latitude / longitude grid. The points are
+    put into square bins once, so a lookup only has to measure the distance to points in the bins around it
+    rather than to every point in the grid. Distance is measured in degrees, as squared lat + squared lon
+    difference, and ties go to the lowest flattened index (both the same as a full search with argmin).
+    """
+
+    POINTS_PER_BIN = 4
+
+    def __init__(self, lat, lon):
+        """
+        Build the index
+        :param lat: array of latitudes for each point on the grid
+        :param lon: array of longitudes for each point on the grid (same shape as lat)
+        """
+        self._lat = np.asarray(lat, dtype=np.float64).ravel()
+        self._lon = np.asarray(lon, dtype=np.float64).ravel()
+        valid_points = np.flatnonzero(np.isfinite(self._lat) & np.isfinite(self._lon))
+        if len(valid_points) == 0:
+            valid_points = np.arange(len(self._lat))
+
+        self._lat_min = self._lat[valid_points].min()
+        self._lon_min = self._lon[valid_points].min()
+        lat_extent = self._lat[valid_points].max() - self._lat_min
+        lon_extent = self._lon[valid_points].max() - self._lon_min
+        area = max(lat_extent, 1e-10) * max(lon_extent, 1e-10)
+        self._bin_size = max(math.sqrt(area * self.POINTS_PER_BIN / len(valid_points)), 1e-10)
+        self._bin_rows = int(lat_extent / self._bin_size) + 1
+        self._bin_columns = int(lon_extent / self._bin_size) + 1
+
+        rows, columns = self._get_bin(self._lat[valid_points], self._lon[valid_points])
+        bins = rows * self._bin_columns + columns
+        order = np.argsort(bins, kind='mergesort')
+        self._points = valid_points[order]
+        self._bin_starts = np.searchsorted(bins[order], np.arange(self._bin_rows * self._bin_columns + 1))
+
+    def _get_bin(self, lat, lon):
+        """
+        Get the bin row and column for positions (not limited to the bins in the grid)
+        :param lat: latitude(s)
+        :param lon: longitude(s)
+        :return: tuple of bin row(s) and column(s)
+        """
+        rows = np.floor((np.asarray(lat) - self._lat_min) / self._bin_size).astype(np.int64)
+        columns = np.floor((np.asarray(lon) - self._lon_min) / self._bin_size).astype(np.int64)
+        return rows, columns
+
+    def _get_points_in_bins(self, rows, columns):
+        """
+        Get the flattened grid indices of all points in a rectangle of bins
+        :param rows: tuple of first and last bin row (inclusive)
+        :param columns: tuple of first and last bin column (inclusive)
+        :return: array of flattened indices
+        """
+        first_row, last_row = max(rows[0], 0), min(rows[1], self._bin_rows - 1)
+        first_column, last_column = max(columns[0], 0), min(columns[1], self._bin_columns - 1)
+        if first_row > last_row or first_column > last_column:
+            return np.array([], dtype=np.int64)
+        slices = []
+        for row in range(first_row, last_row + 1):
+            start = self._bin_starts[row * self._bin_columns + first_column]
+            end = self._bin_starts[row * self._bin_columns + last_column + 1]
+            slices.append(self._points[start:end])
+        return np.concatenate(slices)
+
+    def find_closest_index(self, lat, lon):
+        """
+        Find the flattened index of the grid point closest to a position
+        :param lat: latitude of the position
+        :param lon: longitude of the position
+        :return: flattened index of the closest point
+        """
+        row, column = self._get_bin(lat, lon)
+        # no bin closer than this ring can contain points, so start there
+        ring = max(0, -row, row - self._bin_rows + 1, -column, column - self._bin_columns + 1)
+        last_ring = max(row, self._bin_rows - 1 - row, column, self._bin_columns - 1 - column)
+        candidates = self._get_points_in_bins((row - ring, row + ring), (column - ring, column + ring))
+        while True:
+            if len(candidates) > 0:
+                lat_diff = self._lat[candidates] - lat
+                lon_diff = self._lon[candidates] - lon
+                distances = lat_diff * lat_diff + lon_diff * lon_diff
+                best_distance = distances.min()
+                # any point outside the searched rings is at least ring * bin size away
+                if ring >= last_ring or math.sqrt(best_distance) < ring * self._bin_size:
+                    return int(candidates[distances == best_distance].min())
+            elif ring >= last_ring:
+                return 0
+            ring += 1
+            candidates = self._get_points_in_bins((row - ring, row + ring), (column - ring, column + ring))
+
+    def find_closest_indices(self, lats, lons):
+        """
+        Find the flattened indices of the grid points closest to several positions
+        :param lats: list or array of latitudes
+        :param lons: list or array of longitudes
+        :return: array of flattened indices
+        """
+        return np.array([self.find_closest_index(lat, lon) for lat, lon in zip(lats, lons)], dtype=np.int64)
@@ -20,6 +20,7 @@ import logging
 import datetime
 from coards import parse
 import math
+import numpy as np
 from numpy import amin, amax
 from numpy.ma import masked_equal
 from pylons import config
@@ -36,22 +37,21 @@ class DapClient(BaseDapClient):
     Client for communicating with the OpenDAP server to extract map data for a particular latitude / longitude
     """
 
-    def __init__(self, url):
+    def __init__(self, url, dataset_cache=None):
         """
         Create a new DapClient for a specified dataset
         :param url: The URL of the OpenDAP dataset to look for
+        :param dataset_cache: cache of opened datasets to use (None to always open the dataset)
         """
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return
-        super(DapClient, self).__init__(url)
+        super(DapClient, self).__init__(url, dataset_cache)
         try:
-            self._time = self._dataset[self._get_key(NETCDF_TIME)][:]
+            self._time = self._get_coordinate(NETCDF_TIME)
             self._time_units = self._dataset[self._get_key(NETCDF_TIME)].units
             self._start_date = self._get_data_start_date()
             self._variable_names = []
             self._variable = self._get_variable_to_plot()
-            self._cache_dict = {}
-            self._cache_lat_lon = None
         except Exception:
             log.exception("Can not read dataset '%s'." % url)
             raise DapClientException("Problems reading the dataset.")
@@ -69,8 +69,8 @@ class DapClient(BaseDapClient):
     def get_data_range(self):
         """
         Gets the datarange of the variable in this dataset
-        NOTE: This method might be time-consuming if called on a large dataset
-        as it may have to iterate over every single data point.
+        NOTE: If the dataset has no range attributes this reads the data, a slab of times at a time, and for a
+        large dataset only a sample of the slabs is read.
         :return: min and max tuple for the range
         """
         try:
@@ -85,22 +85,10 @@ class DapClient(BaseDapClient):
             pass
 
         try:
-            fill_value = self._variable.attributes.get('_FillValue', None)
-            missing_value = self._variable.attributes.get('missing_value', None)
-            if fill_value is not None and missing_value is not None:
-                valid_array = masked_equal(masked_equal(self._variable.array, missing_value), fill_value)
-            elif fill_value is None and missing_value is None:
-                valid_array = self._variable.array
-            elif fill_value is not None:
-                valid_array = masked_equal(self._variable.array, fill_value)
-            else:
-                valid_array = masked_equal(self._variable.array, missing_value)
-
-            min = float(amin(valid_array))
-            max = float(amax(valid_array))
-            if math.isnan(min):
+            min, max = self._calculate_data_range()
+            if min is None or math.isnan(min):
                 min = 0
-            if math.isnan(max):
+            if max is None or math.isnan(max):
                 max = 100
         except:
             # Use the default result if something goes wrong
@@ -110,6 +98,45 @@ class DapClient(BaseDapClient):
 
         return [min, max]
 
+    def _calculate_data_range(self):
+        """
+        Calculate the data range by reading the data in slabs of times, each of at most
+        DATA_RANGE_MAX_VALUES_PER_REQUEST values. If there are more than DATA_RANGE_MAX_REQUESTS slabs then
+        evenly spaced slabs are read.
+        :return: min and max of the valid values read (None if there are no valid values)
+        """
+        fill_value = self._variable.attributes.get('_FillValue', None)
+        missing_value = self._variable.attributes.get('missing_value', None)
+
+        shape = self._variable.shape
+        ntimes = shape[0] if len(shape) > 0 else 1
+        values_per_time = int(np.prod(shape[1:]))
+        times_per_slab = max(1, constants.DATA_RANGE_MAX_VALUES_PER_REQUEST // max(values_per_time, 1))
+        slab_starts = range(0, ntimes, times_per_slab)
+        if len(slab_starts) > constants.DATA_RANGE_MAX_REQUESTS:
+            step = int(math.ceil(len(slab_starts) / float(constants.DATA_RANGE_MAX_REQUESTS)))
+            slab_starts = slab_starts[::step]
+
+        mins = []
+        maxs = []
+        for slab_start in slab_starts:
+            if len(shape) > 0:
+                slab = self._variable.array[slab_start:slab_start + times_per_slab]
+            else:
+                slab = self._variable.array[:]
+            values = np.ma.masked_invalid(np.asarray(slab, dtype=np.float64))
+            if fill_value is not None:
+                values = masked_equal(values, fill_value)
+            if missing_value is not None:
+                values = masked_equal(values, missing_value)
+            if values.count() > 0:
+                mins.append(float(amin(values)))
+                maxs.append(float(amax(values)))
+
+        if len(mins) == 0:
+            return None, None
+        return min(mins), max(maxs)
+
     def get_variable_units(self):
         """
         Get the units for the independent variable
@@ -124,16 +151,10 @@ class DapClient(BaseDapClient):
         :return: Datetime of next data point
         """
         time_secs_elapsed = self._get_seconds_elapsed(time)
-        timestamps = self._time.tolist()
-        next_time = None
-        for time in timestamps:
-            if time >= time_secs_elapsed:
-                # Leave as soon as we find the first time value after this time
-                next_time = time
-                break
-        if next_time is None:
+        next_time_index = self._get_time_axis_index().find_first_index_at_or_after(time_secs_elapsed)
+        if next_time_index is None:
             return None
-        delta = datetime.timedelta(seconds=next_time)
+        delta = datetime.timedelta(seconds=float(self._time[next_time_index]))
         return self._start_date + delta
 
     def get_time_immediately_before(self, time):
@@ -143,18 +164,19 @@ class DapClient(BaseDapClient):
         :return: Datetime of previous data point
         """
         time_secs_elapsed = self._get_seconds_elapsed(time)
-        timestamps = self._time.tolist()
-        prev_time = None
-        for time in reversed(timestamps):
-            if time <= time_secs_elapsed:
-                # Leave as soon as we find the first time value before this time
-                prev_time = time
-                break
-        if prev_time is None:
+        prev_time_index = self._get_time_axis_index().find_last_index_at_or_before(time_secs_elapsed)
+        if prev_time_index is None:
             return None
-        delta = datetime.timedelta(seconds=prev_time)
+        delta = datetime.timedelta(seconds=float(self._time[prev_time_index]))
         return self._start_date + delta
 
+    def _get_time_axis_index(self):
+        """
+        Get the index for looking up values on the time axis
+        :return: AxisIndex
+        """
+        return self._get_axis_index('time', self._time)
+
     def get_period(self):
         """
         Get the dataset period in seconds (assumes evenly spaced)
@@ -179,33 +201,19 @@ class DapClient(BaseDapClient):
         :return: Time index
         """
         time_secs_elapsed = self._get_seconds_elapsed(date)
-        return self._get_closest_value_index(self._time, time_secs_elapsed)
+        return self._get_time_axis_index().find_closest_index(time_secs_elapsed)
 
-    def get_data_at(self, lat_index, lon_index, time_index):
+    def get_data_block(self, lat_index, lon_index, time_index_start, time_index_end):
         """
-        Get the value of the independent variable at a specified location and datetime
+        Get the values of the independent variable at a specified location for a range of times in one request
         :param lat_index: Latitude index to get at
         :param lon_index: Longitude index to get at
-        :param time_index: Time index to get at
-        :return: The data value at that time/space
+        :param time_index_start: First time index to get
+        :param time_index_end: Time index to stop before
+        :return: numpy array of data values, one for each time index
         """
-        # try and use cache:
-        if time_index in self._cache_dict and self._cache_lat_lon == (lat_index, lon_index):
-            return self._cache_dict[time_index]
-
-        # Save cache
-        if time_index + constants.USER_DOWNLOAD_CACHE_SIZE < len(self._time):
-            vals_array = self._variable.array[time_index: time_index + constants.USER_DOWNLOAD_CACHE_SIZE,
-                                              lat_index, lon_index].tolist()
-        else:
-            vals_array = self._variable.array[time_index:, lat_index, lon_index].tolist()
-        vals = [val[0][0] for val in vals_array]
-        time_indices = [time_index + i for i in range(0, constants.USER_DOWNLOAD_CACHE_SIZE)]
-
-        self._cache_dict = {time: val for time, val in zip(time_indices, vals)}
-        self._cache_lat_lon = lat_index, lon_index
-
-        return self._cache_dict[time_index]
+        values = self._variable.array[time_index_start:time_index_end, lat_index, lon_index]
+        return np.asarray(values).reshape(-1)
 
     def _get_variable_to_plot(self):
         """
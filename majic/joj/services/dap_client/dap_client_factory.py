@@ -16,12 +16,16 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+from multiprocessing.pool import ThreadPool
 from pylons import config
 from joj.services.dap_client.dap_client import DapClient
 from joj.services.dap_client.graphing_dap_client import GraphingDapClient
 from joj.services.dap_client.land_cover_dap_client import LandCoverDapClient
 from joj.services.dap_client.soil_properties_dap_client import SoilPropertiesDapClient
 from joj.services.dap_client.ancils_dap_client import AncilsDapClient
+from joj.services.dap_client.dap_dataset_cache import dap_dataset_cache
+from joj.services.dap_client.time_series_cache import time_series_cache
+from joj.utils import constants
 
 
 class DapClientFactory(object):
@@ -29,6 +33,15 @@ class DapClientFactory(object):
     Factory for creating dap clients
     """
 
+    def __init__(self, dataset_cache=dap_dataset_cache, series_cache=time_series_cache):
+        """
+        Create the factory
+        :param dataset_cache: cache of opened datasets shared by the clients (defaults to the process wide cache)
+        :param series_cache: cache of time series read for graphs (defaults to the process wide cache)
+        """
+        self._dataset_cache = dataset_cache
+        self._series_cache = series_cache
+
     def get_full_url_for_file(self, filepath, service="dodsC", config=config):
         """
         Get the full THREDDS URL for a file on the THREDDS server
@@ -49,7 +62,7 @@ class DapClientFactory(object):
         :param url: URL for the DAP client to use
         :return: Dapclient
         """
-        return DapClient(url)
+        return DapClient(url, self._dataset_cache)
 
     def get_land_cover_dap_client(self, url, key='frac'):
         """
@@ -58,7 +71,7 @@ class DapClientFactory(object):
         :param key: the variable key for the land cover pseudo dimension
         :return: LandCoverDapClient
         """
-        return LandCoverDapClient(url, key)
+        return LandCoverDapClient(url, key, self._dataset_cache)
 
     def get_graphing_dap_client(self, url):
         """
@@ -66,7 +79,64 @@ class DapClientFactory(object):
         :param url: URL for the DAP Client to use
         :return: GraphingDapClient
         """
-        return GraphingDapClient(url)
+        return GraphingDapClient(url, self._dataset_cache, self._series_cache)
+
+    def get_graphs_data(self, urls, lat, lon, times, run_names, npoints=constants.GRAPH_NPOINTS, start_time=None,
+                        end_time=None, compact=False):
+        """
+        Get the time series graphing data at a point for several datasets in one go. The datasets are opened and read
+        concurrently and the point is located once for each distinct lat / lon grid.
+        :param urls: list of URLs of the datasets
+        :param lat: Latitude of point to graph
+        :param lon: Longitude of point to graph
+        :param times: list of times to graph around, one for each dataset
+        :param run_names: list of model run names to prefix the legends with, one for each dataset
+        :param npoints: Max number of points to plot for each dataset
+        :param start_time: Start of the times to graph (None for the first time or to graph around the times)
+        :param end_time: End of the times to graph (None for the last time or to graph around the times)
+        :param compact: True to return separate lists of times and values rather than a list of [time, value] pairs
+        :return: list of JSON-like dictionaries of data and metadata, one for each dataset
+        """
+        if len(urls) == 0:
+            return []
+        max_workers = int(config.get('dap_client.graph_fetch_workers', constants.GRAPH_FETCH_WORKERS))
+        pool = ThreadPool(min(max_workers, len(urls)))
+        try:
+            dap_clients = pool.map(self._with_current_config(self.get_graphing_dap_client), urls)
+
+            lat_lon_indices = {}
+            for dap_client in dap_clients:
+                grid_key = dap_client.get_grid_key()
+                if grid_key not in lat_lon_indices:
+                    lat_lon_indices[grid_key] = dap_client.get_lat_lon_index(lat, lon)
+
+            def _get_graph_data(client_time_and_run_name):
+                dap_client, time, run_name = client_time_and_run_name
+                return dap_client.get_graph_data(
+                    lat, lon, time, npoints=npoints, run_name=run_name, start_time=start_time, end_time=end_time,
+                    compact=compact, lat_lon_index=lat_lon_indices[dap_client.get_grid_key()])
+
+            return pool.map(self._with_current_config(_get_graph_data), zip(dap_clients, times, run_names))
+        finally:
+            pool.close()
+            pool.join()
+
+    def _with_current_config(self, function):
+        """
+        Wrap a function so that it sees this thread's configuration when it is run in another thread (the pylons
+        config is thread local and would otherwise be the default configuration in a worker thread)
+        :param function: the function to wrap
+        :return: the wrapped function
+        """
+        current_config = config._current_obj()
+
+        def _run_with_config(*args):
+            config.push_thread_config(current_config)
+            try:
+                return function(*args)
+            finally:
+                config.pop_thread_config(current_config)
+        return _run_with_config
 
     def get_soil_properties_dap_client(self, url):
         """
@@ -74,7 +144,7 @@ class DapClientFactory(object):
         :param url: URL for the DAP Client to use
         :return:
         """
-        return SoilPropertiesDapClient(url)
+        return SoilPropertiesDapClient(url, self._dataset_cache)
 
     def get_ancils_dap_client(self, url):
         """
@@ -82,4 +152,21 @@ class DapClientFactory(object):
         :param url: URL for the DAP Client to use
         :return: AncilsDapClient
         """
-        return AncilsDapClient(url)
\ No newline at end of file
+        return AncilsDapClient(url, self._dataset_cache)
+
+    def invalidate_url(self, url):
+        """
+        Remove a dataset from the cache of opened datasets and the cache of time series, e.g. because it has been
+        deleted
+        :param url: URL of the dataset
+        :return: nothing
+        """
+        self._dataset_cache.invalidate(url)
+        self._series_cache.invalidate(url)
+
+    def get_cache_statistics(self):
+        """
+        Get the hit and miss counts for the cache of opened datasets
+        :return: dictionary of statistics
+        """
+        return self._dataset_cache.get_statistics()
@@ -0,0 +1,167 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pylons import config
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class DapDatasetCacheEntry(object):
+    """
+    An opened OPeNDAP dataset together with any coordinate arrays which have been read from it
+    """
+
+    def __init__(self, dataset, created_time):
+        """
+        Create an entry
+        :param dataset: the opened pydap dataset
+        :param created_time: time (in seconds since the epoch) at which the dataset was opened
+        """
+        self.dataset = dataset
+        self.created_time = created_time
+        self._coordinates = {}
+        self._lock = threading.Lock()
+
+    def get_coordinate(self, name, createfunc):
+        """
+        Get a coordinate array read from the dataset, reading it the first time it is asked for
+        :param name: the name to store the coordinate under
+        :param createfunc: function with no arguments which reads the coordinate from the dataset
+        :return: the coordinate
+        """
+        with self._lock:
+            if name in self._coordinates:
+                return self._coordinates[name]
+        coordinate = createfunc()
+        with self._lock:
+            return self._coordinates.setdefault(name, coordinate)
+
+
+class DapDatasetCache(object):
+    """
+    A process wide, thread safe, least recently used cache of opened OPeNDAP datasets keyed by URL.
+    Entries are evicted when the cache is full or when they are older than the time to live.
+    """
+
+    def __init__(self, max_size=None, time_to_live_in_s=None, config=config, clock=time.time):
+        """
+        Create the cache; size and time to live are read from the config if they are not given
+        :param max_size: maximum number of datasets to hold, 0 to disable the cache
+        :param time_to_live_in_s: number of seconds a dataset may be held for
+        :param config: the configuration to read defaults from
+        :param clock: function returning the current time in seconds
+        """
+        self._max_size = max_size
+        self._time_to_live_in_s = time_to_live_in_s
+        self._config = config
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        """
+        Maximum number of datasets held in the cache
+        """
+        if self._max_size is None:
+            return int(self._config.get('dap_client.cache_size', constants.DAP_DATASET_CACHE_SIZE))
+        return self._max_size
+
+    @property
+    def time_to_live_in_s(self):
+        """
+        Number of seconds for which a dataset is held in the cache
+        """
+        if self._time_to_live_in_s is None:
+            return float(self._config.get('dap_client.cache_expire_in_s', constants.DAP_DATASET_CACHE_EXPIRE_IN_S))
+        return self._time_to_live_in_s
+
+    def get(self, url, createfunc):
+        """
+        Get the entry for a URL from the cache, opening the dataset if it is not in the cache or has expired.
+        Exceptions from opening the dataset are passed on and nothing is cached.
+        :param url: the URL of the dataset
+        :param createfunc: function taking the url which opens and returns the dataset
+        :return: DapDatasetCacheEntry for the url
+        """
+        max_size = self.max_size
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None and now - entry.created_time > self.time_to_live_in_s:
+                entry = None
+                self.evictions += 1
+            if entry is not None:
+                self._entries[url] = entry
+                self.hits += 1
+                log.debug("DAP dataset cache hit for %s" % url)
+                return entry
+            self.misses += 1
+
+        log.debug("DAP dataset cache miss for %s" % url)
+        entry = DapDatasetCacheEntry(createfunc(url), now)
+        if max_size <= 0:
+            return entry
+
+        with self._lock:
+            self._entries[url] = entry
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, url):
+        """
+        Remove a dataset from the cache, e.g. because the file it points at has been deleted
+        :param url: the URL of the dataset
+        :return: nothing
+        """
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def clear(self):
+        """
+        Remove all datasets from the cache
+        :return: nothing
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_statistics(self):
+        """
+        Get the usage statistics for the cache
+        :return: dictionary of hits, misses, evictions and current size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)}
+
+
+# The single cache shared by all the DAP clients created in this process
+dap_dataset_cache = DapDatasetCache()
@@ -17,84 +17,236 @@
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 import datetime
+import logging
 from coards import parse
 import math
+import numpy as np
 from pylons import config
 from joj.services.dap_client.dap_client import DapClient
 from joj.utils import constants
 
+log = logging.getLogger(__name__)
+
+
+def downsample_min_max(values, npoints):
+    """
+    Choose which points of a series to plot so that there are at most about npoints of them but the peaks and troughs
+    are kept. The series is split into npoints / 2 equal buckets and the minimum and maximum of each bucket kept; a
+    bucket with no valid values keeps its first point so that gaps in the data still show on the graph.
+    :param values: numpy array of values with NaN for missing values
+    :param npoints: maximum number of points wanted
+    :return: sorted numpy array of the indices of the points to keep
+    """
+    count = len(values)
+    if count <= npoints:
+        return np.arange(count)
+    number_of_buckets = max(npoints // 2, 1)
+    bucket_starts = np.linspace(0, count, number_of_buckets + 1).astype(int)
+    buckets = np.repeat(np.arange(number_of_buckets), np.diff(bucket_starts))
+
+    valid_indices = np.nonzero(~np.isnan(values))[0]
+    valid_buckets = buckets[valid_indices]
+    # sort the valid points by bucket then value so each bucket's minimum is first and maximum last in its run
+    ordered = valid_indices[np.lexsort((values[valid_indices], valid_buckets))]
+    ordered_buckets = buckets[ordered]
+    bucket_changes = ordered_buckets[1:] != ordered_buckets[:-1]
+    minimums = ordered[np.concatenate(([True], bucket_changes))] if len(ordered) > 0 else ordered
+    maximums = ordered[np.concatenate((bucket_changes, [True]))] if len(ordered) > 0 else ordered
+    empty_buckets = np.setdiff1d(np.arange(number_of_buckets), valid_buckets)
+    return np.unique(np.concatenate((minimums, maximums, bucket_starts[empty_buckets])))
+
 
 class GraphingDapClient(DapClient):
     """
     Dap Client class for providing data for the Flot visualisation graphs.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, dataset_cache=None, series_cache=None):
+        """
+        Create the client
+        :param url: URL of the dataset
+        :param dataset_cache: cache of opened datasets to use (None to always open the dataset)
+        :param series_cache: cache of the time series read at each cell (None to read just the times graphed)
+        """
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return
-        super(GraphingDapClient, self).__init__(url)
+        super(GraphingDapClient, self).__init__(url, dataset_cache)
+        self._series_cache = series_cache
         self.gse_lat_n = self._dataset.attributes['NC_GLOBAL']['geospatial_lat_max']
         self.gse_lat_s = self._dataset.attributes['NC_GLOBAL']['geospatial_lat_min']
         self.gse_lon_w = self._dataset.attributes['NC_GLOBAL']['geospatial_lon_min']
         self.gse_lon_e = self._dataset.attributes['NC_GLOBAL']['geospatial_lon_max']
 
-    def get_graph_data(self, lat, lon, time, npoints=constants.GRAPH_NPOINTS, run_name=''):
+    def get_graph_data(self, lat, lon, time, npoints=constants.GRAPH_NPOINTS, run_name='', start_time=None,
+                       end_time=None, compact=False, lat_lon_index=None):
         """
-        Get the time series graphing data for a given point
+        Get the time series graphing data for a given point. Either the npoints times around the given time are
+        returned or, if a start or end time is given, the times between them downsampled to about npoints so that the
+        peaks and troughs are kept.
         :param lat: Latitude of point to graph
         :param lon: Longitude of point to graph
         :param time: Time to graph around
         :param npoints: Max number of points to plot
         :param run_name: Model run name to prefix legend with
+        :param start_time: Start of the times to graph (None for the first time or to graph around time)
+        :param end_time: End of the times to graph (None for the last time or to graph around time)
+        :param compact: True to return separate lists of times and values rather than a list of [time, value] pairs
+        :param lat_lon_index: the lat and lon index of the point if already known (e.g. from a dataset on the same grid)
         :return: JSON-like dictionary of data and metadata
         """
         # First we identify the closest positions we can use (by index):
         is_inside_grid = (self.gse_lat_s <= lat <= self.gse_lat_n) and (self.gse_lon_w <= lon <= self.gse_lon_e)
 
-        lat_index, lon_index = self.get_lat_lon_index(lat, lon)
-        if time is None:
-            plot_point_time_index = 0
+        if lat_lon_index is None:
+            lat_lon_index = self.get_lat_lon_index(lat, lon)
+        lat_index, lon_index = lat_lon_index
+        if start_time is None and end_time is None:
+            time_index_start, time_index_end = self._get_time_window(time, npoints)
         else:
-            time_elapsed = self._get_seconds_elapsed(time)
-            plot_point_time_index = self._get_closest_value_index(self._time, time_elapsed)
-        time_index_start = int(max(plot_point_time_index - math.floor((npoints - 1) / 2.0), 0))
-        time_index_end = int(min(plot_point_time_index + math.ceil((npoints - 1) / 2.0), len(self._time) - 1))
+            time_index_start, time_index_end = self._get_time_range(start_time, end_time)
+
+        millis = self._get_time_millis()
+        if time_index_end < time_index_start:
+            values = np.zeros(0)
+        elif is_inside_grid:
+            values = self._get_series(lat_index, lon_index, time_index_start, time_index_end + 1)
+        else:
+            values = np.empty(time_index_end + 1 - time_index_start)
+            values.fill(np.nan)
+
+        points_to_plot = downsample_min_max(values, npoints)
+        times = millis[time_index_start + points_to_plot].tolist()
+        data_values = [None if math.isnan(value) else value for value in values[points_to_plot].tolist()]
 
-        # Assumes that dimensions are time, lat, long.
-        data_slice = self._variable.array[time_index_start:time_index_end + 1, lat_index, lon_index]
-        variable_data = [data[0][0] for data in data_slice.tolist()]
-        timestamps = self._time.tolist()
-        data = []
-        missing_value = self._variable.attributes.get('missing_value', None)
-        fill_value = self._variable.attributes.get('_FillValue', None)
-        for i in range(len(variable_data)):
-            time_index = time_index_start + i
-            # Time should be in millis after 1970 epoch for FLOT
-            t = self._get_millis_since_epoch(timestamps[time_index])
-            if is_inside_grid:
-                data_value = variable_data[i]
-                if data_value == missing_value or data_value == fill_value or math.isnan(data_value):
-                    data_value = None
-            else:
-                data_value = None
-            data.append([t, data_value])
+        valid_values = values[~np.isnan(values)]
         min_data_value = None
         max_data_value = None
-        if len(data) > 0:
-            min_data_value = min([row[1] for row in data])
-            max_data_value = max([row[1] for row in data])
+        if len(valid_values) > 0:
+            min_data_value = float(valid_values.min())
+            max_data_value = float(valid_values.max())
         label = "%s (%s)" % (self.get_longname(), self._variable.units)
         if len(run_name) > 0:
             label = "%s - %s" % (run_name, label)
-        return {'data': data,
-                'label': label,
-                'lat': lat,
-                'lon': lon,
-                'xmin': self._get_millis_since_epoch(min(timestamps)),
-                'xmax': self._get_millis_since_epoch(max(timestamps)),
-                'ymin': min_data_value,
-                'ymax': max_data_value
-                }
+        graph_data = {'label': label,
+                      'lat': lat,
+                      'lon': lon,
+                      'xmin': float(millis.min()),
+                      'xmax': float(millis.max()),
+                      'ymin': min_data_value,
+                      'ymax': max_data_value
+                      }
+        if compact:
+            graph_data['times'] = times
+            graph_data['values'] = data_values
+        else:
+            graph_data['data'] = [[t, value] for t, value in zip(times, data_values)]
+        return graph_data
+
+    def _get_time_window(self, time, npoints):
+        """
+        Get the range of time indices for the npoints times around a time
+        :param time: time to centre the window on (None for the first time)
+        :param npoints: number of points in the window
+        :return: tuple of first and last time index (inclusive)
+        """
+        if time is None:
+            plot_point_time_index = 0
+        else:
+            time_elapsed = self._get_seconds_elapsed(time)
+            plot_point_time_index = self._get_time_axis_index().find_closest_index(time_elapsed)
+        time_index_start = int(max(plot_point_time_index - math.floor((npoints - 1) / 2.0), 0))
+        time_index_end = int(min(plot_point_time_index + math.ceil((npoints - 1) / 2.0), len(self._time) - 1))
+        return time_index_start, time_index_end
+
+    def _get_time_range(self, start_time, end_time):
+        """
+        Get the range of time indices for the times between a start and end time
+        :param start_time: first time wanted (None for the first time in the dataset)
+        :param end_time: last time wanted (None for the last time in the dataset)
+        :return: tuple of first and last time index (inclusive), the last is before the first if there are no times
+        """
+        time_index_start = 0
+        time_index_end = len(self._time) - 1
+        if start_time is not None:
+            time_index_start = self._get_time_axis_index().find_first_index_at_or_after(
+                self._get_seconds_elapsed(start_time))
+            if time_index_start is None:
+                return 0, -1
+        if end_time is not None:
+            time_index_end = self._get_time_axis_index().find_last_index_at_or_before(
+                self._get_seconds_elapsed(end_time))
+            if time_index_end is None:
+                return 0, -1
+        return int(time_index_start), int(time_index_end)
+
+    def _get_series(self, lat_index, lon_index, time_index_start, time_index_end):
+        """
+        Get the values of the variable at a cell for a range of times. If there is a series cache the whole series
+        at the cell is read and cached so that later graphs of the cell, at any zoom, do not read the dataset again.
+        :param lat_index: latitude index of the cell
+        :param lon_index: longitude index of the cell
+        :param time_index_start: first time index
+        :param time_index_end: time index to stop before
+        :return: numpy array of values with NaN where they are missing
+        """
+        if self._series_cache is None:
+            return self._read_series(lat_index, lon_index, time_index_start, time_index_end)
+        series = self._series_cache.get(
+            self.url, lat_index, lon_index,
+            lambda: self._read_series(lat_index, lon_index, 0, len(self._time)))
+        return series[time_index_start:time_index_end]
+
+    def _read_series(self, lat_index, lon_index, time_index_start, time_index_end):
+        """
+        Read the values of the variable at a cell for a range of times, a block of times per request
+        :param lat_index: latitude index of the cell
+        :param lon_index: longitude index of the cell
+        :param time_index_start: first time index
+        :param time_index_end: time index to stop before
+        :return: numpy array of values with NaN where they are missing
+        """
+        block_size = int(config.get('dap_client.series_read_block_size', constants.TIME_SERIES_READ_BLOCK_SIZE))
+        blocks = [self.get_data_block(lat_index, lon_index, block_start, min(block_start + block_size, time_index_end))
+                  for block_start in xrange(time_index_start, time_index_end, block_size)]
+        if len(blocks) == 0:
+            return np.zeros(0)
+        raw_values = np.concatenate(blocks)
+        values = raw_values.astype(np.float64)
+        for missing in [self._variable.attributes.get('missing_value', None),
+                        self._variable.attributes.get('_FillValue', None)]:
+            if missing is not None:
+                values[raw_values == missing] = np.nan
+        return values
+
+    def _get_time_millis(self):
+        """
+        Get the times on the time axis as milliseconds since the Unix epoch (needed for Flot), converting them only if
+        they are not already in the cache
+        :return: numpy array of milliseconds
+        """
+        return self._dataset_cache_entry.get_coordinate('time millis', self._convert_times_to_millis)
+
+    def _convert_times_to_millis(self):
+        """
+        Convert all the times on the time axis to milliseconds since the Unix epoch. The units are parsed once and the
+        conversion done as array arithmetic; a sample is checked against parsing each time and if the units are not
+        linear (e.g. months) every time is parsed.
+        :return: numpy array of milliseconds
+        """
+        times = np.asarray(self._time, dtype=np.float64)
+        if len(times) == 0:
+            return times
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        origin = parse(0, self._time_units)
+        seconds_per_unit = (parse(1, self._time_units) - origin).total_seconds()
+        millis = ((origin - epoch).total_seconds() + times * seconds_per_unit) * 1000
+
+        sample = np.unique(np.linspace(0, len(times) - 1, min(len(times), 5)).astype(int))
+        expected = [self._get_millis_since_epoch(times[index]) for index in sample]
+        if not np.allclose(millis[sample], expected, rtol=0, atol=1):
+            log.debug("Time units '%s' are not linear, converting each time" % self._time_units)
+            millis = np.array([self._get_millis_since_epoch(interval) for interval in times.tolist()])
+        return millis
 
     def _get_millis_since_epoch(self, intervals):
         """
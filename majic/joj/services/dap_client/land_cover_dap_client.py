@@ -25,10 +25,10 @@ class LandCoverDapClient(BaseDapClient):
     Specialised DAP Client class for accessing land cover data via THREDDS
     """
 
-    def __init__(self, url, key):
+    def __init__(self, url, key, dataset_cache=None):
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return
-        super(LandCoverDapClient, self).__init__(url)
+        super(LandCoverDapClient, self).__init__(url, dataset_cache)
         self._frac = self._dataset[key]
 
     def get_fractional_cover(self, lat, lon):
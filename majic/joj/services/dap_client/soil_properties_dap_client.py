@@ -30,10 +30,10 @@ class SoilPropertiesDapClient(BaseDapClient):
     Specialised DAP Client class for accessing soil properties via THREDDS
     """
 
-    def __init__(self, url):
+    def __init__(self, url, dataset_cache=None):
         if 'run_in_test_mode' in config and config['run_in_test_mode'].lower() == 'true':
             return
-        super(SoilPropertiesDapClient, self).__init__(url)
+        super(SoilPropertiesDapClient, self).__init__(url, dataset_cache)
 
     def get_soil_properties(self, lat, lon, var_names_in_file, use_file_list, const_vals):
         """
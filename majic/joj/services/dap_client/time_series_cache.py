@@ -0,0 +1,141 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pylons import config
+from joj.utils import constants
+
+log = logging.getLogger(__name__)
+
+
+class TimeSeriesCache(object):
+    """
+    A process wide, thread safe, least recently used cache of the whole time series of a variable at one grid cell,
+    keyed by dataset URL and cell indices. The cache is bounded by the total number of values held.
+    """
+
+    def __init__(self, max_values=None, time_to_live_in_s=None, config=config, clock=time.time):
+        """
+        Create the cache; size and time to live are read from the config if they are not given
+        :param max_values: maximum total number of values to hold, 0 to disable the cache
+        :param time_to_live_in_s: number of seconds a series may be held for
+        :param config: the configuration to read defaults from
+        :param clock: function returning the current time in seconds
+        """
+        self._max_values = max_values
+        self._time_to_live_in_s = time_to_live_in_s
+        self._config = config
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._total_values = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_values(self):
+        """
+        Maximum total number of values held in the cache
+        """
+        if self._max_values is None:
+            return int(self._config.get('dap_client.series_cache_max_values', constants.TIME_SERIES_CACHE_MAX_VALUES))
+        return self._max_values
+
+    @property
+    def time_to_live_in_s(self):
+        """
+        Number of seconds for which a series is held in the cache
+        """
+        if self._time_to_live_in_s is None:
+            return float(self._config.get('dap_client.series_cache_expire_in_s',
+                                          constants.TIME_SERIES_CACHE_EXPIRE_IN_S))
+        return self._time_to_live_in_s
+
+    def get(self, url, lat_index, lon_index, createfunc):
+        """
+        Get the series at a cell from the cache, reading it if it is not in the cache or has expired.
+        Exceptions from reading the series are passed on and nothing is cached.
+        :param url: the URL of the dataset
+        :param lat_index: latitude index of the cell
+        :param lon_index: longitude index of the cell
+        :param createfunc: function with no arguments which reads and returns the series as a numpy array
+        :return: the series
+        """
+        key = (url, lat_index, lon_index)
+        max_values = self.max_values
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                created_time, series = entry
+                if now - created_time > self.time_to_live_in_s:
+                    self._total_values -= len(series)
+                    self.evictions += 1
+                else:
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return series
+            self.misses += 1
+
+        log.debug("Time series cache miss for %s at %s, %s" % key)
+        series = createfunc()
+        if len(series) > max_values:
+            return series
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_values -= len(previous[1])
+            self._entries[key] = (now, series)
+            self._total_values += len(series)
+            while self._total_values > max_values:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._total_values -= len(evicted)
+                self.evictions += 1
+        return series
+
+    def invalidate(self, url):
+        """
+        Remove all the series for a dataset, e.g. because the file has been deleted
+        :param url: the URL of the dataset
+        :return: nothing
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == url]:
+                self._total_values -= len(self._entries.pop(key)[1])
+
+    def get_statistics(self):
+        """
+        Get the usage statistics for the cache
+        :return: dictionary of hits, misses, evictions, number of series and number of values held
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'values': self._total_values}
+
+
+# The single cache shared by all the graphing DAP clients created in this process
+time_series_cache = TimeSeriesCache()
@@ -18,8 +18,11 @@
 """
 from sqlalchemy import or_
 from sqlalchemy.orm import joinedload, contains_eager, subqueryload
+from sqlalchemy.orm.exc import NoResultFound
 from joj.model import Dataset, DatasetType, DrivingDataset, DrivingDatasetParameterValue, Parameter, \
-    DrivingDatasetLocation
+    DrivingDatasetLocation, ModelRun, Session
+from joj.lib.parsed_wms_capability_cache import parsed_wms_capability_cache
+from joj.lib.request_cache import cached_for_request
 from joj.services.general import DatabaseService
 from joj.model.non_database.spatial_extent import SpatialExtent
 from joj.model.non_database.temporal_extent import TemporalExtent
@@ -30,6 +33,15 @@ from joj.model.non_database.driving_dataset_jules_params import DrivingDatasetJu
 class DatasetService(DatabaseService):
     """Encapsulates operations on Map datasets"""
 
+    def __init__(self, session=Session, parsed_wms_capability_cache=parsed_wms_capability_cache):
+        """
+        Create the dataset service
+        :param session: Session class to use
+        :param parsed_wms_capability_cache: cache of parsed WMS capabilities to invalidate when datasets change
+        """
+        super(DatasetService, self).__init__(session)
+        self._parsed_wms_capability_cache = parsed_wms_capability_cache
+
     def get_datasets_for_user(self, user_id, dataset_type=None, dataset_type_id=None):
         """
         Returns a list of datasets that the supplied user has access to,
@@ -72,7 +84,14 @@ class DatasetService(DatabaseService):
         :param dataset_id: ID of the dataset to look for
         :param user_id: Optional user ID to match
         """
+        return cached_for_request(('dataset', str(dataset_id), user_id),
+                                  lambda: self._get_dataset_by_id(dataset_id, user_id))
 
+    def _get_dataset_by_id(self, dataset_id, user_id):
+        """ Reads a single dataset with the given ID from the database
+        :param dataset_id: ID of the dataset to look for
+        :param user_id: user ID to match
+        """
         with self.readonly_scope() as session:
             dataset = session.query(Dataset) \
                 .options(joinedload(Dataset.dataset_type)) \
@@ -85,6 +104,30 @@ class DatasetService(DatabaseService):
             dataset.data_range_to = tmp
         return dataset
 
+    def get_model_run_datasets_by_ids(self, dataset_ids, user):
+        """
+        Returns the model run datasets with the given IDs, with their model runs loaded, using a single query
+        :param dataset_ids: list of IDs of the datasets to look for
+        :param user: User to verify access to the datasets and their model runs
+        :return: list of datasets in the same order as the IDs; raises NoResultFound if any can not be viewed
+        """
+        dataset_ids = [int(dataset_id) for dataset_id in dataset_ids]
+        with self.readonly_scope() as session:
+            datasets = session.query(Dataset) \
+                .join(Dataset.model_run) \
+                .join(ModelRun.status) \
+                .options(contains_eager(Dataset.model_run).contains_eager(ModelRun.status)) \
+                .filter(Dataset.id.in_(dataset_ids),
+                        or_(Dataset.viewable_by_user_id == user.id,
+                            Dataset.viewable_by_user_id == None)).all()
+        datasets_by_id = {dataset.id: dataset for dataset in datasets}
+        for dataset_id in dataset_ids:
+            dataset = datasets_by_id.get(dataset_id)
+            if dataset is None or not (dataset.model_run.user_id == user.id or
+                                       dataset.model_run.status.is_viewable_by_any_majic_user()):
+                raise NoResultFound
+        return [datasets_by_id[dataset_id] for dataset_id in dataset_ids]
+
     def get_all_datasets(self):
         """
         Returns a list of all active datasets in EcoMaps
@@ -157,6 +200,7 @@ class DatasetService(DatabaseService):
                 dataset.deleted = True
 
                 session.add(dataset)
+            self._parsed_wms_capability_cache.invalidate_dataset(ds.id)
 
     def update(self, id, data_range_from, data_range_to, is_categorical):
         """
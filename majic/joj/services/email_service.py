@@ -18,6 +18,8 @@
 """
 from _socket import timeout
 import logging
+import threading
+import Queue
 from email.header import Header
 from email.mime.text import MIMEText
 from email.utils import formataddr, parseaddr
@@ -100,3 +102,53 @@ class EmailService(object):
         except Exception, ex:
             log.error("There is a general exception when sending an email. Message not sent: %s." % str(ex))
             log.error("Message was %s" % str(msg))
+
+
+class QueuedEmailSender(object):
+    """
+    Sends emails from a queue on a background thread so that the caller does not wait for the SMTP server
+    """
+
+    def __init__(self, email_service):
+        """
+        Create the sender and start its thread
+        :param email_service: the email service to send the emails with
+        """
+        self._email_service = email_service
+        self._queue = Queue.Queue()
+        self._thread = threading.Thread(target=self._send_queued_emails, name="QueuedEmailSender")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send_email(self, sender, recipient, subject, body):
+        """
+        Queue an email to be sent
+        :param sender: the senders address
+        :param recipient: the recipients address
+        :param subject: the emails subject
+        :param body: the body of the email
+        :return: nothing
+        """
+        self._queue.put((sender, recipient, subject, body))
+
+    def close(self):
+        """
+        Wait for all the queued emails to be sent and stop the thread
+        :return: nothing
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _send_queued_emails(self):
+        """
+        Send emails from the queue until it is closed
+        :return: nothing
+        """
+        while True:
+            email = self._queue.get()
+            if email is None:
+                return
+            try:
+                self._email_service.send_email(*email)
+            except Exception:
+                log.exception("Exception when sending a queued email")
@@ -3,6 +3,7 @@
 """
 from contextlib import contextmanager
 from joj.model import Session
+from joj.lib.request_cache import clear_request_cache
 
 __author__ = 'Phil Jenkins (Tessella)'
 
@@ -51,6 +52,8 @@ class DatabaseService(object):
             yield session
             session.commit()
             session.expunge_all()
+            # entities read earlier in the request may have been changed
+            clear_request_cache()
         except:
             session.rollback()
             raise
@@ -71,7 +71,7 @@ class JobRunnerClient(object):
         """
         Get the model statuses for ids passed in
         :param model_ids: list of model run ids
-        :return:list of model run dictionaries with ids, status and error message
+        :return:dictionary of model run id to model run status dictionaries with ids, status and error message
         """
         try:
             url = self._config['job_runner_url'] + 'jobs/status'
@@ -81,7 +81,11 @@ class JobRunnerClient(object):
             raise ServiceException("Failed to get job statuses: %s" % ex.message)
 
         if response.status_code == 200:
-            return response.json()
+            job_statuses = response.json()
+            if isinstance(job_statuses, list):
+                # job runners before statuses were keyed by id return a list
+                return {job_status['id']: job_status for job_status in job_statuses}
+            return {int(model_id): job_status for model_id, job_status in job_statuses.items()}
         else:
             raise ServiceException("Job status call returned with non ok status code. Status code {} content {}"
                                    .format(str(response.status_code), response.text))
@@ -18,18 +18,22 @@
 """
 
 import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 from sqlalchemy.orm import subqueryload
 from dateutil.parser import parse
 
 from joj.services.model_run_service import ModelRunService
 from joj.services.general import DatabaseService
-from joj.services.email_service import EmailService
+from joj.services.email_service import EmailService, QueuedEmailSender
 from joj.model import ModelRun, ModelRunStatus, Session, Dataset, DatasetType, DrivingDatasetLocation, \
     SystemAlertEmail, User, DrivingDataset
 from joj.utils import constants
-from joj.utils.utils import KeyNotFound, find_by_id_in_dict, insert_before_file_extension
+from joj.utils.utils import insert_before_file_extension
 from joj.utils import email_messages, utils
 from joj.services.dap_client.dap_client_factory import DapClientFactory
 from joj.services.dap_client.dap_client import DapClientException
@@ -73,28 +77,61 @@ class JobStatusUpdaterService(DatabaseService):
             self._email_service = email_service
         self._dap_client_factory = dap_client_factory
         self._config = config
+        self._max_workers = int(config.get('job_status_updater.max_workers', constants.JOB_STATUS_UPDATER_MAX_WORKERS))
+        self._db_batch_size = constants.JOB_STATUS_UPDATER_DB_BATCH_SIZE
 
     def update(self):
         """
-        Update the status of all pending model runs
+        Update the status of all pending model runs. The datasets for completed runs are looked up on the THREDDS
+        server by a pool of workers, the database is updated in batches and the emails are sent in the background.
         :return:nothing
         """
-        model_ids = self._get_ids_for_submitted_model_runs()
+        timings = OrderedDict()
+        with self._timed_stage(timings, 'find submitted model runs'):
+            model_ids = self._get_ids_for_submitted_model_runs()
         if len(model_ids) == 0:
             return
 
-        job_statuses = self._job_runner_client.get_run_model_statuses(model_ids)
+        with self._timed_stage(timings, 'get job statuses'):
+            job_statuses = self._job_runner_client.get_run_model_statuses(model_ids)
 
-        for model_id in model_ids:
-            try:
-                run_model = self._update_model_run_status(job_statuses, model_id)
-                self._send_email(run_model)
-            except DapClientException, ex:
-                log.exception("DAP client threw an exception: %s", ex.message)
-            except Exception, ex:
-                log.exception("General exception was thrown: %s", ex.message)
-
-        self._check_total_allocation_and_alert()
+        email_sender = QueuedEmailSender(self._email_service)
+        try:
+            with self._timed_stage(timings, 'look up datasets'):
+                datasets, failed_model_ids = self._get_datasets_for_completed_model_runs(job_statuses, model_ids)
+
+            with self._timed_stage(timings, 'update database'):
+                model_runs = self._update_model_run_statuses(
+                    job_statuses,
+                    [model_id for model_id in model_ids if model_id not in failed_model_ids],
+                    datasets)
+
+            for model_run in model_runs:
+                self._send_email(model_run, email_sender)
+        finally:
+            with self._timed_stage(timings, 'send emails'):
+                email_sender.close()
+
+        with self._timed_stage(timings, 'check total allocation'):
+            self._check_total_allocation_and_alert()
+
+        log.info("Updated the status of %s model runs (%s)" % (
+            len(model_ids),
+            ", ".join(["{}: {:.2f}s".format(stage, seconds) for stage, seconds in timings.items()])))
+
+    @contextmanager
+    def _timed_stage(self, timings, stage):
+        """
+        Record how long the code in the with block takes
+        :param timings: dictionary of stage names to time taken in seconds to add the timing to
+        :param stage: the name of the stage
+        :return: nothing
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            timings[stage] = time.time() - start_time
 
     def _get_ids_for_submitted_model_runs(self):
         """
@@ -111,50 +148,138 @@ class JobStatusUpdaterService(DatabaseService):
                 .all()
             return [model_run.id for model_run in model_runs]
 
-    def _update_model_run_status(self, job_statuses, model_id):
+    def _get_datasets_for_completed_model_runs(self, job_statuses, model_ids):
         """
-        Find the new status and update it for a model
-        :param job_statuses: a list of new job statuses
+        Look up the datasets for all the model runs which have completed using a pool of workers
+        :param job_statuses: dictionary of model id to new job status
+        :param model_ids: the model ids
+        :return: tuple of a dictionary of model id to a list of new datasets and a set of model ids for which the
+        datasets could not be looked up
+        """
+        completed_model_ids = [
+            model_id for model_id in model_ids
+            if model_id in job_statuses and job_statuses[model_id]['status'] == constants.MODEL_RUN_STATUS_COMPLETED]
+
+        if len(completed_model_ids) == 0:
+            return {}, set()
+
+        pool = ThreadPool(min(self._max_workers, len(completed_model_ids)))
+        try:
+            results = pool.map(self._get_datasets_for_model_run_or_none, completed_model_ids)
+        finally:
+            pool.close()
+            pool.join()
+
+        datasets = {}
+        failed_model_ids = set()
+        for model_id, model_run_datasets in zip(completed_model_ids, results):
+            if model_run_datasets is None:
+                failed_model_ids.add(model_id)
+            else:
+                datasets[model_id] = model_run_datasets
+        return datasets, failed_model_ids
+
+    def _get_datasets_for_model_run_or_none(self, model_id):
+        """
+        Look up the datasets for a model run, logging any problem
         :param model_id: the model id
-        :return: model_run
+        :return: list of new datasets or None if there was a problem (the status is then left for the next update)
+        """
+        try:
+            with self.readonly_scope() as session:
+                model_run = session.query(ModelRun) \
+                    .filter(ModelRun.id == model_id) \
+                    .options(subqueryload(ModelRun.user)) \
+                    .one()
+                return self._get_datasets(model_run, session)
+        except DapClientException, ex:
+            log.exception("DAP client threw an exception: %s", ex.message)
+        except Exception, ex:
+            log.exception("General exception was thrown: %s", ex.message)
+        return None
+
+    def _update_model_run_statuses(self, job_statuses, model_ids, datasets):
+        """
+        Update the statuses of the model runs in batches, if a batch fails each model run in it is updated on its own
+        :param job_statuses: dictionary of model id to new job status
+        :param model_ids: the model ids to update
+        :param datasets: dictionary of model id to the datasets to add for completed model runs
+        :return: list of updated model runs
+        """
+        model_runs = []
+        for batch_start in range(0, len(model_ids), self._db_batch_size):
+            batch_model_ids = model_ids[batch_start:batch_start + self._db_batch_size]
+            try:
+                model_runs.extend(self._update_model_run_statuses_in_transaction(
+                    job_statuses, batch_model_ids, datasets))
+            except Exception:
+                log.exception("Problem updating a batch of model runs, updating them one at a time")
+                for model_id in batch_model_ids:
+                    try:
+                        model_runs.extend(self._update_model_run_statuses_in_transaction(
+                            job_statuses, [model_id], datasets))
+                    except Exception, ex:
+                        log.exception("General exception was thrown: %s", ex.message)
+        return model_runs
+
+    def _update_model_run_statuses_in_transaction(self, job_statuses, model_ids, datasets):
+        """
+        Update the statuses of some model runs in a single transaction
+        :param job_statuses: dictionary of model id to new job status
+        :param model_ids: the model ids to update
+        :param datasets: dictionary of model id to the datasets to add for completed model runs
+        :return: list of updated model runs
         """
         with self.transaction_scope() as session:
-            model_run = session.query(ModelRun) \
-                .filter(ModelRun.id == model_id) \
+            model_runs = session.query(ModelRun) \
+                .filter(ModelRun.id.in_(model_ids)) \
                 .options(subqueryload(ModelRun.user)) \
-                .one()
+                .all()
+            for model_run in model_runs:
+                self._update_model_run_status(job_statuses, model_run, datasets.get(model_run.id, []), session)
+        return model_runs
 
-            try:
-                job_status = find_by_id_in_dict(job_statuses, model_run.id)
-                if constants.JSON_STATUS_STORAGE in job_status:
-                    model_run.storage_in_mb = job_status[constants.JSON_STATUS_STORAGE]
-                else:
-                    model_run.storage_in_mb = 0
-
-                model_run.date_started = None
-                model_run.time_elapsed_secs = 0
-                if constants.JSON_STATUS_START_TIME in job_status \
-                        and job_status[constants.JSON_STATUS_START_TIME] is not None:
-                    model_run.date_started = parse(job_status[constants.JSON_STATUS_START_TIME]).replace(tzinfo=None)
-                    if constants.JSON_STATUS_END_TIME in job_status \
-                            and job_status[constants.JSON_STATUS_END_TIME] is not None:
-                        end = parse(job_status[constants.JSON_STATUS_END_TIME]).replace(tzinfo=None)
-                        model_run.time_elapsed_secs = int((end - model_run.date_started).total_seconds())
-
-                model_run.change_status(session, job_status['status'], job_status['error_message'])
-                if job_status['status'] == constants.MODEL_RUN_STATUS_COMPLETED:
-                    self._update_datasets(model_run, session)
-            except KeyNotFound:
-                log.error("No status returned from job runner for model run %s", model_id)
-                model_run.change_status(session, constants.MODEL_RUN_STATUS_UNKNOWN,
-                                        constants.ERROR_MESSAGE_NO_STATUS_RETURNED)
-
-        return model_run
-
-    def _send_email(self, model_run):
+    def _update_model_run_status(self, job_statuses, model_run, datasets, session):
+        """
+        Find the new status and update it for a model
+        :param job_statuses: dictionary of model id to new job status
+        :param model_run: the model run
+        :param datasets: the datasets to add if the model run has completed
+        :param session: the session
+        :return: nothing
+        """
+        if model_run.id not in job_statuses:
+            log.error("No status returned from job runner for model run %s", model_run.id)
+            model_run.change_status(session, constants.MODEL_RUN_STATUS_UNKNOWN,
+                                    constants.ERROR_MESSAGE_NO_STATUS_RETURNED)
+            return
+
+        job_status = job_statuses[model_run.id]
+        if constants.JSON_STATUS_STORAGE in job_status:
+            model_run.storage_in_mb = job_status[constants.JSON_STATUS_STORAGE]
+        else:
+            model_run.storage_in_mb = 0
+
+        model_run.date_started = None
+        model_run.time_elapsed_secs = 0
+        if constants.JSON_STATUS_START_TIME in job_status \
+                and job_status[constants.JSON_STATUS_START_TIME] is not None:
+            model_run.date_started = parse(job_status[constants.JSON_STATUS_START_TIME]).replace(tzinfo=None)
+            if constants.JSON_STATUS_END_TIME in job_status \
+                    and job_status[constants.JSON_STATUS_END_TIME] is not None:
+                end = parse(job_status[constants.JSON_STATUS_END_TIME]).replace(tzinfo=None)
+                model_run.time_elapsed_secs = int((end - model_run.date_started).total_seconds())
+
+        model_run.change_status(session, job_status['status'], job_status['error_message'])
+        if job_status['status'] == constants.MODEL_RUN_STATUS_COMPLETED:
+            for dataset in datasets:
+                session.add(dataset)
+
+    def _send_email(self, model_run, email_sender=None):
         """
         Send an email if the job has entered a non submitted state
         :param model_run: the run model
+        :param email_sender: the sender to send the email with (defaults to the email service)
         :return:nothing
         """
 
@@ -189,7 +314,9 @@ class JobStatusUpdaterService(DatabaseService):
         else:
             return
 
-        self._email_service.send_email(
+        if email_sender is None:
+            email_sender = self._email_service
+        email_sender.send_email(
             self._config['email.from_address'],
             model_run.user.email,
             subject,
@@ -241,13 +368,14 @@ class JobStatusUpdaterService(DatabaseService):
             profile_name=profile_name,
             output_dir=constants.OUTPUT_DIR)
 
-    def _update_datasets(self, model_run, session):
+    def _get_datasets(self, model_run, session):
         """
-        Update all data sets for this model
-        :param model_run: the model run to update
+        Create all data sets for this model, these are not added to the session
+        :param model_run: the model run to create the datasets for
         :param session: a session
-        :return:nothing
+        :return:list of datasets
         """
+        datasets = []
 
         run_id = model_run.get_python_parameter_value(constants.JULES_PARAM_OUTPUT_RUN_ID)
         selected_output_profile_names = model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_PROFILE_NAME)
@@ -268,7 +396,7 @@ class JobStatusUpdaterService(DatabaseService):
 
                 profile_name = utils.convert_time_period_to_name(
                     selected_output_periods[selected_output_profile_name.group_id])
-                self._create_dataset(dataset_type, file_path, is_input, model_run, session, profile_name)
+                self._create_dataset(dataset_type, file_path, is_input, model_run, datasets, profile_name)
 
         input_locations = session \
             .query(DrivingDatasetLocation) \
@@ -278,9 +406,10 @@ class JobStatusUpdaterService(DatabaseService):
         for input_location in input_locations:
             file_path = input_location.base_url
             is_input = True
-            self._create_dataset(input_location.dataset_type, file_path, is_input, model_run, session)
+            self._create_dataset(input_location.dataset_type, file_path, is_input, model_run, datasets)
 
-        self._create_ancil_datasets(model_run, session)
+        self._create_ancil_datasets(model_run, datasets, session)
+        return datasets
 
     def get_dataset_type(self, dataset_type_name, session):
         """
@@ -295,17 +424,18 @@ class JobStatusUpdaterService(DatabaseService):
             .one()
         return dataset_type
 
-    def _create_ancil_datasets(self, model_run, session):
+    def _create_ancil_datasets(self, model_run, datasets, session):
         """
         Create ancillary datasets if available and add them to the model run datasets
         :param model_run: Model run to update
+        :param datasets: list of datasets to add the datasets to
         :param session: DB Session
         :return:
         """
         soil_props_file = model_run.get_python_parameter_value(constants.JULES_PARAM_SOIL_PROPS_FILE)
         if soil_props_file is not None:
             dataset_type = self.get_dataset_type(constants.DATASET_TYPE_SOIL_PROP, session)
-            self._create_dataset(dataset_type, soil_props_file, True, model_run, session)
+            self._create_dataset(dataset_type, soil_props_file, True, model_run, datasets)
 
         frac_file = model_run.get_python_parameter_value(constants.JULES_PARAM_FRAC_FILE)
         user_upload_id = session.query(DrivingDataset) \
@@ -319,16 +449,16 @@ class JobStatusUpdaterService(DatabaseService):
         if frac_file is not None and frac_file != constants.FRACTIONAL_FILENAME:
             dataset_type = self.get_dataset_type(constants.DATASET_TYPE_LAND_COVER_FRAC, session)
             frac_file_vis = insert_before_file_extension(frac_file, constants.MODIFIED_FOR_VISUALISATION_EXTENSION)
-            self._create_dataset(dataset_type, frac_file_vis, True, model_run, session)
+            self._create_dataset(dataset_type, frac_file_vis, True, model_run, datasets)
 
-    def _create_dataset(self, dataset_type, filename, is_input, model_run, session, frequency=None):
+    def _create_dataset(self, dataset_type, filename, is_input, model_run, datasets, frequency=None):
         """
         Create a single dataset
         :param dataset_type: the dataset type
         :param filename: filename of the dataset
         :param is_input: true if this is an input dataset
         :param model_run: the model run
-        :param session: the session
+        :param datasets: list of datasets to add the dataset to
         :param frequency: extra label to append to the name to indicate frequency
         :return:
         """
@@ -351,7 +481,7 @@ class JobStatusUpdaterService(DatabaseService):
 
             dataset = Dataset()
             dataset.model_run_id = model_run.id
-            dataset.dataset_type = dataset_type
+            dataset.dataset_type_id = dataset_type.id
             dataset.is_categorical = False
             dataset.is_input = is_input
             dataset.viewable_by_user_id = model_run.user.id
@@ -362,7 +492,7 @@ class JobStatusUpdaterService(DatabaseService):
             dataset.data_range_from = data_range_from
             dataset.data_range_to = data_range_to
             dataset.name = name
-            session.add(dataset)
+            datasets.append(dataset)
         except DapClientInternalServerErrorException:
             log.exception("Trouble creating the dataset %s" % netcdf_url)
             #  do not register the dataset just continue
@@ -19,6 +19,7 @@
 from sqlalchemy import asc
 from sqlalchemy.orm import subqueryload, eagerload
 
+from joj.lib.request_cache import cached_for_request
 from joj.services.general import DatabaseService, ServiceException
 from joj.model import LandCoverRegion, LandCoverValue, LandCoverRegionCategory, LandCoverAction
 from joj.utils import constants
@@ -46,6 +47,14 @@ class LandCoverService(DatabaseService):
         :param id: Database ID of the land cover region requested
         :return: LandCoverRegion
         """
+        return cached_for_request(('land_cover_region', str(id)), lambda: self._get_land_cover_region_by_id(id))
+
+    def _get_land_cover_region_by_id(self, id):
+        """
+        Read a specified land cover region from the database
+        :param id: Database ID of the land cover region requested
+        :return: LandCoverRegion
+        """
         with self.readonly_scope() as session:
             return self._get_land_cover_region_by_id_in_session(id, session)
 
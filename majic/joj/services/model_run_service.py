@@ -18,7 +18,7 @@
 """
 
 import logging
-from sqlalchemy.orm import subqueryload, contains_eager, joinedload, make_transient
+from sqlalchemy.orm import subqueryload, contains_eager, joinedload, make_transient, aliased
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql import func
 from sqlalchemy import and_, desc, or_
@@ -33,9 +33,15 @@ from joj.services.job_runner_client import JobRunnerClient
 from joj.services.general import ServiceException
 from joj.model import Namelist
 from joj.model.output_variable import OutputVariable
+from joj.model.non_database.model_run_listing import ModelRunListingItem, ModelRunListingPage
 from joj.services.land_cover_service import LandCoverService
 from joj.services.parameter_service import ParameterService
 from joj.services.dataset import DatasetService
+from joj.services.dap_client.dap_client_factory import DapClientFactory
+from joj.lib.wms_tile_cache import wms_tile_cache
+from joj.lib.parsed_wms_capability_cache import parsed_wms_capability_cache
+from joj.lib.finished_model_run_cache import finished_model_run_cache
+from joj.lib.request_cache import cached_for_request
 from joj.utils.email_messages import FAILED_SUBMIT_SUPPORT_MESSAGE_TEMPLATE, FAILED_SUBMIT_SUPPORT_SUBJECT_TEMPLATE
 
 log = logging.getLogger(__name__)
@@ -61,12 +67,20 @@ class ModelRunService(DatabaseService):
                  job_runner_client=JobRunnerClient(config),
                  parameter_service=ParameterService(),
                  dataset_service=DatasetService(),
-                 email_service=EmailService(config)):
+                 email_service=EmailService(config),
+                 dap_client_factory=DapClientFactory(),
+                 wms_tile_cache=wms_tile_cache,
+                 parsed_wms_capability_cache=parsed_wms_capability_cache,
+                 finished_model_run_cache=finished_model_run_cache):
         super(ModelRunService, self).__init__(session)
         self.parameter_service = parameter_service
         self._job_runner_client = job_runner_client
         self._dataset_service = dataset_service
         self._email_service = email_service
+        self._dap_client_factory = dap_client_factory
+        self._wms_tile_cache = wms_tile_cache
+        self._parsed_wms_capability_cache = parsed_wms_capability_cache
+        self._finished_model_run_cache = finished_model_run_cache
 
     def get_models_for_user(self, user):
         """
@@ -108,6 +122,64 @@ class ModelRunService(DatabaseService):
             except NoResultFound:
                 return []
 
+    def get_model_run_listing(self, user=None, before_id=None, page_size=None):
+        """
+        Get a page of the model run catalogue, newest first, in a single query. Only the columns the catalogue shows
+        are read so the number of queries does not depend on the number of runs.
+        :param user: the user whose (non-created) model runs to list; None to list the published and public runs
+        :param before_id: id of the last model run on the previous page; None for the first page
+        :param page_size: maximum number of runs on the page; None to use the configured page size
+        :return: a ModelRunListingPage
+        """
+        if page_size is None:
+            page_size = int(config.get('model_run_listing.page_size', constants.MODEL_RUN_LISTING_PAGE_SIZE))
+        with self.readonly_scope() as session:
+            query = session\
+                .query(ModelRun.id, ModelRun.name, ModelRun.description, ModelRun.date_created,
+                       ModelRun.last_status_change, ModelRun.storage_in_mb, User.name, ModelRunStatus)\
+                .join(ModelRun.status)\
+                .join(ModelRun.user)
+            if user is None:
+                query = query.filter(or_(
+                    ModelRunStatus.name == constants.MODEL_RUN_STATUS_PUBLISHED,
+                    ModelRunStatus.name == constants.MODEL_RUN_STATUS_PUBLIC))
+            else:
+                query = query\
+                    .filter(ModelRun.user_id == user.id)\
+                    .filter(ModelRunStatus.name != constants.MODEL_RUN_STATUS_CREATED)
+            if before_id is not None:
+                # keyset paging on (date created, id) with the previous page's last run looked up in the same query
+                before_model_run = aliased(ModelRun)
+                before_date_created = session\
+                    .query(before_model_run.date_created)\
+                    .filter(before_model_run.id == before_id)\
+                    .as_scalar()
+                query = query.filter(or_(
+                    ModelRun.date_created < before_date_created,
+                    and_(ModelRun.date_created == before_date_created, ModelRun.id < before_id)))
+            rows = query\
+                .order_by(desc(ModelRun.date_created), desc(ModelRun.id))\
+                .limit(page_size + 1)\
+                .all()
+
+        items = [ModelRunListingItem(*row) for row in rows[:page_size]]
+        next_before_id = None
+        if len(rows) > page_size:
+            next_before_id = items[-1].id
+        return ModelRunListingPage(items, next_before_id)
+
+    def get_storage_used_by_user_in_mb(self, user):
+        """
+        Get the storage counted against a user's quota, i.e. used by their runs which are not published or public
+        :param user: the user
+        :return: the storage used in mb
+        """
+        total = 0
+        for user_id, status_name, storage_in_mb in self.get_storage_used(user):
+            if status_name != constants.MODEL_RUN_STATUS_PUBLISHED and status_name != constants.MODEL_RUN_STATUS_PUBLIC:
+                total += storage_in_mb
+        return total
+
     def get_model_by_id(self, user, id):
         """
         Get a specified model by the model id
@@ -115,6 +187,22 @@ class ModelRunService(DatabaseService):
         :param id: ID of the model run requested
         :return: The matching ModelRun.
         """
+        model_run = cached_for_request(('model_run', str(id)), lambda: self._get_model_by_id(id))
+        # Is user allowed to access this run?
+        if model_run.user_id == user.id or \
+                model_run.status.is_viewable_by_any_majic_user():
+            return model_run
+        raise NoResultFound
+
+    def _get_model_by_id(self, id):
+        """
+        Get a model run, with its parameter values, from the cache of finished runs or the database
+        :param id: ID of the model run requested
+        :return: The matching ModelRun
+        """
+        model_run = self._finished_model_run_cache.get(id)
+        if model_run is not None:
+            return model_run
         with self.readonly_scope() as session:
             model_run = session.query(ModelRun) \
                 .join(User) \
@@ -123,15 +211,13 @@ class ModelRunService(DatabaseService):
                 .filter(ModelRun.id == id) \
                 .options(subqueryload(ModelRun.code_version)) \
                 .options(contains_eager(ModelRun.user))\
+                .options(contains_eager(ModelRun.status))\
                 .options(contains_eager(ModelRun.parameter_values)
                          .contains_eager(ParameterValue.parameter)
                          .contains_eager(Parameter.namelist))\
                 .one()
-            # Is user allowed to access this run?
-            if model_run.user_id == user.id or \
-                    model_run.status.is_viewable_by_any_majic_user():
-                return model_run
-            raise NoResultFound
+        self._finished_model_run_cache.put(model_run)
+        return model_run
 
     def publish_model(self, user, id):
         """
@@ -152,6 +238,7 @@ class ModelRunService(DatabaseService):
                 raise ServiceException("Error publishing model run. Either the requested model run doesn't exist, "
                                        "has not completed or you are not authorised to access it")
             model_run.change_status(session, constants.MODEL_RUN_STATUS_PUBLISHED)
+            self._finished_model_run_cache.invalidate(model_run.id)
 
             datasets = session.query(Dataset) \
                 .filter(Dataset.model_run_id == model_run.id) \
@@ -179,6 +266,7 @@ class ModelRunService(DatabaseService):
                 raise ServiceException("Error making model run public. Either the requested model run doesn't exist, "
                                        "is not yet published or you are not authorised to access it")
             model_run.change_status(session, constants.MODEL_RUN_STATUS_PUBLIC)
+            self._finished_model_run_cache.invalidate(model_run.id)
 
     def get_code_versions(self):
         """
@@ -740,6 +828,9 @@ class ModelRunService(DatabaseService):
             .options(contains_eager(ModelRun.land_cover_actions)) \
             .one()
         for dataset in model_run.datasets:
+            self._dap_client_factory.invalidate_url(dataset.netcdf_url)
+            self._wms_tile_cache.invalidate_dataset(dataset.id)
+            self._parsed_wms_capability_cache.invalidate_dataset(dataset.id)
             session.delete(dataset)
         for parameter_value in model_run.parameter_values:
             session.delete(parameter_value)
@@ -775,6 +866,7 @@ class ModelRunService(DatabaseService):
 
         with self.transaction_scope() as session:
             self._delete_model_run_in_session_no_checks(model_id, session)
+        self._finished_model_run_cache.invalidate(model_id)
 
         return model_run_name
 
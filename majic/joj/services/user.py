@@ -24,6 +24,7 @@ from joj.crowd.client import ClientException
 from joj.crowd.crowd_client_factory import CrowdClientFactory
 from joj.model import User, Session
 from joj.services.general import DatabaseService, ServiceException
+from joj.lib.request_cache import cached_for_request
 from joj.utils import constants
 import uuid
 from joj.services.email_service import EmailService
@@ -114,8 +115,11 @@ class UserService(DatabaseService):
         if username is None:
             return None
 
-        with self.readonly_scope() as session:
-            return self.get_user_by_username_in_session(session, username)
+        def _get_user():
+            with self.readonly_scope() as session:
+                return self.get_user_by_username_in_session(session, username)
+
+        return cached_for_request(('user', username), _get_user)
 
     def get_user_by_username_in_session(self, session, username):
         """
@@ -0,0 +1,45 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import datetime
+from hamcrest import assert_that, is_
+from pylons import url
+from joj.tests import TestController
+from joj.utils import constants
+
+
+class TestMapGraphs(TestController):
+    def setUp(self):
+        super(TestMapGraphs, self).setUp()
+        self.clean_database()
+        self.user = self.login()
+
+    def _time(self, year):
+        return datetime.datetime(year, 1, 1).strftime(constants.GRAPH_TIME_FORMAT)
+
+    def test_GIVEN_number_of_times_not_matching_number_of_datasets_WHEN_get_graphs_THEN_bad_request(self):
+        response = self.app.get(
+            url(controller='map', action='graphs'),
+            params={
+                'id': ['1', '2'],
+                'time': [self._time(1901), self._time(1902), self._time(1903)],
+                'lat': '51.5',
+                'lon': '-1.5'},
+            expect_errors=True)
+
+        assert_that(response.status_code, is_(400))
@@ -47,6 +47,9 @@ class TestAsciiDownloadHelper(TestController):
             def _data(lat, lon, date):
                 return len(var_name) * lat * lon + date
 
+            def _data_block(lat, lon, date_start, date_end):
+                return [_data(lat, lon, date) for date in range(date_start, date_end)]
+
             def _desc():
                 return var_name + "_desc"
 
@@ -61,7 +64,7 @@ class TestAsciiDownloadHelper(TestController):
             mock_dap_client = MagicMock()
             mock_dap_client.get_time_immediately_after = _gtia
             mock_dap_client.get_time_immediately_before = _gtib
-            mock_dap_client.get_data_at = _data
+            mock_dap_client.get_data_block = _data_block
             mock_dap_client.get_longname = _desc
             mock_dap_client.get_lat_lon_index = _lat_lon_index
             mock_dap_client.get_time_index = _time_index
@@ -58,10 +58,10 @@ class TestJobDataUpdater(TestController):
         model_run = self.create_run_model(status=constants.MODEL_RUN_STATUS_PENDING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -79,14 +79,14 @@ class TestJobDataUpdater(TestController):
         model_run = self.create_run_model(status=constants.MODEL_RUN_STATUS_PENDING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id + 1,
-                           'status': constants.MODEL_RUN_STATUS_UNKNOWN,
-                           'error_message': ''
-                           },
-                          {'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id + 1: {'id': model_run.id + 1,
+                                             'status': constants.MODEL_RUN_STATUS_UNKNOWN,
+                                             'error_message': ''
+                                             },
+                          model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -97,14 +97,14 @@ class TestJobDataUpdater(TestController):
         model_run2 = self.create_run_model(status=constants.MODEL_RUN_STATUS_RUNNING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run2.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           },
-                          {'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_FAILED,
-                           'error_message': 'error'
-                           }])
+            return_value={model_run2.id: {'id': model_run2.id,
+                                          'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                          'error_message': ''
+                                          },
+                          model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_FAILED,
+                                         'error_message': 'error'
+                                         }})
 
         self.job_status_updater.update()
 
@@ -116,10 +116,10 @@ class TestJobDataUpdater(TestController):
         expected_error = "error"
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_FAILED,
-                           'error_message': expected_error
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_FAILED,
+                                         'error_message': expected_error
+                                         }})
 
         self.job_status_updater.update()
 
@@ -131,10 +131,10 @@ class TestJobDataUpdater(TestController):
         model_run = self.create_run_model(status=constants.MODEL_RUN_STATUS_PENDING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_RUNNING,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_RUNNING,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -145,10 +145,10 @@ class TestJobDataUpdater(TestController):
         model_run = self.create_run_model(status=constants.MODEL_RUN_STATUS_PENDING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_UNKNOWN,
-                           'error_message': 'error'
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_UNKNOWN,
+                                         'error_message': 'error'
+                                         }})
 
         self.job_status_updater.update()
 
@@ -160,13 +160,13 @@ class TestJobDataUpdater(TestController):
         expected_storage = 10
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': '',
-                           'start_time': "2014-07-16 16:33:30",
-                           'end_time': "2014-07-17 12:07:46",
-                           'storage_in_mb': expected_storage
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': '',
+                                         'start_time': "2014-07-16 16:33:30",
+                                         'end_time': "2014-07-17 12:07:46",
+                                         'storage_in_mb': expected_storage
+                                        }})
 
         self.job_status_updater.update()
 
@@ -184,13 +184,13 @@ class TestJobDataUpdater(TestController):
         expected_storage = int(config['storage_quota_total_GB']) * 1024 + 1
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_RUNNING,
-                           'error_message': '',
-                           'start_time': "2014-07-16 16:33:30",
-                           'end_time': "2014-07-17 12:07:46",
-                           'storage_in_mb': expected_storage
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_RUNNING,
+                                         'error_message': '',
+                                         'start_time': "2014-07-16 16:33:30",
+                                         'end_time': "2014-07-17 12:07:46",
+                                         'storage_in_mb': expected_storage
+                                        }})
 
         self.job_status_updater.update()
 
@@ -211,13 +211,13 @@ class TestJobDataUpdater(TestController):
         expected_storage = 10
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_RUNNING,
-                           'error_message': '',
-                           'start_time': "2014-07-16 16:33:30",
-                           'end_time': "2014-07-17 12:07:46",
-                           'storage_in_mb': expected_storage
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_RUNNING,
+                                         'error_message': '',
+                                         'start_time': "2014-07-16 16:33:30",
+                                         'end_time': "2014-07-17 12:07:46",
+                                         'storage_in_mb': expected_storage
+                                        }})
 
         self.job_status_updater.update()
 
@@ -244,13 +244,13 @@ class TestJobDataUpdater(TestController):
             email.last_sent = datetime.now() - timedelta(seconds=60)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_RUNNING,
-                           'error_message': '',
-                           'start_time': "2014-07-16 16:33:30",
-                           'end_time': "2014-07-17 12:07:46",
-                           'storage_in_mb': expected_storage
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_RUNNING,
+                                         'error_message': '',
+                                         'start_time': "2014-07-16 16:33:30",
+                                         'end_time': "2014-07-17 12:07:46",
+                                         'storage_in_mb': expected_storage
+                                        }})
 
         self.job_status_updater.update()
 
@@ -265,10 +265,10 @@ class TestJobDataUpdater(TestController):
         model_run = self.create_run_model(status=constants.MODEL_RUN_STATUS_PENDING, name="test", user=self.user, storage_in_mb=10)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -41,10 +41,10 @@ class TestJobDataUpdaterCreation(TestWithFullModelRun):
             model_run.change_status(session, constants.MODEL_RUN_STATUS_RUNNING)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -79,10 +79,10 @@ class TestJobDataUpdaterCreation(TestWithFullModelRun):
             model_run.change_status(session, constants.MODEL_RUN_STATUS_RUNNING)
 
         self.running_job_client.get_run_model_statuses = Mock(
-            return_value=[{'id': model_run.id,
-                           'status': constants.MODEL_RUN_STATUS_COMPLETED,
-                           'error_message': ''
-                           }])
+            return_value={model_run.id: {'id': model_run.id,
+                                         'status': constants.MODEL_RUN_STATUS_COMPLETED,
+                                         'error_message': ''
+                                         }})
 
         self.job_status_updater.update()
 
@@ -0,0 +1,122 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from datetime import datetime
+from sqlalchemy import event
+
+from hamcrest import *
+from joj.model import User, session_scope, Session, ModelRun
+from joj.services.model_run_service import ModelRunService
+from pylons import config
+from joj.utils import constants
+from joj.services.job_runner_client import JobRunnerClient
+from joj.tests.test_with_create_full_model_run import TestWithFullModelRun
+
+
+class ModelRunServiceListingTest(TestWithFullModelRun):
+    def setUp(self):
+        super(ModelRunServiceListingTest, self).setUp()
+        self.job_runner_client = JobRunnerClient(config)
+        self.model_run_service = ModelRunService(job_runner_client=self.job_runner_client)
+        self.clean_database()
+        self.queries = []
+        self.engine = Session.get_bind()
+        event.listen(self.engine, 'before_cursor_execute', self._count_query)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self._count_query)
+        super(ModelRunServiceListingTest, self).tearDown()
+
+    def _count_query(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries.append(statement)
+
+    def _add_user_with_runs(self, name, count, status=constants.MODEL_RUN_STATUS_COMPLETED):
+        with session_scope(Session) as session:
+            user = User()
+            user.name = name
+            session.add(user)
+        self._add_runs_to_user(user, count, status)
+        return user
+
+    def _add_runs_to_user(self, user, count, status, name_format="%s run %s"):
+        with session_scope(Session) as session:
+            for index in range(count):
+                model_run = ModelRun()
+                model_run.name = name_format % (user.name, index)
+                model_run.user_id = user.id
+                model_run.storage_in_mb = 10
+                model_run.date_created = datetime(2014, 1, 1 + index)
+                model_run.status = self._status(status)
+                session.add(model_run)
+
+    def _count_queries_for_listing(self, user):
+        self.queries = []
+        listing = self.model_run_service.get_model_run_listing(user)
+        for model_run in listing:
+            model_run.status.allow_publish()
+            model_run.status.get_display_color()
+        return len(self.queries)
+
+    def test_GIVEN_user_with_few_or_many_runs_WHEN_get_listing_THEN_query_count_is_the_same(self):
+        few_runs_user = self._add_user_with_runs("few", 2)
+        many_runs_user = self._add_user_with_runs("many", 20)
+
+        few_runs_query_count = self._count_queries_for_listing(few_runs_user)
+        many_runs_query_count = self._count_queries_for_listing(many_runs_user)
+
+        assert_that(many_runs_query_count, is_(few_runs_query_count))
+        assert_that(few_runs_query_count, is_(1))
+
+    def test_GIVEN_few_or_many_published_runs_WHEN_get_published_listing_THEN_query_count_is_the_same(self):
+        self._add_user_with_runs("few", 2, constants.MODEL_RUN_STATUS_PUBLISHED)
+        few_runs_query_count = self._count_queries_for_listing(None)
+        self._add_user_with_runs("many", 20, constants.MODEL_RUN_STATUS_PUBLIC)
+        many_runs_query_count = self._count_queries_for_listing(None)
+
+        assert_that(many_runs_query_count, is_(few_runs_query_count))
+
+    def test_GIVEN_user_has_created_and_completed_runs_WHEN_get_listing_THEN_only_completed_runs_listed(self):
+        user = self._add_user_with_runs("user", 2)
+        self._add_model_run_being_created(user)
+
+        listing = self.model_run_service.get_model_run_listing(user)
+
+        assert_that([model_run.name for model_run in listing], contains("user run 1", "user run 0"))
+        assert_that(listing.items[0].user_name, is_("user"))
+
+    def test_GIVEN_more_runs_than_page_size_WHEN_get_listing_pages_THEN_all_runs_listed_once_newest_first(self):
+        user = self._add_user_with_runs("user", 5)
+
+        first_page = self.model_run_service.get_model_run_listing(user, page_size=2)
+        second_page = self.model_run_service.get_model_run_listing(
+            user, before_id=first_page.next_before_id, page_size=2)
+        last_page = self.model_run_service.get_model_run_listing(
+            user, before_id=second_page.next_before_id, page_size=2)
+
+        names = [model_run.name for page in [first_page, second_page, last_page] for model_run in page]
+        assert_that(names, contains("user run 4", "user run 3", "user run 2", "user run 1", "user run 0"))
+        assert_that(last_page.next_before_id, is_(None))
+
+    def test_GIVEN_user_with_published_and_completed_runs_WHEN_get_storage_used_THEN_only_unpublished_counted(self):
+        user = self._add_user_with_runs("user", 3)
+        self._add_runs_to_user(user, 2, constants.MODEL_RUN_STATUS_PUBLISHED, "%s published run %s")
+
+        storage = self.model_run_service.get_storage_used_by_user_in_mb(user)
+
+        assert_that(storage, is_(30))
+
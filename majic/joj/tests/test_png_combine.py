@@ -0,0 +1,61 @@
+'''
+Tests for compositing figure layer images
+'''
+import unittest
+import numpy as N
+
+try:
+    from PIL import Image
+except:
+    import Image
+
+from joj.lib.png_combine import merge
+from joj.scripts.benchmark_figure_compositing import makeLayers
+
+
+def referenceMerge(*layers):
+    """Pairwise alpha blending in float64, rounding only at the end
+    """
+    result = N.asarray(layers[0], dtype=float) / 255
+    for layer in layers[1:]:
+        top = N.asarray(layer, dtype=float) / 255
+        alpha = top[:, :, 3] + result[:, :, 3] * (1 - top[:, :, 3])
+        for i in range(3):
+            result[:, :, i] = (top[:, :, i] * top[:, :, 3] +
+                               result[:, :, i] * result[:, :, 3] * (1 - top[:, :, 3])) / alpha
+        result[:, :, 3] = alpha
+    return N.rint(result * 255)
+
+
+class TestPngCombine(unittest.TestCase):
+    """Tests for png_combine.merge
+    """
+    def test_opaque_top_layer_replaces_base(self):
+        base = Image.new('RGBA', (2, 2), (255, 255, 255, 255))
+        top = Image.new('RGBA', (2, 2), (10, 20, 30, 255))
+
+        result = N.asarray(merge(base, top))
+
+        self.assertTrue((result == [10, 20, 30, 255]).all())
+
+    def test_transparent_top_layer_leaves_base(self):
+        base = Image.new('RGB', (2, 2), (1, 2, 3))
+        top = Image.new('RGBA', (2, 2), (10, 20, 30, 0))
+
+        result = N.asarray(merge(base, top))
+
+        self.assertTrue((result == [1, 2, 3, 255]).all())
+
+    def test_fully_transparent_layers_give_transparent_black(self):
+        result = N.asarray(merge(Image.new('RGBA', (2, 2), (9, 9, 9, 0)), Image.new('RGBA', (2, 2), (7, 7, 7, 0))))
+
+        self.assertTrue((result == 0).all())
+
+    def test_matches_pairwise_combination(self):
+        layers = makeLayers(40, 30, 4)
+
+        result = N.asarray(merge(*layers), dtype=int)
+        expected = referenceMerge(*layers)
+
+        self.assertEqual(result.shape, (30, 40, 4))
+        self.assertTrue(N.abs(result - expected).max() <= 1)
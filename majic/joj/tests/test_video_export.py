@@ -0,0 +1,126 @@
+'''
+Tests for rendering video frames and piping them to the converter
+'''
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from mock import patch
+import pylons
+
+try:
+    from PIL import Image
+except:
+    import Image
+
+import joj.lib.build_figure as build_figure
+import joj.lib.video_export as video_export
+
+CONVERTER = '''import sys
+output = open(sys.argv[-1], 'wb')
+output.write(' '.join(sys.argv[1:-1]) + '\\n')
+output.write(sys.stdin.read())
+'''
+
+
+class LayerInfo(object):
+    def __init__(self, params):
+        self.params = params
+        self.legendURL = 'http://legend/wms?REQUEST=GetLegendGraphic'
+
+
+class ExportParams(object):
+    def __init__(self, exportDir, dimensionValues):
+        self.configuration = {'maxnumbersteps': '100'}
+        self.numberSteps = len(dimensionValues)
+        self.layerInfoList = [LayerInfo({'LAYERS': 'base'}), LayerInfo({'LAYERS': 'gpp', 'TIME': 'x'})]
+        self.animationLayerNumber = 2
+        self.animationDimension = 'TIME'
+        self.dimensionValues = dimensionValues
+        self.params = {}
+        self.figureOptions = None
+        self.commonLayerParams = {}
+        self.formatName = 'FLV'
+        self.frameRate = '10'
+        self.exportDir = exportDir
+        self.fileNamePrefix = 'test-'
+
+
+class TestVideoExport(unittest.TestCase):
+    """Tests for video_export.makeVideo
+    """
+    def setUp(self):
+        self.exportDir = tempfile.mkdtemp()
+        converter = os.path.join(self.exportDir, 'converter.py')
+        with open(converter, 'w') as converterFile:
+            converterFile.write(CONVERTER)
+        pylons.config.push_thread_config({'video.converter.ffmpeg': '%s %s' % (sys.executable, converter),
+                                          'video.frame_render_workers': '3',
+                                          'omit_label_for_single_legend': 'true'})
+        self.fetches = []
+        self.configValues = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        pylons.config.pop_thread_config()
+        shutil.rmtree(self.exportDir, ignore_errors=True)
+
+    def buildFigureForLayers(self, requestParams, figureOptions, commonLayerParams, layerInfoList, imageCache):
+        for index, layerInfo in enumerate(layerInfoList):
+            if imageCache[index] == None:
+                with self.lock:
+                    self.fetches.append((layerInfo.params['LAYERS'], layerInfo.params.get('TIME')))
+                imageCache[index] = layerInfo.params.get('TIME', 'static')
+        with self.lock:
+            self.configValues.append(pylons.config.get('omit_label_for_single_legend'))
+        return Image.new('RGB', (3, 2), (int(imageCache[1]), 0, 0))
+
+    def makeVideo(self, dimensionValues):
+        with patch.object(build_figure, 'buildFigureForLayers', self.buildFigureForLayers):
+            result = video_export.makeVideo(ExportParams(self.exportDir, dimensionValues))
+        self.assertTrue(result.success)
+        with open(os.path.join(self.exportDir, result.fileName), 'rb') as videoFile:
+            return videoFile.readline().strip(), videoFile.read()
+
+    def test_frames_piped_in_order_as_raw_rgba(self):
+        values = [str(value) for value in range(20)]
+
+        command, frames = self.makeVideo(values)
+
+        self.assertTrue('-f rawvideo -pix_fmt rgba -s 3x2 -r 10 -i -' in command)
+        self.assertEqual(frames, ''.join(chr(value) + '\x00\x00\xff' for value in range(20) for _ in range(6)))
+        self.assertEqual([name for name in os.listdir(self.exportDir) if name.endswith('.png')], [])
+
+    def test_static_layers_fetched_once(self):
+        values = [str(value) for value in range(10)]
+
+        self.makeVideo(values)
+
+        self.assertEqual(self.fetches.count(('base', None)), 1)
+        self.assertEqual(sorted(time for layer, time in self.fetches if layer == 'gpp'), sorted(values))
+
+    def test_frames_rendered_with_application_config(self):
+        values = [str(value) for value in range(10)]
+
+        self.makeVideo(values)
+
+        self.assertEqual(self.configValues, ['true'] * 10)
+
+    def test_progress_reported(self):
+        progress = []
+        with patch.object(build_figure, 'buildFigureForLayers', self.buildFigureForLayers):
+            video_export.makeVideo(ExportParams(self.exportDir, ['1', '2', '3']),
+                                   lambda written, total: progress.append((written, total)))
+
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    def test_failing_converter_gives_failed_result(self):
+        pylons.config.pop_thread_config()
+        pylons.config.push_thread_config({'video.converter.ffmpeg': 'false'})
+        with patch.object(build_figure, 'buildFigureForLayers', self.buildFigureForLayers):
+            result = video_export.makeVideo(ExportParams(self.exportDir, [str(value) for value in range(50)]))
+
+        self.assertFalse(result.success)
@@ -0,0 +1,115 @@
+'''
+Tests for parsing WMS capabilities documents in WmsCapabilityReader
+'''
+import unittest
+
+from joj.lib.parsed_wms_capability_cache import ParsedWmsCapabilityCache
+from joj.lib.wms_capability_reader import WmsCapabilityReader
+
+CAPABILITIES = '''<?xml version="1.0" encoding="UTF-8"?>
+<WMS_Capabilities version="1.3.0" xmlns="http://www.opengis.net/wms" xmlns:xlink="http://www.w3.org/1999/xlink">
+  <Service>
+    <Name>WMS</Name>
+    <Title>Model run output</Title>
+    <Abstract>JULES output</Abstract>
+  </Service>
+  <Capability>
+    <Request>
+      <GetCapabilities>
+        <DCPType><HTTP><Get><OnlineResource xlink:type="simple" xlink:href="http://thredds/wms/run1.nc"/></Get></HTTP></DCPType>
+      </GetCapabilities>
+      <GetMap>
+        <DCPType><HTTP><Get><OnlineResource xlink:type="simple" xlink:href="http://thredds/wms/run1.nc?"/></Get></HTTP></DCPType>
+      </GetMap>
+      <GetFeatureInfo>
+        <DCPType><HTTP><Get><OnlineResource xlink:type="simple" xlink:href="http://thredds/wms/run1.nc&amp;"/></Get></HTTP></DCPType>
+      </GetFeatureInfo>
+    </Request>
+    <Layer>
+      <Title>Run 1</Title>
+      <Layer>
+        <Title>gpp</Title>
+        <Name>gpp</Name>
+        <Abstract>Gross primary productivity</Abstract>
+        <Dimension name="time" units="ISO8601" default="2000-01-02">2000-01-01,2000-01-02</Dimension>
+        <Style>
+          <Name>boxfill/rainbow</Name>
+          <Title>boxfill/rainbow</Title>
+          <LegendURL width="110" height="264">
+            <OnlineResource xlink:type="simple" xlink:href="http://thredds/wms/run1.nc?REQUEST=GetLegendGraphic"/>
+          </LegendURL>
+        </Style>
+      </Layer>
+      <Layer>
+        <Title>npp</Title>
+        <Name>npp</Name>
+      </Layer>
+    </Layer>
+  </Capability>
+</WMS_Capabilities>
+'''
+
+
+class TestWmsCapabilityReader(unittest.TestCase):
+    """Tests for WmsCapabilityReader parsing and caching
+    """
+    def setUp(self):
+        self.fetches = 0
+        self.reader = WmsCapabilityReader({'wmscapabilitycache.enable': 'False'},
+                                          ParsedWmsCapabilityCache(max_size=10, time_to_live_in_s=60))
+        self.reader.wmsCapabilityCache.getWmsCapabilities = self.getWmsCapabilities
+        self.endpoint = {'wmsurl': 'http://thredds/wms/run1.nc', 'wcsurl': 'http://thredds/wcs/run1.nc'}
+
+    def getWmsCapabilities(self, wmsUrl, forceRefresh):
+        self.fetches += 1
+        return CAPABILITIES
+
+    def test_layer_tree(self):
+        nodes = self.reader.getLayers(self.endpoint, 'ds', None, None, False)
+
+        self.assertEqual(len(nodes), 1)
+        self.assertEqual(nodes[0].entity.title, 'Run 1')
+        self.assertEqual([node.entity.name for node in nodes[0].children], ['gpp', 'npp'])
+
+    def test_layer_details(self):
+        layer = self.reader.getLayers(self.endpoint, 'ds', None, None, False)[0].children[0].entity
+
+        self.assertEqual(layer.abstract, 'Gross primary productivity')
+        self.assertEqual(layer.wmsVersion, '1.3.0')
+        self.assertEqual(layer.getMapUrl, 'http://thredds/wms/run1.nc')
+        self.assertEqual(layer.getFeatureInfoUrl, 'http://thredds/wms/run1.nc')
+        self.assertEqual(layer.getCoverageUrl, 'http://thredds/wcs/run1.nc')
+        self.assertEqual(layer.dimensions, [{'name': 'time', 'units': 'ISO8601', 'unitSymbol': '',
+                                             'default': '2000-01-02',
+                                             'dimensionValues': ['2000-01-01', '2000-01-02']}])
+        self.assertEqual(layer.styles, [{'name': 'boxfill/rainbow', 'title': 'boxfill/rainbow',
+                                         'legendURL': {'width': '110', 'height': '264',
+                                                       'onlineResource':
+                                                           'http://thredds/wms/run1.nc?REQUEST=GetLegendGraphic'}}])
+
+    def test_service_data(self):
+        service = self.reader.getEndpointServiceData(self.endpoint, False)
+
+        self.assertEqual(service, {'version': '1.3.0', 'title': 'Model run output', 'abstract': 'JULES output'})
+
+    def test_capabilities_are_fetched_once(self):
+        self.reader.getLayers(self.endpoint, 'ds', None, None, False)
+        self.reader.getEndpointServiceData(self.endpoint, False)
+        self.reader.getLayers(self.endpoint, 'ds', None, None, False)
+
+        self.assertEqual(self.fetches, 1)
+
+    def test_changes_to_returned_layers_do_not_change_cached_layers(self):
+        layer = self.reader.getLayers(self.endpoint, 'ds', None, None, False)[0].children[0].entity
+        layer.styles[0]['legendURL']['onlineResource'] = 'changed'
+
+        layer = self.reader.getLayers(self.endpoint, 'ds', None, None, False)[0].children[0].entity
+
+        self.assertEqual(layer.styles[0]['legendURL']['onlineResource'],
+                         'http://thredds/wms/run1.nc?REQUEST=GetLegendGraphic')
+
+    def test_force_refresh(self):
+        self.reader.getLayers(self.endpoint, 'ds', None, None, False)
+        self.reader.getLayers(self.endpoint, 'ds', None, None, True)
+
+        self.assertEqual(self.fetches, 2)
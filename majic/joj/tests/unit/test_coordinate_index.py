@@ -0,0 +1,100 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import numpy as np
+from hamcrest import assert_that, is_
+
+from joj.tests.base import BaseTest
+from joj.services.dap_client.coordinate_index import AxisIndex, CurvilinearGridIndex
+
+
+class TestAxisIndex(BaseTest):
+
+    def test_GIVEN_increasing_axis_WHEN_find_closest_index_THEN_closest_index_returned(self):
+        index = AxisIndex([0.0, 0.5, 1.0, 1.5, 2.0])
+
+        assert_that(index.find_closest_index(1.2), is_(2))
+
+    def test_GIVEN_decreasing_axis_WHEN_find_closest_index_THEN_closest_index_returned(self):
+        index = AxisIndex([2.0, 1.5, 1.0, 0.5, 0.0])
+
+        assert_that(index.find_closest_index(1.4), is_(1))
+
+    def test_GIVEN_value_equally_close_to_two_points_WHEN_find_closest_index_THEN_lowest_index_returned(self):
+        index = AxisIndex([3.0, 2.0, 1.0])
+
+        assert_that(index.find_closest_index(1.5), is_(1))
+
+    def test_GIVEN_values_outside_axis_WHEN_find_closest_indices_THEN_end_indices_returned(self):
+        index = AxisIndex([0.0, 1.0, 2.0])
+
+        indices = index.find_closest_indices([-10.0, 10.0])
+
+        assert_that(indices.tolist(), is_([0, 2]))
+
+    def test_GIVEN_unordered_axis_WHEN_find_closest_index_THEN_same_as_full_search(self):
+        values = np.random.RandomState(1).rand(50)
+        index = AxisIndex(values)
+
+        for value in np.linspace(-0.1, 1.1, 100):
+            expected = min(range(len(values)), key=lambda i: abs(values[i] - value))
+            assert_that(index.find_closest_index(value), is_(expected))
+
+    def test_GIVEN_increasing_axis_WHEN_find_first_index_at_or_after_THEN_index_of_value_returned(self):
+        index = AxisIndex([0, 1800, 3600, 5400])
+
+        assert_that(index.find_first_index_at_or_after(1800), is_(1))
+        assert_that(index.find_first_index_at_or_after(1801), is_(2))
+        assert_that(index.find_first_index_at_or_after(5401), is_(None))
+
+    def test_GIVEN_increasing_axis_WHEN_find_last_index_at_or_before_THEN_index_of_value_returned(self):
+        index = AxisIndex([0, 1800, 3600, 5400])
+
+        assert_that(index.find_last_index_at_or_before(3600), is_(2))
+        assert_that(index.find_last_index_at_or_before(3599), is_(1))
+        assert_that(index.find_last_index_at_or_before(-1), is_(None))
+
+
+class TestCurvilinearGridIndex(BaseTest):
+
+    def setUp(self):
+        rows, columns = np.meshgrid(np.arange(40), np.arange(50), indexing='ij')
+        self.lat = 49 + rows * 0.1 + columns * 0.01
+        self.lon = -8 + columns * 0.15 - rows * 0.02
+        self.index = CurvilinearGridIndex(self.lat, self.lon)
+
+    def _find_by_full_search(self, lat, lon):
+        lat_diff = self.lat - lat
+        lon_diff = self.lon - lon
+        return np.argmin(lat_diff * lat_diff + lon_diff * lon_diff)
+
+    def test_GIVEN_points_in_grid_WHEN_find_closest_index_THEN_same_as_full_search(self):
+        random = np.random.RandomState(2)
+        for lat, lon in zip(random.uniform(49, 53, 200), random.uniform(-8, -1, 200)):
+            assert_that(self.index.find_closest_index(lat, lon), is_(self._find_by_full_search(lat, lon)))
+
+    def test_GIVEN_point_far_outside_grid_WHEN_find_closest_index_THEN_same_as_full_search(self):
+        assert_that(self.index.find_closest_index(70, 20), is_(self._find_by_full_search(70, 20)))
+
+    def test_GIVEN_grid_point_WHEN_find_closest_indices_THEN_flattened_indices_of_points_returned(self):
+        lats = [self.lat[3, 4], self.lat[20, 30]]
+        lons = [self.lon[3, 4], self.lon[20, 30]]
+
+        indices = self.index.find_closest_indices(lats, lons)
+
+        assert_that(indices.tolist(), is_([3 * 50 + 4, 20 * 50 + 30]))
@@ -0,0 +1,130 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import shutil
+import tempfile
+from hamcrest import assert_that, is_, none
+from mock import Mock
+
+from joj.tests.base import BaseTest
+from joj.crowd.client import CrowdClient, SessionNotFoundException
+from joj.crowd.token_cache import CrowdTokenCache
+
+
+class TestCrowdTokenCache(BaseTest):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = CrowdTokenCache(max_size=2, time_to_live_in_s=20, clock=lambda: self.now)
+
+    def test_GIVEN_token_not_verified_WHEN_get_THEN_none_returned_and_miss_counted(self):
+        user = self.cache.get("token")
+
+        assert_that(user, none())
+        assert_that(self.cache.get_statistics()['misses'], is_(1))
+
+    def test_GIVEN_token_verified_WHEN_get_THEN_user_returned_and_hit_counted(self):
+        self.cache.put("token", {'name': 'user'})
+
+        user = self.cache.get("token")
+
+        assert_that(user, is_({'name': 'user'}))
+        assert_that(self.cache.get_statistics()['hit_rate'], is_(1.0))
+
+    def test_GIVEN_token_verified_longer_ago_than_time_to_live_WHEN_get_THEN_none_returned(self):
+        self.cache.put("token", {'name': 'user'})
+        self.now += 21
+
+        assert_that(self.cache.get("token"), none())
+
+    def test_GIVEN_cache_full_WHEN_put_THEN_least_recently_used_token_evicted(self):
+        self.cache.put("token1", {'name': 'user1'})
+        self.cache.put("token2", {'name': 'user2'})
+        self.cache.get("token1")
+
+        self.cache.put("token3", {'name': 'user3'})
+
+        assert_that(self.cache.get("token2"), none())
+        assert_that(self.cache.get("token1"), is_({'name': 'user1'}))
+        assert_that(self.cache.get_statistics()['size'], is_(2))
+
+    def test_GIVEN_token_verified_WHEN_invalidate_THEN_none_returned(self):
+        self.cache.put("token", {'name': 'user'})
+
+        self.cache.invalidate("token")
+
+        assert_that(self.cache.get("token"), none())
+
+    def test_GIVEN_verifications_recorded_WHEN_get_statistics_THEN_mean_and_max_time_returned(self):
+        self.cache.record_verification(0.1)
+        self.cache.record_verification(0.3)
+
+        statistics = self.cache.get_statistics()
+
+        assert_that(statistics['verifications'], is_(2))
+        assert_that(round(statistics['mean_verification_time_in_s'], 6), is_(0.2))
+        assert_that(statistics['max_verification_time_in_s'], is_(0.3))
+
+    def test_GIVEN_shared_file_cache_WHEN_token_invalidated_in_other_process_THEN_none_returned(self):
+        data_dir = tempfile.mkdtemp()
+        try:
+            config = {'crowd_token_cache.type': 'file', 'crowd_token_cache.data_dir': data_dir}
+            self.cache.configure(config)
+            other_process_cache = CrowdTokenCache(clock=lambda: self.now)
+            other_process_cache.configure(config)
+            self.cache.put("token", {'name': 'user'})
+            assert_that(other_process_cache.get("token"), is_({'name': 'user'}))
+
+            other_process_cache.invalidate("token")
+
+            assert_that(self.cache.get("token"), none())
+        finally:
+            shutil.rmtree(data_dir)
+
+
+class TestCrowdClientVerifyUserSession(BaseTest):
+
+    def setUp(self):
+        self.cache = CrowdTokenCache(max_size=10, time_to_live_in_s=20)
+        self.client = CrowdClient(token_cache=self.cache)
+        self.client._make_request = Mock(return_value={'user': {'name': 'user'}, 'token': 'token'})
+
+    def test_GIVEN_token_verified_recently_WHEN_verify_user_session_THEN_crowd_not_called_again(self):
+        self.client.verify_user_session('token')
+
+        result = self.client.verify_user_session('token')
+
+        assert_that(result, is_({'user': {'name': 'user'}, 'token': 'token'}))
+        assert_that(self.client._make_request.call_count, is_(1))
+        assert_that(self.cache.get_statistics()['verifications'], is_(1))
+
+    def test_GIVEN_token_invalid_WHEN_verify_user_session_THEN_exception_raised_and_token_not_cached(self):
+        self.client._make_request.side_effect = SessionNotFoundException()
+
+        with self.assertRaises(SessionNotFoundException):
+            self.client.verify_user_session('token')
+
+        assert_that(self.cache.get('token'), none())
+
+    def test_GIVEN_session_deleted_WHEN_verify_user_session_THEN_crowd_called_again(self):
+        self.client.verify_user_session('token')
+
+        self.client.delete_session('token')
+        self.client.verify_user_session('token')
+
+        assert_that(self.client._make_request.call_count, is_(3))
@@ -0,0 +1,104 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import threading
+from hamcrest import assert_that, is_, contains
+from mock import Mock
+from pylons import config
+
+from joj.tests.base import BaseTest
+from joj.services.dap_client.dap_client_factory import DapClientFactory
+
+
+class TestDapClientFactoryGetGraphsData(BaseTest):
+
+    def setUp(self):
+        self.factory = DapClientFactory(dataset_cache=Mock(), series_cache=Mock())
+        self.clients = {}
+        self.factory.get_graphing_dap_client = Mock(side_effect=lambda url: self.clients[url])
+
+    def _add_client(self, url, grid_key):
+        client = Mock()
+        client.get_grid_key.return_value = grid_key
+        client.get_lat_lon_index.return_value = (len(self.clients), 0)
+        client.get_graph_data.side_effect = \
+            lambda lat, lon, time, **kwargs: {'url': url, 'time': time, 'label': kwargs['run_name'],
+                                              'index': kwargs['lat_lon_index'], 'thread': threading.current_thread(),
+                                              'block_size': config.get('dap_client.series_read_block_size')}
+        self.clients[url] = client
+        return client
+
+    def test_GIVEN_no_urls_WHEN_get_graphs_data_THEN_empty_list_returned(self):
+        graphs = self.factory.get_graphs_data([], 51, -1, [], [])
+
+        assert_that(graphs, is_([]))
+
+    def test_GIVEN_several_datasets_WHEN_get_graphs_data_THEN_graphs_returned_in_order_of_urls(self):
+        for url in ["url1", "url2", "url3"]:
+            self._add_client(url, url)
+
+        graphs = self.factory.get_graphs_data(["url3", "url1", "url2"], 51, -1, ["t3", "t1", "t2"], ["r3", "r1", "r2"])
+
+        assert_that([(graph['url'], graph['time'], graph['label']) for graph in graphs],
+                    contains(("url3", "t3", "r3"), ("url1", "t1", "r1"), ("url2", "t2", "r2")))
+
+    def test_GIVEN_datasets_on_same_grid_WHEN_get_graphs_data_THEN_point_located_once_for_the_grid(self):
+        first = self._add_client("url1", "grid")
+        second = self._add_client("url2", "grid")
+        other = self._add_client("url3", "other grid")
+
+        graphs = self.factory.get_graphs_data(["url1", "url2", "url3"], 51, -1, [None] * 3, [""] * 3)
+
+        lookups = first.get_lat_lon_index.call_count + second.get_lat_lon_index.call_count
+        assert_that(lookups, is_(1))
+        assert_that(other.get_lat_lon_index.call_count, is_(1))
+        assert_that(graphs[0]['index'], is_(graphs[1]['index']))
+
+    def test_GIVEN_several_datasets_WHEN_get_graphs_data_THEN_datasets_read_in_worker_threads(self):
+        for url in ["url1", "url2"]:
+            self._add_client(url, url)
+
+        graphs = self.factory.get_graphs_data(["url1", "url2"], 51, -1, [None] * 2, [""] * 2)
+
+        assert_that(any(graph['thread'] is threading.current_thread() for graph in graphs), is_(False))
+
+    def test_GIVEN_app_config_WHEN_get_graphs_data_THEN_worker_threads_use_app_config(self):
+        opened_with_block_size = []
+
+        def _get_graphing_dap_client(url):
+            opened_with_block_size.append(config.get('dap_client.series_read_block_size'))
+            return self.clients[url]
+        self.factory.get_graphing_dap_client.side_effect = _get_graphing_dap_client
+        for url in ["url1", "url2"]:
+            self._add_client(url, url)
+
+        config.push_thread_config({'dap_client.series_read_block_size': '7'})
+        try:
+            graphs = self.factory.get_graphs_data(["url1", "url2"], 51, -1, [None] * 2, [""] * 2)
+        finally:
+            config.pop_thread_config()
+
+        assert_that(opened_with_block_size, is_(['7', '7']))
+        assert_that([graph['block_size'] for graph in graphs], is_(['7', '7']))
+
+    def test_GIVEN_dataset_fails_to_open_WHEN_get_graphs_data_THEN_exception_raised(self):
+        self._add_client("url1", "grid")
+        self.factory.get_graphing_dap_client.side_effect = IOError("can not open")
+
+        with self.assertRaises(IOError):
+            self.factory.get_graphs_data(["url1"], 51, -1, [None], [""])
@@ -0,0 +1,102 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_, is_not, same_instance
+from mock import Mock
+
+from joj.tests.base import BaseTest
+from joj.services.dap_client.dap_dataset_cache import DapDatasetCache
+
+
+class TestDapDatasetCache(BaseTest):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = DapDatasetCache(max_size=2, time_to_live_in_s=60, clock=lambda: self.now)
+        self.open_dataset = Mock(side_effect=lambda url: "dataset for " + url)
+
+    def test_GIVEN_url_not_in_cache_WHEN_get_THEN_dataset_opened_and_miss_counted(self):
+        entry = self.cache.get("url1", self.open_dataset)
+
+        assert_that(entry.dataset, is_("dataset for url1"))
+        assert_that(self.open_dataset.call_count, is_(1))
+        assert_that(self.cache.get_statistics()['misses'], is_(1))
+
+    def test_GIVEN_url_in_cache_WHEN_get_THEN_dataset_not_reopened_and_hit_counted(self):
+        first = self.cache.get("url1", self.open_dataset)
+
+        second = self.cache.get("url1", self.open_dataset)
+
+        assert_that(second, same_instance(first))
+        assert_that(self.open_dataset.call_count, is_(1))
+        assert_that(self.cache.get_statistics()['hits'], is_(1))
+
+    def test_GIVEN_entry_older_than_time_to_live_WHEN_get_THEN_dataset_reopened(self):
+        first = self.cache.get("url1", self.open_dataset)
+        self.now += 61
+
+        second = self.cache.get("url1", self.open_dataset)
+
+        assert_that(second, is_not(same_instance(first)))
+        assert_that(self.open_dataset.call_count, is_(2))
+
+    def test_GIVEN_cache_full_WHEN_get_new_url_THEN_least_recently_used_evicted(self):
+        self.cache.get("url1", self.open_dataset)
+        self.cache.get("url2", self.open_dataset)
+        self.cache.get("url1", self.open_dataset)
+
+        self.cache.get("url3", self.open_dataset)
+        self.cache.get("url1", self.open_dataset)
+        self.cache.get("url2", self.open_dataset)
+
+        assert_that(self.open_dataset.call_count, is_(4))
+        assert_that(self.cache.get_statistics()['size'], is_(2))
+
+    def test_GIVEN_url_in_cache_WHEN_invalidate_THEN_dataset_reopened_on_next_get(self):
+        self.cache.get("url1", self.open_dataset)
+
+        self.cache.invalidate("url1")
+        self.cache.get("url1", self.open_dataset)
+
+        assert_that(self.open_dataset.call_count, is_(2))
+
+    def test_GIVEN_dataset_fails_to_open_WHEN_get_THEN_exception_raised_and_nothing_cached(self):
+        self.open_dataset.side_effect = IOError("can not open")
+
+        with self.assertRaises(IOError):
+            self.cache.get("url1", self.open_dataset)
+
+        assert_that(self.cache.get_statistics()['size'], is_(0))
+
+    def test_GIVEN_cache_size_zero_WHEN_get_twice_THEN_dataset_opened_twice(self):
+        cache = DapDatasetCache(max_size=0, time_to_live_in_s=60)
+
+        cache.get("url1", self.open_dataset)
+        cache.get("url1", self.open_dataset)
+
+        assert_that(self.open_dataset.call_count, is_(2))
+
+    def test_GIVEN_coordinate_read_WHEN_get_coordinate_again_THEN_coordinate_not_reread(self):
+        entry = self.cache.get("url1", self.open_dataset)
+        read_latitude = Mock(return_value=[1, 2, 3])
+
+        entry.get_coordinate("lat", read_latitude)
+        latitude = entry.get_coordinate("lat", read_latitude)
+
+        assert_that(latitude, is_([1, 2, 3]))
+        assert_that(read_latitude.call_count, is_(1))
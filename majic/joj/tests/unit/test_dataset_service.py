@@ -0,0 +1,89 @@
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from mock import MagicMock
+from hamcrest import *
+from sqlalchemy.orm.exc import NoResultFound
+
+from joj.tests.base import BaseTest
+from joj.model import User, Dataset, ModelRun, ModelRunStatus
+from joj.services.dataset import DatasetService
+from joj.utils import constants
+
+
+class DatasetServiceGetModelRunDatasetsTest(BaseTest):
+
+    def setUp(self):
+        super(DatasetServiceGetModelRunDatasetsTest, self).setUp()
+        self.session = MagicMock()
+        self.query = self.session.query.return_value
+        self.query.join.return_value = self.query
+        self.query.options.return_value = self.query
+        self.query.filter.return_value = self.query
+        self.dataset_service = DatasetService(session=lambda: self.session)
+
+        self.user = User()
+        self.user.id = 10
+
+    def _create_dataset(self, dataset_id, user_id, status_name):
+        model_run = ModelRun()
+        model_run.user_id = user_id
+        model_run.status = ModelRunStatus(status_name)
+        dataset = Dataset()
+        dataset.id = dataset_id
+        dataset.model_run = model_run
+        return dataset
+
+    def test_GIVEN_users_own_datasets_WHEN_get_model_run_datasets_by_ids_THEN_datasets_returned_in_order_of_ids(self):
+        first = self._create_dataset(1, self.user.id, constants.MODEL_RUN_STATUS_COMPLETED)
+        second = self._create_dataset(2, self.user.id, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.query.all.return_value = [first, second]
+
+        datasets = self.dataset_service.get_model_run_datasets_by_ids(['2', '1'], self.user)
+
+        assert_that(datasets, contains(second, first))
+
+    def test_GIVEN_published_run_of_another_user_WHEN_get_model_run_datasets_by_ids_THEN_dataset_returned(self):
+        dataset = self._create_dataset(1, self.user.id + 1, constants.MODEL_RUN_STATUS_PUBLISHED)
+        self.query.all.return_value = [dataset]
+
+        datasets = self.dataset_service.get_model_run_datasets_by_ids(['1'], self.user)
+
+        assert_that(datasets, contains(dataset))
+
+    def test_GIVEN_unpublished_run_of_another_user_WHEN_get_model_run_datasets_by_ids_THEN_refused(self):
+        own = self._create_dataset(1, self.user.id, constants.MODEL_RUN_STATUS_COMPLETED)
+        unpublished = self._create_dataset(2, self.user.id + 1, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.query.all.return_value = [own, unpublished]
+
+        assert_that(calling(self.dataset_service.get_model_run_datasets_by_ids).with_args(['1', '2'], self.user),
+                    raises(NoResultFound))
+
+    def test_GIVEN_dataset_only_viewable_by_another_user_WHEN_get_model_run_datasets_by_ids_THEN_refused(self):
+        # the query leaves out datasets which are only viewable by another user
+        own = self._create_dataset(1, self.user.id, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.query.all.return_value = [own]
+
+        assert_that(calling(self.dataset_service.get_model_run_datasets_by_ids).with_args(['1', '2'], self.user),
+                    raises(NoResultFound))
+        criteria = [str(criterion.compile(compile_kwargs={'literal_binds': True}))
+                    for criterion in self.query.filter.call_args[0]]
+        assert_that(criteria, has_item(contains_string('viewable_by_user_id = 10')))
+
+    def test_GIVEN_non_integer_id_WHEN_get_model_run_datasets_by_ids_THEN_value_error(self):
+        assert_that(calling(self.dataset_service.get_model_run_datasets_by_ids).with_args(['a'], self.user),
+                    raises(ValueError))
@@ -0,0 +1,110 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_, none, same_instance
+from mock import Mock
+from sqlalchemy.orm.exc import NoResultFound
+
+from joj.tests.base import BaseTest
+from joj.lib.finished_model_run_cache import FinishedModelRunCache
+from joj.services.model_run_service import ModelRunService
+from joj.utils import constants
+
+
+def _create_model_run(id, status_name, user_id=1, viewable_by_any_user=False):
+    model_run = Mock()
+    model_run.id = id
+    model_run.user_id = user_id
+    model_run.status.name = status_name
+    model_run.status.is_viewable_by_any_majic_user.return_value = viewable_by_any_user
+    return model_run
+
+
+class TestFinishedModelRunCache(BaseTest):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = FinishedModelRunCache(max_size=2, time_to_live_in_s=30, clock=lambda: self.now)
+
+    def test_GIVEN_completed_run_put_WHEN_get_THEN_run_returned(self):
+        model_run = _create_model_run(1, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.cache.put(model_run)
+
+        assert_that(self.cache.get("1"), same_instance(model_run))
+        assert_that(self.cache.get_statistics()['hits'], is_(1))
+
+    def test_GIVEN_running_run_put_WHEN_get_THEN_none_returned(self):
+        self.cache.put(_create_model_run(1, constants.MODEL_RUN_STATUS_RUNNING))
+
+        assert_that(self.cache.get(1), none())
+
+    def test_GIVEN_run_older_than_time_to_live_WHEN_get_THEN_none_returned(self):
+        self.cache.put(_create_model_run(1, constants.MODEL_RUN_STATUS_PUBLISHED))
+        self.now += 31
+
+        assert_that(self.cache.get(1), none())
+
+    def test_GIVEN_cache_full_WHEN_put_THEN_least_recently_used_run_evicted(self):
+        self.cache.put(_create_model_run(1, constants.MODEL_RUN_STATUS_COMPLETED))
+        self.cache.put(_create_model_run(2, constants.MODEL_RUN_STATUS_COMPLETED))
+        self.cache.get(1)
+
+        self.cache.put(_create_model_run(3, constants.MODEL_RUN_STATUS_COMPLETED))
+
+        assert_that(self.cache.get(2), none())
+        assert_that(self.cache.get(1).id, is_(1))
+
+    def test_GIVEN_run_in_cache_WHEN_invalidate_THEN_none_returned(self):
+        self.cache.put(_create_model_run(1, constants.MODEL_RUN_STATUS_COMPLETED))
+
+        self.cache.invalidate(1)
+
+        assert_that(self.cache.get(1), none())
+
+
+class TestModelRunServiceGetModelById(BaseTest):
+
+    def setUp(self):
+        self.session = Mock()
+        self.cache = FinishedModelRunCache(max_size=10, time_to_live_in_s=30)
+        self.service = ModelRunService(self.session, finished_model_run_cache=self.cache)
+        self.user = Mock()
+        self.user.id = 1
+
+    def test_GIVEN_finished_run_in_cache_WHEN_get_model_by_id_THEN_run_returned_without_database_query(self):
+        model_run = _create_model_run(5, constants.MODEL_RUN_STATUS_COMPLETED)
+        self.cache.put(model_run)
+
+        result = self.service.get_model_by_id(self.user, 5)
+
+        assert_that(result, same_instance(model_run))
+        assert_that(self.session.call_count, is_(0))
+
+    def test_GIVEN_other_users_unpublished_run_in_cache_WHEN_get_model_by_id_THEN_no_result(self):
+        self.cache.put(_create_model_run(5, constants.MODEL_RUN_STATUS_COMPLETED, user_id=2))
+
+        with self.assertRaises(NoResultFound):
+            self.service.get_model_by_id(self.user, 5)
+
+    def test_GIVEN_other_users_published_run_in_cache_WHEN_get_model_by_id_THEN_run_returned(self):
+        model_run = _create_model_run(5, constants.MODEL_RUN_STATUS_PUBLISHED, user_id=2, viewable_by_any_user=True)
+        self.cache.put(model_run)
+
+        result = self.service.get_model_by_id(self.user, 5)
+
+        assert_that(result, same_instance(model_run))
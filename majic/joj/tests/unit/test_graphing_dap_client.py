@@ -0,0 +1,153 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import datetime
+import numpy as np
+from hamcrest import assert_that, is_, contains, has_key, is_not
+from mock import Mock
+
+from joj.tests.base import BaseTest
+from joj.services.dap_client.dap_dataset_cache import DapDatasetCacheEntry
+from joj.services.dap_client.graphing_dap_client import GraphingDapClient, downsample_min_max
+from joj.services.dap_client.time_series_cache import TimeSeriesCache
+
+MILLIS_AT_1970 = 0.0
+SECONDS_PER_DAY = 24 * 60 * 60
+MILLIS_PER_DAY = SECONDS_PER_DAY * 1000.0
+
+
+class TestDownsampleMinMax(BaseTest):
+
+    def test_GIVEN_fewer_values_than_points_WHEN_downsample_THEN_all_points_kept(self):
+        indices = downsample_min_max(np.array([3.0, 1.0, 2.0]), 5)
+
+        assert_that(list(indices), is_([0, 1, 2]))
+
+    def test_GIVEN_many_values_WHEN_downsample_THEN_minimum_and_maximum_of_each_bucket_kept(self):
+        values = np.array([5.0, 1.0, 9.0, 4.0, 7.0, 3.0, 8.0, 2.0])
+
+        indices = downsample_min_max(values, 4)
+
+        assert_that(list(indices), is_([1, 2, 6, 7]))
+
+    def test_GIVEN_many_values_WHEN_downsample_THEN_global_extremes_kept(self):
+        values = np.sin(np.linspace(0, 100, 100000))
+        values[31234] = 5.0
+        values[77777] = -5.0
+
+        indices = downsample_min_max(values, 1000)
+
+        assert_that(len(indices) <= 1000, is_(True))
+        assert_that(values[indices].max(), is_(5.0))
+        assert_that(values[indices].min(), is_(-5.0))
+
+    def test_GIVEN_bucket_of_missing_values_WHEN_downsample_THEN_first_point_of_bucket_kept(self):
+        values = np.array([5.0, 1.0, np.nan, np.nan, np.nan, np.nan, 8.0, 2.0])
+
+        indices = downsample_min_max(values, 6)
+
+        assert_that(list(indices), is_([0, 1, 2, 6, 7]))
+
+
+class TestGraphingDapClient(BaseTest):
+
+    def _create_client(self, values, time_units="seconds since 1970-01-01 00:00:00", series_cache=None):
+        """
+        Create a graphing dap client for a single cell grid with a time axis of one time per value, a day apart
+        """
+        client = GraphingDapClient.__new__(GraphingDapClient)
+        client.url = "url"
+        client._dataset_cache_entry = DapDatasetCacheEntry(None, None)
+        client._series_cache = series_cache
+        client._lat = np.array([51.0])
+        client._lon = np.array([-1.0])
+        client._time = np.arange(len(values), dtype=np.float64) * SECONDS_PER_DAY
+        client._time_units = time_units
+        client._start_date = client._get_data_start_date()
+        client._variable = Mock()
+        client._variable.array = np.array(values, dtype=np.float32).reshape(len(values), 1, 1)
+        client._variable.attributes = {'long_name': 'Rainfall', 'missing_value': -99.0}
+        client._variable.units = 'mm'
+        client.gse_lat_n = client.gse_lat_s = 51.0
+        client.gse_lon_w = client.gse_lon_e = -1.0
+        return client
+
+    def test_GIVEN_times_in_seconds_WHEN_get_graph_data_THEN_times_converted_to_millis(self):
+        client = self._create_client([1.0, 2.0, 3.0])
+
+        data = client.get_graph_data(51.0, -1.0, None)
+
+        assert_that(data['data'], is_([[MILLIS_AT_1970, 1.0], [MILLIS_PER_DAY, 2.0], [2 * MILLIS_PER_DAY, 3.0]]))
+        assert_that(data['xmax'], is_(2 * MILLIS_PER_DAY))
+
+    def test_GIVEN_times_in_hours_since_1900_WHEN_get_graph_data_THEN_times_match_converting_each_time(self):
+        client = self._create_client([1.0, 2.0, 3.0], time_units="hours since 1900-01-01 00:00:00")
+        client._time = np.array([0.5, 1000.25, 613608.0])
+
+        data = client.get_graph_data(51.0, -1.0, None)
+
+        expected_millis = [client._get_millis_since_epoch(time) for time in client._time]
+        assert_that([row[0] for row in data['data']], is_(expected_millis))
+
+    def test_GIVEN_missing_value_WHEN_get_graph_data_THEN_value_is_none_and_range_from_valid_values(self):
+        client = self._create_client([1.0, -99.0, 3.0])
+
+        data = client.get_graph_data(51.0, -1.0, None)
+
+        assert_that([row[1] for row in data['data']], is_([1.0, None, 3.0]))
+        assert_that((data['ymin'], data['ymax']), is_((1.0, 3.0)))
+
+    def test_GIVEN_start_and_end_time_WHEN_get_graph_data_THEN_times_between_returned(self):
+        client = self._create_client([1.0, 2.0, 3.0, 4.0, 5.0])
+
+        data = client.get_graph_data(51.0, -1.0, None, start_time=datetime.datetime(1970, 1, 2),
+                                     end_time=datetime.datetime(1970, 1, 4))
+
+        assert_that([row[1] for row in data['data']], is_([2.0, 3.0, 4.0]))
+
+    def test_GIVEN_long_range_WHEN_get_graph_data_compact_THEN_downsampled_times_and_values_returned(self):
+        values = [float(i % 7) for i in range(1000)]
+        client = self._create_client(values)
+
+        data = client.get_graph_data(51.0, -1.0, None, npoints=100, start_time=datetime.datetime(1970, 1, 1),
+                                     compact=True)
+
+        assert_that(data, is_not(has_key('data')))
+        assert_that(len(data['times']), is_(len(data['values'])))
+        assert_that(len(data['values']) <= 100, is_(True))
+        assert_that((min(data['values']), max(data['values'])), is_((0.0, 6.0)))
+
+    def test_GIVEN_series_cache_WHEN_get_graph_data_twice_THEN_dataset_read_once(self):
+        series_cache = TimeSeriesCache(max_values=100, time_to_live_in_s=60)
+        client = self._create_client([1.0, 2.0, 3.0], series_cache=series_cache)
+        client.get_data_block = Mock(wraps=client.get_data_block)
+
+        client.get_graph_data(51.0, -1.0, None, npoints=1)
+        data = client.get_graph_data(51.0, -1.0, None, start_time=datetime.datetime(1970, 1, 2))
+
+        assert_that(client.get_data_block.call_count, is_(1))
+        assert_that(data['data'], contains([MILLIS_PER_DAY, 2.0], [2 * MILLIS_PER_DAY, 3.0]))
+
+    def test_GIVEN_datasets_on_same_grid_WHEN_get_grid_key_THEN_keys_equal(self):
+        client = self._create_client([1.0])
+        same_grid_client = self._create_client([2.0, 3.0])
+        other_grid_client = self._create_client([1.0])
+        other_grid_client._lat = np.array([52.0])
+
+        assert_that(client.get_grid_key(), is_(same_grid_client.get_grid_key()))
+        assert_that(client.get_grid_key(), is_not(other_grid_client.get_grid_key()))
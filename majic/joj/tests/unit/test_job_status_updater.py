@@ -0,0 +1,115 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_, has_entries, contains_inanyorder
+from mock import Mock, MagicMock
+
+from joj.tests.base import BaseTest
+from joj.model import ModelRun
+from joj.services.job_status_updater import JobStatusUpdaterService
+from joj.services.dap_client.dap_client import DapClientException
+from joj.utils import constants
+
+
+class TestJobStatusUpdater(BaseTest):
+
+    def setUp(self):
+        super(TestJobStatusUpdater, self).setUp()
+        self.session = MagicMock()
+        self.session.query.return_value.filter.side_effect = self._query_model_run
+        self.job_runner_client = Mock()
+        self.job_status_updater = JobStatusUpdaterService(
+            self.job_runner_client,
+            {'job_status_updater.max_workers': '2'},
+            session=lambda: self.session,
+            model_run_service=Mock(),
+            email_service=Mock(),
+            dataset_service=Mock(),
+            dap_client_factory=Mock())
+
+    def _query_model_run(self, criterion):
+        model_run = ModelRun()
+        model_run.id = criterion.right.value
+        query = Mock()
+        query.options.return_value.one.return_value = model_run
+        return query
+
+    def _get_datasets_failing_for_model_run_2(self, model_run, session):
+        if model_run.id == 2:
+            raise DapClientException("THREDDS server down")
+        return ["dataset for run {}".format(model_run.id)]
+
+    def _job_statuses(self, model_ids, status=constants.MODEL_RUN_STATUS_COMPLETED):
+        return {model_id: {'status': status, 'error_message': ''} for model_id in model_ids}
+
+    def test_GIVEN_lookup_fails_for_one_model_run_WHEN_get_datasets_for_completed_runs_THEN_others_returned(self):
+        self.job_status_updater._get_datasets = Mock(side_effect=self._get_datasets_failing_for_model_run_2)
+        job_statuses = self._job_statuses([1, 2, 3])
+
+        datasets, failed_model_ids = self.job_status_updater._get_datasets_for_completed_model_runs(
+            job_statuses, [1, 2, 3])
+
+        assert_that(datasets, is_({1: ["dataset for run 1"], 3: ["dataset for run 3"]}))
+        assert_that(failed_model_ids, is_({2}))
+
+    def test_GIVEN_lookup_raises_general_exception_WHEN_get_datasets_for_completed_runs_THEN_run_failed(self):
+        self.job_status_updater._get_datasets = Mock(side_effect=Exception("unexpected"))
+        job_statuses = self._job_statuses([1])
+
+        datasets, failed_model_ids = self.job_status_updater._get_datasets_for_completed_model_runs(
+            job_statuses, [1])
+
+        assert_that(datasets, is_({}))
+        assert_that(failed_model_ids, is_({1}))
+
+    def test_GIVEN_model_runs_not_completed_WHEN_get_datasets_for_completed_runs_THEN_no_lookups(self):
+        self.job_status_updater._get_datasets = Mock()
+        job_statuses = self._job_statuses([1], constants.MODEL_RUN_STATUS_RUNNING)
+
+        datasets, failed_model_ids = self.job_status_updater._get_datasets_for_completed_model_runs(
+            job_statuses, [1, 2])
+
+        assert_that(datasets, is_({}))
+        assert_that(failed_model_ids, is_(set()))
+        assert_that(self.job_status_updater._get_datasets.called, is_(False))
+
+    def test_GIVEN_dataset_lookup_fails_for_model_run_WHEN_update_THEN_run_left_out_of_batched_write(self):
+        job_statuses = self._job_statuses([1, 2, 3])
+        self.job_status_updater._get_ids_for_submitted_model_runs = Mock(return_value=[1, 2, 3])
+        self.job_runner_client.get_run_model_statuses.return_value = job_statuses
+        self.job_status_updater._get_datasets = Mock(side_effect=self._get_datasets_failing_for_model_run_2)
+        self.job_status_updater._update_model_run_statuses = Mock(return_value=[])
+        self.job_status_updater._check_total_allocation_and_alert = Mock()
+
+        self.job_status_updater.update()
+
+        update_args = self.job_status_updater._update_model_run_statuses.call_args[0]
+        assert_that(update_args[0], is_(job_statuses))
+        assert_that(update_args[1], is_([1, 3]))
+        assert_that(update_args[2], has_entries({1: ["dataset for run 1"], 3: ["dataset for run 3"]}))
+
+    def test_GIVEN_batch_write_fails_WHEN_update_model_run_statuses_THEN_each_run_written_on_its_own(self):
+        def _update_in_transaction(job_statuses, model_ids, datasets):
+            if len(model_ids) > 1 or model_ids == [2]:
+                raise Exception("database problem")
+            return ["model run {}".format(model_ids[0])]
+        self.job_status_updater._update_model_run_statuses_in_transaction = Mock(side_effect=_update_in_transaction)
+
+        model_runs = self.job_status_updater._update_model_run_statuses(self._job_statuses([1, 2, 3]), [1, 2, 3], {})
+
+        assert_that(model_runs, contains_inanyorder("model run 1", "model run 3"))
@@ -0,0 +1,141 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import datetime as dt
+
+from hamcrest import assert_that, is_, none, contains
+from mock import patch
+
+from joj.model import ModelRun, DrivingDataset, DrivingDatasetParameterValue, Parameter, ParameterValue, Namelist
+from joj.tests.base import BaseTest
+from joj.utils import constants, f90_helper
+
+
+def _create_parameter(namelist_name, name):
+    parameter = Parameter()
+    parameter.name = name
+    parameter.namelist = Namelist()
+    parameter.namelist.name = namelist_name
+    return parameter
+
+
+def _create_parameter_value(parameter_namelist_name, value, group_id=None):
+    parameter_value = ParameterValue()
+    parameter_value.parameter = _create_parameter(parameter_namelist_name[0], parameter_namelist_name[1])
+    parameter_value.set_value_from_python(value)
+    parameter_value.group_id = group_id
+    return parameter_value
+
+
+class TestIndexedParameterValues(BaseTest):
+
+    def setUp(self):
+        self.model_run = ModelRun()
+        self.model_run.parameter_values = [
+            _create_parameter_value(constants.JULES_PARAM_RUN_START, dt.datetime(1901, 1, 1)),
+            _create_parameter_value(constants.JULES_PARAM_OUTPUT_VAR, 'gpp', group_id=0),
+            _create_parameter_value(constants.JULES_PARAM_OUTPUT_PERIOD, constants.JULES_MONTHLY_PERIOD, group_id=1),
+            _create_parameter_value(constants.JULES_PARAM_OUTPUT_VAR, 'npp', group_id=1),
+            _create_parameter_value(constants.JULES_PARAM_OUTPUT_PERIOD, constants.JULES_YEARLY_PERIOD, group_id=0),
+            _create_parameter_value(constants.JULES_PARAM_LAT_BOUNDS, [50, 52])]
+
+    def test_GIVEN_parameter_in_run_WHEN_get_python_parameter_value_THEN_value_returned(self):
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_RUN_START)
+
+        assert_that(value, is_(dt.datetime(1901, 1, 1)))
+
+    def test_GIVEN_parameter_not_in_run_WHEN_get_python_parameter_value_THEN_none_returned(self):
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_RUN_END)
+
+        assert_that(value, none())
+
+    def test_GIVEN_parameter_repeated_WHEN_get_python_parameter_value_THEN_first_value_returned(self):
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_OUTPUT_VAR)
+
+        assert_that(value, is_('gpp'))
+
+    def test_GIVEN_list_parameter_WHEN_get_python_parameter_value_as_list_THEN_list_returned(self):
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_LAT_BOUNDS, is_list=True)
+
+        assert_that(value, is_([50, 52]))
+
+    def test_GIVEN_list_value_changed_by_caller_WHEN_get_python_parameter_value_THEN_original_list_returned(self):
+        self.model_run.get_python_parameter_value(constants.JULES_PARAM_LAT_BOUNDS, is_list=True).append(54)
+
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_LAT_BOUNDS, is_list=True)
+
+        assert_that(value, is_([50, 52]))
+
+    def test_GIVEN_parameter_value_added_after_lookup_WHEN_get_python_parameter_value_THEN_new_value_found(self):
+        self.model_run.get_python_parameter_value(constants.JULES_PARAM_RUN_END)
+        self.model_run.parameter_values.append(
+            _create_parameter_value(constants.JULES_PARAM_RUN_END, dt.datetime(1902, 1, 1)))
+
+        value = self.model_run.get_python_parameter_value(constants.JULES_PARAM_RUN_END)
+
+        assert_that(value, is_(dt.datetime(1902, 1, 1)))
+
+    def test_GIVEN_groups_WHEN_get_parameter_values_for_group_THEN_values_in_group_returned(self):
+        values = self.model_run.get_parameter_values_for_group(constants.JULES_PARAM_OUTPUT_PERIOD, 1)
+
+        assert_that([value.get_value_as_python() for value in values], contains(constants.JULES_MONTHLY_PERIOD))
+
+    def test_GIVEN_repeated_parameter_WHEN_get_parameter_values_THEN_values_sorted_by_group(self):
+        values = self.model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_VAR)
+
+        assert_that([value.get_value_as_python() for value in values], contains('gpp', 'npp'))
+
+    def test_GIVEN_driving_dataset_WHEN_get_python_parameter_value_THEN_value_returned(self):
+        driving_dataset = DrivingDataset()
+        parameter_value = DrivingDatasetParameterValue(None, driving_dataset, 1, None)
+        parameter_value.parameter = _create_parameter(constants.JULES_PARAM_RUN_START[0],
+                                                      constants.JULES_PARAM_RUN_START[1])
+        parameter_value.set_value_from_python(dt.datetime(1950, 1, 1))
+
+        value = driving_dataset.get_python_parameter_value(constants.JULES_PARAM_RUN_START)
+
+        assert_that(value, is_(dt.datetime(1950, 1, 1)))
+
+
+class TestPythonValue(BaseTest):
+
+    def test_GIVEN_value_read_WHEN_get_value_as_python_again_THEN_string_not_parsed_again(self):
+        parameter_value = _create_parameter_value(constants.JULES_PARAM_RUN_START, dt.datetime(1901, 1, 1))
+        parameter_value.get_value_as_python()
+
+        with patch.object(f90_helper, 'f90_str_to_python') as f90_str_to_python:
+            value = parameter_value.get_value_as_python()
+
+        assert_that(value, is_(dt.datetime(1901, 1, 1)))
+        assert_that(f90_str_to_python.call_count, is_(0))
+
+    def test_GIVEN_value_read_WHEN_set_value_from_python_THEN_new_value_returned(self):
+        parameter_value = _create_parameter_value(constants.JULES_PARAM_RUN_START, dt.datetime(1901, 1, 1))
+        parameter_value.get_value_as_python()
+
+        parameter_value.set_value_from_python(dt.datetime(1999, 1, 1))
+
+        assert_that(parameter_value.get_value_as_python(), is_(dt.datetime(1999, 1, 1)))
+
+    def test_GIVEN_value_read_WHEN_value_string_set_directly_THEN_new_value_returned(self):
+        parameter_value = _create_parameter_value(constants.JULES_PARAM_RUN_START, dt.datetime(1901, 1, 1))
+        parameter_value.get_value_as_python()
+
+        parameter_value.value = "'1999-01-01 00:00:00'"
+
+        assert_that(parameter_value.get_value_as_python(), is_(dt.datetime(1999, 1, 1)))
@@ -0,0 +1,106 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_
+
+from joj.tests.base import BaseTest
+from joj.lib.parsed_wms_capability_cache import ParsedWmsCapabilityCache
+
+
+class TestParsedWmsCapabilityCache(BaseTest):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.fetches = []
+        self.cache = ParsedWmsCapabilityCache(max_size=2, time_to_live_in_s=60, clock=lambda: self.now)
+
+    def fetch(self, url, force_refresh):
+        self.fetches.append((url, force_refresh))
+        return "<doc %s>" % url
+
+    def parse(self, document):
+        return {'parsed': document}
+
+    def get(self, url, force_refresh=False, dataset_id=None):
+        return self.cache.get(url, self.fetch, self.parse, force_refresh, dataset_id)
+
+    def test_GIVEN_empty_cache_WHEN_get_THEN_document_fetched_from_document_cache_and_parsed(self):
+        capabilities = self.get('url1')
+
+        assert_that(capabilities, is_({'parsed': '<doc url1>'}))
+        assert_that(self.fetches, is_([('url1', False)]))
+        assert_that(self.cache.get_statistics()['misses'], is_(1))
+
+    def test_GIVEN_capabilities_cached_WHEN_get_THEN_same_capabilities_returned_without_fetch(self):
+        first = self.get('url1')
+
+        second = self.get('url1')
+
+        assert_that(second is first, is_(True))
+        assert_that(len(self.fetches), is_(1))
+        assert_that(self.cache.get_statistics()['hits'], is_(1))
+
+    def test_GIVEN_capabilities_cached_WHEN_get_with_force_refresh_THEN_refetched_bypassing_document_cache(self):
+        self.get('url1')
+
+        self.get('url1', force_refresh=True)
+
+        assert_that(self.fetches, is_([('url1', False), ('url1', True)]))
+
+    def test_GIVEN_capabilities_expired_WHEN_get_THEN_refetched_bypassing_document_cache(self):
+        self.get('url1')
+        self.now += 61
+
+        self.get('url1')
+        self.get('url1')
+
+        assert_that(self.fetches, is_([('url1', False), ('url1', True)]))
+
+    def test_GIVEN_cache_full_WHEN_get_new_url_THEN_least_recently_used_evicted(self):
+        self.get('url1')
+        self.get('url2')
+        self.get('url1')
+
+        self.get('url3')
+        self.get('url2')
+
+        assert_that([url for url, _ in self.fetches], is_(['url1', 'url2', 'url3', 'url2']))
+        assert_that(self.cache.get_statistics()['size'], is_(2))
+
+    def test_GIVEN_capabilities_for_datasets_WHEN_invalidate_dataset_THEN_only_that_dataset_refetched(self):
+        self.get('url1', dataset_id=1)
+        self.get('url2', dataset_id=2)
+
+        self.cache.invalidate_dataset(1)
+        self.get('url1', dataset_id=1)
+        self.get('url2', dataset_id=2)
+
+        assert_that(self.fetches, is_([('url1', False), ('url2', False), ('url1', True)]))
+
+    def test_GIVEN_parse_fails_WHEN_get_THEN_exception_passed_on_and_nothing_cached(self):
+        def parse(document):
+            raise ValueError("bad document")
+
+        try:
+            self.cache.get('url1', self.fetch, parse)
+        except ValueError:
+            pass
+        self.get('url1')
+
+        assert_that(len(self.fetches), is_(2))
+        assert_that(self.cache.get_statistics()['size'], is_(1))
@@ -0,0 +1,48 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_
+from mock import Mock
+
+from joj.tests.base import BaseTest
+from joj.services.email_service import QueuedEmailSender
+
+
+class TestQueuedEmailSender(BaseTest):
+
+    def test_GIVEN_emails_queued_WHEN_close_THEN_all_emails_sent_in_order(self):
+        email_service = Mock()
+        sender = QueuedEmailSender(email_service)
+
+        sender.send_email("from", "to1", "subject1", "body1")
+        sender.send_email("from", "to2", "subject2", "body2")
+        sender.close()
+
+        assert_that(email_service.send_email.call_count, is_(2))
+        assert_that(email_service.send_email.call_args_list[1][0], is_(("from", "to2", "subject2", "body2")))
+
+    def test_GIVEN_sending_an_email_fails_WHEN_close_THEN_later_emails_still_sent(self):
+        email_service = Mock()
+        email_service.send_email.side_effect = [Exception("smtp down"), None]
+        sender = QueuedEmailSender(email_service)
+
+        sender.send_email("from", "to1", "subject1", "body1")
+        sender.send_email("from", "to2", "subject2", "body2")
+        sender.close()
+
+        assert_that(email_service.send_email.call_count, is_(2))
@@ -0,0 +1,102 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from hamcrest import assert_that, is_, none, same_instance
+from mock import Mock
+from pylons import request
+
+from joj.tests.base import BaseTest
+from joj.lib.request_cache import start_request_cache, end_request_cache, get_request_cache, cached_for_request, \
+    clear_request_cache
+
+
+class FakeRequest(object):
+    def __init__(self):
+        self.environ = {}
+
+
+class TestRequestCache(BaseTest):
+
+    def setUp(self):
+        self.request = FakeRequest()
+        request._push_object(self.request)
+        self.read = Mock(side_effect=lambda: object())
+
+    def tearDown(self):
+        request._pop_object(self.request)
+
+    def test_GIVEN_request_cache_started_WHEN_entity_read_twice_THEN_read_once(self):
+        start_request_cache(self.request.environ)
+
+        first = cached_for_request(('user', 'bob'), self.read)
+        second = cached_for_request(('user', 'bob'), self.read)
+
+        assert_that(second, same_instance(first))
+        assert_that(self.read.call_count, is_(1))
+        assert_that(get_request_cache().hits, is_(1))
+
+    def test_GIVEN_request_cache_started_WHEN_different_entities_read_THEN_each_read(self):
+        start_request_cache(self.request.environ)
+
+        cached_for_request(('user', 'bob'), self.read)
+        cached_for_request(('user', 'alice'), self.read)
+
+        assert_that(self.read.call_count, is_(2))
+
+    def test_GIVEN_request_cache_not_started_WHEN_entity_read_twice_THEN_read_twice(self):
+        cached_for_request(('user', 'bob'), self.read)
+        cached_for_request(('user', 'bob'), self.read)
+
+        assert_that(self.read.call_count, is_(2))
+
+    def test_GIVEN_request_cache_ended_WHEN_get_request_cache_THEN_none_returned(self):
+        start_request_cache(self.request.environ)
+
+        end_request_cache(self.request.environ)
+
+        assert_that(get_request_cache(), none())
+
+    def test_GIVEN_entity_cached_WHEN_cache_cleared_THEN_entity_read_again(self):
+        start_request_cache(self.request.environ)
+        cached_for_request(('user', 'bob'), self.read)
+
+        clear_request_cache()
+        cached_for_request(('user', 'bob'), self.read)
+
+        assert_that(self.read.call_count, is_(2))
+
+    def test_GIVEN_read_fails_WHEN_entity_read_THEN_exception_raised_and_nothing_cached(self):
+        start_request_cache(self.request.environ)
+        self.read.side_effect = IOError("database down")
+
+        with self.assertRaises(IOError):
+            cached_for_request(('user', 'bob'), self.read)
+
+        self.read.side_effect = lambda: "bob"
+        assert_that(cached_for_request(('user', 'bob'), self.read), is_("bob"))
+
+
+class TestRequestCacheWithoutRequest(BaseTest):
+
+    def test_GIVEN_no_request_registered_WHEN_entity_read_twice_THEN_read_twice(self):
+        read = Mock(return_value="bob")
+
+        cached_for_request(('user', 'bob'), read)
+        cached_for_request(('user', 'bob'), read)
+
+        assert_that(read.call_count, is_(2))
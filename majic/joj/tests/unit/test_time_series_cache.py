@@ -0,0 +1,101 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import numpy as np
+from hamcrest import assert_that, is_, same_instance
+from mock import Mock
+
+from joj.tests.base import BaseTest
+from joj.services.dap_client.time_series_cache import TimeSeriesCache
+
+
+class TestTimeSeriesCache(BaseTest):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = TimeSeriesCache(max_values=10, time_to_live_in_s=60, clock=lambda: self.now)
+        self.read_series = Mock(side_effect=lambda: np.arange(4.0))
+
+    def test_GIVEN_cell_not_in_cache_WHEN_get_THEN_series_read_and_miss_counted(self):
+        series = self.cache.get("url1", 1, 2, self.read_series)
+
+        assert_that(list(series), is_([0.0, 1.0, 2.0, 3.0]))
+        assert_that(self.read_series.call_count, is_(1))
+        assert_that(self.cache.get_statistics()['misses'], is_(1))
+
+    def test_GIVEN_cell_in_cache_WHEN_get_THEN_series_not_reread_and_hit_counted(self):
+        first = self.cache.get("url1", 1, 2, self.read_series)
+
+        second = self.cache.get("url1", 1, 2, self.read_series)
+
+        assert_that(second, same_instance(first))
+        assert_that(self.read_series.call_count, is_(1))
+        assert_that(self.cache.get_statistics()['hits'], is_(1))
+
+    def test_GIVEN_different_cell_WHEN_get_THEN_series_read(self):
+        self.cache.get("url1", 1, 2, self.read_series)
+
+        self.cache.get("url1", 2, 1, self.read_series)
+
+        assert_that(self.read_series.call_count, is_(2))
+
+    def test_GIVEN_series_older_than_time_to_live_WHEN_get_THEN_series_reread(self):
+        self.cache.get("url1", 1, 2, self.read_series)
+        self.now += 61
+
+        self.cache.get("url1", 1, 2, self.read_series)
+
+        assert_that(self.read_series.call_count, is_(2))
+
+    def test_GIVEN_values_over_maximum_WHEN_get_THEN_least_recently_used_evicted(self):
+        self.cache.get("url1", 0, 0, self.read_series)
+        self.cache.get("url1", 0, 1, self.read_series)
+        self.cache.get("url1", 0, 0, self.read_series)
+
+        self.cache.get("url1", 0, 2, self.read_series)
+        self.cache.get("url1", 0, 0, self.read_series)
+        self.cache.get("url1", 0, 1, self.read_series)
+
+        assert_that(self.read_series.call_count, is_(4))
+        assert_that(self.cache.get_statistics()['values'], is_(8))
+
+    def test_GIVEN_series_longer_than_maximum_WHEN_get_THEN_series_returned_but_not_cached(self):
+        self.read_series.side_effect = lambda: np.arange(11.0)
+
+        series = self.cache.get("url1", 0, 0, self.read_series)
+
+        assert_that(len(series), is_(11))
+        assert_that(self.cache.get_statistics()['size'], is_(0))
+
+    def test_GIVEN_series_for_url_in_cache_WHEN_invalidate_THEN_only_that_url_removed(self):
+        self.cache.get("url1", 0, 0, self.read_series)
+        self.cache.get("url2", 0, 0, self.read_series)
+
+        self.cache.invalidate("url1")
+        self.cache.get("url1", 0, 0, self.read_series)
+        self.cache.get("url2", 0, 0, self.read_series)
+
+        assert_that(self.read_series.call_count, is_(3))
+
+    def test_GIVEN_series_fails_to_read_WHEN_get_THEN_exception_raised_and_nothing_cached(self):
+        self.read_series.side_effect = IOError("can not read")
+
+        with self.assertRaises(IOError):
+            self.cache.get("url1", 0, 0, self.read_series)
+
+        assert_that(self.cache.get_statistics()['size'], is_(0))
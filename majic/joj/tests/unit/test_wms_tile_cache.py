@@ -0,0 +1,136 @@
+"""
+#    Majic
+#    Copyright (C) 2014  CEH
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from hamcrest import assert_that, is_, is_not, none, contains_string
+
+from joj.tests.base import BaseTest
+from joj.lib.wms_tile_cache import WmsTileCache
+
+
+class TestWmsTileCache(BaseTest):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.cache = WmsTileCache(data_dir=self.data_dir, max_size_in_mb=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def store(self, key, image='image', cache=None):
+        cache = cache or self.cache
+        etag = cache.create_etag(key)
+        blocks = list(cache.stream_and_store(key, StringIO(image), 'image/png', etag))
+        return ''.join(blocks), etag
+
+    def test_GIVEN_get_map_request_WHEN_is_cacheable_THEN_true(self):
+        assert_that(self.cache.is_cacheable({'REQUEST': 'GetMap'}), is_(True))
+        assert_that(self.cache.is_cacheable({'request': 'GetLegendGraphic'}), is_(True))
+
+    def test_GIVEN_get_capabilities_request_WHEN_is_cacheable_THEN_false(self):
+        assert_that(self.cache.is_cacheable({'REQUEST': 'GetCapabilities'}), is_(False))
+        assert_that(self.cache.is_cacheable({}), is_(False))
+
+    def test_GIVEN_cache_disabled_WHEN_is_cacheable_THEN_false(self):
+        cache = WmsTileCache(data_dir=self.data_dir, max_size_in_mb=0)
+
+        assert_that(cache.is_cacheable({'REQUEST': 'GetMap'}), is_(False))
+
+    def test_GIVEN_same_parameters_in_different_order_and_case_WHEN_get_key_THEN_keys_are_equal(self):
+        key1 = self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '0,0,1,1', 'LAYERS': 'gpp'})
+        key2 = self.cache.get_key(1, {'layers': 'gpp', 'request': 'GetMap', 'bbox': '0,0,1,1'})
+
+        assert_that(key1, is_(key2))
+
+    def test_GIVEN_different_dataset_or_parameters_WHEN_get_key_THEN_keys_differ(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '0,0,1,1'})
+
+        assert_that(self.cache.get_key(2, {'REQUEST': 'GetMap', 'BBOX': '0,0,1,1'}), is_not(key))
+        assert_that(self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '0,0,1,2'}), is_not(key))
+
+    def test_GIVEN_empty_cache_WHEN_get_THEN_none_and_miss_recorded(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+
+        assert_that(self.cache.get(key), none())
+        assert_that(self.cache.get_statistics()['misses'], is_(1))
+
+    def test_GIVEN_tile_streamed_WHEN_get_THEN_tile_returned_with_content_type_and_etag(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+        streamed, etag = self.store(key, 'png data')
+
+        tile = self.cache.get(key)
+
+        assert_that(streamed, is_('png data'))
+        assert_that(''.join(tile.read_blocks()), is_('png data'))
+        assert_that(tile.content_type, is_('image/png'))
+        assert_that(tile.etag, is_(etag))
+        assert_that(self.cache.get_statistics()['hits'], is_(1))
+
+    def test_GIVEN_stream_not_read_to_end_WHEN_get_THEN_tile_not_cached(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+        stream = self.cache.stream_and_store(key, StringIO('a' * 200000), 'image/png', 'etag')
+        next(stream)
+        stream.close()
+
+        assert_that(self.cache.get(key), none())
+        assert_that(os.listdir(os.path.join(self.data_dir, '1')), is_([]))
+
+    def test_GIVEN_cache_full_WHEN_tile_added_THEN_least_recently_used_tile_evicted(self):
+        key1 = self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '1'})
+        key2 = self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '2'})
+        key3 = self.cache.get_key(1, {'REQUEST': 'GetMap', 'BBOX': '3'})
+        tile = 'a' * 400 * 1024
+        self.store(key1, tile)
+        self.store(key2, tile)
+        self.cache.get(key1)
+
+        self.store(key3, tile)
+
+        assert_that(self.cache.get(key2), none())
+        assert_that(self.cache.get(key1), is_not(none()))
+        assert_that(self.cache.get(key3), is_not(none()))
+        assert_that(self.cache.get_statistics()['evictions'], is_(1))
+
+    def test_GIVEN_tiles_on_disk_WHEN_new_cache_created_THEN_existing_tiles_are_used(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+        self.store(key, 'png data')
+
+        cache = WmsTileCache(data_dir=self.data_dir, max_size_in_mb=1)
+
+        assert_that(''.join(cache.get(key).read_blocks()), is_('png data'))
+        assert_that(cache.get_statistics()['tiles'], is_(1))
+
+    def test_GIVEN_tiles_for_two_datasets_WHEN_invalidate_dataset_THEN_only_that_datasets_tiles_removed(self):
+        key1 = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+        key2 = self.cache.get_key(2, {'REQUEST': 'GetMap'})
+        self.store(key1)
+        self.store(key2)
+
+        self.cache.invalidate_dataset(1)
+
+        assert_that(self.cache.get(key1), none())
+        assert_that(self.cache.get(key2), is_not(none()))
+        assert_that(self.cache.get_statistics()['tiles'], is_(1))
+
+    def test_GIVEN_key_WHEN_create_etag_THEN_etag_contains_key(self):
+        key = self.cache.get_key(1, {'REQUEST': 'GetMap'})
+
+        assert_that(self.cache.create_etag(key), contains_string(key.split('/')[1]))
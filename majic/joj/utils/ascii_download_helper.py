@@ -16,13 +16,19 @@
 #    with this program; if not, write to the Free Software Foundation, Inc.,
 #    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+import logging
 import sys
+import time
+from multiprocessing.pool import ThreadPool
+import numpy as np
 
 from joj.utils import constants
 from joj.services.dataset import DatasetService
 from joj.services.dap_client.dap_client_factory import DapClientFactory
 from joj.services.general import ServiceException
 
+log = logging.getLogger(__name__)
+
 
 class AsciiDownloadHelper(object):
     """
@@ -59,17 +65,20 @@ class AsciiDownloadHelper(object):
 # {interps}
 """
 
-    def __init__(self, thredds_url, dataset_service=DatasetService(), dap_client_factory=DapClientFactory()):
+    def __init__(self, thredds_url, dataset_service=DatasetService(), dap_client_factory=DapClientFactory(),
+                 block_size=constants.USER_DOWNLOAD_BLOCK_SIZE):
         """
         Constructor
         :param dataset_service: Provides access to datasets
         :param dap_client_factory: Factory to create dap clients
+        :param block_size: Number of timesteps to fetch from the THREDDS server in one go
         :return: AsciiDownloadHelper
         """
         self.thredds_url = thredds_url
         self._dap_clients = None
         self._dataset_service = dataset_service
         self._dap_client_factory = dap_client_factory
+        self._block_size = block_size
 
     def get_driving_data_file_gen(self, driving_data, lat, lon, start, end):
         """
@@ -99,19 +108,12 @@ class AsciiDownloadHelper(object):
                                     vars=vars,
                                     interps=interps).replace('\n', '\r\n')
         yield str(header)
-        data_to_send = ""
         self._create_dap_clients_if_missing(driving_data)
         lat_index, lon_index = self._dap_clients[0].get_lat_lon_index(lat, lon)
         time_index = self._dap_clients[0].get_time_index(actual_start)
         end_time_index = self._dap_clients[0].get_time_index(actual_end)
-        while time_index <= end_time_index:
-            data_line = self._get_data_line(lat_index, lon_index, time_index)
-            time_index += 1
-            data_to_send += data_line
-            if time_index % constants.GENERATORS_LINES_TO_READ == 0:
-                yield str(data_to_send)
-                data_to_send = ""
-        yield str(data_to_send)
+        for data_block in self._get_data_blocks_gen(lat_index, lon_index, time_index, end_time_index + 1):
+            yield data_block
 
     def get_driving_data_filename(self, driving_data, lat, lon, start, end):
         """
@@ -208,12 +210,65 @@ class AsciiDownloadHelper(object):
                                    "Cannot process download")
         return ends[0]
 
-    def _get_data_line(self, lat_index, lon_index, time_index):
-        data_values = []
-        for dap_client in self._dap_clients:
-            data = dap_client.get_data_at(lat_index, lon_index, time_index)
-            data_values.append((data))
-        return '\t'.join(('%-*G' % (self.col_size, x) for x in data_values)) + "\r\n"
+    def _get_data_blocks_gen(self, lat_index, lon_index, time_index_start, time_index_end):
+        """
+        Get the formatted data lines for a range of times. Each block of times is fetched for all the variables
+        at once, and the next block is fetched while the current one is being sent.
+        :param lat_index: Latitude index to get data at
+        :param lon_index: Longitude index to get data at
+        :param time_index_start: First time index to get
+        :param time_index_end: Time index to stop before
+        :return: generator of blocks of data lines
+        """
+        start_time = time.time()
+        nlines = 0
+        nbytes = 0
+        blocks = [(block_start, min(block_start + self._block_size, time_index_end))
+                  for block_start in range(time_index_start, time_index_end, self._block_size)]
+        pool = ThreadPool(max(len(self._dap_clients), 1))
+        try:
+            if len(blocks) > 0:
+                pending = self._fetch_data_block(pool, lat_index, lon_index, *blocks[0])
+            for i, (block_start, block_end) in enumerate(blocks):
+                columns = pending.get()
+                if i + 1 < len(blocks):
+                    pending = self._fetch_data_block(pool, lat_index, lon_index, *blocks[i + 1])
+                data_block = self._format_data_block(columns)
+                nlines += block_end - block_start
+                nbytes += len(data_block)
+                yield data_block
+        finally:
+            pool.terminate()
+
+        elapsed = time.time() - start_time
+        log.info("ASCII download of %s lines (%s bytes) took %.2fs (%.0f lines/s)"
+                 % (nlines, nbytes, elapsed, nlines / max(elapsed, 1e-6)))
+
+    def _fetch_data_block(self, pool, lat_index, lon_index, time_index_start, time_index_end):
+        """
+        Start fetching a block of times for every variable
+        :param pool: thread pool to fetch the variables in
+        :param lat_index: Latitude index to get data at
+        :param lon_index: Longitude index to get data at
+        :param time_index_start: First time index to get
+        :param time_index_end: Time index to stop before
+        :return: asynchronous result which gives a list of arrays of values, one for each variable
+        """
+        def _get_data_block(dap_client):
+            return dap_client.get_data_block(lat_index, lon_index, time_index_start, time_index_end)
+
+        return pool.map_async(_get_data_block, self._dap_clients)
+
+    def _format_data_block(self, columns):
+        """
+        Format a block of data as lines of whitespace separated values, one column for each variable
+        :param columns: list of arrays of values, one for each variable
+        :return: the lines as a string
+        """
+        values = np.column_stack(columns)
+        nlines, ncolumns = values.shape
+        line_format = '\t'.join(['%-{size}G'.format(size=self.col_size)] * ncolumns) + "\r\n"
+        return str((line_format * nlines) % tuple(values.ravel().tolist()))
 
     def _create_dap_clients_if_missing(self, driving_data):
         if self._dap_clients is None or len(self._dap_clients) == 0:
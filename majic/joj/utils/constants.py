@@ -35,6 +35,9 @@ USER_ACCESS_LEVEL_EXTERNAL = "External"
 QUOTA_WARNING_LIMIT_PERCENT = 80
 QUOTA_ABSOLUTE_LIMIT_PERCENT = 100
 
+# Default number of model runs shown on each page of the model run catalogue
+MODEL_RUN_LISTING_PAGE_SIZE = 50
+
 # Size to cache when read file for a generator
 GENERATORS_SIZE_TO_READ = 100000
 GENERATORS_LINES_TO_READ = 100
@@ -119,9 +122,56 @@ LAYERS_NOT_TO_DISPLAY = ['latitude', 'lat', 'longitude', 'lon', 'crs', 'time']
 
 # Max number of points to get for graph:
 GRAPH_NPOINTS = 1000
+# Max number of points a graph request may ask for:
+GRAPH_MAX_NPOINTS = 10000
 # Date time string format used by the graph / visualisation.
 GRAPH_TIME_FORMAT = "%Y-%m-%dT%X.%fZ"
 
+# Default number of OPeNDAP datasets held open by each process and how long (in seconds) to hold them for
+DAP_DATASET_CACHE_SIZE = 50
+DAP_DATASET_CACHE_EXPIRE_IN_S = 600
+
+# Total number of values in the time series held for graphs per process, seconds to hold each series for and the
+# maximum number of times read in one request when reading a series
+TIME_SERIES_CACHE_MAX_VALUES = 5000000
+TIME_SERIES_CACHE_EXPIRE_IN_S = 600
+TIME_SERIES_READ_BLOCK_SIZE = 100000
+
+# Maximum number of datasets read at once when graphing several datasets at a point
+GRAPH_FETCH_WORKERS = 4
+
+# Number of verified Crowd session tokens held per process and how long (in seconds) to trust each one for
+CROWD_TOKEN_CACHE_SIZE = 10000
+CROWD_TOKEN_CACHE_EXPIRE_IN_S = 20
+
+# Number of finished model runs held per process and how long (in seconds) to hold each one for
+FINISHED_MODEL_RUN_CACHE_SIZE = 200
+FINISHED_MODEL_RUN_CACHE_EXPIRE_IN_S = 30
+
+# Maximum number of layer images fetched at once when building a figure
+FIGURE_LAYER_FETCH_WORKERS = 4
+
+# Maximum number of video frames rendered at once when exporting an animation
+VIDEO_FRAME_RENDER_WORKERS = 4
+
+# Number of parsed WMS capabilities documents held per process and seconds to hold each one for
+PARSED_WMS_CAPABILITIES_CACHE_SIZE = 200
+PARSED_WMS_CAPABILITIES_CACHE_EXPIRE_IN_S = 600
+
+# Default directory and maximum total size (in MB) of the cache of WMS map tiles
+WMS_TILE_CACHE_DATA_DIR = '/tmp/majic/wms_tile_cache'
+WMS_TILE_CACHE_MAX_SIZE_IN_MB = 500
+
+# Limits on reading data to find the data range of a dataset which has no range attributes: the maximum number of
+# values to read in one request and the maximum number of requests (times are sampled beyond this)
+DATA_RANGE_MAX_VALUES_PER_REQUEST = 1000000
+DATA_RANGE_MAX_REQUESTS = 100
+
+# Default number of workers looking up the datasets of completed model runs when updating the job statuses and the
+# number of model runs updated in each database transaction
+JOB_STATUS_UPDATER_MAX_WORKERS = 4
+JOB_STATUS_UPDATER_DB_BATCH_SIZE = 50
+
 # The name of the driving dataset which represents the 'upload your own driving dataset' option
 USER_UPLOAD_DRIVING_DATASET_NAME = "Use My Own Single Cell Driving Data"
 USER_UPLOAD_FILE_NAME = "user_uploaded_driving_data.dat"  # The name of the file we store user driving data in
@@ -131,7 +181,7 @@ USER_UPLOAD_ALLOWED_VARS = ['pstar', 'q', 't', 'rad_net', 'sw_down', 'lw_down',
                             'wind', 'u', 'v']
 USER_UPLOAD_ALLOWED_INTERPS = ['b', 'c', 'f', 'i', 'nb', 'nc', 'nf']
 USER_DOWNLOAD_DATA_FILE_EXTENSION = ".dat"
-USER_DOWNLOAD_CACHE_SIZE = 1000  # Number of timesteps to cache when downloading driving data
+USER_DOWNLOAD_BLOCK_SIZE = 5000  # Number of timesteps to fetch in one request when downloading driving data
 
 # These two dictionaries allow us to identify which interpolation flags need extra driving data steps at the start
 # or end of a run.
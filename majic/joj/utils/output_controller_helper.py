@@ -66,7 +66,6 @@ def add_selected_outputs_to_template_context(template_context, model_run):
 
     # Get the list of ParameterValues for the JULES params 'var' and 'output_period'
     selected_vars = model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_VAR)
-    selected_output_periods = model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_PERIOD)
 
     # For each selected output variable we need to get the param_id,
     # and identify the corresponding selected time periods:
@@ -81,17 +80,17 @@ def add_selected_outputs_to_template_context(template_context, model_run):
         template_context.selected_output_ids.append(param_id)
 
         # Go through the selected output period and see which ones are for this output variable
-        for output_period in selected_output_periods:
-            if output_period.group_id == selected_var.group_id:
-                period = output_period.get_value_as_python()
-                if period == constants.JULES_YEARLY_PERIOD:
-                    template_context.yearly_output_ids.append(param_id)
-                elif period == constants.JULES_MONTHLY_PERIOD:
-                    template_context.monthly_output_ids.append(param_id)
-                elif period == constants.JULES_DAILY_PERIOD:
-                    template_context.daily_output_ids.append(param_id)
-                else:
-                    template_context.hourly_output_ids.append(param_id)
+        for output_period in model_run.get_parameter_values_for_group(constants.JULES_PARAM_OUTPUT_PERIOD,
+                                                                      selected_var.group_id):
+            period = output_period.get_value_as_python()
+            if period == constants.JULES_YEARLY_PERIOD:
+                template_context.yearly_output_ids.append(param_id)
+            elif period == constants.JULES_MONTHLY_PERIOD:
+                template_context.monthly_output_ids.append(param_id)
+            elif period == constants.JULES_DAILY_PERIOD:
+                template_context.daily_output_ids.append(param_id)
+            else:
+                template_context.hourly_output_ids.append(param_id)
 
 
 def create_output_variable_groups(post_values, model_run_service, model_run):
@@ -67,24 +67,23 @@ class SummaryControllerHelper(object):
         output_variables = self._model_run_service.get_output_variables()
         output_variable_dict = dict((x.name, x.description) for x in output_variables)
         selected_vars = model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_VAR)
-        selected_output_periods = model_run.get_parameter_values(constants.JULES_PARAM_OUTPUT_PERIOD)
         outputs = {}
         # Each group contains one output variable and one output period
         for selected_var in selected_vars:
             var_name = selected_var.get_value_as_python()
             if var_name not in outputs:
                 outputs[var_name] = []
-            for output_period in selected_output_periods:
-                if output_period.group_id == selected_var.group_id:
-                    period = output_period.get_value_as_python()
-                    if period == constants.JULES_YEARLY_PERIOD:
-                        outputs[var_name].append('Yearly')
-                    elif period == constants.JULES_MONTHLY_PERIOD:
-                        outputs[var_name].append('Monthly')
-                    elif period == constants.JULES_DAILY_PERIOD:
-                        outputs[var_name].append('Daily')
-                    else:
-                        outputs[var_name].append('Hourly')
+            for output_period in model_run.get_parameter_values_for_group(constants.JULES_PARAM_OUTPUT_PERIOD,
+                                                                          selected_var.group_id):
+                period = output_period.get_value_as_python()
+                if period == constants.JULES_YEARLY_PERIOD:
+                    outputs[var_name].append('Yearly')
+                elif period == constants.JULES_MONTHLY_PERIOD:
+                    outputs[var_name].append('Monthly')
+                elif period == constants.JULES_DAILY_PERIOD:
+                    outputs[var_name].append('Daily')
+                else:
+                    outputs[var_name].append('Hourly')
         context.outputs = []
         for output in outputs:
             context.outputs.append(output_variable_dict[output] + ' - ' + ', '.join(map(str, outputs[output])) + '')
@@ -46,20 +46,6 @@ def find_by_id(values, id_to_match):
     raise KeyNotFound(id_to_match)
 
 
-def find_by_id_in_dict(values, id_to_match):
-    """
-    Find a value in values which are dictionaries with the id id_to_match
-    :param values: the list of possible values
-    :param id_to_match: the id to match
-    :return: the matched value or thrown KeyNotFound exception if it is not in the list
-    """
-    for value in values:
-        if value['id'] == id_to_match:
-            return value
-
-    raise KeyNotFound(id_to_match)
-
-
 def convert_mb_to_gb_and_round(value_in_mb):
     """
     Convert a value from MB to GB and round it to the nearest 1dp
@@ -116,23 +102,6 @@ def _is_list(is_list, parameter_namelist_name):
     return is_list_local
 
 
-def find_first_parameter_value_in_param_vals_list(parameter_values, parameter_namelist_name, is_list=None):
-    """
-        Gets the value of the first matching parameter value as a python object
-        :param parameter_values: parameter value to search through
-        :param parameter_namelist_name: list containing [namelist, name, is_list] of parameter to find
-            if is_list is not present defaults to false
-        :param is_list: Indicates whether the value is a list, overrides constant
-        :return parameter value as python or None
-        """
-    is_list_local = _is_list(is_list, parameter_namelist_name)
-    for param_val in parameter_values:
-        if param_val.parameter.name == parameter_namelist_name[1]:
-            if param_val.parameter.namelist.name == parameter_namelist_name[0]:
-                return param_val.get_value_as_python(is_list=is_list_local)
-    return None
-
-
 def get_first_parameter_value_from_parameter_list(parameters, parameter_namelist_name, is_list=False, group_id=None):
     """
     Get a parameter value from a list of parameters